@@ -3,17 +3,23 @@ import logging
 import os
 import platform
 import socket
-import tempfile
 import json
 import argparse
 from datetime import datetime
 import aiohttp
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 
-from config.settings import AGENT_POLL_INTERVAL, AGENT_HEARTBEAT_INTERVAL
-from entity.task import TaskStatus
+from config.settings import (
+    AGENT_POLL_INTERVAL, AGENT_HEARTBEAT_INTERVAL, AGENT_LONG_POLL_TIMEOUT,
+    AGENT_RESULT_INTERVAL, AGENT_WORK_DIR, AGENT_PREFETCH_TASKS
+)
+from entity.task import Task, TaskStatus
 from entity.agent import AgentStatus
 from usecase.hashcat_usecase import HashcatUseCase
+from usecase.hashcat_status import HASHCAT_EXIT_CRACKED, HASHCAT_EXIT_EXHAUSTED
+from usecase.potfile_usecase import normalize_hash
+from usecase.file_cache import FileCache
+from usecase.wordlist_stream import WordlistFeeder, detect_compression
 
 # Configure logging
 logging.basicConfig(
@@ -26,7 +32,7 @@ logger = logging.getLogger(__name__)
 class HashcatAgent:
     """Agent for running hashcat tasks on a GPU server"""
     
-    def __init__(self, server_url: str, api_key: str = None, name: str = None):
+    def __init__(self, server_url: str, api_key: str = None, name: str = None, work_dir: str = None):
         self.server_url = server_url.rstrip("/")
         self.api_key = api_key
         self.name = name or socket.gethostname()
@@ -34,8 +40,18 @@ class HashcatAgent:
         self.ip_address = self._get_ip_address()
         self.hashcat_usecase = HashcatUseCase()
         self.current_task = None
+        self.current_chunk = None
         self.current_process = None
-        self.temp_dir = tempfile.mkdtemp(prefix="hashcat_agent_")
+        # Chunk progress and speed of the latest hashcat status line, sent with the next heartbeat
+        self.current_status = None
+        # Set once the server refuses reports on the current task, its work files are of no use then
+        self.current_withdrawn = False
+        # Outfiles and their read offsets live here so a restarted agent can resume a chunk
+        self.work_dir = work_dir or AGENT_WORK_DIR
+        os.makedirs(self.work_dir, exist_ok=True)
+        # Wordlists and rules fetched from the server's file catalog
+        self.file_cache = FileCache(os.path.join(self.work_dir, "cache"))
+        self._prefetch_task = None
         self.registered = False
         self.session = None
     
@@ -116,23 +132,29 @@ class HashcatAgent:
             try:
                 if self.registered:
                     status = AgentStatus.BUSY if self.current_task else AgentStatus.ONLINE
+                    task_id = self.current_task.get("id") if self.current_task else None
+                    chunk_id = self.current_chunk.get("id") if self.current_chunk else None
                     
+                    # Progress rides on heartbeats, which the server buffers, and renews the chunk lease
                     heartbeat_data = {
                         "status": status.value,
-                        "current_task_id": self.current_task.get("id") if self.current_task else None,
+                        "current_task_id": task_id,
+                        "current_chunk_id": chunk_id,
+                        "task_progress": self.current_status["progress"] if self.current_status else None,
+                        "task_speed": self.current_status["speed"] if self.current_status else None,
                     }
                     
-                    # Add task progress if available
-                    if self.current_task and self.current_process:
-                        heartbeat_data["task_progress"] = self.current_task.get("progress", 0)
-                        heartbeat_data["task_speed"] = self.current_task.get("speed", 0)
-                    
                     async with self.session.post(
                         f"{self.server_url}/agents/heartbeat",
                         json=heartbeat_data
                     ) as response:
                         if response.status == 200:
                             logger.debug("Heartbeat sent successfully")
+                            data = await response.json()
+                            # The server no longer names the chunk once it was cancelled or retired
+                            withdrawn = chunk_id and data.get("current_chunk_id") != chunk_id
+                            if withdrawn and self.current_chunk and self.current_chunk.get("id") == chunk_id:
+                                self._withdraw_task(task_id)
                         else:
                             error = await response.text()
                             logger.error(f"Failed to send heartbeat: {error}")
@@ -142,134 +164,412 @@ class HashcatAgent:
             # Sleep until next heartbeat
             await asyncio.sleep(AGENT_HEARTBEAT_INTERVAL)
     
+    def _withdraw_task(self, task_id: str):
+        """Stop hashcat if the server withdrew the task (cancelled, or retired once fully cracked)"""
+        if not self.current_task or self.current_task.get("id") != task_id:
+            return
+        self.current_withdrawn = True
+        if self.current_process and self.current_process.returncode is None:
+            logger.info(f"Task {self.current_task.get('id')} was withdrawn by the server, stopping hashcat")
+            self.current_process.terminate()
+    
     async def task_poll_task(self):
-        """Poll for tasks from server"""
+        """Wait for tasks from server using long-poll requests"""
         while True:
             try:
                 if self.registered and not self.current_task:
-                    # Check for new task
+                    # The server holds the request until a task is assigned or the wait runs out
                     async with self.session.get(
-                        f"{self.server_url}/agent/task"
+                        f"{self.server_url}/agent/task",
+                        params={"wait": AGENT_LONG_POLL_TIMEOUT},
+                        timeout=aiohttp.ClientTimeout(total=AGENT_LONG_POLL_TIMEOUT + 30),
                     ) as response:
                         if response.status == 200:
                             data = await response.json()
                             if data.get("status") == "ok" and data.get("task"):
                                 # Got a new task
                                 self.current_task = data["task"]
+                                self.current_chunk = data.get("chunk")
                                 logger.info(f"Received task: {self.current_task['name']}")
                                 
                                 # Process task in background
-                                asyncio.create_task(self.process_task(self.current_task))
+                                asyncio.create_task(self.process_task(
+                                    self.current_task, self.current_chunk, data.get("files")
+                                ))
+                                continue
+                            if data.get("status") == "no_task":
+                                # Long-poll expired without work, ask again straight away
+                                continue
             except Exception as e:
                 logger.error(f"Error polling for tasks: {e}")
             
-            # Sleep until next poll
+            # Back off while busy, unregistered or after an error
             await asyncio.sleep(AGENT_POLL_INTERVAL)
     
-    async def process_task(self, task: Dict[str, Any]):
-        """Process a hashcat task"""
+    async def process_task(self, task: Dict[str, Any], chunk: Optional[Dict[str, Any]] = None,
+                           files: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Process a hashcat task, or one keyspace chunk of it"""
+        chunk_id = chunk.get("id") if chunk else None
+        digests = [entry["sha256"] for entry in (files or {}).values()]
+        self.file_cache.pin(digests)
+        feeder = None
+        slice_file = None
+        output_file = None
+        acknowledged = False
         try:
             logger.info(f"Processing task {task['id']}: {task['name']}")
+            if chunk:
+                logger.info(f"Keyspace chunk {chunk_id}: skip={chunk['skip']} limit={chunk['limit']}")
             
             # Update task status to running
             await self.update_task_status(
                 task["id"],
                 TaskStatus.RUNNING,
-                0.0
+                0.0,
+                chunk_id=chunk_id
             )
             
-            # Create output file
-            output_file = os.path.join(self.temp_dir, f"task_{task['id']}_output.txt")
+            # Hashes another task already cracked are reported without running hashcat
+            hash_type_id = self.hashcat_usecase.get_hash_type_id(Task.from_dict(dict(task)))
+            potfile = await self.sync_potfile(hash_type_id)
+            hashes, unreported = await self._report_known_hashes(task, chunk_id, potfile)
+            if not hashes:
+                logger.info(f"All hashes of task {task['id']} are in the potfile")
+                await self.update_task_status(
+                    task["id"], TaskStatus.COMPLETED, 1.0, recovered_hashes=unreported, chunk_id=chunk_id
+                )
+                return
+            
+            # Create output file, one per chunk so results are not reported twice
+            output_name = f"task_{task['id']}_{chunk_id}_output.txt" if chunk_id else f"task_{task['id']}_output.txt"
+            output_file = os.path.join(self.work_dir, output_name)
+            offset_file = f"{output_file}.offset"
+            
+            # A chunk of an indexed wordlist comes with the byte range of its words, only those are downloaded
+            wordlist_entry = (files or {}).get("wordlist_path")
+            if wordlist_entry and wordlist_entry.get("slice") and not self.file_cache.get(wordlist_entry["sha256"]):
+                slice_file = f"{output_file}.words"
+                await self.fetch_wordlist_slice(wordlist_entry, slice_file)
+                files = {field: entry for field, entry in files.items() if field != "wordlist_path"}
+            
+            # Wordlist and rules from the local cache instead of the server's paths
+            local_paths = await self.fetch_task_files(task, files)
+            if slice_file:
+                local_paths["wordlist_path"] = slice_file
+            
+            # Compressed wordlists are decompressed into hashcat's stdin, never onto disk
+            wordlist = local_paths.get("wordlist_path", task.get("wordlist_path"))
+            if task.get("attack_mode", 0) == 0 and wordlist and detect_compression(wordlist):
+                feeder = WordlistFeeder(
+                    wordlist, chunk.get("skip") if chunk else 0, chunk.get("limit") if chunk else None
+                )
             
             # Prepare hashcat command
+            # The downloaded words are the chunk, hashcat runs over all of them
             command = await self.hashcat_usecase.prepare_task_command(
-                task, output_file, self.temp_dir
+                Task.from_dict(dict(task, hashes=hashes, **local_paths)), output_file, self.work_dir,
+                skip=chunk.get("skip") if chunk and not slice_file else None,
+                limit=chunk.get("limit") if chunk and not slice_file else None,
+                potfile_path=self._potfile_path(hash_type_id),
+                stdin_wordlist=feeder is not None
             )
             
             logger.info(f"Running hashcat command: {' '.join(command)}")
             
             # Run hashcat
-            self.current_process = await self.hashcat_usecase.run_hashcat(command)
+            self.current_process = await self.hashcat_usecase.run_hashcat(
+                command, stdin=feeder.open_pipe() if feeder else None
+            )
+            if feeder:
+                feeder.start()
             
-            # Monitor hashcat process
-            while True:
-                # Check if process is still running
-                if self.current_process.returncode is not None:
-                    break
-                
-                # Read output
-                stdout_data, stderr_data = await asyncio.gather(
-                    self.current_process.stdout.read(1024),
-                    self.current_process.stderr.read(1024)
-                )
-                
-                # Parse status
-                status_data = await self.hashcat_usecase.parse_hashcat_status(
-                    stdout_data, stderr_data
-                )
-                
-                # Update task status
-                if status_data["status"] == "error":
-                    await self.update_task_status(
-                        task["id"],
-                        TaskStatus.FAILED,
-                        status_data["progress"],
-                        status_data["speed"],
-                        status_data["error"]
-                    )
-                    break
-                elif status_data["status"] == "completed":
-                    # Parse results
-                    results = await self.hashcat_usecase.parse_hashcat_results(output_file)
-                    
-                    # Update task with results
-                    await self.update_task_status(
-                        task["id"],
-                        TaskStatus.COMPLETED,
-                        1.0,
-                        status_data["speed"],
-                        None,
-                        results
-                    )
-                    break
-                else:
-                    # Update progress
-                    task["progress"] = status_data["progress"]
-                    task["speed"] = status_data["speed"]
-                    
-                    await self.update_task_status(
-                        task["id"],
-                        TaskStatus.RUNNING,
-                        status_data["progress"],
-                        status_data["speed"]
-                    )
-                
-                # Sleep briefly
-                await asyncio.sleep(1)
+            # The next tasks' files download while this one cracks
+            self._start_prefetch()
             
-            # Final status update if needed
-            if self.current_process.returncode != 0 and task["status"] != TaskStatus.FAILED.value:
-                await self.update_task_status(
+            # Read both streams independently so a quiet stderr never holds up status reports
+            status_reader = asyncio.create_task(
+                self._watch_status(task, self.current_process.stdout, feeder)
+            )
+            error_reader = asyncio.create_task(self.hashcat_usecase.read_errors(self.current_process.stderr))
+            
+            # Ship cracks while hashcat runs
+            finished = asyncio.Event()
+            result_reader = asyncio.create_task(
+                self._tail_results(task, chunk_id, output_file, offset_file, finished)
+            )
+            
+            returncode = await self.current_process.wait()
+            finished.set()
+            await status_reader
+            errors = await error_reader
+            offset = await result_reader
+            
+            if feeder:
+                await asyncio.get_running_loop().run_in_executor(None, feeder.join)
+                if feeder.error:
+                    # Hashcat took the cut off input for the whole chunk, it must not count as exhausted
+                    errors.append(f"Wordlist stream failed: {feeder.error}")
+                    returncode = None
+            
+            # Results written after the last read go out with the final status
+            results, offset = await self.hashcat_usecase.read_new_results(output_file, offset, final=True)
+            results = unreported + results
+            
+            if returncode in [HASHCAT_EXIT_CRACKED, HASHCAT_EXIT_EXHAUSTED]:
+                # Update task with results
+                acknowledged = await self.update_task_status(
+                    task["id"],
+                    TaskStatus.COMPLETED,
+                    1.0,
+                    task.get("speed"),
+                    None,
+                    results,
+                    chunk_id=chunk_id
+                )
+            else:
+                error = errors[-1] if errors else f"Hashcat exited with code {returncode}"
+                acknowledged = await self.update_task_status(
                     task["id"],
                     TaskStatus.FAILED,
-                    task["progress"],
-                    task["speed"],
-                    f"Hashcat exited with code {self.current_process.returncode}"
+                    task.get("progress", 0),
+                    task.get("speed"),
+                    error,
+                    results,
+                    chunk_id=chunk_id
                 )
         except Exception as e:
             logger.error(f"Error processing task: {e}")
             # Update task status to failed
-            await self.update_task_status(
+            acknowledged = await self.update_task_status(
                 task["id"],
                 TaskStatus.FAILED,
                 task.get("progress", 0),
                 task.get("speed", 0),
-                str(e)
+                str(e),
+                chunk_id=chunk_id
             )
         finally:
             # Clean up
+            if feeder:
+                feeder.stop()
+                feeder.join(timeout=0)
+            self.file_cache.unpin(digests)
+            if slice_file and os.path.exists(slice_file):
+                os.remove(slice_file)
+            if output_file and (acknowledged or self.current_withdrawn):
+                # The server has the chunk's final status or dropped it, nothing is left to resume
+                self._remove_work_files(
+                    output_file, offset_file,
+                    self.hashcat_usecase.get_hash_file_path(task["id"], self.work_dir)
+                )
             self.current_task = None
+            self.current_chunk = None
             self.current_process = None
+            self.current_status = None
+            self.current_withdrawn = False
+    
+    async def fetch_task_files(self, task: Dict[str, Any],
+                               files: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, str]:
+        """Cached paths of the task's catalog files by task field, downloading missing ones"""
+        local_paths = {}
+        for field, entry in (files or {}).items():
+            try:
+                local_paths[field] = await self.file_cache.ensure(
+                    entry, lambda offset, sha256=entry["sha256"]: self._download_file(sha256, offset)
+                )
+            except Exception as e:
+                # Agents set up with the file at the same path keep working without the download
+                if task.get(field) and os.path.exists(task[field]):
+                    logger.warning(f"Using local {task[field]}, fetching {entry['name']} failed: {e}")
+                    continue
+                raise RuntimeError(f"Failed to fetch {entry['name']}: {e}")
+        return local_paths
+    
+    async def fetch_wordlist_slice(self, entry: Dict[str, Any], path: str):
+        """Download the words of a chunk, resuming a download left by an interrupted run"""
+        word_slice = entry["slice"]
+        received = os.path.getsize(path) if os.path.exists(path) else 0
+        if received > word_slice["length"]:
+            os.remove(path)
+            received = 0
+        logger.info(f"Fetching lines {word_slice['skip']}-{word_slice['skip'] + word_slice['limit']} of {entry['name']}")
+        
+        with open(path, "ab") as f:
+            if received < word_slice["length"]:
+                end = word_slice["offset"] + word_slice["length"] - 1
+                async for chunk in self._download_file(entry["sha256"], word_slice["offset"] + received, end):
+                    f.write(chunk)
+        
+        if os.path.getsize(path) != word_slice["length"]:
+            raise RuntimeError(f"Fetched {os.path.getsize(path)} bytes of {entry['name']}, expected {word_slice['length']}")
+    
+    async def prefetch_files(self):
+        """Download the files of the tasks the server dispatches next"""
+        try:
+            async with self.session.get(
+                f"{self.server_url}/agent/files/upcoming",
+                params={"limit": AGENT_PREFETCH_TASKS}
+            ) as response:
+                if response.status != 200:
+                    error = await response.text()
+                    logger.error(f"Failed to get upcoming files: {error}")
+                    return
+                data = await response.json()
+            
+            for entry in data.get("files", []):
+                # Indexed wordlists are fetched a chunk at a time
+                if "lines" in entry:
+                    continue
+                await self.file_cache.ensure(
+                    entry, lambda offset, sha256=entry["sha256"]: self._download_file(sha256, offset)
+                )
+        except Exception as e:
+            logger.error(f"Error prefetching files: {e}")
+    
+    def _start_prefetch(self):
+        """Start a prefetch unless one is still running"""
+        if AGENT_PREFETCH_TASKS <= 0:
+            return
+        if self._prefetch_task is None or self._prefetch_task.done():
+            self._prefetch_task = asyncio.create_task(self.prefetch_files())
+    
+    async def _download_file(self, sha256: str, offset: int, end: Optional[int] = None):
+        """Stream a catalog file from a byte offset on, up to and including byte end if given"""
+        ranged = offset or end is not None
+        headers = {"Range": f"bytes={offset}-{'' if end is None else end}"} if ranged else {}
+        async with self.session.get(
+            f"{self.server_url}/agent/files/{sha256}",
+            headers=headers,
+            # Large wordlists take a while, only a stalled transfer times out
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=300),
+        ) as response:
+            if response.status != (206 if ranged else 200):
+                error = await response.text()
+                raise ConnectionError(f"Download failed with status {response.status}: {error}")
+            async for chunk in response.content.iter_chunked(1024 * 1024):
+                yield chunk
+    
+    def _potfile_path(self, hash_type_id: int) -> str:
+        """Local potfile of a hash type, shared by hashcat and the server's potfile deltas"""
+        return os.path.join(self.work_dir, f"potfile_{hash_type_id}.pot")
+    
+    async def sync_potfile(self, hash_type_id: int) -> Dict[str, str]:
+        """Append the server's potfile delta to the local potfile, returning its normalized entries"""
+        potfile_path = self._potfile_path(hash_type_id)
+        since_file = f"{potfile_path}.since"
+        try:
+            with open(since_file, "r") as f:
+                since = json.load(f).get("since")
+        except (OSError, ValueError, AttributeError):
+            since = None
+        
+        try:
+            while True:
+                params = {"hash_type_id": hash_type_id}
+                if since:
+                    params["since"] = since
+                async with self.session.get(f"{self.server_url}/agent/potfile", params=params) as response:
+                    if response.status != 200:
+                        error = await response.text()
+                        logger.error(f"Failed to fetch potfile: {error}")
+                        break
+                    data = await response.json()
+                
+                with open(potfile_path, "a") as f:
+                    for entry in data["entries"]:
+                        f.write(f"{entry['hash']}:{entry['plaintext']}\n")
+                
+                # Stop once the cursor no longer moves, entries at the cursor time come back every request
+                advanced = data.get("since") and data["since"] != since
+                since = data.get("since")
+                with open(since_file, "w") as f:
+                    json.dump({"since": since}, f)
+                if data.get("complete") or not advanced:
+                    break
+        except Exception as e:
+            logger.error(f"Error fetching potfile: {e}")
+        
+        results = await self.hashcat_usecase.parse_hashcat_results(potfile_path)
+        return {normalize_hash(result["hash"]): result["plaintext"] for result in results}
+    
+    async def _report_known_hashes(self, task: Dict[str, Any], chunk_id: Optional[str],
+                                   potfile: Dict[str, str]) -> Tuple[List[str], List[Dict[str, str]]]:
+        """Report the task's hashes found in the potfile, returning the hashes left and unacknowledged known ones"""
+        known = []
+        hashes = []
+        for hash_value in task.get("hashes", []):
+            plaintext = potfile.get(normalize_hash(hash_value))
+            if plaintext is None:
+                hashes.append(hash_value)
+            else:
+                known.append({"hash": hash_value, "plaintext": plaintext})
+        
+        # Hashcat skips potfile hashes, unacknowledged ones go out with the final status instead
+        if known and not await self.send_recovered_hashes(task["id"], known, chunk_id):
+            return hashes, known
+        return hashes, []
+    
+    async def _watch_status(self, task: Dict[str, Any], stdout: asyncio.StreamReader,
+                            feeder: Optional[WordlistFeeder] = None):
+        """Keep the progress of every hashcat status line for the next heartbeat"""
+        async for status in self.hashcat_usecase.stream_status(stdout):
+            # Hashcat knows no total on stdin, the words fed so far stand in for it
+            if feeder and not status.progress_total:
+                task["progress"] = feeder.progress
+            else:
+                task["progress"] = status.progress
+            task["speed"] = status.speed
+            self.current_status = {"progress": task["progress"], "speed": status.speed}
+            logger.debug(f"Hashcat status: {status.to_dict()}")
+    
+    async def _tail_results(self, task: Dict[str, Any], chunk_id: Optional[str], output_file: str,
+                            offset_file: str, finished: asyncio.Event) -> int:
+        """Send cracks appended to the outfile in batches, returning the last acknowledged offset"""
+        offset = self._load_offset(offset_file)
+        while not finished.is_set():
+            try:
+                await asyncio.wait_for(finished.wait(), timeout=AGENT_RESULT_INTERVAL)
+                break
+            except asyncio.TimeoutError:
+                pass
+            
+            results, new_offset = await self.hashcat_usecase.read_new_results(
+                output_file, offset, max_bytes=1024 * 1024
+            )
+            if results and not await self.send_recovered_hashes(task["id"], results, chunk_id):
+                # Not acknowledged, the same bytes are sent again on the next read
+                continue
+            
+            if new_offset != offset:
+                offset = new_offset
+                self._save_offset(offset_file, offset)
+        
+        return offset
+    
+    def _remove_work_files(self, *paths: str):
+        """Delete files of a finished chunk from the work dir"""
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove {path}: {e}")
+    
+    def _load_offset(self, offset_file: str) -> int:
+        """Load the outfile offset acknowledged by the server"""
+        try:
+            with open(offset_file, "r") as f:
+                return int(json.load(f).get("offset", 0))
+        except (OSError, ValueError, AttributeError):
+            return 0
+    
+    def _save_offset(self, offset_file: str, offset: int):
+        """Persist the acknowledged outfile offset atomically"""
+        temp_file = f"{offset_file}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump({"offset": offset, "updated_at": datetime.utcnow().isoformat()}, f)
+        os.replace(temp_file, offset_file)
     
     async def update_task_status(
         self,
@@ -278,12 +578,14 @@ class HashcatAgent:
         progress: float,
         speed: float = None,
         error: str = None,
-        recovered_hashes: List[Dict[str, str]] = None
-    ):
-        """Update task status on server"""
+        recovered_hashes: List[Dict[str, str]] = None,
+        chunk_id: str = None
+    ) -> bool:
+        """Update task status on server, returning whether it was accepted"""
         try:
             status_data = {
                 "status": status.value,
+                "chunk_id": chunk_id,
                 "progress": progress,
                 "speed": speed,
                 "error": error,
@@ -294,11 +596,35 @@ class HashcatAgent:
                 f"{self.server_url}/agent/task/{task_id}/status",
                 json=status_data
             ) as response:
+                if response.status == 403:
+                    self._withdraw_task(task_id)
                 if response.status != 200:
                     error = await response.text()
                     logger.error(f"Failed to update task status: {error}")
+                    return False
+                return True
         except Exception as e:
             logger.error(f"Error updating task status: {e}")
+            return False
+    
+    async def send_recovered_hashes(self, task_id: str, recovered_hashes: List[Dict[str, str]],
+                                    chunk_id: str = None) -> bool:
+        """Send a batch of recovered hashes to server, returning whether it was accepted"""
+        try:
+            async with self.session.post(
+                f"{self.server_url}/agent/task/{task_id}/hashes",
+                json={"chunk_id": chunk_id, "recovered_hashes": recovered_hashes}
+            ) as response:
+                if response.status == 403:
+                    self._withdraw_task(task_id)
+                if response.status != 200:
+                    error = await response.text()
+                    logger.error(f"Failed to send recovered hashes: {error}")
+                    return False
+                return True
+        except Exception as e:
+            logger.error(f"Error sending recovered hashes: {e}")
+            return False
     
     async def _get_gpu_info(self) -> List[Dict[str, Any]]:
         """Get GPU information"""
@@ -334,10 +660,11 @@ async def main():
     parser.add_argument("--server", required=True, help="Server URL")
     parser.add_argument("--api-key", help="API key for authentication")
     parser.add_argument("--name", help="Agent name")
+    parser.add_argument("--work-dir", help="Directory for hash files, outfiles and their offsets")
     args = parser.parse_args()
     
     # Create and start agent
-    agent = HashcatAgent(args.server, args.api_key, args.name)
+    agent = HashcatAgent(args.server, args.api_key, args.name, args.work_dir)
     await agent.start()
 
 
@@ -6,6 +6,9 @@ import sys
 import requests
 from typing import Dict, Any, List, Optional
 
+from usecase.hash_ingest import HashIngestor
+from usecase.wordlist_prep import WordlistPreprocessor
+
 SERVER_URL = "http://localhost:8000"
 
 
@@ -39,6 +42,9 @@ Examples:
   
   # List all results
   python -m cmd.cli result list
+  
+  # Sort and deduplicate a wordlist, indexing its words by length
+  python -m cmd.cli wordlist prepare rockyou.txt.gz rockyou.prepared.txt
 """
         )
         
@@ -121,6 +127,19 @@ Examples:
         result_get_hash_parser = result_subparsers.add_parser("get-by-hash", help="Get result by hash")
         result_get_hash_parser.add_argument("hash", help="Hash value")
         
+        # Wordlist commands
+        wordlist_parser = subparsers.add_parser("wordlist", help="Manage wordlists")
+        wordlist_subparsers = wordlist_parser.add_subparsers(dest="action", help="Action to perform")
+        
+        # Wordlist prepare
+        wordlist_prepare_parser = wordlist_subparsers.add_parser(
+            "prepare", help="Sort, deduplicate and length index a wordlist"
+        )
+        wordlist_prepare_parser.add_argument("source", help="Wordlist to prepare, plain, gzip or zstd")
+        wordlist_prepare_parser.add_argument("destination", help="Prepared wordlist, its index is written next to it")
+        wordlist_prepare_parser.add_argument("--chunk-size", type=int, help="Bytes sorted in memory at a time")
+        wordlist_prepare_parser.add_argument("--temp-dir", help="Directory for the sorted runs")
+        
         # Parse arguments
         args = parser.parse_args()
         
@@ -135,6 +154,8 @@ Examples:
             self.handle_agent_commands(args)
         elif args.entity == "result":
             self.handle_result_commands(args)
+        elif args.entity == "wordlist":
+            self.handle_wordlist_commands(args)
     
     def handle_task_commands(self, args):
         """Handle task commands"""
@@ -155,14 +176,26 @@ Examples:
             self.handle_response(response)
         
         elif args.action == "create":
-            # Read hashes from file
+            # Read hashes from file line by line, checking them before they are uploaded
+            ingestor = HashIngestor.for_hash_type(args.hash_type, args.hash_type_id)
             try:
-                with open(args.hashes, "r") as f:
-                    hashes = [line.strip() for line in f if line.strip()]
+                with open(args.hashes, "r", errors="replace") as f:
+                    ingestor.feed(f)
             except Exception as e:
                 print(f"Error reading hashes file: {e}")
                 return
             
+            if ingestor.duplicates:
+                print(f"Skipped {ingestor.duplicates} duplicate hashes", file=sys.stderr)
+            if ingestor.rejected:
+                print(f"Rejected {ingestor.rejected} lines:", file=sys.stderr)
+                for reject in ingestor.rejects:
+                    print(f"  line {reject['line']}: {reject['reason']}: {reject['value']}", file=sys.stderr)
+            if not ingestor.hashes:
+                print("No valid hashes in the hashes file")
+                return
+            hashes = ingestor.hashes
+            
             data = {
                 "name": args.name,
                 "description": args.description or "",
@@ -250,6 +283,20 @@ Examples:
         else:
             print("Unknown result action")
     
+    def handle_wordlist_commands(self, args):
+        """Handle wordlist commands, these run locally without the server"""
+        if args.action == "prepare":
+            preprocessor = WordlistPreprocessor(args.chunk_size, args.temp_dir)
+            try:
+                index = preprocessor.prepare(args.source, args.destination)
+            except Exception as e:
+                print(f"Error preparing wordlist: {e}")
+                return
+            print(json.dumps({key: value for key, value in index.items() if key != "buckets"}, indent=2))
+        
+        else:
+            print("Unknown wordlist action")
+    
     def handle_response(self, response):
         """Handle API response"""
         try:
@@ -1,27 +1,38 @@
 import asyncio
 import logging
+from datetime import datetime
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Header, Query
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List, Optional
 
-from config.database import Database
-from config.settings import SERVER_HOST, SERVER_PORT
+from config.storage import Storage
+from config.indexes import IndexManager
+from config.settings import (
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, AGENT_LONG_POLL_TIMEOUT, AGENT_LONG_POLL_RECHECK_INTERVAL,
+    POTFILE_DELTA_LIMIT, AGENT_AUTH_CACHE_TTL
+)
 
 from entity.task import Task, TaskStatus
 from entity.agent import Agent, AgentStatus
+from entity.chunk import Chunk
 from entity.result import Result
 
-from repository.task_repository import TaskRepository
-from repository.agent_repository import AgentRepository
-from repository.result_repository import ResultRepository
-
-from usecase.task_usecase import TaskUseCase
+from usecase.task_usecase import TaskUseCase, NotAssignedError
 from usecase.agent_usecase import AgentUseCase
 from usecase.result_usecase import ResultUseCase
-
-from model.task import TaskCreate, TaskResponse, TaskUpdate, TaskStatusUpdate
+from usecase.potfile_usecase import PotfileUseCase
+from usecase.dispatcher import AssignmentDispatcher
+from usecase.api_key_cache import ApiKeyCache
+from usecase.heartbeat_buffer import HeartbeatBuffer
+from usecase.hash_filter import HashFilter
+from usecase.hash_ingest import HashIngestor
+from usecase.file_catalog import FileCatalog, TASK_FILE_FIELDS, parse_range, read_range
+
+from model.task import TaskCreate, TaskResponse, TaskSummary, TaskUpdate, TaskStatusUpdate, RecoveredHashBatch
 from model.agent import AgentCreate, AgentResponse, AgentUpdate, AgentHeartbeat
 from model.result import ResultCreate, ResultResponse
+from model.chunk import ChunkResponse
 
 # Configure logging
 logging.basicConfig(
@@ -46,37 +57,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Dependency to get database connection
-async def get_db():
-    db = Database.get_database()
-    return db
+# Assignment dispatcher, woken whenever work or agents become available
+dispatcher = AssignmentDispatcher(
+    # Other workers' assignments do not wake this worker's held requests
+    recheck_interval=AGENT_LONG_POLL_RECHECK_INTERVAL if SERVER_WORKERS > 1 else None
+)
+
+# Agents authenticated recently, saves a lookup on every agent request.
+# Updating or deleting an agent only clears this worker's cache, so other workers keep entries briefly
+api_key_cache = ApiKeyCache(ttl=min(AGENT_AUTH_CACHE_TTL, 5) if SERVER_WORKERS > 1 else None)
+
+# Heartbeats and progress reports, written in bulk
+heartbeat_buffer = HeartbeatBuffer()
 
-# Dependency to get repositories
-async def get_task_repo(db=Depends(get_db)):
-    return TaskRepository(db)
+# Every cracked hash, screens lookups by hash before they reach the database. A worker's filter
+# only takes the cracks ingested through it, with several workers its misses prove nothing
+hash_filter = HashFilter() if SERVER_WORKERS == 1 else None
 
-async def get_agent_repo(db=Depends(get_db)):
-    return AgentRepository(db)
+# Wordlists and rules agents download by digest
+file_catalog = FileCatalog()
 
-async def get_result_repo(db=Depends(get_db)):
-    return ResultRepository(db)
+# Dependency to get repositories of the configured storage backend
+async def get_task_repo():
+    return Storage.task_repository()
+
+async def get_agent_repo():
+    return Storage.agent_repository()
+
+async def get_result_repo():
+    return Storage.result_repository()
+
+async def get_potfile_repo():
+    return Storage.potfile_repository()
 
 # Dependency to get use cases
+async def get_potfile_usecase(potfile_repo=Depends(get_potfile_repo)):
+    return PotfileUseCase(potfile_repo, hash_filter)
+
 async def get_task_usecase(
     task_repo=Depends(get_task_repo),
     agent_repo=Depends(get_agent_repo),
     result_repo=Depends(get_result_repo),
+    potfile_usecase=Depends(get_potfile_usecase),
 ):
-    return TaskUseCase(task_repo, agent_repo, result_repo)
+    return TaskUseCase(
+        task_repo, agent_repo, result_repo, potfile_usecase=potfile_usecase, file_catalog=file_catalog,
+        heartbeat_buffer=heartbeat_buffer
+    )
 
 async def get_agent_usecase(
     agent_repo=Depends(get_agent_repo),
     task_repo=Depends(get_task_repo),
 ):
-    return AgentUseCase(agent_repo, task_repo)
+    return AgentUseCase(agent_repo, task_repo, api_key_cache, heartbeat_buffer)
 
 async def get_result_usecase(result_repo=Depends(get_result_repo)):
-    return ResultUseCase(result_repo)
+    return ResultUseCase(result_repo, hash_filter)
 
 # Dependency to verify agent API key
 async def verify_agent_api_key(
@@ -89,6 +125,7 @@ async def verify_agent_api_key(
     return agent
 
 
+
 # Background tasks
 async def check_offline_agents(agent_usecase: AgentUseCase):
     """Check for offline agents periodically"""
@@ -97,52 +134,76 @@ async def check_offline_agents(agent_usecase: AgentUseCase):
             offline_count = await agent_usecase.check_offline_agents()
             if offline_count > 0:
                 logger.info(f"Marked {offline_count} agents as offline")
+                dispatcher.notify("agents went offline")
         except Exception as e:
             logger.error(f"Error checking offline agents: {e}")
         
         # Sleep for 1 minute
         await asyncio.sleep(60)
 
-async def auto_assign_tasks(task_usecase: TaskUseCase):
-    """Auto-assign pending tasks to available agents periodically"""
-    while True:
-        try:
-            assigned_count = await task_usecase.auto_assign_tasks()
-            if assigned_count > 0:
-                logger.info(f"Auto-assigned {assigned_count} tasks to agents")
-        except Exception as e:
-            logger.error(f"Error auto-assigning tasks: {e}")
-        
-        # Sleep for 10 seconds
-        await asyncio.sleep(10)
-
 
 # Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
     # Connect to database
-    await Database.connect()
+    await Storage.connect()
+    
+    # Bring old task documents up to date
+    task_repo = Storage.task_repository()
+    migrated = await task_repo.migrate_recovered_hashes()
+    if migrated:
+        logger.info(f"Migrated recovered hashes of {migrated} tasks to counters")
+    backfilled = await task_repo.backfill_hash_counts()
+    if backfilled:
+        logger.info(f"Stored hash counts of {backfilled} tasks")
     
     # Start background tasks
     agent_usecase = AgentUseCase(
-        AgentRepository(Database.get_database()),
-        TaskRepository(Database.get_database())
+        Storage.agent_repository(),
+        Storage.task_repository(),
+        api_key_cache,
+        heartbeat_buffer
     )
     task_usecase = TaskUseCase(
-        TaskRepository(Database.get_database()),
-        AgentRepository(Database.get_database()),
-        ResultRepository(Database.get_database())
+        Storage.task_repository(),
+        Storage.agent_repository(),
+        Storage.result_repository(),
+        potfile_usecase=PotfileUseCase(Storage.potfile_repository(), hash_filter),
+        file_catalog=file_catalog,
+        heartbeat_buffer=heartbeat_buffer
     )
     
     asyncio.create_task(check_offline_agents(agent_usecase))
-    asyncio.create_task(auto_assign_tasks(task_usecase))
+    asyncio.create_task(dispatcher.run(task_usecase))
+    asyncio.create_task(heartbeat_buffer.run(
+        Storage.agent_repository(),
+        Storage.task_repository()
+    ))
+    
+    # The image of the last run answers lookups until the filter is rebuilt
+    if hash_filter:
+        hash_filter.load()
+        asyncio.create_task(hash_filter.run(
+            Storage.result_repository(),
+            Storage.potfile_repository()
+        ))
+    
+    # Wordlists are hashed once up front rather than on the first task using them
+    asyncio.create_task(file_catalog.warm())
     
     logger.info("Server started")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    # Write heartbeats still in memory
+    await heartbeat_buffer.flush()
+    
+    # Keep hashes cracked since the last rebuild in the filter image
+    if hash_filter:
+        hash_filter.save()
+    
     # Close database connection
-    await Database.close()
+    await Storage.close()
     logger.info("Server shutdown")
 
 
@@ -153,25 +214,32 @@ async def create_task(
     task_usecase=Depends(get_task_usecase),
 ):
     """Create a new task"""
+    # Validate, normalize and deduplicate the hash list
+    ingestor = HashIngestor.for_hash_type(task_create.hash_type, task_create.hash_type_id)
+    ingestor.feed(task_create.hashes)
+    if not ingestor.hashes:
+        raise HTTPException(status_code=422, detail={"message": "No valid hashes", **ingestor.report()})
+    
     task = Task(
         name=task_create.name,
         description=task_create.description,
         hash_type=task_create.hash_type,
         hash_type_id=task_create.hash_type_id,
-        hashes=task_create.hashes,
+        hashes=ingestor.hashes,
         wordlist_path=task_create.wordlist_path,
         rule_path=task_create.rule_path,
         mask=task_create.mask,
         attack_mode=task_create.attack_mode,
         additional_args=task_create.additional_args,
         priority=task_create.priority,
-        metadata=task_create.metadata,
+        metadata={**(task_create.metadata or {}), "ingest": ingestor.report()},
     )
     
     created_task = await task_usecase.create_task(task)
+    dispatcher.notify("task created")
     return TaskResponse(**created_task.to_dict())
 
-@app.get("/tasks", response_model=List[TaskResponse], tags=["Tasks"])
+@app.get("/tasks", response_model=List[TaskSummary], tags=["Tasks"])
 async def get_tasks(
     skip: int = 0,
     limit: int = 100,
@@ -188,7 +256,7 @@ async def get_tasks(
     else:
         tasks = await task_usecase.get_all_tasks(skip, limit)
     
-    return [TaskResponse(**task.to_dict()) for task in tasks]
+    return [TaskSummary(**task.to_dict()) for task in tasks]
 
 @app.get("/tasks/{task_id}", response_model=TaskResponse, tags=["Tasks"])
 async def get_task(
@@ -242,8 +310,40 @@ async def delete_task(
     if not deleted:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    dispatcher.notify("task deleted")
     return {"message": "Task deleted"}
 
+@app.get("/tasks/{task_id}/shards", response_model=List[TaskSummary], tags=["Tasks"])
+async def get_task_shards(
+    task_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    task_usecase=Depends(get_task_usecase),
+):
+    """Get the hash shards of a task"""
+    shards = await task_usecase.get_task_shards(task_id, skip, limit)
+    return [TaskSummary(**shard.to_dict()) for shard in shards]
+
+@app.get("/tasks/{task_id}/results", response_model=List[ResultResponse], tags=["Tasks"])
+async def get_task_results(
+    task_id: str,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    task_usecase=Depends(get_task_usecase),
+):
+    """Get a page of the hashes recovered for a task"""
+    results = await task_usecase.get_task_results(task_id, skip, limit)
+    return [ResultResponse(**result.to_dict()) for result in results]
+
+@app.get("/tasks/{task_id}/chunks", response_model=List[ChunkResponse], tags=["Tasks"])
+async def get_task_chunks(
+    task_id: str,
+    task_usecase=Depends(get_task_usecase),
+):
+    """Get the keyspace chunks of a task"""
+    chunks = await task_usecase.get_task_chunks(task_id)
+    return [ChunkResponse(**chunk.to_dict()) for chunk in chunks]
+
 @app.post("/tasks/{task_id}/cancel", response_model=TaskResponse, tags=["Tasks"])
 async def cancel_task(
     task_id: str,
@@ -254,6 +354,7 @@ async def cancel_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    dispatcher.notify("task cancelled")
     return TaskResponse(**task.to_dict())
 
 
@@ -277,6 +378,7 @@ async def register_agent(
     )
     
     registered_agent = await agent_usecase.register_agent(agent)
+    dispatcher.notify("agent registered")
     return AgentResponse(**registered_agent.to_dict())
 
 @app.get("/agents", response_model=List[AgentResponse], tags=["Agents"])
@@ -346,6 +448,7 @@ async def update_agent(
     
     # Save changes
     updated_agent = await agent_usecase.update_agent(agent)
+    dispatcher.notify("agent updated")
     return AgentResponse(**updated_agent.to_dict())
 
 @app.delete("/agents/{agent_id}", tags=["Agents"])
@@ -358,6 +461,7 @@ async def delete_agent(
     if not deleted:
         raise HTTPException(status_code=404, detail="Agent not found")
     
+    dispatcher.notify("agent deleted")
     return {"message": "Agent deleted"}
 
 @app.post("/agents/heartbeat", response_model=AgentResponse, tags=["Agents"])
@@ -367,32 +471,65 @@ async def agent_heartbeat(
     agent_usecase=Depends(get_agent_usecase),
 ):
     """Send agent heartbeat"""
-    updated_agent = await agent_usecase.process_heartbeat(
-        agent.id,
+    updated_agent = await agent_usecase.record_heartbeat(
+        agent,
         heartbeat.status,
         heartbeat.current_task_id,
         heartbeat.task_progress,
         heartbeat.task_speed,
+        heartbeat.current_chunk_id,
     )
     
+    if heartbeat.status != agent.status:
+        dispatcher.notify(f"agent {agent.id} went {heartbeat.status.value}")
+    
     return AgentResponse(**updated_agent.to_dict())
 
 
+@app.get("/agents/{agent_id}/last-seen", tags=["Agents"])
+async def get_agent_last_seen(
+    agent_id: str,
+    agent_usecase=Depends(get_agent_usecase),
+):
+    """Get when an agent last sent a heartbeat"""
+    last_seen = await agent_usecase.get_last_seen(agent_id)
+    if not last_seen:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    
+    return {"agent_id": agent_id, "last_seen": last_seen}
+
+
 # Agent API endpoints (for agent-server communication)
 @app.get("/agent/task", tags=["Agent API"])
 async def get_agent_task(
+    wait: int = Query(0, ge=0, le=AGENT_LONG_POLL_TIMEOUT, description="Seconds to hold the request until work is assigned"),
     agent=Depends(verify_agent_api_key),
     task_usecase=Depends(get_task_usecase),
 ):
-    """Get current task for agent"""
-    if not agent.current_task_id:
+    """Get current task for agent, optionally waiting for one to be assigned"""
+    # The chunk leased to the agent is the assignment, the cached agent may predate it
+    async def current_assignment() -> Optional[Chunk]:
+        return await task_usecase.get_held_chunk(agent.id)
+    
+    if wait > 0:
+        chunk = await dispatcher.wait_for_assignment(agent.id, wait, current_assignment)
+    else:
+        chunk = await current_assignment()
+    
+    if not chunk:
         return {"status": "no_task"}
     
-    task = await task_usecase.get_task(agent.current_task_id)
+    task = await task_usecase.get_task(chunk.task_id)
     if not task:
         return {"status": "no_task"}
     
-    return {"status": "ok", "task": task.to_dict()}
+    return {
+        "status": "ok",
+        "task": task.to_dict(),
+        "chunk": chunk.to_dict(),
+        # Wordlist and rules by task field, agents fetch them by digest or the chunk's words by byte range
+        "files": await file_catalog.describe_task(task, chunk),
+    }
 
 @app.post("/agent/task/{task_id}/status", tags=["Agent API"])
 async def update_task_status(
@@ -402,33 +539,150 @@ async def update_task_status(
     task_usecase=Depends(get_task_usecase),
 ):
     """Update task status from agent"""
-    # Verify agent is assigned to this task
-    if agent.current_task_id != task_id:
-        raise HTTPException(status_code=403, detail="Agent not assigned to this task")
-    
-    # Update task status
-    task = await task_usecase.update_task_status(
-        task_id,
-        status_update.status,
-        status_update.progress,
-        status_update.speed,
-        status_update.error,
-    )
+    # The chunk, or the task without chunks, tells whether the agent is still assigned to it
+    try:
+        task = await task_usecase.update_task_status(
+            task_id,
+            status_update.status,
+            status_update.progress,
+            status_update.speed,
+            status_update.error,
+            status_update.chunk_id,
+            agent.id,
+        )
+    except NotAssignedError as e:
+        raise HTTPException(status_code=403, detail=str(e))
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Add recovered hashes
-    for hash_result in status_update.recovered_hashes:
-        await task_usecase.add_recovered_hash(
+    if status_update.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
+        dispatcher.notify(f"agent {agent.id} finished its work")
+    
+    # Add recovered hashes in one batch
+    if status_update.recovered_hashes:
+        await task_usecase.add_recovered_hashes(
             task_id,
-            hash_result["hash"],
-            hash_result["plaintext"],
+            status_update.recovered_hashes,
             agent.id,
+            status_update.chunk_id,
         )
     
     return {"status": "ok"}
 
+@app.post("/agent/task/{task_id}/hashes", tags=["Agent API"])
+async def add_recovered_hashes(
+    task_id: str,
+    batch: RecoveredHashBatch,
+    agent=Depends(verify_agent_api_key),
+    task_usecase=Depends(get_task_usecase),
+):
+    """Add a batch of recovered hashes from agent"""
+    try:
+        task = await task_usecase.add_recovered_hashes(task_id, batch.recovered_hashes, agent.id, batch.chunk_id)
+    except NotAssignedError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    return {"status": "ok"}
+
+@app.get("/agent/potfile", tags=["Agent API"])
+async def get_agent_potfile(
+    hash_type_id: int = Query(..., description="Hashcat hash mode"),
+    since: Optional[datetime] = Query(None, description="Only entries added at or after this time"),
+    agent=Depends(verify_agent_api_key),
+    potfile_usecase=Depends(get_potfile_usecase),
+):
+    """Get the potfile entries of a hash type added since the agent last synced"""
+    entries = await potfile_usecase.get_delta(hash_type_id, since)
+    return {
+        "entries": [{"hash": entry.hash_value, "plaintext": entry.plaintext} for entry in entries],
+        # Passed back as since on the next request, entries at that exact time are sent again
+        "since": entries[-1].added_at if entries else since,
+        "complete": len(entries) < POTFILE_DELTA_LIMIT,
+    }
+
+
+@app.get("/agent/files/upcoming", tags=["Agent API"])
+async def get_upcoming_files(
+    limit: int = Query(2, ge=1, le=20, description="Number of upcoming tasks"),
+    agent=Depends(verify_agent_api_key),
+    task_usecase=Depends(get_task_usecase),
+):
+    """Get the files of the tasks dispatched next, for agents to fetch ahead"""
+    files = {}
+    for task in await task_usecase.get_upcoming_tasks(limit):
+        for entry in (await file_catalog.describe_task(task)).values():
+            files.setdefault(entry["sha256"], entry)
+    return {"files": list(files.values())}
+
+@app.get("/agent/files/{sha256}/lines", tags=["Agent API"])
+async def get_file_lines(
+    sha256: str,
+    start: int = Query(0, ge=0, description="First line"),
+    end: Optional[int] = Query(None, ge=0, description="Line after the last one, the end of the wordlist by default"),
+    agent=Depends(verify_agent_api_key),
+):
+    """Get the byte range of lines start to end of a plain wordlist, for a ranged download of just those words"""
+    if file_catalog.open_path(sha256) is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    index = await file_catalog.line_index(sha256.lower())
+    if index is None:
+        raise HTTPException(status_code=422, detail="Compressed wordlists cannot be cut by lines")
+    
+    end = index.lines if end is None else min(end, index.lines)
+    if start > end:
+        raise HTTPException(status_code=416, detail=f"Line {start} is past the end of the wordlist")
+    offset, length = index.byte_range(start, end)
+    return {"sha256": sha256.lower(), "start": start, "end": end, "offset": offset, "length": length,
+            "lines": index.lines}
+
+@app.get("/agent/files/{sha256}", tags=["Agent API"])
+async def download_file(
+    sha256: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    agent=Depends(verify_agent_api_key),
+):
+    """Download a wordlist or rule file by digest, whole or one byte range"""
+    path = file_catalog.open_path(sha256)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    size = path.stat().st_size
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError as e:
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{size}"})
+    
+    start, end = byte_range or (0, size - 1)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1), "ETag": f'"{sha256}"'}
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        read_range(path, start, end),
+        status_code=206 if byte_range else 200,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
+# File endpoints
+@app.get("/files", tags=["Files"])
+async def get_files(kind: str = Query("wordlists", description="wordlists or rules")):
+    """List the wordlists or rules served to agents"""
+    if kind not in TASK_FILE_FIELDS.values():
+        raise HTTPException(status_code=400, detail=f"Unknown file kind {kind!r}")
+    return await file_catalog.list_files(kind)
+
+
+# System endpoints
+@app.get("/system/indexes", tags=["System"])
+async def get_index_report():
+    """Report missing, unused and undeclared database indexes"""
+    if Storage.backend != "mongodb":
+        raise HTTPException(status_code=404, detail="Index report is only available for MongoDB")
+    return await IndexManager(Storage.get_database()).check_indexes()
 
 # Result endpoints
 @app.get("/results", response_model=List[ResultResponse], tags=["Results"])
@@ -440,7 +694,7 @@ async def get_results(
 ):
     """Get all results with optional filtering"""
     if task_id:
-        results = await result_usecase.get_results_by_task_id(task_id)
+        results = await result_usecase.get_results_by_task_id(task_id, skip, limit)
     else:
         results = await result_usecase.get_all_results(skip, limit)
     
@@ -474,4 +728,11 @@ async def get_result_by_hash(
 # Main entry point
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("cmd.server:app", host=SERVER_HOST, port=SERVER_PORT, reload=True)
+    # Work is claimed atomically, so several workers can serve the API side by side
+    uvicorn.run(
+        "cmd.server:app",
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        reload=SERVER_WORKERS == 1,
+        workers=SERVER_WORKERS,
+    )
@@ -3,11 +3,14 @@ import os
 import uvicorn
 import datetime
 import shutil
+import io
+import uuid
+import logging
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 
-from fastapi import FastAPI, Request, Depends, HTTPException, Form, File, UploadFile
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Request, Depends, HTTPException, Form, File, UploadFile, BackgroundTasks
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -33,9 +36,14 @@ except ImportError:
 from usecase.task_usecase import TaskUseCase
 from usecase.agent_usecase import AgentUseCase
 from usecase.result_usecase import ResultUseCase
+from usecase.hash_ingest import HashIngestor
+from usecase.file_store import FileStore, UploadError, is_listed
 from entity.task import TaskStatus, HashType
 from model.task import TaskCreate, TaskUpdate
 from model.agent import AgentCreate
+from model.upload import UploadSessionCreate, UploadStatus
+
+logger = logging.getLogger(__name__)
 
 # Create FastAPI app
 app = FastAPI(title="Distributed Hashcat Cracking - Web Dashboard")
@@ -55,6 +63,9 @@ app.mount("/static", StaticFiles(directory="cmd/web/static"), name="static")
 # Setup templates
 templates = Jinja2Templates(directory="cmd/web/templates")
 
+# Content addressed store of uploaded handshakes and wordlists
+file_store = FileStore()
+
 
 @app.on_event("startup")
 async def startup_db_client():
@@ -175,11 +186,11 @@ async def new_wpa_task_form(request: Request):
 async def upload_files_form(request: Request):
     """Form to upload handshake and wordlist files"""
     # Get list of uploaded handshake files
-    handshake_path = Path("uploads/handshakes")
+    handshake_path = file_store.kind_dir("handshakes")
     handshake_files = []
     if handshake_path.exists():
         for file in handshake_path.glob("*"):
-            if file.is_file():
+            if is_listed(file):
                 stats = file.stat()
                 handshake_files.append({
                     "name": file.name,
@@ -189,11 +200,11 @@ async def upload_files_form(request: Request):
                 })
     
     # Get list of uploaded wordlist files
-    wordlist_path = Path("uploads/wordlists")
+    wordlist_path = file_store.kind_dir("wordlists")
     wordlist_files = []
     if wordlist_path.exists():
         for file in wordlist_path.glob("*"):
-            if file.is_file():
+            if is_listed(file):
                 stats = file.stat()
                 wordlist_files.append({
                     "name": file.name,
@@ -229,20 +240,23 @@ async def create_task(
     task_usecase: TaskUseCase = Depends(get_task_usecase)
 ):
     """Create a new task"""
-    # Process hashes (split by newlines)
-    hash_list = [h.strip() for h in hashes.split("\n") if h.strip()]
+    # Validate, normalize and deduplicate the hashes line by line
+    ingestor = HashIngestor.for_hash_type(hash_type, hash_type_id).feed(io.StringIO(hashes))
+    if not ingestor.hashes:
+        raise HTTPException(status_code=422, detail={"message": "No valid hashes", **ingestor.report()})
     
     task_data = TaskCreate(
         name=name,
         description=description,
         hash_type=hash_type,
         hash_type_id=hash_type_id,
-        hashes=hash_list,
+        hashes=ingestor.hashes,
         wordlist_path=wordlist_path,
         rule_path=rule_path,
         mask=mask,
         attack_mode=attack_mode,
-        priority=priority
+        priority=priority,
+        metadata={"ingest": ingestor.report()}
     )
     
     await task_usecase.create_task(task_data)
@@ -309,8 +323,8 @@ async def task_detail(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Get results for this task
-    results = await result_usecase.get_results_by_task_id(task_id)
+    # Get the first page of results for this task, the full list is on the results page
+    results = await result_usecase.get_results_by_task_id(task_id, 0, 100)
     
     return templates.TemplateResponse(
         "task_detail.html",
@@ -452,11 +466,13 @@ async def list_results(
     task_id: Optional[str] = None,
     hash_value: Optional[str] = None,
     plaintext: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 1000,
     result_usecase: ResultUseCase = Depends(get_result_usecase)
 ):
     """List all results with optional filtering"""
     if task_id:
-        results = await result_usecase.get_results_by_task_id(task_id)
+        results = await result_usecase.get_results_by_task_id(task_id, skip, limit)
     else:
         results = await result_usecase.get_all_results()
     
@@ -492,59 +508,101 @@ async def list_results(
 @app.post("/upload/handshake")
 async def upload_handshake(file: UploadFile = File(...)):
     """Upload a handshake file"""
-    # Ensure uploads directory exists
-    upload_dir = Path("uploads/handshakes")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Check if filename is valid
-    if not file.filename:
-        # Generate a random filename if none provided
-        import uuid
-        filename = f"handshake_{uuid.uuid4()}.hccapx"
-    else:
-        filename = file.filename
+    # Generate a random filename if none provided
+    filename = file.filename or f"handshake_{uuid.uuid4()}.hccapx"
     
-    # Save the file
-    file_path = upload_dir / filename
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Stream the file into the store, an identical file is only linked
+    await file_store.store_upload("handshakes", filename, file)
     
     return RedirectResponse(url="/files/upload", status_code=303)
 
 
 @app.post("/upload/wordlist")
-async def upload_wordlist(file: UploadFile = File(...)):
+async def upload_wordlist(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                          prepare: bool = Form(False)):
     """Upload a wordlist file"""
-    # Ensure uploads directory exists
-    upload_dir = Path("uploads/wordlists")
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Check if filename is valid
-    if not file.filename:
-        # Generate a random filename if none provided
-        import uuid
-        filename = f"wordlist_{uuid.uuid4()}.txt"
-    else:
-        filename = file.filename
+    # Generate a random filename if none provided
+    filename = file.filename or f"wordlist_{uuid.uuid4()}.txt"
     
-    # Save the file
-    file_path = upload_dir / filename
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Stream the file into the store, an identical file is only linked
+    stored = await file_store.store_upload("wordlists", filename, file)
+    
+    # Sorting a large list takes a while, the prepared copy shows up once it is done
+    if prepare:
+        background_tasks.add_task(prepare_wordlist_in_background, Path(stored["path"]).name)
     
     return RedirectResponse(url="/files/upload", status_code=303)
 
 
+@app.post("/files/wordlists/{name}/prepare")
+async def prepare_wordlist(name: str):
+    """Store a sorted, deduplicated copy of a wordlist with the length index the scheduler uses"""
+    return await file_store.prepare_wordlist(name)
+
+
+async def prepare_wordlist_in_background(name: str):
+    """Prepare an uploaded wordlist, logging failures nobody waits for"""
+    try:
+        await file_store.prepare_wordlist(name)
+    except Exception as e:
+        logger.error(f"Error preparing wordlist {name}: {e}")
+
+
+@app.post("/upload/{kind}/sessions", response_model=UploadStatus, response_model_exclude_none=True)
+async def create_upload_session(kind: str, upload: UploadSessionCreate):
+    """Open a resumable upload, completed at once if a file with the same SHA-256 is stored"""
+    return await file_store.create_session(kind, upload.filename, upload.size, upload.sha256)
+
+
+@app.get("/upload/sessions/{upload_id}", response_model=UploadStatus, response_model_exclude_none=True)
+async def get_upload_session(upload_id: str):
+    """Get the offset to resume an upload from"""
+    return await file_store.get_session(upload_id)
+
+
+@app.put("/upload/sessions/{upload_id}", response_model=UploadStatus, response_model_exclude_none=True)
+async def append_upload_session(upload_id: str, request: Request):
+    """Append the request body at the start of its Content-Range"""
+    offset = parse_content_range_start(request.headers.get("content-range"))
+    return await file_store.append(upload_id, offset, request.stream())
+
+
+@app.delete("/upload/sessions/{upload_id}")
+async def cancel_upload_session(upload_id: str):
+    """Cancel an unfinished upload"""
+    if not await file_store.cancel_session(upload_id):
+        raise HTTPException(status_code=404, detail=f"Upload {upload_id} not found")
+    return {"cancelled": True}
+
+
+@app.exception_handler(UploadError)
+async def upload_error_handler(request: Request, exc: UploadError):
+    """Report upload errors with the offset a client should resume from"""
+    content = {"detail": str(exc)}
+    if exc.offset is not None:
+        content["offset"] = exc.offset
+    return JSONResponse(status_code=exc.status_code, content=content)
+
+
+def parse_content_range_start(content_range: Optional[str]) -> int:
+    """First byte of a "bytes start-end/total" Content-Range, 0 without one"""
+    if not content_range:
+        return 0
+    try:
+        unit, byte_range = content_range.strip().split(" ", 1)
+        start = int(byte_range.split("-", 1)[0])
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid Content-Range {content_range!r}")
+    if unit != "bytes" or start < 0:
+        raise HTTPException(status_code=400, detail=f"Invalid Content-Range {content_range!r}")
+    return start
+
+
 @app.get("/delete/file")
 async def delete_file(request: Request, path: str):
     """Delete an uploaded file"""
-    file_path = Path(path)
-    
-    # Security check: only allow deleting files in the uploads directory
-    if "uploads" in str(file_path) and file_path.exists():
-        file_path.unlink()
+    # Only named files in the upload directories, their object goes with the last name
+    file_store.remove(Path(path))
     
     return RedirectResponse(url="/files/upload", status_code=303)
 
@@ -3,6 +3,7 @@ from pymongo.errors import ConnectionFailure
 import logging
 
 from config.settings import MONGODB_URI, DATABASE_NAME
+from config.indexes import IndexManager
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +20,9 @@ class Database:
             await cls.client.admin.command('ping')
             cls.db = cls.client[DATABASE_NAME]
             logger.info(f"Connected to MongoDB at {MONGODB_URI}")
+            
+            # Create the indexes the repositories rely on
+            await IndexManager(cls.db).ensure_indexes()
             return cls.db
         except ConnectionFailure as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
@@ -34,6 +38,6 @@ class Database:
     @classmethod
     def get_database(cls):
         """Get database instance"""
-        if not cls.db:
+        if cls.db is None:
             raise ConnectionError("Database not connected. Call connect() first.")
         return cls.db
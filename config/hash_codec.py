@@ -0,0 +1,79 @@
+from typing import Any, Dict, List, Union
+
+from config.settings import STORAGE_PACK_HASHES
+
+# Raw sizes of the digests stored packed: MD5 and NTLM, SHA1, SHA256, SHA512
+PACKED_DIGEST_SIZES = (16, 20, 32, 64)
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+def _is_packable(hash_value: str) -> bool:
+    # Only lowercase hex packs losslessly, anything else is kept as text
+    return (
+        isinstance(hash_value, str)
+        and len(hash_value) // 2 in PACKED_DIGEST_SIZES
+        and len(hash_value) % 2 == 0
+        and _HEX_DIGITS.issuperset(hash_value)
+    )
+
+
+def pack_hash(hash_value: str) -> Union[str, bytes]:
+    """Stored form of a hash value, the raw digest for lowercase hex digests"""
+    if STORAGE_PACK_HASHES and _is_packable(hash_value):
+        return bytes.fromhex(hash_value)
+    return hash_value
+
+
+def unpack_hash(value: Union[str, bytes]) -> str:
+    """Hash value from its stored form"""
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def pack_hashes(hashes: List[str]) -> Union[List[str], bytes]:
+    """Stored form of a hash list, its digests back to back after a size byte if all of them pack"""
+    if not STORAGE_PACK_HASHES or not hashes:
+        return hashes
+    size = len(hashes[0])
+    if not all(len(hash_value) == size and _is_packable(hash_value) for hash_value in hashes):
+        return hashes
+    return bytes([size // 2]) + bytes.fromhex("".join(hashes))
+
+
+def unpack_hashes(value: Union[List[str], bytes, None]) -> List[str]:
+    """Hash list from its stored form"""
+    if not isinstance(value, bytes):
+        return value if value is not None else []
+    size = value[0]
+    data = value[1:].hex()
+    return [data[start:start + 2 * size] for start in range(0, len(data), 2 * size)]
+
+
+def pack_task(task_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Pack the hash list of a task document in place"""
+    if "hashes" in task_dict:
+        task_dict["hashes"] = pack_hashes(task_dict["hashes"])
+    return task_dict
+
+
+def unpack_task(task_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Unpack the hash list of a task document in place"""
+    if "hashes" in task_dict:
+        task_dict["hashes"] = unpack_hashes(task_dict["hashes"])
+    return task_dict
+
+
+def pack_result(result_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Pack the hash value of a result document in place"""
+    if "hash_value" in result_dict:
+        result_dict["hash_value"] = pack_hash(result_dict["hash_value"])
+    return result_dict
+
+
+def unpack_result(result_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Unpack the hash value of a result document in place"""
+    if "hash_value" in result_dict:
+        result_dict["hash_value"] = unpack_hash(result_dict["hash_value"])
+    return result_dict
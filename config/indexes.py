@@ -0,0 +1,127 @@
+from typing import Dict, List, Any
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Indexes the repositories rely on, per collection
+INDEXES: Dict[str, List[IndexModel]] = {
+    "tasks": [
+        # find_pending_tasks / find_by_status
+        IndexModel([("status", ASCENDING), ("priority", DESCENDING), ("created_at", ASCENDING)],
+                   name="status_priority_created_at"),
+        # Shards of a task
+        IndexModel([("parent_id", ASCENDING), ("shard_index", ASCENDING)], name="parent_id_shard_index"),
+    ],
+    "agents": [
+        # Every agent request is authenticated by API key
+        IndexModel([("api_key", ASCENDING)], name="api_key", unique=True),
+        # find_available_agents
+        IndexModel([("status", ASCENDING), ("current_task_id", ASCENDING)], name="status_current_task_id"),
+        # Freeing the agents of a cancelled task
+        IndexModel([("current_task_id", ASCENDING)], name="current_task_id"),
+    ],
+    "results": [
+        # find_by_hash
+        IndexModel([("hash_value", ASCENDING)], name="hash_value"),
+        # find_by_task_id, paged in insertion order
+        IndexModel([("task_id", ASCENDING), ("_id", ASCENDING)], name="task_id"),
+        # Deduplication of recovered hashes within a task
+        IndexModel([("task_id", ASCENDING), ("hash_value", ASCENDING)], name="task_id_hash_value", unique=True),
+    ],
+    "task_chunks": [
+        # find_chunks_by_task_id and chunk cleanup
+        IndexModel([("task_id", ASCENDING), ("skip", ASCENDING)], name="task_id_skip"),
+        # Claiming pending chunks and chunks with an expired lease
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="status_lease_expires_at"),
+        # The chunk an agent holds, looked up on every task request
+        IndexModel([("agent_id", ASCENDING), ("status", ASCENDING)], name="agent_id_status"),
+    ],
+    "potfile": [
+        # One entry per known hash, looked up when tasks are created
+        IndexModel([("hash_type_id", ASCENDING), ("hash_value", ASCENDING)], name="hash_type_id_hash_value",
+                   unique=True),
+        # Potfile deltas for agents
+        IndexModel([("hash_type_id", ASCENDING), ("added_at", ASCENDING)], name="hash_type_id_added_at"),
+    ],
+}
+
+
+class IndexManager:
+    """Creates the declared indexes and reports missing or unused ones"""
+    
+    def __init__(self, database, indexes: Dict[str, List[IndexModel]] = None):
+        self.db = database
+        self.indexes = indexes or INDEXES
+    
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Reconcile every collection with its declared indexes"""
+        report = {"created": [], "rebuilt": [], "missing": [], "undeclared": []}
+        for collection_name, indexes in self.indexes.items():
+            await self._reconcile(collection_name, indexes, report)
+        
+        if report["created"] or report["rebuilt"]:
+            logger.info(f"Created indexes: {report['created'] + report['rebuilt']}")
+        if report["missing"]:
+            logger.error(f"Missing indexes: {report['missing']}")
+        if report["undeclared"]:
+            logger.warning(f"Indexes not declared in config.indexes: {report['undeclared']}")
+        return report
+    
+    async def check_indexes(self) -> Dict[str, List[str]]:
+        """Report declared indexes that are missing and indexes unused since the database started"""
+        report = {"missing": [], "unused": [], "undeclared": []}
+        for collection_name, indexes in self.indexes.items():
+            declared = {index.document["name"] for index in indexes}
+            existing = set()
+            try:
+                async for stats in self.db[collection_name].aggregate([{"$indexStats": {}}]):
+                    existing.add(stats["name"])
+                    if stats["name"] != "_id_" and stats.get("accesses", {}).get("ops", 0) == 0:
+                        report["unused"].append(f"{collection_name}.{stats['name']}")
+            except OperationFailure as e:
+                logger.debug(f"Index usage statistics not available for {collection_name}: {e}")
+                existing = {index["name"] async for index in self.db[collection_name].list_indexes()}
+            
+            report["missing"].extend(f"{collection_name}.{name}" for name in sorted(declared - existing))
+            report["undeclared"].extend(
+                f"{collection_name}.{name}" for name in sorted(existing - declared - {"_id_"})
+            )
+        return report
+    
+    async def _reconcile(self, collection_name: str, indexes: List[IndexModel], report: Dict[str, Any]):
+        """Create missing indexes and rebuild ones whose definition changed"""
+        collection = self.db[collection_name]
+        existing = {index["name"]: index async for index in collection.list_indexes()}
+        
+        for index in indexes:
+            spec = index.document
+            name = spec["name"]
+            current = existing.get(name)
+            qualified_name = f"{collection_name}.{name}"
+            try:
+                if current is None:
+                    await collection.create_indexes([index])
+                    report["created"].append(qualified_name)
+                elif not self._matches(current, spec):
+                    await collection.drop_index(name)
+                    await collection.create_indexes([index])
+                    report["rebuilt"].append(qualified_name)
+            except OperationFailure as e:
+                # Duplicate values block a unique index until they are cleaned up
+                logger.error(f"Failed to create index {qualified_name}: {e}")
+                report["missing"].append(qualified_name)
+        
+        declared = {index.document["name"] for index in indexes}
+        for name in existing:
+            if name != "_id_" and name not in declared:
+                report["undeclared"].append(f"{collection_name}.{name}")
+    
+    def _matches(self, current: Dict[str, Any], spec: Dict[str, Any]) -> bool:
+        """Check whether an existing index has the declared keys and options"""
+        return (
+            list(current["key"].items()) == list(spec["key"].items())
+            and bool(current.get("unique")) == bool(spec.get("unique"))
+        )
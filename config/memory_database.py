@@ -0,0 +1,219 @@
+import asyncio
+import copy
+import itertools
+import logging
+import os
+import pickle
+import threading
+import uuid
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[str, ...]
+
+
+class DuplicateKeyError(ValueError):
+    """Raised when a write would break a unique index"""
+
+
+class MemoryCollection:
+    """Documents by ID with secondary indexes on selected fields"""
+    
+    def __init__(self, indexes: Iterable[IndexKey] = (), unique: Iterable[IndexKey] = ()):
+        # Writes replace stored documents instead of changing them, see dump()
+        self.lock = threading.RLock()
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        # Field values to the IDs holding them, dicts keep the IDs in insertion order
+        self.indexes: Dict[IndexKey, Dict[Any, Dict[str, None]]] = {fields: {} for fields in indexes}
+        self.unique: Dict[IndexKey, Dict[Any, str]] = {fields: {} for fields in unique}
+    
+    def __len__(self) -> int:
+        return len(self.documents)
+    
+    def insert(self, document: Dict[str, Any]) -> str:
+        """Store a copy of the document, returning its ID"""
+        document = copy.deepcopy(document)
+        doc_id = document.pop("id", None) or uuid.uuid4().hex
+        with self.lock:
+            self._check_unique(doc_id, document)
+            self.documents[doc_id] = document
+            self._index(doc_id, document)
+        return doc_id
+    
+    def get(self, doc_id: str, exclude: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """Copy of a document by ID, without the excluded fields"""
+        with self.lock:
+            document = self.documents.get(doc_id)
+            if document is None:
+                return None
+            return self._export(doc_id, document, exclude)
+    
+    def lookup(self, fields: IndexKey, value: Any, exclude: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """Copy of the document holding a value of a unique index"""
+        with self.lock:
+            doc_id = self.unique[fields].get(value)
+            if doc_id is None:
+                return None
+            return self._export(doc_id, self.documents[doc_id], exclude)
+    
+    def find(self, fields: IndexKey, value: Any, exclude: Iterable[str] = (),
+             skip: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        """Copies of the documents holding a value of a secondary index, a limit of 0 returns all"""
+        with self.lock:
+            doc_ids = self._slice(self.indexes[fields].get(value, {}), skip, limit)
+            return [self._export(doc_id, self.documents[doc_id], exclude) for doc_id in doc_ids]
+    
+    def find_ids(self, fields: IndexKey, value: Any) -> List[str]:
+        """IDs of the documents holding a value of a secondary index"""
+        with self.lock:
+            return list(self.indexes[fields].get(value, ()))
+    
+    def all(self, exclude: Iterable[str] = (), skip: int = 0, limit: int = 0) -> List[Dict[str, Any]]:
+        """Copies of all documents in insertion order, a limit of 0 returns all"""
+        with self.lock:
+            doc_ids = self._slice(self.documents, skip, limit)
+            return [self._export(doc_id, self.documents[doc_id], exclude) for doc_id in doc_ids]
+    
+    def update(self, doc_id: str, changes: Dict[str, Any], exclude: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        """Set fields of a document, returning a copy of it as written"""
+        with self.lock:
+            current = self.documents.get(doc_id)
+            if current is None:
+                return None
+            document = {**current, **copy.deepcopy(changes)}
+            self._check_unique(doc_id, document)
+            self._unindex(doc_id, current)
+            self.documents[doc_id] = document
+            self._index(doc_id, document)
+            return self._export(doc_id, document, exclude)
+    
+    def delete(self, doc_id: str) -> bool:
+        """Remove a document"""
+        with self.lock:
+            document = self.documents.pop(doc_id, None)
+            if document is None:
+                return False
+            self._unindex(doc_id, document)
+            return True
+    
+    def dump(self) -> Dict[str, Dict[str, Any]]:
+        """Consistent view of all documents for a snapshot"""
+        with self.lock:
+            return dict(self.documents)
+    
+    def restore(self, documents: Dict[str, Dict[str, Any]]) -> None:
+        """Replace all documents and rebuild the indexes"""
+        with self.lock:
+            self.documents = {}
+            for index in list(self.indexes.values()) + list(self.unique.values()):
+                index.clear()
+            for doc_id, document in documents.items():
+                self.documents[doc_id] = document
+                self._index(doc_id, document)
+    
+    def _slice(self, doc_ids: Dict[str, Any], skip: int, limit: int) -> List[str]:
+        return list(itertools.islice(doc_ids, skip, skip + limit if limit else None))
+    
+    def _key(self, fields: IndexKey, document: Dict[str, Any]) -> Any:
+        if len(fields) == 1:
+            return document.get(fields[0])
+        return tuple(document.get(field) for field in fields)
+    
+    def _check_unique(self, doc_id: str, document: Dict[str, Any]) -> None:
+        for fields, index in self.unique.items():
+            owner = index.get(self._key(fields, document))
+            if owner is not None and owner != doc_id:
+                raise DuplicateKeyError(f"Duplicate value for unique index {fields}")
+    
+    def _index(self, doc_id: str, document: Dict[str, Any]) -> None:
+        for fields, index in self.indexes.items():
+            index.setdefault(self._key(fields, document), {})[doc_id] = None
+        for fields, index in self.unique.items():
+            index[self._key(fields, document)] = doc_id
+    
+    def _unindex(self, doc_id: str, document: Dict[str, Any]) -> None:
+        for fields, index in self.indexes.items():
+            key = self._key(fields, document)
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(doc_id, None)
+                if not ids:
+                    del index[key]
+        for fields, index in self.unique.items():
+            key = self._key(fields, document)
+            if index.get(key) == doc_id:
+                del index[key]
+    
+    def _export(self, doc_id: str, document: Dict[str, Any], exclude: Iterable[str]) -> Dict[str, Any]:
+        exported = {key: copy.deepcopy(value) for key, value in document.items() if key not in exclude}
+        exported["id"] = doc_id
+        return exported
+
+
+class MemoryDatabase:
+    """In-memory storage engine behind the memory repositories, optionally snapshotted to disk"""
+    
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self.tasks = MemoryCollection(
+            indexes=[("status",), ("status", "parent_id"), ("parent_id",), ("agent_id",)]
+        )
+        self.agents = MemoryCollection(
+            indexes=[("status",), ("current_task_id",)],
+            unique=[("api_key",)]
+        )
+        self.results = MemoryCollection(
+            indexes=[("task_id",), ("hash_value",), ("agent_id",)],
+            unique=[("task_id", "hash_value")]
+        )
+        self.task_chunks = MemoryCollection(indexes=[("task_id",), ("status",), ("agent_id",)])
+        self.potfile = MemoryCollection(
+            indexes=[("hash_type_id",)],
+            unique=[("hash_type_id", "hash_value")]
+        )
+    
+    def collections(self) -> Dict[str, MemoryCollection]:
+        return {
+            "tasks": self.tasks,
+            "agents": self.agents,
+            "results": self.results,
+            "task_chunks": self.task_chunks,
+            "potfile": self.potfile
+        }
+    
+    def load(self) -> bool:
+        """Restore the last snapshot, returns False if there is none"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        with open(self.snapshot_path, "rb") as f:
+            data = pickle.load(f)
+        for name, collection in self.collections().items():
+            collection.restore(data.get(name, {}))
+        logger.info(f"Loaded memory database snapshot from {self.snapshot_path}")
+        return True
+    
+    def snapshot(self) -> bool:
+        """Write all collections to the snapshot file, replacing it atomically"""
+        if not self.snapshot_path:
+            return False
+        data = {name: collection.dump() for name, collection in self.collections().items()}
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        return True
+    
+    async def run_snapshots(self, interval: int) -> None:
+        """Snapshot every `interval` seconds off the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.snapshot)
+            except Exception as e:
+                logger.error(f"Error writing memory database snapshot: {e}")
@@ -5,6 +5,8 @@ This provides sample data for the web interface to display.
 
 import asyncio
 import datetime
+import itertools
+from collections import Counter
 from typing import Dict, List, Any, Optional
 from enum import Enum
 
@@ -37,7 +39,7 @@ mock_tasks = [
         "wordlist": "rockyou.txt",
         "rules": "best64.rule",
         "agent_id": "agent1",
-        "recovered_hashes": ["hash1", "hash2"],
+        "recovered_count": 2,
         "hashes": ["hash1", "hash2", "hash3", "hash4"],
         "speed": "45.2 kH/s"
     },
@@ -54,7 +56,7 @@ mock_tasks = [
         "attack_mode": "3",  # Brute force
         "mask": "?a?a?a?a?a?a?a?a",
         "agent_id": "agent2",
-        "recovered_hashes": ["hash5"],
+        "recovered_count": 1,
         "hashes": ["hash5", "hash6", "hash7", "hash8", "hash9"],
         "speed": "1.2 GH/s"
     },
@@ -70,7 +72,7 @@ mock_tasks = [
         "updated_at": datetime.datetime.now() - datetime.timedelta(hours=2),
         "attack_mode": "0",  # Dictionary attack
         "wordlist": "rockyou.txt",
-        "recovered_hashes": [],
+        "recovered_count": 0,
         "hashes": ["hash10", "hash11", "hash12", "hash13", "hash14", "hash15"]
     },
     {
@@ -87,7 +89,7 @@ mock_tasks = [
         "attack_mode": "0",  # Dictionary attack
         "wordlist": "rockyou.txt",
         "agent_id": "agent3",
-        "recovered_hashes": [],
+        "recovered_count": 0,
         "hashes": ["hash16", "hash17", "hash18"]
     },
     {
@@ -103,7 +105,7 @@ mock_tasks = [
         "attack_mode": "0",  # Dictionary attack
         "wordlist": "rockyou.txt",
         "agent_id": "agent1",
-        "recovered_hashes": [],
+        "recovered_count": 0,
         "hashes": ["hash19", "hash20"]
     }
 ]
@@ -218,59 +220,80 @@ mock_results = [
 # Mock database client
 class MockDatabase:
     def __init__(self):
-        self.tasks = mock_tasks
-        self.agents = mock_agents
+        # Documents by ID, results also by task ID
+        self.tasks_by_id = {task["id"]: task for task in mock_tasks}
+        self.agents_by_id = {agent["id"]: agent for agent in mock_agents}
+        self.results_by_task_id: Dict[str, List[Dict[str, Any]]] = {}
+        for result in mock_results:
+            self.results_by_task_id.setdefault(result["task_id"], []).append(result)
         self.results = mock_results
     
+    @property
+    def tasks(self) -> List[Dict[str, Any]]:
+        return list(self.tasks_by_id.values())
+    
+    @property
+    def agents(self) -> List[Dict[str, Any]]:
+        return list(self.agents_by_id.values())
+    
+    def add_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        self.tasks_by_id[task["id"]] = task
+        return task
+    
+    def remove_task(self, task_id: str) -> bool:
+        return self.tasks_by_id.pop(task_id, None) is not None
+    
+    def add_agent(self, agent: Dict[str, Any]) -> Dict[str, Any]:
+        self.agents_by_id[agent["id"]] = agent
+        return agent
+    
     async def get_tasks(self, skip: int = 0, limit: int = 100, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        tasks = self.tasks_by_id.values()
         if status:
-            return [task for task in self.tasks if task["status"] == status][skip:skip+limit]
-        return self.tasks[skip:skip+limit]
+            tasks = (task for task in tasks if task["status"] == status)
+        return list(itertools.islice(tasks, skip, skip + limit))
     
     async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
-        for task in self.tasks:
-            if task["id"] == task_id:
-                return task
-        return None
+        return self.tasks_by_id.get(task_id)
     
     async def get_agents(self, skip: int = 0, limit: int = 100, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        agents = self.agents_by_id.values()
         if status:
-            return [agent for agent in self.agents if agent["status"] == status][skip:skip+limit]
-        return self.agents[skip:skip+limit]
+            agents = (agent for agent in agents if agent["status"] == status)
+        return list(itertools.islice(agents, skip, skip + limit))
     
     async def get_agent(self, agent_id: str) -> Optional[Dict[str, Any]]:
-        for agent in self.agents:
-            if agent["id"] == agent_id:
-                return agent
-        return None
+        return self.agents_by_id.get(agent_id)
     
     async def get_results(self, skip: int = 0, limit: int = 100, task_id: Optional[str] = None) -> List[Dict[str, Any]]:
         if task_id:
-            return [result for result in self.results if result["task_id"] == task_id][skip:skip+limit]
+            return self.results_by_task_id.get(task_id, [])[skip:skip+limit]
         return self.results[skip:skip+limit]
     
     async def get_task_stats(self) -> Dict[str, int]:
+        counts = Counter(task["status"] for task in self.tasks_by_id.values())
         stats = {
-            "total": len(self.tasks),
-            "pending": len([t for t in self.tasks if t["status"] == TaskStatus.PENDING]),
-            "running": len([t for t in self.tasks if t["status"] == TaskStatus.RUNNING]),
-            "completed": len([t for t in self.tasks if t["status"] == TaskStatus.COMPLETED]),
-            "failed": len([t for t in self.tasks if t["status"] == TaskStatus.FAILED]),
-            "cancelled": len([t for t in self.tasks if t["status"] == TaskStatus.CANCELLED])
+            "total": len(self.tasks_by_id),
+            "pending": counts[TaskStatus.PENDING],
+            "running": counts[TaskStatus.RUNNING],
+            "completed": counts[TaskStatus.COMPLETED],
+            "failed": counts[TaskStatus.FAILED],
+            "cancelled": counts[TaskStatus.CANCELLED]
         }
         return stats
     
     async def get_agent_stats(self) -> Dict[str, int]:
+        counts = Counter(agent["status"] for agent in self.agents_by_id.values())
         stats = {
-            "total": len(self.agents),
-            "online": len([a for a in self.agents if a["status"] == AgentStatus.ONLINE]),
-            "busy": len([a for a in self.agents if a["status"] == AgentStatus.BUSY]),
-            "offline": len([a for a in self.agents if a["status"] == AgentStatus.OFFLINE])
+            "total": len(self.agents_by_id),
+            "online": counts[AgentStatus.ONLINE],
+            "busy": counts[AgentStatus.BUSY],
+            "offline": counts[AgentStatus.OFFLINE]
         }
         return stats
     
     async def get_result_stats(self) -> Dict[str, int]:
-        total_hashes = sum(len(task["hashes"]) for task in self.tasks)
+        total_hashes = sum(len(task["hashes"]) for task in self.tasks_by_id.values())
         recovered_hashes = len(self.results)
         
         stats = {
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -8,18 +9,56 @@ load_dotenv()
 MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "hashcat_cracking")
 
+# Storage settings
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongodb")  # mongodb, sqlite or memory
+SQLITE_PATH = os.getenv("SQLITE_PATH", "hashcat_cracking.db")  # database file of the sqlite backend
+MEMORY_SNAPSHOT_PATH = os.getenv("MEMORY_SNAPSHOT_PATH", "")  # empty keeps the memory backend volatile
+MEMORY_SNAPSHOT_INTERVAL = int(os.getenv("MEMORY_SNAPSHOT_INTERVAL", "60"))  # seconds between snapshots
+STORAGE_PACK_HASHES = os.getenv("STORAGE_PACK_HASHES", "true").lower() == "true"  # store hex digests as raw bytes
+
 # Server settings
 SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
 SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
 
 # Agent settings
 AGENT_POLL_INTERVAL = int(os.getenv("AGENT_POLL_INTERVAL", "5"))  # seconds
 AGENT_HEARTBEAT_INTERVAL = int(os.getenv("AGENT_HEARTBEAT_INTERVAL", "30"))  # seconds
+AGENT_LONG_POLL_TIMEOUT = int(os.getenv("AGENT_LONG_POLL_TIMEOUT", "60"))  # seconds a task request may be held
+AGENT_LONG_POLL_RECHECK_INTERVAL = int(os.getenv("AGENT_LONG_POLL_RECHECK_INTERVAL", "5"))  # seconds between assignment checks of a held task request with several SERVER_WORKERS
+AGENT_RESULT_INTERVAL = int(os.getenv("AGENT_RESULT_INTERVAL", "5"))  # seconds between outfile reads
+AGENT_AUTH_CACHE_TTL = int(os.getenv("AGENT_AUTH_CACHE_TTL", "60"))  # seconds an API key lookup is reused, 0 disables; at most 5 with several SERVER_WORKERS
+AGENT_AUTH_CACHE_SIZE = int(os.getenv("AGENT_AUTH_CACHE_SIZE", "1024"))  # API keys kept in the cache
+AGENT_WORK_DIR = os.getenv("AGENT_WORK_DIR", os.path.join(tempfile.gettempdir(), "hashcat_agent"))  # kept across restarts
+AGENT_CACHE_QUOTA = int(os.getenv("AGENT_CACHE_QUOTA", "51200"))  # megabytes of wordlists and rules cached in the work dir
+AGENT_PREFETCH_TASKS = int(os.getenv("AGENT_PREFETCH_TASKS", "2"))  # upcoming tasks whose files are fetched ahead, 0 disables
 
 # Hashcat settings
 HASHCAT_PATH = os.getenv("HASHCAT_PATH", "/usr/bin/hashcat")
-DEFAULT_HASHCAT_ARGS = os.getenv("DEFAULT_HASHCAT_ARGS", "--status --status-timer=10")
+DEFAULT_HASHCAT_ARGS = os.getenv("DEFAULT_HASHCAT_ARGS", "--status-timer=10")
 
 # Task settings
-TASK_CHUNK_SIZE = int(os.getenv("TASK_CHUNK_SIZE", "1000"))  # number of hashes per task
+TASK_CHUNK_SIZE = int(os.getenv("TASK_CHUNK_SIZE", "1000"))  # number of hashes per task shard
 TASK_TIMEOUT = int(os.getenv("TASK_TIMEOUT", "3600"))  # seconds
+TASK_CHUNK_DURATION = int(os.getenv("TASK_CHUNK_DURATION", "600"))  # seconds of work per keyspace chunk
+TASK_LEASE_DURATION = int(os.getenv("TASK_LEASE_DURATION", "300"))  # seconds a chunk stays claimed without a heartbeat
+TASK_DEFAULT_CHUNK_KEYSPACE = int(os.getenv("TASK_DEFAULT_CHUNK_KEYSPACE", "1000000"))  # chunk size before an agent's speed is known
+TASK_CHUNK_MAX_ATTEMPTS = int(os.getenv("TASK_CHUNK_MAX_ATTEMPTS", "3"))  # runs of a failing chunk before its task fails
+
+# Potfile settings
+POTFILE_DELTA_LIMIT = int(os.getenv("POTFILE_DELTA_LIMIT", "10000"))  # entries per agent potfile request
+HASH_FILTER_PATH = os.getenv("HASH_FILTER_PATH", "hash_filter.bin")  # filter image, empty keeps it in memory only
+HASH_FILTER_REBUILD_INTERVAL = int(os.getenv("HASH_FILTER_REBUILD_INTERVAL", "3600"))  # seconds, 0 builds once
+HASH_FILTER_FALSE_POSITIVE_RATE = float(os.getenv("HASH_FILTER_FALSE_POSITIVE_RATE", "0.001"))
+
+# Upload settings
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")  # named files and the content addressed objects they link to
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "1048576"))  # bytes read and hashed at a time
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", "86400"))  # seconds an unfinished upload can be resumed
+WORDLIST_SORT_CHUNK_SIZE = int(os.getenv("WORDLIST_SORT_CHUNK_SIZE", "16777216"))  # bytes of a wordlist sorted in memory at a time, prep runs in the server process
+WORDLIST_INDEX_STRIDE = int(os.getenv("WORDLIST_INDEX_STRIDE", "16384"))  # lines between the offsets kept in a wordlist's line index
+FILE_CATALOG_DIRS = [d for d in os.getenv("FILE_CATALOG_DIRS", "").split(",") if d]  # more wordlist and rule dirs served to agents
+
+# Scheduler settings
+DISPATCH_FALLBACK_INTERVAL = int(os.getenv("DISPATCH_FALLBACK_INTERVAL", "30"))  # seconds between passes without events
+HEARTBEAT_FLUSH_INTERVAL = int(os.getenv("HEARTBEAT_FLUSH_INTERVAL", "1000"))  # milliseconds between heartbeat writes
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+from config.hash_codec import pack_hash, unpack_hash, pack_hashes, unpack_hashes
+
+logger = logging.getLogger(__name__)
+
+# Columns per table and how their values are stored
+TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "tasks": [
+        ("name", "text"), ("description", "text"), ("hash_type", "text"), ("hash_type_id", "integer"),
+        ("hashes", "hashes"), ("wordlist_path", "text"), ("rule_path", "text"), ("mask", "text"),
+        ("attack_mode", "integer"), ("additional_args", "text"), ("priority", "integer"),
+        ("status", "text"), ("agent_id", "text"), ("created_at", "datetime"), ("updated_at", "datetime"),
+        ("started_at", "datetime"), ("completed_at", "datetime"), ("progress", "real"), ("speed", "real"),
+        ("recovered_count", "integer"), ("last_cracked_at", "datetime"), ("error", "text"),
+        ("metadata", "json"), ("keyspace", "integer"), ("keyspace_offset", "integer"),
+        ("hash_count", "integer"), ("parent_id", "text"), ("shard_index", "integer"),
+        ("shard_count", "integer"),
+    ],
+    "agents": [
+        ("name", "text"), ("hostname", "text"), ("ip_address", "text"), ("api_key", "text"),
+        ("status", "text"), ("capabilities", "json"), ("current_task_id", "text"),
+        ("last_seen", "datetime"), ("registered_at", "datetime"), ("gpu_info", "json"),
+        ("cpu_info", "json"), ("hashcat_version", "text"), ("metadata", "json"),
+        ("current_chunk_id", "text"), ("keyspace_speed", "real"),
+    ],
+    "results": [
+        ("task_id", "text"), ("hash_value", "hash"), ("plaintext", "text"), ("cracked_at", "datetime"),
+        ("agent_id", "text"), ("metadata", "json"),
+    ],
+    "task_chunks": [
+        ("task_id", "text"), ("skip", "integer"), ("limit", "integer"), ("status", "text"),
+        ("agent_id", "text"), ("created_at", "datetime"), ("updated_at", "datetime"),
+        ("started_at", "datetime"), ("completed_at", "datetime"), ("progress", "real"), ("speed", "real"),
+        ("error", "text"), ("lease_expires_at", "datetime"), ("failures", "integer"),
+    ],
+    "potfile": [
+        ("hash_type_id", "integer"), ("hash_value", "text"), ("plaintext", "text"), ("task_id", "text"),
+        ("added_at", "datetime"),
+    ],
+}
+
+# Same access paths as the MongoDB indexes in config.indexes
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS tasks_status_priority_created_at ON tasks (status, priority DESC, created_at)",
+    "CREATE INDEX IF NOT EXISTS tasks_parent_id_shard_index ON tasks (parent_id, shard_index)",
+    "CREATE INDEX IF NOT EXISTS tasks_agent_id ON tasks (agent_id)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS agents_api_key ON agents (api_key)",
+    "CREATE INDEX IF NOT EXISTS agents_status_current_task_id ON agents (status, current_task_id)",
+    "CREATE INDEX IF NOT EXISTS agents_current_task_id ON agents (current_task_id)",
+    "CREATE INDEX IF NOT EXISTS results_hash_value ON results (hash_value)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS results_task_id_hash_value ON results (task_id, hash_value)",
+    "CREATE INDEX IF NOT EXISTS results_agent_id ON results (agent_id)",
+    "CREATE INDEX IF NOT EXISTS task_chunks_task_id_skip ON task_chunks (task_id, skip)",
+    "CREATE INDEX IF NOT EXISTS task_chunks_status_created_at ON task_chunks (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS task_chunks_status_lease_expires_at ON task_chunks (status, lease_expires_at)",
+    "CREATE INDEX IF NOT EXISTS task_chunks_agent_id_status ON task_chunks (agent_id, status)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS potfile_hash_type_id_hash_value ON potfile (hash_type_id, hash_value)",
+    "CREATE INDEX IF NOT EXISTS potfile_hash_type_id_added_at ON potfile (hash_type_id, added_at)",
+]
+
+# Packed hashes are BLOBs in TEXT columns, SQLite keeps the type of each value
+SQL_TYPES = {
+    "text": "TEXT", "integer": "INTEGER", "real": "REAL", "json": "TEXT", "datetime": "TEXT",
+    "hash": "TEXT", "hashes": "TEXT",
+}
+
+
+def quote(name: str) -> str:
+    """Quote a column name, some of them (limit) are SQL keywords"""
+    return f'"{name}"'
+
+
+def encode_datetime(value: Optional[datetime]) -> Optional[str]:
+    """Fixed width ISO text, so stored datetimes compare and sort as strings"""
+    if value is None:
+        return None
+    return value.isoformat(timespec="microseconds")
+
+
+def encode(table: str, document: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a document to column values"""
+    kinds = dict(TABLES[table])
+    row = {}
+    for name, value in document.items():
+        kind = kinds.get(name)
+        if kind is None:
+            continue
+        if kind == "json":
+            value = json.dumps(value) if value is not None else None
+        elif kind == "datetime":
+            value = encode_datetime(value)
+        elif kind == "hash":
+            value = pack_hash(value)
+        elif kind == "hashes" and value is not None:
+            value = pack_hashes(value)
+            if not isinstance(value, bytes):
+                value = json.dumps(value)
+        row[name] = value
+    return row
+
+
+def decode(table: str, row: sqlite3.Row) -> Dict[str, Any]:
+    """Convert a row back to a document"""
+    kinds = dict(TABLES[table])
+    document = {}
+    for name in row.keys():
+        value = row[name]
+        kind = kinds.get(name)
+        if value is not None:
+            if kind == "json":
+                value = json.loads(value)
+            elif kind == "datetime":
+                value = datetime.fromisoformat(value)
+            elif kind == "hash":
+                value = unpack_hash(value)
+            elif kind == "hashes":
+                value = unpack_hashes(value if isinstance(value, bytes) else json.loads(value))
+        document[name] = value
+    return document
+
+
+class SQLiteDatabase:
+    """Single file storage backend, one connection in WAL mode used from a dedicated thread"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.connection: Optional[sqlite3.Connection] = None
+        # One thread owns the connection, calls are serialized in submission order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+    
+    async def connect(self) -> "SQLiteDatabase":
+        """Open the database file and create the schema"""
+        await self._submit(self._open)
+        logger.info(f"Opened SQLite database at {self.path}")
+        return self
+    
+    async def close(self) -> None:
+        """Checkpoint the WAL and close the connection"""
+        if self.connection is not None:
+            await self._submit(self._close)
+        self.executor.shutdown(wait=True)
+    
+    async def read(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(connection, *args) on the database thread"""
+        return await self._submit(fn, self.connection, *args)
+    
+    async def write(self, fn: Callable[..., Any], *args) -> Any:
+        """Run fn(connection, *args) on the database thread in one write transaction"""
+        return await self._submit(self._transaction, fn, *args)
+    
+    def _transaction(self, fn: Callable[..., Any], *args) -> Any:
+        # IMMEDIATE takes the write lock up front, conditional updates cannot interleave
+        # with other processes sharing the file
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(self.connection, *args)
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return result
+    
+    async def _submit(self, fn: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+    
+    def _open(self) -> None:
+        # Transactions are managed explicitly, see write()
+        self.connection = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False, cached_statements=256
+        )
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA busy_timeout=5000")
+        self._create_schema()
+    
+    def _close(self) -> None:
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.close()
+        self.connection = None
+    
+    def _create_schema(self) -> None:
+        for table, columns in TABLES.items():
+            definitions = ", ".join(f"{quote(name)} {SQL_TYPES[kind]}" for name, kind in columns)
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (id TEXT PRIMARY KEY, {definitions})")
+            # Columns added to TABLES after the file was created
+            existing = {row["name"] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            for name, kind in columns:
+                if name not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {quote(name)} {SQL_TYPES[kind]}")
+        for statement in INDEXES:
+            try:
+                self.connection.execute(statement)
+            except sqlite3.IntegrityError as e:
+                # Duplicate values block a unique index until they are cleaned up
+                logger.error(f"Failed to create index: {statement}: {e}")
+    
+    # Statement helpers, called on the database thread
+    
+    @staticmethod
+    def insert(connection: sqlite3.Connection, table: str, document: Dict[str, Any]) -> str:
+        """Insert a document, returning its ID"""
+        doc_id = document.get("id") or uuid.uuid4().hex
+        row = encode(table, document)
+        names = ["id"] + list(row)
+        connection.execute(
+            f"INSERT INTO {table} ({', '.join(quote(name) for name in names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})",
+            [doc_id] + list(row.values())
+        )
+        return doc_id
+    
+    @staticmethod
+    def update(connection: sqlite3.Connection, table: str, changes: Dict[str, Any],
+               where: str, params: Tuple = ()) -> int:
+        """Set columns on the rows matching a WHERE clause, returning how many matched"""
+        row = encode(table, changes)
+        assignments = ", ".join(f"{quote(name)} = ?" for name in row)
+        cursor = connection.execute(
+            f"UPDATE {table} SET {assignments} WHERE {where}",
+            list(row.values()) + list(params)
+        )
+        return cursor.rowcount
+    
+    @staticmethod
+    def select(connection: sqlite3.Connection, table: str, where: str = "1", params: Tuple = (),
+               order_by: Optional[str] = None, skip: int = 0, limit: int = 0,
+               exclude: Tuple[str, ...] = ()) -> List[Dict[str, Any]]:
+        """Documents matching a WHERE clause, a limit of 0 returns all"""
+        columns = ", ".join(["id"] + [quote(name) for name, _ in TABLES[table] if name not in exclude])
+        sql = f"SELECT {columns} FROM {table} WHERE {where}"
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        if limit or skip:
+            sql += f" LIMIT {int(limit) if limit else -1} OFFSET {int(skip)}"
+        return [decode(table, row) for row in connection.execute(sql, params)]
+    
+    @classmethod
+    def select_one(cls, connection: sqlite3.Connection, table: str, where: str, params: Tuple = (),
+                   order_by: Optional[str] = None, exclude: Tuple[str, ...] = ()) -> Optional[Dict[str, Any]]:
+        """First document matching a WHERE clause"""
+        rows = cls.select(connection, table, where, params, order_by=order_by, limit=1, exclude=exclude)
+        return rows[0] if rows else None
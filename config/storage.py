@@ -0,0 +1,93 @@
+import asyncio
+import logging
+
+from config.settings import (
+    STORAGE_BACKEND, MEMORY_SNAPSHOT_PATH, MEMORY_SNAPSHOT_INTERVAL, SQLITE_PATH, SERVER_WORKERS
+)
+from config.database import Database
+from config.memory_database import MemoryDatabase
+from config.sqlite_database import SQLiteDatabase
+from repository.task_repository import TaskRepository
+from repository.agent_repository import AgentRepository
+from repository.result_repository import ResultRepository
+from repository.potfile_repository import PotfileRepository
+from repository.memory_repository import (
+    MemoryTaskRepository, MemoryAgentRepository, MemoryResultRepository, MemoryPotfileRepository
+)
+from repository.sqlite_repository import (
+    SQLiteTaskRepository, SQLiteAgentRepository, SQLiteResultRepository, SQLitePotfileRepository
+)
+
+logger = logging.getLogger(__name__)
+
+# Repository classes of each backend: task, agent, result, potfile
+REPOSITORIES = {
+    "mongodb": (TaskRepository, AgentRepository, ResultRepository, PotfileRepository),
+    "memory": (MemoryTaskRepository, MemoryAgentRepository, MemoryResultRepository, MemoryPotfileRepository),
+    "sqlite": (SQLiteTaskRepository, SQLiteAgentRepository, SQLiteResultRepository, SQLitePotfileRepository),
+}
+
+
+class Storage:
+    """Opens the configured STORAGE_BACKEND and builds its repositories"""
+    backend = STORAGE_BACKEND
+    db = None
+    _snapshot_task = None
+    
+    @classmethod
+    async def connect(cls):
+        """Open the storage backend"""
+        if cls.backend not in REPOSITORIES:
+            raise ValueError(f"Unknown STORAGE_BACKEND {cls.backend!r}, expected one of {list(REPOSITORIES)}")
+        
+        if cls.backend == "memory":
+            cls.db = MemoryDatabase(MEMORY_SNAPSHOT_PATH or None)
+            cls.db.load()
+            if MEMORY_SNAPSHOT_PATH and MEMORY_SNAPSHOT_INTERVAL > 0:
+                cls._snapshot_task = asyncio.create_task(cls.db.run_snapshots(MEMORY_SNAPSHOT_INTERVAL))
+            if SERVER_WORKERS > 1:
+                # Every worker process would hold its own copy of the data
+                logger.warning("The in-memory storage backend needs SERVER_WORKERS=1")
+            logger.info("Using the in-memory storage backend")
+        elif cls.backend == "sqlite":
+            cls.db = await SQLiteDatabase(SQLITE_PATH).connect()
+        else:
+            cls.db = await Database.connect()
+        return cls.db
+    
+    @classmethod
+    async def close(cls):
+        """Close the storage backend, writing a last snapshot of the memory backend"""
+        if cls.backend == "memory":
+            if cls._snapshot_task:
+                cls._snapshot_task.cancel()
+            if cls.db is not None:
+                cls.db.snapshot()
+        elif cls.backend == "sqlite":
+            if cls.db is not None:
+                await cls.db.close()
+        else:
+            await Database.close()
+    
+    @classmethod
+    def get_database(cls):
+        """Get database instance"""
+        if cls.db is None:
+            raise ConnectionError("Storage not connected. Call connect() first.")
+        return cls.db
+    
+    @classmethod
+    def task_repository(cls):
+        return REPOSITORIES[cls.backend][0](cls.get_database())
+    
+    @classmethod
+    def agent_repository(cls):
+        return REPOSITORIES[cls.backend][1](cls.get_database())
+    
+    @classmethod
+    def result_repository(cls):
+        return REPOSITORIES[cls.backend][2](cls.get_database())
+    
+    @classmethod
+    def potfile_repository(cls):
+        return REPOSITORIES[cls.backend][3](cls.get_database())
@@ -28,7 +28,9 @@ class Agent:
         gpu_info: List[Dict[str, Any]] = None,
         cpu_info: Dict[str, Any] = None,
         hashcat_version: Optional[str] = None,
-        metadata: Dict[str, Any] = None
+        metadata: Dict[str, Any] = None,
+        current_chunk_id: Optional[str] = None,
+        keyspace_speed: Optional[float] = None  # keyspace units/s measured from completed chunks
     ):
         self.id = id
         self.name = name
@@ -44,6 +46,8 @@ class Agent:
         self.cpu_info = cpu_info or {}
         self.hashcat_version = hashcat_version
         self.metadata = metadata or {}
+        self.current_chunk_id = current_chunk_id
+        self.keyspace_speed = keyspace_speed
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert agent to dictionary"""
@@ -61,7 +65,9 @@ class Agent:
             "gpu_info": self.gpu_info,
             "cpu_info": self.cpu_info,
             "hashcat_version": self.hashcat_version,
-            "metadata": self.metadata
+            "metadata": self.metadata,
+            "current_chunk_id": self.current_chunk_id,
+            "keyspace_speed": self.keyspace_speed
         }
     
     @classmethod
@@ -0,0 +1,92 @@
+from enum import Enum
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+
+class ChunkStatus(str, Enum):
+    PENDING = "pending"
+    ASSIGNED = "assigned"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Chunk:
+    """Chunk entity representing a --skip/--limit slice of a task's keyspace"""
+    
+    def __init__(
+        self,
+        id: Optional[str] = None,
+        task_id: str = "",
+        skip: int = 0,
+        limit: Optional[int] = None,  # None runs to the end of the keyspace
+        status: ChunkStatus = ChunkStatus.PENDING,
+        agent_id: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
+        started_at: Optional[datetime] = None,
+        completed_at: Optional[datetime] = None,
+        progress: float = 0.0,
+        speed: Optional[float] = None,  # H/s
+        error: Optional[str] = None,
+        lease_expires_at: Optional[datetime] = None,  # claimable by another agent after this
+        failures: int = 0  # failed runs so far, the chunk is retried until TASK_CHUNK_MAX_ATTEMPTS
+    ):
+        self.id = id
+        self.task_id = task_id
+        self.skip = skip
+        self.limit = limit
+        self.status = status
+        self.agent_id = agent_id
+        self.created_at = created_at or datetime.utcnow()
+        self.updated_at = updated_at or datetime.utcnow()
+        self.started_at = started_at
+        self.completed_at = completed_at
+        self.progress = progress
+        self.speed = speed
+        self.error = error
+        self.lease_expires_at = lease_expires_at
+        self.failures = failures or 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert chunk to dictionary"""
+        return {
+            "id": self.id,
+            "task_id": self.task_id,
+            "skip": self.skip,
+            "limit": self.limit,
+            "status": self.status.value,
+            "agent_id": self.agent_id,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "progress": self.progress,
+            "speed": self.speed,
+            "error": self.error,
+            "lease_expires_at": self.lease_expires_at,
+            "failures": self.failures
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Chunk':
+        """Create chunk from dictionary"""
+        if data.get("status"):
+            data["status"] = ChunkStatus(data["status"])
+        return cls(**data)
+    
+    def is_open(self) -> bool:
+        """Check if chunk still has work outstanding"""
+        return self.status in [ChunkStatus.PENDING, ChunkStatus.ASSIGNED, ChunkStatus.RUNNING]
+    
+    def keyspace_rate(self) -> Optional[float]:
+        """Keyspace units processed per second, measured from a completed chunk"""
+        if self.status != ChunkStatus.COMPLETED or not self.limit:
+            return None
+        if not self.started_at or not self.completed_at:
+            return None
+        elapsed = (self.completed_at - self.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return self.limit / elapsed
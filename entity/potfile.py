@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+
+class PotfileEntry:
+    """Potfile entry, a hash of one hash type cracked by any task"""
+    
+    def __init__(
+        self,
+        id: Optional[str] = None,
+        hash_type_id: int = 0,
+        hash_value: str = "",
+        plaintext: str = "",
+        task_id: Optional[str] = None,
+        added_at: Optional[datetime] = None
+    ):
+        self.id = id
+        self.hash_type_id = hash_type_id
+        self.hash_value = hash_value
+        self.plaintext = plaintext
+        self.task_id = task_id
+        self.added_at = added_at or datetime.utcnow()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert potfile entry to dictionary"""
+        return {
+            "id": self.id,
+            "hash_type_id": self.hash_type_id,
+            "hash_value": self.hash_value,
+            "plaintext": self.plaintext,
+            "task_id": self.task_id,
+            "added_at": self.added_at
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PotfileEntry':
+        """Create potfile entry from dictionary"""
+        return cls(**data)
@@ -48,9 +48,16 @@ class Task:
         completed_at: Optional[datetime] = None,
         progress: float = 0.0,
         speed: Optional[float] = None,  # H/s
-        recovered_hashes: List[Dict[str, str]] = None,
+        recovered_count: int = 0,  # cracked hashes are stored as results
+        last_cracked_at: Optional[datetime] = None,
         error: Optional[str] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        keyspace: Optional[int] = None,  # None until measured, 0 if it cannot be split
+        keyspace_offset: int = 0,  # keyspace already cut into chunks
+        hash_count: int = 0,
+        parent_id: Optional[str] = None,  # set on hash shards of a larger task
+        shard_index: Optional[int] = None,
+        shard_count: int = 0  # number of hash shards, set on the parent task
     ):
         self.id = id
         self.name = name
@@ -72,9 +79,16 @@ class Task:
         self.completed_at = completed_at
         self.progress = progress
         self.speed = speed
-        self.recovered_hashes = recovered_hashes or []
+        self.recovered_count = recovered_count
+        self.last_cracked_at = last_cracked_at
         self.error = error
         self.metadata = metadata or {}
+        self.keyspace = keyspace
+        self.keyspace_offset = keyspace_offset
+        self.hash_count = hash_count or len(self.hashes)
+        self.parent_id = parent_id
+        self.shard_index = shard_index
+        self.shard_count = shard_count
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert task to dictionary"""
@@ -99,9 +113,16 @@ class Task:
             "completed_at": self.completed_at,
             "progress": self.progress,
             "speed": self.speed,
-            "recovered_hashes": self.recovered_hashes,
+            "recovered_count": self.recovered_count,
+            "last_cracked_at": self.last_cracked_at,
             "error": self.error,
-            "metadata": self.metadata
+            "metadata": self.metadata,
+            "keyspace": self.keyspace,
+            "keyspace_offset": self.keyspace_offset,
+            "hash_count": self.hash_count,
+            "parent_id": self.parent_id,
+            "shard_index": self.shard_index,
+            "shard_count": self.shard_count
         }
     
     @classmethod
@@ -111,4 +132,35 @@ class Task:
             data["hash_type"] = HashType(data["hash_type"])
         if data.get("status"):
             data["status"] = TaskStatus(data["status"])
+        # Documents written before recovered hashes moved to results
+        recovered_hashes = data.pop("recovered_hashes", None)
+        if recovered_hashes and not data.get("recovered_count"):
+            data["recovered_count"] = len(recovered_hashes)
         return cls(**data)
+    
+    def is_fully_dispatched(self) -> bool:
+        """Check if the whole keyspace has been cut into chunks"""
+        return self.keyspace is not None and self.keyspace_offset >= self.keyspace
+    
+    def is_sharded(self) -> bool:
+        """Check if the task's hashes are split across shard tasks"""
+        return self.shard_count > 0
+    
+    def create_shard(self, shard_index: int, hashes: List[str]) -> 'Task':
+        """Create a schedulable shard of this task covering a subset of its hashes"""
+        return Task(
+            name=f"{self.name} [{shard_index + 1}/{self.shard_count}]",
+            description=self.description,
+            hash_type=self.hash_type,
+            hash_type_id=self.hash_type_id,
+            hashes=hashes,
+            wordlist_path=self.wordlist_path,
+            rule_path=self.rule_path,
+            mask=self.mask,
+            attack_mode=self.attack_mode,
+            additional_args=self.additional_args,
+            priority=self.priority,
+            metadata=dict(self.metadata),
+            parent_id=self.id,
+            shard_index=shard_index
+        )
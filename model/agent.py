@@ -47,6 +47,8 @@ class AgentResponse(AgentBase):
     cpu_info: Dict[str, Any] = Field(default_factory=dict)
     hashcat_version: Optional[str] = None
     metadata: Dict[str, Any] = Field(default_factory=dict)
+    current_chunk_id: Optional[str] = None
+    keyspace_speed: Optional[float] = None
 
     class Config:
         orm_mode = True
@@ -56,5 +58,6 @@ class AgentHeartbeat(BaseModel):
     """Model for agent heartbeat"""
     status: AgentStatus
     current_task_id: Optional[str] = None
+    current_chunk_id: Optional[str] = None
     task_progress: Optional[float] = None
     task_speed: Optional[float] = None
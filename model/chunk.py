@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from entity.chunk import ChunkStatus
+
+
+class ChunkResponse(BaseModel):
+    """Model for chunk response"""
+    id: str
+    task_id: str
+    skip: int
+    limit: Optional[int] = None
+    status: ChunkStatus
+    agent_id: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    progress: float = 0.0
+    speed: Optional[float] = None
+    error: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
@@ -34,11 +34,10 @@ class TaskUpdate(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
-class TaskResponse(TaskBase):
-    """Model for task response"""
+class TaskSummary(TaskBase):
+    """Model for task list entries, without the hash list"""
     id: str
     status: TaskStatus
-    hashes: List[str]
     wordlist_path: Optional[str] = None
     rule_path: Optional[str] = None
     mask: Optional[str] = None
@@ -49,17 +48,36 @@ class TaskResponse(TaskBase):
     completed_at: Optional[datetime] = None
     progress: float = 0.0
     speed: Optional[float] = None
-    recovered_hashes: List[Dict[str, str]] = Field(default_factory=list)
+    recovered_count: int = 0
+    last_cracked_at: Optional[datetime] = None
     error: Optional[str] = None
+    keyspace: Optional[int] = None
+    keyspace_offset: int = 0
+    hash_count: int = 0
+    parent_id: Optional[str] = None
+    shard_index: Optional[int] = None
+    shard_count: int = 0
 
     class Config:
         orm_mode = True
 
 
+class TaskResponse(TaskSummary):
+    """Model for task response"""
+    hashes: List[str]
+
+
 class TaskStatusUpdate(BaseModel):
     """Model for updating task status from agent"""
     status: TaskStatus
+    chunk_id: Optional[str] = None
     progress: float = 0.0
     speed: Optional[float] = None
     recovered_hashes: List[Dict[str, str]] = Field(default_factory=list)
     error: Optional[str] = None
+
+
+class RecoveredHashBatch(BaseModel):
+    """Model for a batch of recovered hashes sent by an agent"""
+    chunk_id: Optional[str] = None
+    recovered_hashes: List[Dict[str, str]] = Field(default_factory=list)
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class UploadSessionCreate(BaseModel):
+    """Model for opening a resumable upload"""
+    filename: str
+    size: int = Field(..., ge=0)
+    sha256: Optional[str] = None
+
+
+class UploadStatus(BaseModel):
+    """Model for the state of an upload"""
+    complete: bool
+    size: int
+    upload_id: Optional[str] = None
+    offset: Optional[int] = None
+    sha256: Optional[str] = None
+    path: Optional[str] = None
+    deduplicated: Optional[bool] = None
@@ -1,6 +1,7 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from bson import ObjectId
 from datetime import datetime
+from pymongo import ReturnDocument, UpdateOne
 
 from entity.agent import Agent, AgentStatus
 
@@ -31,6 +32,23 @@ class AgentRepository:
             return Agent.from_dict(agent_dict)
         return None
     
+    async def _update_by_id(self, agent_id: str, update: Any,
+                            return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update one agent, returning it as written or, without return_document, whether it exists"""
+        if not return_document:
+            result = await self.collection.update_one({"_id": ObjectId(agent_id)}, update)
+            return result.matched_count > 0
+        
+        agent_dict = await self.collection.find_one_and_update(
+            {"_id": ObjectId(agent_id)},
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+        if agent_dict:
+            agent_dict["id"] = str(agent_dict.pop("_id"))
+            return Agent.from_dict(agent_dict)
+        return None
+    
     async def find_by_api_key(self, api_key: str) -> Optional[Agent]:
         """Find agent by API key"""
         agent_dict = await self.collection.find_one({"api_key": api_key})
@@ -69,80 +87,150 @@ class AgentRepository:
             agents.append(Agent.from_dict(agent_dict))
         return agents
     
-    async def update(self, agent: Agent) -> Optional[Agent]:
+    async def update(self, agent: Agent,
+                     return_document: bool = True) -> Union[Agent, bool, None]:
         """Update an existing agent"""
         agent_dict = agent.to_dict()
         agent_id = agent_dict.pop("id")
         
-        result = await self.collection.update_one(
-            {"_id": ObjectId(agent_id)},
-            {"$set": agent_dict}
+        return await self._update_by_id(
+            agent_id,
+            {"$set": agent_dict},
+            return_document
         )
-        
-        if result.modified_count > 0:
-            return await self.find_by_id(agent_id)
-        return None
     
-    async def update_status(self, agent_id: str, status: AgentStatus) -> Optional[Agent]:
-        """Update agent status"""
-        result = await self.collection.update_one(
-            {"_id": ObjectId(agent_id)},
-            {
+    async def update_status(self, agent_id: str, status: AgentStatus,
+                            return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update agent status, an agent holding work stays busy when it reports online"""
+        status_value = status.value
+        if status == AgentStatus.ONLINE:
+            # A heartbeat racing an assignment must not mark a busy agent idle
+            status_value = {
+                "$cond": [
+                    {"$ne": [{"$ifNull": ["$current_task_id", None]}, None]},
+                    AgentStatus.BUSY.value,
+                    AgentStatus.ONLINE.value
+                ]
+            }
+        
+        return await self._update_by_id(
+            agent_id,
+            [{
                 "$set": {
-                    "status": status.value,
+                    "status": status_value,
                     "last_seen": datetime.utcnow()
                 }
-            }
+            }],
+            return_document
         )
+    
+    async def bulk_update_heartbeats(self, heartbeats: Dict[str, Dict[str, Any]]) -> int:
+        """Write buffered heartbeats, agent ID to status and last_seen, in one bulk write"""
+        operations = []
+        for agent_id, heartbeat in heartbeats.items():
+            status = heartbeat["status"]
+            status_value = status.value
+            if status == AgentStatus.ONLINE:
+                # Same rule as update_status, a busy agent stays busy
+                status_value = {
+                    "$cond": [
+                        {"$ne": [{"$ifNull": ["$current_task_id", None]}, None]},
+                        AgentStatus.BUSY.value,
+                        AgentStatus.ONLINE.value
+                    ]
+                }
+            operations.append(UpdateOne(
+                {"_id": ObjectId(agent_id)},
+                [{"$set": {"status": status_value, "last_seen": heartbeat["last_seen"]}}]
+            ))
         
-        if result.modified_count > 0:
-            return await self.find_by_id(agent_id)
-        return None
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
     
-    async def update_heartbeat(self, agent_id: str) -> Optional[Agent]:
+    async def update_heartbeat(self, agent_id: str,
+                               return_document: bool = True) -> Union[Agent, bool, None]:
         """Update agent heartbeat"""
-        result = await self.collection.update_one(
-            {"_id": ObjectId(agent_id)},
-            {"$set": {"last_seen": datetime.utcnow()}}
+        return await self._update_by_id(
+            agent_id,
+            {"$set": {"last_seen": datetime.utcnow()}},
+            return_document
         )
-        
-        if result.modified_count > 0:
-            return await self.find_by_id(agent_id)
-        return None
     
-    async def assign_task(self, agent_id: str, task_id: str) -> Optional[Agent]:
-        """Assign task to agent"""
-        result = await self.collection.update_one(
-            {"_id": ObjectId(agent_id)},
+    async def claim_task(self, agent_id: str, task_id: str, chunk_id: str = None) -> Optional[Agent]:
+        """Atomically assign work to an agent, returns None if the agent is no longer available"""
+        agent_dict = await self.collection.find_one_and_update(
+            {
+                "_id": ObjectId(agent_id),
+                "status": AgentStatus.ONLINE.value,
+                "current_task_id": None
+            },
             {
                 "$set": {
                     "current_task_id": task_id,
+                    "current_chunk_id": chunk_id,
                     "status": AgentStatus.BUSY.value,
                     "last_seen": datetime.utcnow()
                 }
-            }
+            },
+            return_document=ReturnDocument.AFTER
         )
-        
-        if result.modified_count > 0:
-            return await self.find_by_id(agent_id)
+        if agent_dict:
+            agent_dict["id"] = str(agent_dict.pop("_id"))
+            return Agent.from_dict(agent_dict)
         return None
     
-    async def clear_task(self, agent_id: str) -> Optional[Agent]:
+    async def clear_task(self, agent_id: str,
+                         return_document: bool = True) -> Union[Agent, bool, None]:
         """Clear current task from agent"""
-        result = await self.collection.update_one(
-            {"_id": ObjectId(agent_id)},
+        return await self._update_by_id(
+            agent_id,
             {
                 "$set": {
                     "current_task_id": None,
+                    "current_chunk_id": None,
                     "status": AgentStatus.ONLINE.value,
                     "last_seen": datetime.utcnow()
                 }
+            },
+            return_document
+        )
+    
+    async def release_chunk(self, agent_id: str, chunk_id: str) -> bool:
+        """Clear a chunk from an agent, only if the agent still holds it"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(agent_id), "current_chunk_id": chunk_id},
+            {
+                "$set": {
+                    "current_task_id": None,
+                    "current_chunk_id": None,
+                    "status": AgentStatus.ONLINE.value
+                }
             }
         )
-        
-        if result.modified_count > 0:
-            return await self.find_by_id(agent_id)
-        return None
+        return result.modified_count > 0
+    
+    async def clear_task_by_task_id(self, task_id: str) -> int:
+        """Clear a task from every agent working on it"""
+        result = await self.collection.update_many(
+            {"current_task_id": task_id},
+            {
+                "$set": {
+                    "current_task_id": None,
+                    "current_chunk_id": None,
+                    "status": AgentStatus.ONLINE.value
+                }
+            }
+        )
+        return result.modified_count
+    
+    async def update_keyspace_speed(self, agent_id: str, keyspace_speed: float) -> None:
+        """Record the keyspace throughput measured on the agent's last chunk"""
+        await self.collection.update_one(
+            {"_id": ObjectId(agent_id)},
+            {"$set": {"keyspace_speed": keyspace_speed}}
+        )
     
     async def delete(self, agent_id: str) -> bool:
         """Delete an agent"""
@@ -0,0 +1,805 @@
+from typing import List, Optional, Dict, Any, Set, Union, AsyncIterator
+from datetime import datetime, timedelta
+
+from config.memory_database import MemoryDatabase, MemoryCollection, DuplicateKeyError
+from config.hash_codec import (
+    pack_hash, unpack_hash, unpack_hashes, pack_task, unpack_task, pack_result, unpack_result
+)
+from entity.task import Task, TaskStatus
+from entity.chunk import Chunk, ChunkStatus
+from entity.agent import Agent, AgentStatus
+from entity.result import Result
+from entity.potfile import PotfileEntry
+
+# List views leave out the hash list, hash_count carries its size
+SUMMARY_EXCLUDE = ("hashes",)
+
+OPEN_CHUNK_STATUSES = [ChunkStatus.PENDING.value, ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]
+HELD_CHUNK_STATUSES = [ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]
+
+
+async def iter_field(collection: MemoryCollection, field: str,
+                     batch_size: int) -> AsyncIterator[List[Any]]:
+    """Yield one field of every document in batches, documents written meanwhile may be left out"""
+    # Stored documents are replaced rather than changed, so the copied list stays consistent
+    with collection.lock:
+        documents = list(collection.documents.values())
+    for start in range(0, len(documents), batch_size):
+        yield [document.get(field) for document in documents[start:start + batch_size]]
+
+
+class MemoryTaskRepository:
+    """Task repository backed by the in-memory storage engine"""
+    
+    def __init__(self, database: MemoryDatabase):
+        self.db = database
+        self.collection = database.tasks
+        self.chunks = database.task_chunks
+    
+    def _exclude(self, include_hashes: bool):
+        return () if include_hashes else SUMMARY_EXCLUDE
+    
+    async def create(self, task: Task) -> Task:
+        """Create a new task"""
+        task.id = self.collection.insert(pack_task(task.to_dict()))
+        return task
+    
+    async def find_by_id(self, task_id: str) -> Optional[Task]:
+        """Find task by ID"""
+        task_dict = self.collection.get(task_id)
+        if task_dict:
+            return Task.from_dict(unpack_task(task_dict))
+        return None
+    
+    def _update_by_id(self, task_id: str, update_data: Dict[str, Any],
+                      return_document: bool = True) -> Union[Task, bool, None]:
+        """Update one task, returning it as written or, without return_document, whether it exists"""
+        task_dict = self.collection.update(task_id, update_data)
+        if not return_document:
+            return task_dict is not None
+        if task_dict:
+            return Task.from_dict(unpack_task(task_dict))
+        return None
+    
+    async def create_many(self, tasks: List[Task]) -> List[Task]:
+        """Create several tasks"""
+        for task in tasks:
+            task.id = self.collection.insert(pack_task(task.to_dict()))
+        return tasks
+    
+    async def find_all(self, skip: int = 0, limit: int = 100, include_hashes: bool = False) -> List[Task]:
+        """Find all top-level tasks with pagination"""
+        task_dicts = self.collection.find(
+            ("parent_id",), None, exclude=self._exclude(include_hashes), skip=skip, limit=limit
+        )
+        return [Task.from_dict(unpack_task(task_dict)) for task_dict in task_dicts]
+    
+    async def find_by_status(self, status: TaskStatus, skip: int = 0, limit: int = 100,
+                             include_hashes: bool = False) -> List[Task]:
+        """Find top-level tasks by status"""
+        task_dicts = self.collection.find(
+            ("status", "parent_id"), (status.value, None),
+            exclude=self._exclude(include_hashes), skip=skip, limit=limit
+        )
+        return [Task.from_dict(unpack_task(task_dict)) for task_dict in task_dicts]
+    
+    async def find_by_agent_id(self, agent_id: str, include_hashes: bool = False) -> List[Task]:
+        """Find tasks assigned to an agent"""
+        task_dicts = self.collection.find(("agent_id",), agent_id, exclude=self._exclude(include_hashes))
+        return [Task.from_dict(unpack_task(task_dict)) for task_dict in task_dicts]
+    
+    async def find_by_parent_id(self, parent_id: str, skip: int = 0, limit: int = 100,
+                                include_hashes: bool = False) -> List[Task]:
+        """Find the hash shards of a task"""
+        task_dicts = self.collection.find(("parent_id",), parent_id, exclude=self._exclude(include_hashes))
+        task_dicts.sort(key=lambda task_dict: task_dict.get("shard_index") or 0)
+        task_dicts = task_dicts[skip:skip + limit] if limit else task_dicts[skip:]
+        return [Task.from_dict(unpack_task(task_dict)) for task_dict in task_dicts]
+    
+    async def find_shard_ids(self, parent_id: str) -> List[str]:
+        """Find the IDs of the hash shards of a task"""
+        return self.collection.find_ids(("parent_id",), parent_id)
+    
+    async def cancel_shards(self, parent_id: str) -> List[str]:
+        """Cancel the shards of a task that are not finished, returning their IDs"""
+        unfinished = [TaskStatus.PENDING.value, TaskStatus.ASSIGNED.value, TaskStatus.RUNNING.value]
+        shard_ids = []
+        with self.collection.lock:
+            for task_dict in self.collection.find(("parent_id",), parent_id, exclude=SUMMARY_EXCLUDE):
+                if task_dict["status"] in unfinished:
+                    self.collection.update(task_dict["id"], {
+                        "status": TaskStatus.CANCELLED.value,
+                        "updated_at": datetime.utcnow()
+                    })
+                    shard_ids.append(task_dict["id"])
+        return shard_ids
+    
+    async def summarize_shards(self, parent_id: str) -> Dict[str, Any]:
+        """Count the shards of a task by status and average their progress"""
+        summary = {"statuses": {}, "total": 0, "progress": 0.0}
+        for task_dict in self.collection.find(("parent_id",), parent_id, exclude=SUMMARY_EXCLUDE):
+            status = task_dict["status"]
+            summary["statuses"][status] = summary["statuses"].get(status, 0) + 1
+            summary["total"] += 1
+            summary["progress"] += task_dict.get("progress") or 0.0
+        if summary["total"]:
+            summary["progress"] /= summary["total"]
+        return summary
+    
+    async def delete_by_parent_id(self, parent_id: str) -> int:
+        """Delete the hash shards of a task"""
+        with self.collection.lock:
+            return sum(
+                self.collection.delete(task_id)
+                for task_id in self.collection.find_ids(("parent_id",), parent_id)
+            )
+    
+    async def update(self, task: Task, return_document: bool = True) -> Union[Task, bool, None]:
+        """Update an existing task"""
+        task_dict = pack_task(task.to_dict())
+        task_id = task_dict.pop("id")
+        task_dict["updated_at"] = datetime.utcnow()
+        
+        return self._update_by_id(task_id, task_dict, return_document)
+    
+    async def update_status(self, task_id: str, status: TaskStatus,
+                            progress: float = None, speed: float = None,
+                            error: str = None, return_document: bool = True) -> Union[Task, bool, None]:
+        """Update task status"""
+        update_data = {
+            "status": status.value,
+            "updated_at": datetime.utcnow()
+        }
+        
+        if progress is not None:
+            update_data["progress"] = progress
+        
+        if speed is not None:
+            update_data["speed"] = speed
+        
+        if error is not None:
+            update_data["error"] = error
+        
+        if status == TaskStatus.RUNNING and progress == 0:
+            update_data["started_at"] = datetime.utcnow()
+        
+        if status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+            update_data["completed_at"] = datetime.utcnow()
+        
+        return self._update_by_id(task_id, update_data, return_document)
+    
+    async def delete(self, task_id: str) -> bool:
+        """Delete a task"""
+        return self.collection.delete(task_id)
+    
+    async def assign_to_agent(self, task_id: str, agent_id: str) -> Optional[Task]:
+        """Atomically flip a pending task to assigned, returns None if it was not pending"""
+        with self.collection.lock:
+            task_dict = self.collection.get(task_id, exclude=SUMMARY_EXCLUDE)
+            if not task_dict or task_dict["status"] != TaskStatus.PENDING.value:
+                return None
+            task_dict = self.collection.update(task_id, {
+                "agent_id": agent_id,
+                "status": TaskStatus.ASSIGNED.value,
+                "updated_at": datetime.utcnow()
+            })
+        return Task.from_dict(unpack_task(task_dict))
+    
+    async def increment_recovered(self, task_id: str, count: int) -> Optional[Task]:
+        """Count newly recovered hashes on the task, returning it without its hash list"""
+        now = datetime.utcnow()
+        with self.collection.lock:
+            task_dict = self.collection.get(task_id, exclude=SUMMARY_EXCLUDE)
+            if not task_dict:
+                return None
+            task_dict = self.collection.update(task_id, {
+                "recovered_count": (task_dict.get("recovered_count") or 0) + count,
+                "last_cracked_at": now,
+                "updated_at": now
+            }, exclude=SUMMARY_EXCLUDE)
+        return Task.from_dict(unpack_task(task_dict))
+    
+    async def backfill_hash_counts(self) -> int:
+        """Store hash_count on tasks created before it existed"""
+        updated = 0
+        with self.collection.lock:
+            for task_dict in self.collection.all():
+                if not task_dict.get("hash_count") and task_dict.get("hashes"):
+                    self.collection.update(task_dict["id"], {"hash_count": len(unpack_hashes(task_dict["hashes"]))})
+                    updated += 1
+        return updated
+    
+    async def migrate_recovered_hashes(self) -> int:
+        """Nothing to migrate, the memory backend never stored recovered hash arrays"""
+        return 0
+    
+    async def find_next_pending_task(self) -> Optional[Task]:
+        """Find the next task with keyspace left to dispatch, based on priority"""
+        tasks = await self.find_pending_tasks(limit=1)
+        return tasks[0] if tasks else None
+    
+    async def find_pending_tasks(self, limit: int = 100) -> List[Task]:
+        """Find tasks with keyspace left to dispatch, highest priority first"""
+        task_dicts = []
+        for status in [TaskStatus.PENDING, TaskStatus.ASSIGNED, TaskStatus.RUNNING]:
+            for task_dict in self.collection.find(("status",), status.value):
+                # Sharded parents are only containers, their shards get scheduled
+                if (task_dict.get("shard_count") or 0) > 0:
+                    continue
+                keyspace = task_dict.get("keyspace")
+                if keyspace is None or (task_dict.get("keyspace_offset") or 0) < keyspace:
+                    task_dicts.append(task_dict)
+        
+        task_dicts.sort(key=lambda task_dict: (-task_dict["priority"], task_dict["created_at"]))
+        return [Task.from_dict(unpack_task(task_dict)) for task_dict in task_dicts[:limit]]
+    
+    async def set_keyspace(self, task_id: str, keyspace: int) -> bool:
+        """Record the measured keyspace of a task, returns False if it was already set"""
+        with self.collection.lock:
+            task_dict = self.collection.get(task_id, exclude=SUMMARY_EXCLUDE)
+            if not task_dict or task_dict.get("keyspace") is not None:
+                return False
+            self.collection.update(task_id, {
+                "keyspace": keyspace,
+                "keyspace_offset": 0,
+                "updated_at": datetime.utcnow()
+            })
+            return True
+    
+    async def advance_keyspace_offset(self, task_id: str, size: int) -> Optional[int]:
+        """Atomically reserve the next `size` keyspace units, returning the previous offset"""
+        with self.collection.lock:
+            task_dict = self.collection.get(task_id, exclude=SUMMARY_EXCLUDE)
+            if not task_dict or task_dict.get("keyspace") is None:
+                return None
+            offset = task_dict.get("keyspace_offset") or 0
+            if offset >= task_dict["keyspace"]:
+                return None
+            self.collection.update(task_id, {"keyspace_offset": offset + size, "updated_at": datetime.utcnow()})
+            return offset
+    
+    async def create_chunk(self, chunk: Chunk) -> Chunk:
+        """Create a new chunk"""
+        chunk.id = self.chunks.insert(chunk.to_dict())
+        return chunk
+    
+    async def find_chunk_by_id(self, chunk_id: str) -> Optional[Chunk]:
+        """Find chunk by ID"""
+        chunk_dict = self.chunks.get(chunk_id)
+        if chunk_dict:
+            return Chunk.from_dict(chunk_dict)
+        return None
+    
+    async def find_held_chunk(self, agent_id: str) -> Optional[Chunk]:
+        """Find the chunk an agent holds, the one claimed last if there are several"""
+        chunk_dicts = [
+            chunk_dict for chunk_dict in self.chunks.find(("agent_id",), agent_id)
+            if chunk_dict["status"] in HELD_CHUNK_STATUSES
+        ]
+        if not chunk_dicts:
+            return None
+        return Chunk.from_dict(max(chunk_dicts, key=lambda chunk_dict: chunk_dict["updated_at"]))
+    
+    async def find_chunks_by_task_id(self, task_id: str) -> List[Chunk]:
+        """Find all chunks of a task ordered by keyspace position"""
+        chunk_dicts = self.chunks.find(("task_id",), task_id)
+        chunk_dicts.sort(key=lambda chunk_dict: chunk_dict["skip"])
+        return [Chunk.from_dict(chunk_dict) for chunk_dict in chunk_dicts]
+    
+    def _claimable_chunk_dicts(self) -> List[Dict[str, Any]]:
+        """Chunks that are pending, or whose agent let the lease expire, oldest first"""
+        now = datetime.utcnow()
+        chunk_dicts = self.chunks.find(("status",), ChunkStatus.PENDING.value)
+        for status in HELD_CHUNK_STATUSES:
+            chunk_dicts.extend(
+                chunk_dict for chunk_dict in self.chunks.find(("status",), status)
+                if chunk_dict.get("lease_expires_at") and chunk_dict["lease_expires_at"] < now
+            )
+        chunk_dicts.sort(key=lambda chunk_dict: chunk_dict["created_at"])
+        return chunk_dicts
+    
+    def _is_claimable(self, chunk_dict: Dict[str, Any]) -> bool:
+        if chunk_dict["status"] == ChunkStatus.PENDING.value:
+            return True
+        lease_expires_at = chunk_dict.get("lease_expires_at")
+        return (
+            chunk_dict["status"] in HELD_CHUNK_STATUSES
+            and lease_expires_at is not None
+            and lease_expires_at < datetime.utcnow()
+        )
+    
+    async def find_pending_chunks(self, limit: int = 100) -> List[Chunk]:
+        """Find chunks waiting to be (re)assigned, oldest first"""
+        return [Chunk.from_dict(chunk_dict) for chunk_dict in self._claimable_chunk_dicts()[:limit]]
+    
+    async def claim_chunk(self, chunk_id: str, agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Atomically claim a chunk for an agent, returns None if someone else holds it"""
+        with self.chunks.lock:
+            chunk_dict = self.chunks.get(chunk_id)
+            if not chunk_dict or not self._is_claimable(chunk_dict):
+                return None
+            return self._claim(chunk_id, agent_id, lease_seconds)
+    
+    async def claim_next_chunk(self, agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Atomically claim the oldest claimable chunk for an agent"""
+        with self.chunks.lock:
+            chunk_dicts = self._claimable_chunk_dicts()
+            if not chunk_dicts:
+                return None
+            return self._claim(chunk_dicts[0]["id"], agent_id, lease_seconds)
+    
+    def _claim(self, chunk_id: str, agent_id: str, lease_seconds: int) -> Chunk:
+        """Flip a claimable chunk to assigned with a fresh lease, called with the lock held"""
+        now = datetime.utcnow()
+        chunk_dict = self.chunks.update(chunk_id, {
+            "agent_id": agent_id,
+            "status": ChunkStatus.ASSIGNED.value,
+            "progress": 0.0,
+            "started_at": None,
+            "lease_expires_at": now + timedelta(seconds=lease_seconds),
+            "updated_at": now
+        })
+        return Chunk.from_dict(chunk_dict)
+    
+    def _update_held_chunk(self, chunk_id: str, agent_id: str, update_data: Dict[str, Any]) -> bool:
+        """Update a chunk still held by the agent"""
+        with self.chunks.lock:
+            chunk_dict = self.chunks.get(chunk_id)
+            if (
+                not chunk_dict
+                or chunk_dict.get("agent_id") != agent_id
+                or chunk_dict["status"] not in HELD_CHUNK_STATUSES
+            ):
+                return False
+            self.chunks.update(chunk_id, update_data)
+            return True
+    
+    async def renew_chunk_lease(self, chunk_id: str, agent_id: str, lease_seconds: int) -> bool:
+        """Extend the lease of a chunk still held by the agent"""
+        return self._update_held_chunk(
+            chunk_id, agent_id,
+            {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}
+        )
+    
+    async def bulk_update_chunk_progress(self, updates: Dict[str, Dict[str, Any]], lease_seconds: int) -> int:
+        """Write buffered progress of running chunks, chunk ID to agent_id/progress/speed/reported_at"""
+        modified = 0
+        for chunk_id, update in updates.items():
+            update_data = {
+                "lease_expires_at": update["reported_at"] + timedelta(seconds=lease_seconds)
+            }
+            if update.get("progress") is not None or update.get("speed") is not None:
+                update_data["status"] = ChunkStatus.RUNNING.value
+                update_data["updated_at"] = update["reported_at"]
+            if update.get("progress") is not None:
+                update_data["progress"] = update["progress"]
+            if update.get("speed") is not None:
+                update_data["speed"] = update["speed"]
+            
+            # Only chunks the agent still holds, finished chunks are left alone
+            modified += self._update_held_chunk(chunk_id, update["agent_id"], update_data)
+        return modified
+    
+    async def bulk_update_task_progress(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Write buffered progress of tasks run without chunks, task ID to progress/speed/reported_at"""
+        modified = 0
+        with self.collection.lock:
+            for task_id, update in updates.items():
+                task_dict = self.collection.get(task_id, exclude=SUMMARY_EXCLUDE)
+                if not task_dict or task_dict["status"] not in [TaskStatus.ASSIGNED.value, TaskStatus.RUNNING.value]:
+                    continue
+                update_data = {
+                    "status": TaskStatus.RUNNING.value,
+                    "updated_at": update["reported_at"]
+                }
+                if update.get("progress") is not None:
+                    update_data["progress"] = update["progress"]
+                if update.get("speed") is not None:
+                    update_data["speed"] = update["speed"]
+                self.collection.update(task_id, update_data)
+                modified += 1
+        return modified
+    
+    async def update_chunk_status(self, chunk_id: str, status: ChunkStatus,
+                                progress: float = None, speed: float = None,
+                                error: str = None, agent_id: str = None,
+                                lease_seconds: int = None) -> Optional[Chunk]:
+        """Update chunk status, only for the holding agent when agent_id is given"""
+        update_data = {
+            "status": status.value,
+            "updated_at": datetime.utcnow()
+        }
+        
+        if lease_seconds is not None:
+            update_data["lease_expires_at"] = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        
+        if progress is not None:
+            update_data["progress"] = progress
+        
+        if speed is not None:
+            update_data["speed"] = speed
+        
+        if error is not None:
+            update_data["error"] = error
+        
+        if status == ChunkStatus.RUNNING and progress == 0:
+            update_data["started_at"] = datetime.utcnow()
+        
+        if status in [ChunkStatus.COMPLETED, ChunkStatus.FAILED]:
+            update_data["completed_at"] = datetime.utcnow()
+        
+        with self.chunks.lock:
+            chunk_dict = self.chunks.get(chunk_id)
+            # Finished and cancelled chunks stay that way so late reports cannot bring them back
+            if not chunk_dict or chunk_dict["status"] not in HELD_CHUNK_STATUSES:
+                return None
+            if agent_id is not None and chunk_dict.get("agent_id") != agent_id:
+                return None
+            chunk_dict = self.chunks.update(chunk_id, update_data)
+        return Chunk.from_dict(chunk_dict)
+    
+    async def requeue_chunk(self, chunk_id: str, agent_id: str) -> bool:
+        """Return an unfinished chunk to the pending queue, only while the agent still holds it"""
+        with self.chunks.lock:
+            chunk_dict = self.chunks.get(chunk_id)
+            if (
+                not chunk_dict
+                or chunk_dict.get("agent_id") != agent_id
+                or chunk_dict["status"] not in HELD_CHUNK_STATUSES
+            ):
+                return False
+            self.chunks.update(chunk_id, {
+                "status": ChunkStatus.PENDING.value,
+                "agent_id": None,
+                "progress": 0.0,
+                "started_at": None,
+                "lease_expires_at": None,
+                "updated_at": datetime.utcnow()
+            })
+            return True
+    
+    async def retry_chunk(self, chunk_id: str) -> bool:
+        """Return a failed chunk to the pending queue, counting the failure"""
+        with self.chunks.lock:
+            chunk_dict = self.chunks.get(chunk_id)
+            if not chunk_dict or chunk_dict["status"] != ChunkStatus.FAILED.value:
+                return False
+            self.chunks.update(chunk_id, {
+                "status": ChunkStatus.PENDING.value,
+                "agent_id": None,
+                "progress": 0.0,
+                "started_at": None,
+                "completed_at": None,
+                "lease_expires_at": None,
+                "failures": (chunk_dict.get("failures") or 0) + 1,
+                "updated_at": datetime.utcnow()
+            })
+            return True
+    
+    async def cancel_chunks(self, task_id: str) -> int:
+        """Cancel all unfinished chunks of a task"""
+        cancelled = 0
+        with self.chunks.lock:
+            for chunk_dict in self.chunks.find(("task_id",), task_id):
+                if chunk_dict["status"] in OPEN_CHUNK_STATUSES:
+                    self.chunks.update(chunk_dict["id"], {
+                        "status": ChunkStatus.CANCELLED.value,
+                        "updated_at": datetime.utcnow()
+                    })
+                    cancelled += 1
+        return cancelled
+    
+    async def delete_chunks(self, task_id: str) -> int:
+        """Delete all chunks of a task"""
+        with self.chunks.lock:
+            return sum(self.chunks.delete(chunk_id) for chunk_id in self.chunks.find_ids(("task_id",), task_id))
+    
+    async def count_open_chunks(self, task_id: str) -> int:
+        """Count chunks of a task that are not finished yet"""
+        return sum(
+            1 for chunk_dict in self.chunks.find(("task_id",), task_id)
+            if chunk_dict["status"] in OPEN_CHUNK_STATUSES
+        )
+    
+    async def sum_completed_keyspace(self, task_id: str) -> int:
+        """Sum the keyspace covered by the completed chunks of a task"""
+        return sum(
+            chunk_dict.get("limit") or 0
+            for chunk_dict in self.chunks.find(("task_id",), task_id)
+            if chunk_dict["status"] == ChunkStatus.COMPLETED.value
+        )
+
+
+class MemoryAgentRepository:
+    """Agent repository backed by the in-memory storage engine"""
+    
+    def __init__(self, database: MemoryDatabase):
+        self.db = database
+        self.collection = database.agents
+    
+    async def create(self, agent: Agent) -> Agent:
+        """Create a new agent"""
+        agent.id = self.collection.insert(agent.to_dict())
+        return agent
+    
+    async def find_by_id(self, agent_id: str) -> Optional[Agent]:
+        """Find agent by ID"""
+        agent_dict = self.collection.get(agent_id)
+        if agent_dict:
+            return Agent.from_dict(agent_dict)
+        return None
+    
+    def _update_by_id(self, agent_id: str, update_data: Dict[str, Any],
+                      return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update one agent, returning it as written or, without return_document, whether it exists"""
+        agent_dict = self.collection.update(agent_id, update_data)
+        if not return_document:
+            return agent_dict is not None
+        if agent_dict:
+            return Agent.from_dict(agent_dict)
+        return None
+    
+    async def find_by_api_key(self, api_key: str) -> Optional[Agent]:
+        """Find agent by API key"""
+        agent_dict = self.collection.lookup(("api_key",), api_key)
+        if agent_dict:
+            return Agent.from_dict(agent_dict)
+        return None
+    
+    async def find_all(self, skip: int = 0, limit: int = 100) -> List[Agent]:
+        """Find all agents with pagination"""
+        return [Agent.from_dict(agent_dict) for agent_dict in self.collection.all(skip=skip, limit=limit)]
+    
+    async def find_by_status(self, status: AgentStatus, skip: int = 0, limit: int = 100) -> List[Agent]:
+        """Find agents by status"""
+        agent_dicts = self.collection.find(("status",), status.value, skip=skip, limit=limit)
+        return [Agent.from_dict(agent_dict) for agent_dict in agent_dicts]
+    
+    async def find_available_agents(self) -> List[Agent]:
+        """Find available agents for task assignment"""
+        return [
+            Agent.from_dict(agent_dict)
+            for agent_dict in self.collection.find(("status",), AgentStatus.ONLINE.value)
+            if agent_dict.get("current_task_id") is None
+        ]
+    
+    async def update(self, agent: Agent,
+                     return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update an existing agent"""
+        agent_dict = agent.to_dict()
+        agent_id = agent_dict.pop("id")
+        
+        return self._update_by_id(agent_id, agent_dict, return_document)
+    
+    def _status_value(self, agent_id: str, status: AgentStatus) -> str:
+        """An agent holding work stays busy when it reports online, called with the lock held"""
+        if status == AgentStatus.ONLINE:
+            agent_dict = self.collection.get(agent_id)
+            if agent_dict and agent_dict.get("current_task_id") is not None:
+                return AgentStatus.BUSY.value
+        return status.value
+    
+    async def update_status(self, agent_id: str, status: AgentStatus,
+                            return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update agent status, an agent holding work stays busy when it reports online"""
+        with self.collection.lock:
+            return self._update_by_id(
+                agent_id,
+                {"status": self._status_value(agent_id, status), "last_seen": datetime.utcnow()},
+                return_document
+            )
+    
+    async def bulk_update_heartbeats(self, heartbeats: Dict[str, Dict[str, Any]]) -> int:
+        """Write buffered heartbeats, agent ID to status and last_seen"""
+        modified = 0
+        with self.collection.lock:
+            for agent_id, heartbeat in heartbeats.items():
+                status_value = self._status_value(agent_id, heartbeat["status"])
+                if self.collection.update(agent_id, {"status": status_value, "last_seen": heartbeat["last_seen"]}):
+                    modified += 1
+        return modified
+    
+    async def update_heartbeat(self, agent_id: str,
+                               return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update agent heartbeat"""
+        return self._update_by_id(agent_id, {"last_seen": datetime.utcnow()}, return_document)
+    
+    def _assign(self, agent_id: str, task_id: str, chunk_id: Optional[str],
+                return_document: bool = True) -> Union[Agent, bool, None]:
+        return self._update_by_id(
+            agent_id,
+            {
+                "current_task_id": task_id,
+                "current_chunk_id": chunk_id,
+                "status": AgentStatus.BUSY.value,
+                "last_seen": datetime.utcnow()
+            },
+            return_document
+        )
+    
+    async def claim_task(self, agent_id: str, task_id: str, chunk_id: str = None) -> Optional[Agent]:
+        """Atomically assign work to an agent, returns None if the agent is no longer available"""
+        with self.collection.lock:
+            agent_dict = self.collection.get(agent_id)
+            if (
+                not agent_dict
+                or agent_dict["status"] != AgentStatus.ONLINE.value
+                or agent_dict.get("current_task_id") is not None
+            ):
+                return None
+            return self._assign(agent_id, task_id, chunk_id)
+    
+    async def clear_task(self, agent_id: str,
+                         return_document: bool = True) -> Union[Agent, bool, None]:
+        """Clear current task from agent"""
+        return self._update_by_id(
+            agent_id,
+            {
+                "current_task_id": None,
+                "current_chunk_id": None,
+                "status": AgentStatus.ONLINE.value,
+                "last_seen": datetime.utcnow()
+            },
+            return_document
+        )
+    
+    async def release_chunk(self, agent_id: str, chunk_id: str) -> bool:
+        """Clear a chunk from an agent, only if the agent still holds it"""
+        with self.collection.lock:
+            agent_dict = self.collection.get(agent_id)
+            if not agent_dict or agent_dict.get("current_chunk_id") != chunk_id:
+                return False
+            self.collection.update(agent_id, {
+                "current_task_id": None,
+                "current_chunk_id": None,
+                "status": AgentStatus.ONLINE.value
+            })
+            return True
+    
+    async def clear_task_by_task_id(self, task_id: str) -> int:
+        """Clear a task from every agent working on it"""
+        with self.collection.lock:
+            agent_ids = self.collection.find_ids(("current_task_id",), task_id)
+            for agent_id in agent_ids:
+                self.collection.update(agent_id, {
+                    "current_task_id": None,
+                    "current_chunk_id": None,
+                    "status": AgentStatus.ONLINE.value
+                })
+        return len(agent_ids)
+    
+    async def update_keyspace_speed(self, agent_id: str, keyspace_speed: float) -> None:
+        """Record the keyspace throughput measured on the agent's last chunk"""
+        self.collection.update(agent_id, {"keyspace_speed": keyspace_speed})
+    
+    async def delete(self, agent_id: str) -> bool:
+        """Delete an agent"""
+        return self.collection.delete(agent_id)
+
+
+class MemoryResultRepository:
+    """Result repository backed by the in-memory storage engine"""
+    
+    def __init__(self, database: MemoryDatabase):
+        self.db = database
+        self.collection = database.results
+    
+    async def create(self, result: Result) -> Result:
+        """Create a new result"""
+        result.id = self.collection.insert(pack_result(result.to_dict()))
+        return result
+    
+    async def create_many(self, results: List[Result]) -> List[Result]:
+        """Create results, skipping ones rejected as duplicates"""
+        created = []
+        for result in results:
+            try:
+                result.id = self.collection.insert(pack_result(result.to_dict()))
+            except DuplicateKeyError:
+                continue
+            created.append(result)
+        return created
+    
+    async def find_existing_hashes(self, task_id: str, hash_values: List[str]) -> Set[str]:
+        """Find which of the given hash values already have a result for the task"""
+        with self.collection.lock:
+            index = self.collection.unique[("task_id", "hash_value")]
+            return {hash_value for hash_value in hash_values if (task_id, pack_hash(hash_value)) in index}
+    
+    async def find_by_id(self, result_id: str) -> Optional[Result]:
+        """Find result by ID"""
+        result_dict = self.collection.get(result_id)
+        if result_dict:
+            return Result.from_dict(unpack_result(result_dict))
+        return None
+    
+    async def find_all(self, skip: int = 0, limit: int = 100) -> List[Result]:
+        """Find all results with pagination"""
+        return [Result.from_dict(unpack_result(result_dict)) for result_dict in self.collection.all(skip=skip, limit=limit)]
+    
+    async def find_by_task_id(self, task_id: str, skip: int = 0, limit: int = 0) -> List[Result]:
+        """Find results by task ID, oldest first; a limit of 0 returns all"""
+        result_dicts = self.collection.find(("task_id",), task_id, skip=skip, limit=limit)
+        return [Result.from_dict(unpack_result(result_dict)) for result_dict in result_dicts]
+    
+    async def find_by_hash(self, hash_value: str) -> Optional[Result]:
+        """Find result by hash value"""
+        result_dicts = self.collection.find(("hash_value",), pack_hash(hash_value), limit=1)
+        if result_dicts:
+            return Result.from_dict(unpack_result(result_dicts[0]))
+        return None
+    
+    async def find_by_agent_id(self, agent_id: str) -> List[Result]:
+        """Find results by agent ID"""
+        return [Result.from_dict(unpack_result(result_dict)) for result_dict in self.collection.find(("agent_id",), agent_id)]
+    
+    async def delete(self, result_id: str) -> bool:
+        """Delete a result"""
+        return self.collection.delete(result_id)
+    
+    async def count(self) -> int:
+        """Count all results"""
+        return len(self.collection)
+    
+    async def iter_hash_values(self, batch_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Yield the hash values of all results in batches"""
+        async for batch in iter_field(self.collection, "hash_value", batch_size):
+            yield [unpack_hash(hash_value) for hash_value in batch]
+    
+    async def delete_by_task_id(self, task_id: str) -> int:
+        """Delete all results for a task"""
+        with self.collection.lock:
+            return sum(
+                self.collection.delete(result_id)
+                for result_id in self.collection.find_ids(("task_id",), task_id)
+            )
+
+
+class MemoryPotfileRepository:
+    """Potfile repository backed by the in-memory storage engine"""
+    
+    def __init__(self, database: MemoryDatabase):
+        self.db = database
+        self.collection = database.potfile
+    
+    async def add_many(self, entries: List[PotfileEntry]) -> List[PotfileEntry]:
+        """Add entries, skipping hashes that are already known"""
+        added = []
+        for entry in entries:
+            try:
+                entry.id = self.collection.insert(entry.to_dict())
+            except DuplicateKeyError:
+                continue
+            added.append(entry)
+        return added
+    
+    async def find_plaintexts(self, hash_type_id: int, hash_values: List[str]) -> Dict[str, str]:
+        """Map the given hash values that are known to their plaintext"""
+        with self.collection.lock:
+            index = self.collection.unique[("hash_type_id", "hash_value")]
+            plaintexts = {}
+            for hash_value in hash_values:
+                entry_id = index.get((hash_type_id, hash_value))
+                if entry_id is not None:
+                    plaintexts[hash_value] = self.collection.documents[entry_id]["plaintext"]
+            return plaintexts
+    
+    async def find_since(self, hash_type_id: int, since: datetime = None, limit: int = 0) -> List[PotfileEntry]:
+        """Find entries of a hash type added at or after since, oldest first"""
+        with self.collection.lock:
+            entry_ids = [
+                entry_id for entry_id in self.collection.find_ids(("hash_type_id",), hash_type_id)
+                if not since or self.collection.documents[entry_id]["added_at"] >= since
+            ]
+            if limit:
+                entry_ids = entry_ids[:limit]
+            return [PotfileEntry.from_dict(self.collection.get(entry_id)) for entry_id in entry_ids]
+    
+    async def count(self) -> int:
+        """Count known hashes over all hash types"""
+        return len(self.collection)
+    
+    async def iter_hash_values(self, batch_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Yield the hash values of all entries in batches"""
+        async for batch in iter_field(self.collection, "hash_value", batch_size):
+            yield batch
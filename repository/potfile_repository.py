@@ -0,0 +1,82 @@
+from typing import List, Dict, AsyncIterator
+from datetime import datetime
+from pymongo.errors import BulkWriteError
+
+from entity.potfile import PotfileEntry
+
+
+class PotfileRepository:
+    """Repository for the server-wide potfile"""
+    
+    def __init__(self, database):
+        self.db = database
+        self.collection = database.potfile
+    
+    async def add_many(self, entries: List[PotfileEntry]) -> List[PotfileEntry]:
+        """Add entries in one unordered batch, skipping hashes that are already known"""
+        if not entries:
+            return []
+        
+        entry_dicts = []
+        for entry in entries:
+            entry_dict = entry.to_dict()
+            # Remove id if None
+            if entry_dict["id"] is None:
+                del entry_dict["id"]
+            entry_dicts.append(entry_dict)
+        
+        try:
+            await self.collection.insert_many(entry_dicts, ordered=False)
+            failed = set()
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details.get("writeErrors", []) if error.get("code") == 11000}
+            if len(failed) < len(e.details.get("writeErrors", [])):
+                raise
+        
+        added = []
+        for index, (entry, entry_dict) in enumerate(zip(entries, entry_dicts)):
+            if index not in failed:
+                entry.id = str(entry_dict["_id"])
+                added.append(entry)
+        return added
+    
+    async def find_plaintexts(self, hash_type_id: int, hash_values: List[str]) -> Dict[str, str]:
+        """Map the given hash values that are known to their plaintext"""
+        plaintexts = {}
+        # Keep each $in list to a reasonable size on very large task uploads
+        for start in range(0, len(hash_values), 10000):
+            cursor = self.collection.find(
+                {"hash_type_id": hash_type_id, "hash_value": {"$in": hash_values[start:start + 10000]}},
+                {"hash_value": 1, "plaintext": 1, "_id": 0}
+            )
+            async for entry_dict in cursor:
+                plaintexts[entry_dict["hash_value"]] = entry_dict["plaintext"]
+        return plaintexts
+    
+    async def find_since(self, hash_type_id: int, since: datetime = None, limit: int = 0) -> List[PotfileEntry]:
+        """Find entries of a hash type added at or after since, oldest first"""
+        query = {"hash_type_id": hash_type_id}
+        if since:
+            query["added_at"] = {"$gte": since}
+        cursor = self.collection.find(query).sort("added_at", 1).limit(limit)
+        entries = []
+        async for entry_dict in cursor:
+            entry_dict["id"] = str(entry_dict.pop("_id"))
+            entries.append(PotfileEntry.from_dict(entry_dict))
+        return entries
+    
+    async def count(self) -> int:
+        """Count known hashes over all hash types"""
+        return await self.collection.estimated_document_count()
+    
+    async def iter_hash_values(self, batch_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Yield the hash values of all entries in batches"""
+        cursor = self.collection.find({}, {"hash_value": 1, "_id": 0}).batch_size(batch_size)
+        batch = []
+        async for entry_dict in cursor:
+            batch.append(entry_dict["hash_value"])
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
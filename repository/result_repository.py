@@ -1,10 +1,19 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, AsyncIterator
 from bson import ObjectId
 from datetime import datetime
+from pymongo.errors import BulkWriteError
 
+from config.hash_codec import pack_hash, unpack_hash, pack_result, unpack_result
 from entity.result import Result
 
 
+def stored_forms(hash_values: List[str]) -> List[Any]:
+    """Packed and text form of each hash value, results written before packing keep the text form"""
+    forms = [pack_hash(hash_value) for hash_value in hash_values]
+    forms.extend(hash_value for hash_value, form in zip(hash_values, forms) if form != hash_value)
+    return forms
+
+
 class ResultRepository:
     """Repository for result data access"""
     
@@ -14,7 +23,7 @@ class ResultRepository:
     
     async def create(self, result: Result) -> Result:
         """Create a new result"""
-        result_dict = result.to_dict()
+        result_dict = pack_result(result.to_dict())
         # Remove id if None
         if result_dict["id"] is None:
             del result_dict["id"]
@@ -23,12 +32,49 @@ class ResultRepository:
         result.id = str(result_obj.inserted_id)
         return result
     
+    async def create_many(self, results: List[Result]) -> List[Result]:
+        """Create results in one unordered batch, skipping ones rejected as duplicates"""
+        if not results:
+            return []
+        
+        result_dicts = []
+        for result in results:
+            result_dict = pack_result(result.to_dict())
+            # Remove id if None
+            if result_dict["id"] is None:
+                del result_dict["id"]
+            result_dicts.append(result_dict)
+        
+        try:
+            await self.collection.insert_many(result_dicts, ordered=False)
+            failed = set()
+        except BulkWriteError as e:
+            # Unordered inserts carry on past duplicates, only those are left out
+            failed = {error["index"] for error in e.details.get("writeErrors", []) if error.get("code") == 11000}
+            if len(failed) < len(e.details.get("writeErrors", [])):
+                raise
+        
+        created = []
+        for index, (result, result_dict) in enumerate(zip(results, result_dicts)):
+            if index not in failed:
+                result.id = str(result_dict["_id"])
+                created.append(result)
+        return created
+    
+    async def find_existing_hashes(self, task_id: str, hash_values: List[str]) -> Set[str]:
+        """Find which of the given hash values already have a result for the task"""
+        cursor = self.collection.find(
+            {"task_id": task_id, "hash_value": {"$in": stored_forms(hash_values)}},
+            {"hash_value": 1, "_id": 0}
+        )
+        return {unpack_hash(result_dict["hash_value"]) async for result_dict in cursor}
+    
     async def find_by_id(self, result_id: str) -> Optional[Result]:
         """Find result by ID"""
         result_dict = await self.collection.find_one({"_id": ObjectId(result_id)})
         if result_dict:
             result_dict["id"] = str(result_dict.pop("_id"))
-            return Result.from_dict(result_dict)
+            return Result.from_dict(unpack_result(result_dict))
         return None
     
     async def find_all(self, skip: int = 0, limit: int = 100) -> List[Result]:
@@ -37,24 +83,24 @@ class ResultRepository:
         results = []
         async for result_dict in cursor:
             result_dict["id"] = str(result_dict.pop("_id"))
-            results.append(Result.from_dict(result_dict))
+            results.append(Result.from_dict(unpack_result(result_dict)))
         return results
     
-    async def find_by_task_id(self, task_id: str) -> List[Result]:
-        """Find results by task ID"""
-        cursor = self.collection.find({"task_id": task_id})
+    async def find_by_task_id(self, task_id: str, skip: int = 0, limit: int = 0) -> List[Result]:
+        """Find results by task ID, oldest first; a limit of 0 returns all"""
+        cursor = self.collection.find({"task_id": task_id}).sort("_id", 1).skip(skip).limit(limit)
         results = []
         async for result_dict in cursor:
             result_dict["id"] = str(result_dict.pop("_id"))
-            results.append(Result.from_dict(result_dict))
+            results.append(Result.from_dict(unpack_result(result_dict)))
         return results
     
     async def find_by_hash(self, hash_value: str) -> Optional[Result]:
         """Find result by hash value"""
-        result_dict = await self.collection.find_one({"hash_value": hash_value})
+        result_dict = await self.collection.find_one({"hash_value": {"$in": stored_forms([hash_value])}})
         if result_dict:
             result_dict["id"] = str(result_dict.pop("_id"))
-            return Result.from_dict(result_dict)
+            return Result.from_dict(unpack_result(result_dict))
         return None
     
     async def find_by_agent_id(self, agent_id: str) -> List[Result]:
@@ -63,9 +109,25 @@ class ResultRepository:
         results = []
         async for result_dict in cursor:
             result_dict["id"] = str(result_dict.pop("_id"))
-            results.append(Result.from_dict(result_dict))
+            results.append(Result.from_dict(unpack_result(result_dict)))
         return results
     
+    async def count(self) -> int:
+        """Count all results"""
+        return await self.collection.estimated_document_count()
+    
+    async def iter_hash_values(self, batch_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Yield the hash values of all results in batches"""
+        cursor = self.collection.find({}, {"hash_value": 1, "_id": 0}).batch_size(batch_size)
+        batch = []
+        async for result_dict in cursor:
+            batch.append(unpack_hash(result_dict["hash_value"]))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
     async def delete(self, result_id: str) -> bool:
         """Delete a result"""
         result = await self.collection.delete_one({"_id": ObjectId(result_id)})
@@ -0,0 +1,861 @@
+from typing import List, Optional, Dict, Any, Set, Union, AsyncIterator
+from datetime import datetime, timedelta
+import sqlite3
+
+from config.sqlite_database import SQLiteDatabase, encode_datetime
+from config.hash_codec import pack_hash, unpack_hash
+from entity.task import Task, TaskStatus
+from entity.chunk import Chunk, ChunkStatus
+from entity.agent import Agent, AgentStatus
+from entity.result import Result
+from entity.potfile import PotfileEntry
+
+# List views leave out the hash list, hash_count carries its size
+SUMMARY_EXCLUDE = ("hashes",)
+
+OPEN_CHUNK_STATUSES = (ChunkStatus.PENDING.value, ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value)
+HELD_CHUNK_STATUSES = (ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value)
+
+# Chunks that are pending, or whose agent let the lease expire
+CLAIMABLE_CHUNK_WHERE = (
+    "(status = ? OR (status IN (?, ?) AND lease_expires_at < ?))"
+)
+
+
+def claimable_chunk_params(now: datetime) -> tuple:
+    return (ChunkStatus.PENDING.value,) + HELD_CHUNK_STATUSES + (encode_datetime(now),)
+
+
+async def iter_column(database: SQLiteDatabase, table: str, column: str,
+                      batch_size: int) -> AsyncIterator[List[Any]]:
+    """Yield one column of every row in batches, paging by rowid"""
+    def select(connection: sqlite3.Connection, after: int):
+        return connection.execute(
+            f"SELECT rowid, {column} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?", (after, batch_size)
+        ).fetchall()
+    
+    after = 0
+    while True:
+        rows = await database.read(select, after)
+        if not rows:
+            return
+        yield [row[1] for row in rows]
+        after = rows[-1][0]
+
+
+async def count_rows(database: SQLiteDatabase, table: str) -> int:
+    """Count the rows of a table"""
+    return await database.read(
+        lambda connection: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    )
+
+
+class SQLiteTaskRepository:
+    """Task repository backed by SQLite"""
+    
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+    
+    def _exclude(self, include_hashes: bool):
+        return () if include_hashes else SUMMARY_EXCLUDE
+    
+    async def _find(self, where: str = "1", params: tuple = (), order_by: str = None,
+                    skip: int = 0, limit: int = 0, include_hashes: bool = False) -> List[Task]:
+        task_dicts = await self.db.read(
+            SQLiteDatabase.select, "tasks", where, params, order_by, skip, limit, self._exclude(include_hashes)
+        )
+        return [Task.from_dict(task_dict) for task_dict in task_dicts]
+    
+    async def create(self, task: Task) -> Task:
+        """Create a new task"""
+        task.id = await self.db.write(SQLiteDatabase.insert, "tasks", task.to_dict())
+        return task
+    
+    async def find_by_id(self, task_id: str) -> Optional[Task]:
+        """Find task by ID"""
+        tasks = await self._find("id = ?", (task_id,), include_hashes=True)
+        return tasks[0] if tasks else None
+    
+    async def _update_by_id(self, task_id: str, update_data: Dict[str, Any],
+                            return_document: bool = True) -> Union[Task, bool, None]:
+        """Update one task, returning it as written or, without return_document, whether it exists"""
+        def update(connection: sqlite3.Connection):
+            if not SQLiteDatabase.update(connection, "tasks", update_data, "id = ?", (task_id,)):
+                return None
+            if return_document:
+                return SQLiteDatabase.select_one(connection, "tasks", "id = ?", (task_id,))
+            return True
+        
+        task_dict = await self.db.write(update)
+        if not return_document:
+            return bool(task_dict)
+        if task_dict:
+            return Task.from_dict(task_dict)
+        return None
+    
+    async def create_many(self, tasks: List[Task]) -> List[Task]:
+        """Create several tasks in one transaction"""
+        def insert(connection: sqlite3.Connection):
+            return [SQLiteDatabase.insert(connection, "tasks", task.to_dict()) for task in tasks]
+        
+        for task, task_id in zip(tasks, await self.db.write(insert)):
+            task.id = task_id
+        return tasks
+    
+    async def find_all(self, skip: int = 0, limit: int = 100, include_hashes: bool = False) -> List[Task]:
+        """Find all top-level tasks with pagination"""
+        return await self._find("parent_id IS NULL", (), "rowid", skip, limit, include_hashes)
+    
+    async def find_by_status(self, status: TaskStatus, skip: int = 0, limit: int = 100,
+                             include_hashes: bool = False) -> List[Task]:
+        """Find top-level tasks by status"""
+        return await self._find("status = ? AND parent_id IS NULL", (status.value,), "rowid", skip, limit,
+                                include_hashes)
+    
+    async def find_by_agent_id(self, agent_id: str, include_hashes: bool = False) -> List[Task]:
+        """Find tasks assigned to an agent"""
+        return await self._find("agent_id = ?", (agent_id,), include_hashes=include_hashes)
+    
+    async def find_by_parent_id(self, parent_id: str, skip: int = 0, limit: int = 100,
+                                include_hashes: bool = False) -> List[Task]:
+        """Find the hash shards of a task"""
+        return await self._find("parent_id = ?", (parent_id,), "shard_index", skip, limit, include_hashes)
+    
+    async def find_shard_ids(self, parent_id: str) -> List[str]:
+        """Find the IDs of the hash shards of a task"""
+        def select(connection: sqlite3.Connection):
+            return [row["id"] for row in connection.execute("SELECT id FROM tasks WHERE parent_id = ?", (parent_id,))]
+        
+        return await self.db.read(select)
+    
+    async def cancel_shards(self, parent_id: str) -> List[str]:
+        """Cancel the shards of a task that are not finished, returning their IDs"""
+        unfinished = (TaskStatus.PENDING.value, TaskStatus.ASSIGNED.value, TaskStatus.RUNNING.value)
+        
+        def cancel(connection: sqlite3.Connection):
+            shard_ids = [row["id"] for row in connection.execute(
+                "SELECT id FROM tasks WHERE parent_id = ? AND status IN (?, ?, ?)", (parent_id,) + unfinished
+            )]
+            SQLiteDatabase.update(
+                connection, "tasks", {"status": TaskStatus.CANCELLED.value, "updated_at": datetime.utcnow()},
+                "parent_id = ? AND status IN (?, ?, ?)", (parent_id,) + unfinished
+            )
+            return shard_ids
+        
+        return await self.db.write(cancel)
+    
+    async def summarize_shards(self, parent_id: str) -> Dict[str, Any]:
+        """Count the shards of a task by status and average their progress"""
+        def select(connection: sqlite3.Connection):
+            return connection.execute(
+                "SELECT status, COUNT(*) AS count, SUM(progress) AS progress FROM tasks "
+                "WHERE parent_id = ? GROUP BY status",
+                (parent_id,)
+            ).fetchall()
+        
+        summary = {"statuses": {}, "total": 0, "progress": 0.0}
+        for row in await self.db.read(select):
+            summary["statuses"][row["status"]] = row["count"]
+            summary["total"] += row["count"]
+            summary["progress"] += row["progress"] or 0.0
+        if summary["total"]:
+            summary["progress"] /= summary["total"]
+        return summary
+    
+    async def delete_by_parent_id(self, parent_id: str) -> int:
+        """Delete the hash shards of a task"""
+        return await self.db.write(
+            lambda connection: connection.execute("DELETE FROM tasks WHERE parent_id = ?", (parent_id,)).rowcount
+        )
+    
+    async def update(self, task: Task, return_document: bool = True) -> Union[Task, bool, None]:
+        """Update an existing task"""
+        task_dict = task.to_dict()
+        task_id = task_dict.pop("id")
+        task_dict["updated_at"] = datetime.utcnow()
+        
+        return await self._update_by_id(task_id, task_dict, return_document)
+    
+    async def update_status(self, task_id: str, status: TaskStatus,
+                            progress: float = None, speed: float = None,
+                            error: str = None, return_document: bool = True) -> Union[Task, bool, None]:
+        """Update task status"""
+        update_data = {
+            "status": status.value,
+            "updated_at": datetime.utcnow()
+        }
+        
+        if progress is not None:
+            update_data["progress"] = progress
+        
+        if speed is not None:
+            update_data["speed"] = speed
+        
+        if error is not None:
+            update_data["error"] = error
+        
+        if status == TaskStatus.RUNNING and progress == 0:
+            update_data["started_at"] = datetime.utcnow()
+        
+        if status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+            update_data["completed_at"] = datetime.utcnow()
+        
+        return await self._update_by_id(task_id, update_data, return_document)
+    
+    async def delete(self, task_id: str) -> bool:
+        """Delete a task"""
+        return await self.db.write(
+            lambda connection: connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,)).rowcount > 0
+        )
+    
+    async def assign_to_agent(self, task_id: str, agent_id: str) -> Optional[Task]:
+        """Atomically flip a pending task to assigned, returns None if it was not pending"""
+        def assign(connection: sqlite3.Connection):
+            updated = SQLiteDatabase.update(
+                connection, "tasks",
+                {"agent_id": agent_id, "status": TaskStatus.ASSIGNED.value, "updated_at": datetime.utcnow()},
+                "id = ? AND status = ?", (task_id, TaskStatus.PENDING.value)
+            )
+            if updated:
+                return SQLiteDatabase.select_one(connection, "tasks", "id = ?", (task_id,))
+            return None
+        
+        task_dict = await self.db.write(assign)
+        if task_dict:
+            return Task.from_dict(task_dict)
+        return None
+    
+    async def increment_recovered(self, task_id: str, count: int) -> Optional[Task]:
+        """Count newly recovered hashes on the task, returning it without its hash list"""
+        now = encode_datetime(datetime.utcnow())
+        
+        def increment(connection: sqlite3.Connection):
+            updated = connection.execute(
+                "UPDATE tasks SET recovered_count = COALESCE(recovered_count, 0) + ?, "
+                "last_cracked_at = ?, updated_at = ? WHERE id = ?",
+                (count, now, now, task_id)
+            ).rowcount
+            if updated:
+                return SQLiteDatabase.select_one(connection, "tasks", "id = ?", (task_id,), exclude=SUMMARY_EXCLUDE)
+            return None
+        
+        task_dict = await self.db.write(increment)
+        if task_dict:
+            return Task.from_dict(task_dict)
+        return None
+    
+    async def backfill_hash_counts(self) -> int:
+        """Store hash_count on tasks created before it existed"""
+        return await self.db.write(lambda connection: connection.execute(
+            "UPDATE tasks SET hash_count = json_array_length(hashes) "
+            "WHERE COALESCE(hash_count, 0) = 0 AND typeof(hashes) = 'text' AND json_array_length(hashes) > 0"
+        ).rowcount)
+    
+    async def migrate_recovered_hashes(self) -> int:
+        """Nothing to migrate, the SQLite backend never stored recovered hash arrays"""
+        return 0
+    
+    async def find_next_pending_task(self) -> Optional[Task]:
+        """Find the next task with keyspace left to dispatch, based on priority"""
+        tasks = await self.find_pending_tasks(limit=1)
+        return tasks[0] if tasks else None
+    
+    async def find_pending_tasks(self, limit: int = 100) -> List[Task]:
+        """Find tasks with keyspace left to dispatch, highest priority first"""
+        # Sharded parents are only containers, their shards get scheduled
+        return await self._find(
+            "status IN (?, ?, ?) AND (keyspace IS NULL OR keyspace_offset < keyspace) "
+            "AND COALESCE(shard_count, 0) <= 0",
+            (TaskStatus.PENDING.value, TaskStatus.ASSIGNED.value, TaskStatus.RUNNING.value),
+            "priority DESC, created_at",
+            limit=limit,
+            include_hashes=True
+        )
+    
+    async def set_keyspace(self, task_id: str, keyspace: int) -> bool:
+        """Record the measured keyspace of a task, returns False if it was already set"""
+        return await self.db.write(lambda connection: SQLiteDatabase.update(
+            connection, "tasks",
+            {"keyspace": keyspace, "keyspace_offset": 0, "updated_at": datetime.utcnow()},
+            "id = ? AND keyspace IS NULL", (task_id,)
+        ) > 0)
+    
+    async def advance_keyspace_offset(self, task_id: str, size: int) -> Optional[int]:
+        """Atomically reserve the next `size` keyspace units, returning the previous offset"""
+        def advance(connection: sqlite3.Connection):
+            row = connection.execute(
+                "SELECT keyspace_offset FROM tasks WHERE id = ? AND keyspace_offset < keyspace",
+                (task_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE tasks SET keyspace_offset = keyspace_offset + ?, updated_at = ? WHERE id = ?",
+                (size, encode_datetime(datetime.utcnow()), task_id)
+            )
+            return row["keyspace_offset"] or 0
+        
+        return await self.db.write(advance)
+    
+    async def create_chunk(self, chunk: Chunk) -> Chunk:
+        """Create a new chunk"""
+        chunk.id = await self.db.write(SQLiteDatabase.insert, "task_chunks", chunk.to_dict())
+        return chunk
+    
+    async def _find_chunks(self, where: str, params: tuple = (), order_by: str = None,
+                           limit: int = 0) -> List[Chunk]:
+        chunk_dicts = await self.db.read(SQLiteDatabase.select, "task_chunks", where, params, order_by, 0, limit)
+        return [Chunk.from_dict(chunk_dict) for chunk_dict in chunk_dicts]
+    
+    async def find_chunk_by_id(self, chunk_id: str) -> Optional[Chunk]:
+        """Find chunk by ID"""
+        chunks = await self._find_chunks("id = ?", (chunk_id,))
+        return chunks[0] if chunks else None
+    
+    async def find_held_chunk(self, agent_id: str) -> Optional[Chunk]:
+        """Find the chunk an agent holds, the one claimed last if there are several"""
+        chunks = await self._find_chunks(
+            "agent_id = ? AND status IN (?, ?)", (agent_id,) + HELD_CHUNK_STATUSES, "updated_at DESC", 1
+        )
+        return chunks[0] if chunks else None
+    
+    async def find_chunks_by_task_id(self, task_id: str) -> List[Chunk]:
+        """Find all chunks of a task ordered by keyspace position"""
+        return await self._find_chunks("task_id = ?", (task_id,), "skip")
+    
+    async def find_pending_chunks(self, limit: int = 100) -> List[Chunk]:
+        """Find chunks waiting to be (re)assigned, oldest first"""
+        return await self._find_chunks(
+            CLAIMABLE_CHUNK_WHERE, claimable_chunk_params(datetime.utcnow()), "created_at", limit
+        )
+    
+    async def claim_chunk(self, chunk_id: str, agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Atomically claim a chunk for an agent, returns None if someone else holds it"""
+        return await self._claim(f"id = ? AND {CLAIMABLE_CHUNK_WHERE}", (chunk_id,), agent_id, lease_seconds)
+    
+    async def claim_next_chunk(self, agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Atomically claim the oldest claimable chunk for an agent"""
+        return await self._claim(CLAIMABLE_CHUNK_WHERE, (), agent_id, lease_seconds)
+    
+    async def _claim(self, where: str, params: tuple, agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Flip a claimable chunk to assigned with a fresh lease in one transaction"""
+        now = datetime.utcnow()
+        
+        def claim(connection: sqlite3.Connection):
+            chunk_dict = SQLiteDatabase.select_one(
+                connection, "task_chunks", where, params + claimable_chunk_params(now), order_by="created_at"
+            )
+            if chunk_dict is None:
+                return None
+            changes = {
+                "agent_id": agent_id,
+                "status": ChunkStatus.ASSIGNED.value,
+                "progress": 0.0,
+                "started_at": None,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "updated_at": now
+            }
+            SQLiteDatabase.update(connection, "task_chunks", changes, "id = ?", (chunk_dict["id"],))
+            chunk_dict.update(changes)
+            return chunk_dict
+        
+        chunk_dict = await self.db.write(claim)
+        if chunk_dict:
+            return Chunk.from_dict(chunk_dict)
+        return None
+    
+    async def renew_chunk_lease(self, chunk_id: str, agent_id: str, lease_seconds: int) -> bool:
+        """Extend the lease of a chunk still held by the agent"""
+        return await self.db.write(lambda connection: SQLiteDatabase.update(
+            connection, "task_chunks",
+            {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)},
+            "id = ? AND agent_id = ? AND status IN (?, ?)", (chunk_id, agent_id) + HELD_CHUNK_STATUSES
+        ) > 0)
+    
+    async def bulk_update_chunk_progress(self, updates: Dict[str, Dict[str, Any]], lease_seconds: int) -> int:
+        """Write buffered progress of running chunks, chunk ID to agent_id/progress/speed/reported_at"""
+        def update_all(connection: sqlite3.Connection):
+            modified = 0
+            for chunk_id, update in updates.items():
+                update_data = {
+                    "lease_expires_at": update["reported_at"] + timedelta(seconds=lease_seconds)
+                }
+                if update.get("progress") is not None or update.get("speed") is not None:
+                    update_data["status"] = ChunkStatus.RUNNING.value
+                    update_data["updated_at"] = update["reported_at"]
+                if update.get("progress") is not None:
+                    update_data["progress"] = update["progress"]
+                if update.get("speed") is not None:
+                    update_data["speed"] = update["speed"]
+                
+                # Only chunks the agent still holds, finished chunks are left alone
+                modified += SQLiteDatabase.update(
+                    connection, "task_chunks", update_data,
+                    "id = ? AND agent_id = ? AND status IN (?, ?)",
+                    (chunk_id, update["agent_id"]) + HELD_CHUNK_STATUSES
+                )
+            return modified
+        
+        if not updates:
+            return 0
+        return await self.db.write(update_all)
+    
+    async def bulk_update_task_progress(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Write buffered progress of tasks run without chunks, task ID to progress/speed/reported_at"""
+        def update_all(connection: sqlite3.Connection):
+            modified = 0
+            for task_id, update in updates.items():
+                update_data = {
+                    "status": TaskStatus.RUNNING.value,
+                    "updated_at": update["reported_at"]
+                }
+                if update.get("progress") is not None:
+                    update_data["progress"] = update["progress"]
+                if update.get("speed") is not None:
+                    update_data["speed"] = update["speed"]
+                modified += SQLiteDatabase.update(
+                    connection, "tasks", update_data, "id = ? AND status IN (?, ?)",
+                    (task_id, TaskStatus.ASSIGNED.value, TaskStatus.RUNNING.value)
+                )
+            return modified
+        
+        if not updates:
+            return 0
+        return await self.db.write(update_all)
+    
+    async def update_chunk_status(self, chunk_id: str, status: ChunkStatus,
+                                progress: float = None, speed: float = None,
+                                error: str = None, agent_id: str = None,
+                                lease_seconds: int = None) -> Optional[Chunk]:
+        """Update chunk status, only for the holding agent when agent_id is given"""
+        update_data = {
+            "status": status.value,
+            "updated_at": datetime.utcnow()
+        }
+        
+        if lease_seconds is not None:
+            update_data["lease_expires_at"] = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        
+        if progress is not None:
+            update_data["progress"] = progress
+        
+        if speed is not None:
+            update_data["speed"] = speed
+        
+        if error is not None:
+            update_data["error"] = error
+        
+        if status == ChunkStatus.RUNNING and progress == 0:
+            update_data["started_at"] = datetime.utcnow()
+        
+        if status in [ChunkStatus.COMPLETED, ChunkStatus.FAILED]:
+            update_data["completed_at"] = datetime.utcnow()
+        
+        # Finished and cancelled chunks stay that way so late reports cannot bring them back
+        where = "id = ? AND status IN (?, ?)"
+        params = (chunk_id,) + HELD_CHUNK_STATUSES
+        if agent_id is not None:
+            where += " AND agent_id = ?"
+            params += (agent_id,)
+        
+        def update(connection: sqlite3.Connection):
+            if SQLiteDatabase.update(connection, "task_chunks", update_data, where, params):
+                return SQLiteDatabase.select_one(connection, "task_chunks", "id = ?", (chunk_id,))
+            return None
+        
+        chunk_dict = await self.db.write(update)
+        if chunk_dict:
+            return Chunk.from_dict(chunk_dict)
+        return None
+    
+    async def requeue_chunk(self, chunk_id: str, agent_id: str) -> bool:
+        """Return an unfinished chunk to the pending queue, only while the agent still holds it"""
+        return await self.db.write(lambda connection: SQLiteDatabase.update(
+            connection, "task_chunks",
+            {
+                "status": ChunkStatus.PENDING.value,
+                "agent_id": None,
+                "progress": 0.0,
+                "started_at": None,
+                "lease_expires_at": None,
+                "updated_at": datetime.utcnow()
+            },
+            "id = ? AND agent_id = ? AND status IN (?, ?)", (chunk_id, agent_id) + HELD_CHUNK_STATUSES
+        ) > 0)
+    
+    async def retry_chunk(self, chunk_id: str) -> bool:
+        """Return a failed chunk to the pending queue, counting the failure"""
+        def retry(connection: sqlite3.Connection) -> bool:
+            row = connection.execute(
+                "SELECT failures FROM task_chunks WHERE id = ? AND status = ?", (chunk_id, ChunkStatus.FAILED.value)
+            ).fetchone()
+            if not row:
+                return False
+            return SQLiteDatabase.update(
+                connection, "task_chunks",
+                {
+                    "status": ChunkStatus.PENDING.value,
+                    "agent_id": None,
+                    "progress": 0.0,
+                    "started_at": None,
+                    "completed_at": None,
+                    "lease_expires_at": None,
+                    "failures": (row["failures"] or 0) + 1,
+                    "updated_at": datetime.utcnow()
+                },
+                "id = ? AND status = ?", (chunk_id, ChunkStatus.FAILED.value)
+            ) > 0
+        
+        return await self.db.write(retry)
+    
+    async def cancel_chunks(self, task_id: str) -> int:
+        """Cancel all unfinished chunks of a task"""
+        return await self.db.write(lambda connection: SQLiteDatabase.update(
+            connection, "task_chunks",
+            {"status": ChunkStatus.CANCELLED.value, "updated_at": datetime.utcnow()},
+            "task_id = ? AND status IN (?, ?, ?)", (task_id,) + OPEN_CHUNK_STATUSES
+        ))
+    
+    async def delete_chunks(self, task_id: str) -> int:
+        """Delete all chunks of a task"""
+        return await self.db.write(
+            lambda connection: connection.execute("DELETE FROM task_chunks WHERE task_id = ?", (task_id,)).rowcount
+        )
+    
+    async def count_open_chunks(self, task_id: str) -> int:
+        """Count chunks of a task that are not finished yet"""
+        return await self.db.read(lambda connection: connection.execute(
+            "SELECT COUNT(*) FROM task_chunks WHERE task_id = ? AND status IN (?, ?, ?)",
+            (task_id,) + OPEN_CHUNK_STATUSES
+        ).fetchone()[0])
+    
+    async def sum_completed_keyspace(self, task_id: str) -> int:
+        """Sum the keyspace covered by the completed chunks of a task"""
+        return await self.db.read(lambda connection: connection.execute(
+            'SELECT COALESCE(SUM("limit"), 0) FROM task_chunks WHERE task_id = ? AND status = ?',
+            (task_id, ChunkStatus.COMPLETED.value)
+        ).fetchone()[0])
+
+
+class SQLiteAgentRepository:
+    """Agent repository backed by SQLite"""
+    
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+    
+    async def _find(self, where: str = "1", params: tuple = (), skip: int = 0, limit: int = 0) -> List[Agent]:
+        agent_dicts = await self.db.read(SQLiteDatabase.select, "agents", where, params, "rowid", skip, limit)
+        return [Agent.from_dict(agent_dict) for agent_dict in agent_dicts]
+    
+    async def create(self, agent: Agent) -> Agent:
+        """Create a new agent"""
+        agent.id = await self.db.write(SQLiteDatabase.insert, "agents", agent.to_dict())
+        return agent
+    
+    async def find_by_id(self, agent_id: str) -> Optional[Agent]:
+        """Find agent by ID"""
+        agents = await self._find("id = ?", (agent_id,))
+        return agents[0] if agents else None
+    
+    async def _update_by_id(self, agent_id: str, update_data: Dict[str, Any],
+                            return_document: bool = True, where: str = "id = ?",
+                            params: tuple = None) -> Union[Agent, bool, None]:
+        """Update one agent, returning it as written or, without return_document, whether it exists"""
+        def update(connection: sqlite3.Connection):
+            if not SQLiteDatabase.update(connection, "agents", update_data, where, params or (agent_id,)):
+                return None
+            if return_document:
+                return SQLiteDatabase.select_one(connection, "agents", "id = ?", (agent_id,))
+            return True
+        
+        agent_dict = await self.db.write(update)
+        if not return_document:
+            return bool(agent_dict)
+        if agent_dict:
+            return Agent.from_dict(agent_dict)
+        return None
+    
+    async def find_by_api_key(self, api_key: str) -> Optional[Agent]:
+        """Find agent by API key"""
+        agents = await self._find("api_key = ?", (api_key,))
+        return agents[0] if agents else None
+    
+    async def find_all(self, skip: int = 0, limit: int = 100) -> List[Agent]:
+        """Find all agents with pagination"""
+        return await self._find(skip=skip, limit=limit)
+    
+    async def find_by_status(self, status: AgentStatus, skip: int = 0, limit: int = 100) -> List[Agent]:
+        """Find agents by status"""
+        return await self._find("status = ?", (status.value,), skip, limit)
+    
+    async def find_available_agents(self) -> List[Agent]:
+        """Find available agents for task assignment"""
+        return await self._find("status = ? AND current_task_id IS NULL", (AgentStatus.ONLINE.value,))
+    
+    async def update(self, agent: Agent,
+                     return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update an existing agent"""
+        agent_dict = agent.to_dict()
+        agent_id = agent_dict.pop("id")
+        
+        return await self._update_by_id(agent_id, agent_dict, return_document)
+    
+    def _set_status(self, connection: sqlite3.Connection, agent_id: str, status: AgentStatus,
+                    last_seen: datetime) -> int:
+        """Set status and last_seen, an agent holding work stays busy when it reports online"""
+        if status != AgentStatus.ONLINE:
+            return SQLiteDatabase.update(
+                connection, "agents", {"status": status.value, "last_seen": last_seen}, "id = ?", (agent_id,)
+            )
+        return connection.execute(
+            "UPDATE agents SET status = CASE WHEN current_task_id IS NULL THEN ? ELSE ? END, "
+            "last_seen = ? WHERE id = ?",
+            (AgentStatus.ONLINE.value, AgentStatus.BUSY.value, encode_datetime(last_seen), agent_id)
+        ).rowcount
+    
+    async def update_status(self, agent_id: str, status: AgentStatus,
+                            return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update agent status, an agent holding work stays busy when it reports online"""
+        def update(connection: sqlite3.Connection):
+            if not self._set_status(connection, agent_id, status, datetime.utcnow()):
+                return None
+            if return_document:
+                return SQLiteDatabase.select_one(connection, "agents", "id = ?", (agent_id,))
+            return True
+        
+        agent_dict = await self.db.write(update)
+        if not return_document:
+            return bool(agent_dict)
+        if agent_dict:
+            return Agent.from_dict(agent_dict)
+        return None
+    
+    async def bulk_update_heartbeats(self, heartbeats: Dict[str, Dict[str, Any]]) -> int:
+        """Write buffered heartbeats, agent ID to status and last_seen, in one transaction"""
+        def update_all(connection: sqlite3.Connection):
+            return sum(
+                self._set_status(connection, agent_id, heartbeat["status"], heartbeat["last_seen"])
+                for agent_id, heartbeat in heartbeats.items()
+            )
+        
+        if not heartbeats:
+            return 0
+        return await self.db.write(update_all)
+    
+    async def update_heartbeat(self, agent_id: str,
+                               return_document: bool = True) -> Union[Agent, bool, None]:
+        """Update agent heartbeat"""
+        return await self._update_by_id(agent_id, {"last_seen": datetime.utcnow()}, return_document)
+    
+    async def claim_task(self, agent_id: str, task_id: str, chunk_id: str = None) -> Optional[Agent]:
+        """Atomically assign work to an agent, returns None if the agent is no longer available"""
+        return await self._update_by_id(
+            agent_id,
+            {
+                "current_task_id": task_id,
+                "current_chunk_id": chunk_id,
+                "status": AgentStatus.BUSY.value,
+                "last_seen": datetime.utcnow()
+            },
+            where="id = ? AND status = ? AND current_task_id IS NULL",
+            params=(agent_id, AgentStatus.ONLINE.value)
+        )
+    
+    async def clear_task(self, agent_id: str,
+                         return_document: bool = True) -> Union[Agent, bool, None]:
+        """Clear current task from agent"""
+        return await self._update_by_id(
+            agent_id,
+            {
+                "current_task_id": None,
+                "current_chunk_id": None,
+                "status": AgentStatus.ONLINE.value,
+                "last_seen": datetime.utcnow()
+            },
+            return_document
+        )
+    
+    async def release_chunk(self, agent_id: str, chunk_id: str) -> bool:
+        """Clear a chunk from an agent, only if the agent still holds it"""
+        return await self.db.write(lambda connection: SQLiteDatabase.update(
+            connection, "agents",
+            {"current_task_id": None, "current_chunk_id": None, "status": AgentStatus.ONLINE.value},
+            "id = ? AND current_chunk_id = ?", (agent_id, chunk_id)
+        ) > 0)
+    
+    async def clear_task_by_task_id(self, task_id: str) -> int:
+        """Clear a task from every agent working on it"""
+        return await self.db.write(lambda connection: SQLiteDatabase.update(
+            connection, "agents",
+            {"current_task_id": None, "current_chunk_id": None, "status": AgentStatus.ONLINE.value},
+            "current_task_id = ?", (task_id,)
+        ))
+    
+    async def update_keyspace_speed(self, agent_id: str, keyspace_speed: float) -> None:
+        """Record the keyspace throughput measured on the agent's last chunk"""
+        await self.db.write(lambda connection: SQLiteDatabase.update(
+            connection, "agents", {"keyspace_speed": keyspace_speed}, "id = ?", (agent_id,)
+        ))
+    
+    async def delete(self, agent_id: str) -> bool:
+        """Delete an agent"""
+        return await self.db.write(
+            lambda connection: connection.execute("DELETE FROM agents WHERE id = ?", (agent_id,)).rowcount > 0
+        )
+
+
+class SQLiteResultRepository:
+    """Result repository backed by SQLite"""
+    
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+    
+    async def _find(self, where: str = "1", params: tuple = (), skip: int = 0, limit: int = 0) -> List[Result]:
+        result_dicts = await self.db.read(SQLiteDatabase.select, "results", where, params, "rowid", skip, limit)
+        return [Result.from_dict(result_dict) for result_dict in result_dicts]
+    
+    async def create(self, result: Result) -> Result:
+        """Create a new result"""
+        result.id = await self.db.write(SQLiteDatabase.insert, "results", result.to_dict())
+        return result
+    
+    async def create_many(self, results: List[Result]) -> List[Result]:
+        """Create results in one transaction, skipping ones rejected as duplicates"""
+        def insert(connection: sqlite3.Connection):
+            created = []
+            for result in results:
+                try:
+                    created.append((result, SQLiteDatabase.insert(connection, "results", result.to_dict())))
+                except sqlite3.IntegrityError:
+                    continue
+            return created
+        
+        if not results:
+            return []
+        created = []
+        for result, result_id in await self.db.write(insert):
+            result.id = result_id
+            created.append(result)
+        return created
+    
+    async def find_existing_hashes(self, task_id: str, hash_values: List[str]) -> Set[str]:
+        """Find which of the given hash values already have a result for the task"""
+        def select(connection: sqlite3.Connection):
+            existing = set()
+            # Stay below the bound parameter limit of older SQLite builds
+            for start in range(0, len(hash_values), 500):
+                batch = hash_values[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT hash_value FROM results WHERE task_id = ? "
+                    f"AND hash_value IN ({', '.join('?' for _ in batch)})",
+                    [task_id] + [pack_hash(hash_value) for hash_value in batch]
+                )
+                existing.update(unpack_hash(row["hash_value"]) for row in rows)
+            return existing
+        
+        return await self.db.read(select)
+    
+    async def find_by_id(self, result_id: str) -> Optional[Result]:
+        """Find result by ID"""
+        results = await self._find("id = ?", (result_id,))
+        return results[0] if results else None
+    
+    async def find_all(self, skip: int = 0, limit: int = 100) -> List[Result]:
+        """Find all results with pagination"""
+        return await self._find(skip=skip, limit=limit)
+    
+    async def find_by_task_id(self, task_id: str, skip: int = 0, limit: int = 0) -> List[Result]:
+        """Find results by task ID, oldest first; a limit of 0 returns all"""
+        return await self._find("task_id = ?", (task_id,), skip, limit)
+    
+    async def find_by_hash(self, hash_value: str) -> Optional[Result]:
+        """Find result by hash value"""
+        results = await self._find("hash_value = ?", (pack_hash(hash_value),), limit=1)
+        return results[0] if results else None
+    
+    async def find_by_agent_id(self, agent_id: str) -> List[Result]:
+        """Find results by agent ID"""
+        return await self._find("agent_id = ?", (agent_id,))
+    
+    async def delete(self, result_id: str) -> bool:
+        """Delete a result"""
+        return await self.db.write(
+            lambda connection: connection.execute("DELETE FROM results WHERE id = ?", (result_id,)).rowcount > 0
+        )
+    
+    async def count(self) -> int:
+        """Count all results"""
+        return await count_rows(self.db, "results")
+    
+    async def iter_hash_values(self, batch_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Yield the hash values of all results in batches"""
+        async for batch in iter_column(self.db, "results", "hash_value", batch_size):
+            yield [unpack_hash(hash_value) for hash_value in batch]
+    
+    async def delete_by_task_id(self, task_id: str) -> int:
+        """Delete all results for a task"""
+        return await self.db.write(
+            lambda connection: connection.execute("DELETE FROM results WHERE task_id = ?", (task_id,)).rowcount
+        )
+
+
+class SQLitePotfileRepository:
+    """Potfile repository backed by SQLite"""
+    
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+    
+    async def add_many(self, entries: List[PotfileEntry]) -> List[PotfileEntry]:
+        """Add entries in one transaction, skipping hashes that are already known"""
+        def insert(connection: sqlite3.Connection):
+            added = []
+            for entry in entries:
+                try:
+                    added.append((entry, SQLiteDatabase.insert(connection, "potfile", entry.to_dict())))
+                except sqlite3.IntegrityError:
+                    continue
+            return added
+        
+        if not entries:
+            return []
+        added = []
+        for entry, entry_id in await self.db.write(insert):
+            entry.id = entry_id
+            added.append(entry)
+        return added
+    
+    async def find_plaintexts(self, hash_type_id: int, hash_values: List[str]) -> Dict[str, str]:
+        """Map the given hash values that are known to their plaintext"""
+        def select(connection: sqlite3.Connection):
+            plaintexts = {}
+            # Stay below the bound parameter limit of older SQLite builds
+            for start in range(0, len(hash_values), 500):
+                batch = hash_values[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT hash_value, plaintext FROM potfile WHERE hash_type_id = ? "
+                    f"AND hash_value IN ({', '.join('?' for _ in batch)})",
+                    [hash_type_id] + list(batch)
+                )
+                plaintexts.update((row["hash_value"], row["plaintext"]) for row in rows)
+            return plaintexts
+        
+        return await self.db.read(select)
+    
+    async def find_since(self, hash_type_id: int, since: datetime = None, limit: int = 0) -> List[PotfileEntry]:
+        """Find entries of a hash type added at or after since, oldest first"""
+        where, params = "hash_type_id = ?", (hash_type_id,)
+        if since:
+            where, params = where + " AND added_at >= ?", params + (encode_datetime(since),)
+        entry_dicts = await self.db.read(
+            SQLiteDatabase.select, "potfile", where, params, "added_at, rowid", 0, limit
+        )
+        return [PotfileEntry.from_dict(entry_dict) for entry_dict in entry_dicts]
+    
+    async def count(self) -> int:
+        """Count known hashes over all hash types"""
+        return await count_rows(self.db, "potfile")
+    
+    async def iter_hash_values(self, batch_size: int = 10000) -> AsyncIterator[List[str]]:
+        """Yield the hash values of all entries in batches"""
+        async for batch in iter_column(self.db, "potfile", "hash_value", batch_size):
+            yield batch
@@ -1,8 +1,14 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument, UpdateOne
 
+from config.hash_codec import pack_task, unpack_task
 from entity.task import Task, TaskStatus
+from entity.chunk import Chunk, ChunkStatus
+
+# List views leave out the hash list, hash_count carries its size
+SUMMARY_PROJECTION = {"hashes": 0}
 
 
 class TaskRepository:
@@ -11,10 +17,11 @@ class TaskRepository:
     def __init__(self, database):
         self.db = database
         self.collection = database.tasks
+        self.chunks = database.task_chunks
     
     async def create(self, task: Task) -> Task:
         """Create a new task"""
-        task_dict = task.to_dict()
+        task_dict = pack_task(task.to_dict())
         # Remove id if None
         if task_dict["id"] is None:
             del task_dict["id"]
@@ -28,54 +35,138 @@ class TaskRepository:
         task_dict = await self.collection.find_one({"_id": ObjectId(task_id)})
         if task_dict:
             task_dict["id"] = str(task_dict.pop("_id"))
-            return Task.from_dict(task_dict)
+            return Task.from_dict(unpack_task(task_dict))
         return None
     
-    async def find_all(self, skip: int = 0, limit: int = 100) -> List[Task]:
-        """Find all tasks with pagination"""
-        cursor = self.collection.find().skip(skip).limit(limit)
+    async def _update_by_id(self, task_id: str, update: Dict[str, Any],
+                            return_document: bool = True) -> Union[Task, bool, None]:
+        """Update one task, returning it as written or, without return_document, whether it exists"""
+        if not return_document:
+            result = await self.collection.update_one({"_id": ObjectId(task_id)}, update)
+            return result.matched_count > 0
+        
+        task_dict = await self.collection.find_one_and_update(
+            {"_id": ObjectId(task_id)},
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+        if task_dict:
+            task_dict["id"] = str(task_dict.pop("_id"))
+            return Task.from_dict(unpack_task(task_dict))
+        return None
+    
+    async def create_many(self, tasks: List[Task]) -> List[Task]:
+        """Create several tasks in one round trip"""
+        task_dicts = []
+        for task in tasks:
+            task_dict = pack_task(task.to_dict())
+            # Remove id if None
+            if task_dict["id"] is None:
+                del task_dict["id"]
+            task_dicts.append(task_dict)
+        
+        result = await self.collection.insert_many(task_dicts)
+        for task, inserted_id in zip(tasks, result.inserted_ids):
+            task.id = str(inserted_id)
+        return tasks
+    
+    def _projection(self, include_hashes: bool) -> Optional[Dict[str, int]]:
+        """Projection leaving out the hash list unless it is asked for"""
+        return None if include_hashes else SUMMARY_PROJECTION
+    
+    async def find_all(self, skip: int = 0, limit: int = 100, include_hashes: bool = False) -> List[Task]:
+        """Find all top-level tasks with pagination"""
+        cursor = self.collection.find(
+            {"parent_id": None}, projection=self._projection(include_hashes)
+        ).skip(skip).limit(limit)
         tasks = []
         async for task_dict in cursor:
             task_dict["id"] = str(task_dict.pop("_id"))
-            tasks.append(Task.from_dict(task_dict))
+            tasks.append(Task.from_dict(unpack_task(task_dict)))
         return tasks
     
-    async def find_by_status(self, status: TaskStatus, skip: int = 0, limit: int = 100) -> List[Task]:
-        """Find tasks by status"""
-        cursor = self.collection.find({"status": status.value}).skip(skip).limit(limit)
+    async def find_by_status(self, status: TaskStatus, skip: int = 0, limit: int = 100,
+                             include_hashes: bool = False) -> List[Task]:
+        """Find top-level tasks by status"""
+        cursor = self.collection.find(
+            {"status": status.value, "parent_id": None}, projection=self._projection(include_hashes)
+        ).skip(skip).limit(limit)
         tasks = []
         async for task_dict in cursor:
             task_dict["id"] = str(task_dict.pop("_id"))
-            tasks.append(Task.from_dict(task_dict))
+            tasks.append(Task.from_dict(unpack_task(task_dict)))
         return tasks
     
-    async def find_by_agent_id(self, agent_id: str) -> List[Task]:
+    async def find_by_agent_id(self, agent_id: str, include_hashes: bool = False) -> List[Task]:
         """Find tasks assigned to an agent"""
-        cursor = self.collection.find({"agent_id": agent_id})
+        cursor = self.collection.find({"agent_id": agent_id}, projection=self._projection(include_hashes))
+        tasks = []
+        async for task_dict in cursor:
+            task_dict["id"] = str(task_dict.pop("_id"))
+            tasks.append(Task.from_dict(unpack_task(task_dict)))
+        return tasks
+    
+    async def find_by_parent_id(self, parent_id: str, skip: int = 0, limit: int = 100,
+                                include_hashes: bool = False) -> List[Task]:
+        """Find the hash shards of a task"""
+        cursor = self.collection.find(
+            {"parent_id": parent_id}, projection=self._projection(include_hashes)
+        ).sort("shard_index", 1).skip(skip).limit(limit)
         tasks = []
         async for task_dict in cursor:
             task_dict["id"] = str(task_dict.pop("_id"))
-            tasks.append(Task.from_dict(task_dict))
+            tasks.append(Task.from_dict(unpack_task(task_dict)))
         return tasks
     
-    async def update(self, task: Task) -> Optional[Task]:
+    async def find_shard_ids(self, parent_id: str) -> List[str]:
+        """Find the IDs of the hash shards of a task"""
+        cursor = self.collection.find({"parent_id": parent_id}, projection={"_id": 1})
+        return [str(task_dict["_id"]) async for task_dict in cursor]
+    
+    async def cancel_shards(self, parent_id: str) -> List[str]:
+        """Cancel the shards of a task that are not finished, returning their IDs"""
+        unfinished = {"$in": [TaskStatus.PENDING.value, TaskStatus.ASSIGNED.value, TaskStatus.RUNNING.value]}
+        cursor = self.collection.find({"parent_id": parent_id, "status": unfinished}, projection={"_id": 1})
+        shard_ids = [task_dict["_id"] async for task_dict in cursor]
+        if shard_ids:
+            # Shards finishing meanwhile keep their outcome
+            await self.collection.update_many(
+                {"_id": {"$in": shard_ids}, "status": unfinished},
+                {"$set": {"status": TaskStatus.CANCELLED.value, "updated_at": datetime.utcnow()}}
+            )
+        return [str(shard_id) for shard_id in shard_ids]
+    
+    async def summarize_shards(self, parent_id: str) -> Dict[str, Any]:
+        """Count the shards of a task by status and average their progress"""
+        cursor = self.collection.aggregate([
+            {"$match": {"parent_id": parent_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}, "progress": {"$sum": "$progress"}}}
+        ])
+        summary = {"statuses": {}, "total": 0, "progress": 0.0}
+        async for row in cursor:
+            summary["statuses"][row["_id"]] = row["count"]
+            summary["total"] += row["count"]
+            summary["progress"] += row["progress"] or 0.0
+        if summary["total"]:
+            summary["progress"] /= summary["total"]
+        return summary
+    
+    async def delete_by_parent_id(self, parent_id: str) -> int:
+        """Delete the hash shards of a task"""
+        result = await self.collection.delete_many({"parent_id": parent_id})
+        return result.deleted_count
+    
+    async def update(self, task: Task, return_document: bool = True) -> Union[Task, bool, None]:
         """Update an existing task"""
-        task_dict = task.to_dict()
+        task_dict = pack_task(task.to_dict())
         task_id = task_dict.pop("id")
         task_dict["updated_at"] = datetime.utcnow()
         
-        result = await self.collection.update_one(
-            {"_id": ObjectId(task_id)},
-            {"$set": task_dict}
-        )
-        
-        if result.modified_count > 0:
-            return await self.find_by_id(task_id)
-        return None
+        return await self._update_by_id(task_id, {"$set": task_dict}, return_document)
     
     async def update_status(self, task_id: str, status: TaskStatus, 
                           progress: float = None, speed: float = None,
-                          error: str = None) -> Optional[Task]:
+                          error: str = None, return_document: bool = True) -> Union[Task, bool, None]:
         """Update task status"""
         update_data = {
             "status": status.value,
@@ -97,14 +188,7 @@ class TaskRepository:
         if status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
             update_data["completed_at"] = datetime.utcnow()
         
-        result = await self.collection.update_one(
-            {"_id": ObjectId(task_id)},
-            {"$set": update_data}
-        )
-        
-        if result.modified_count > 0:
-            return await self.find_by_id(task_id)
-        return None
+        return await self._update_by_id(task_id, {"$set": update_data}, return_document)
     
     async def delete(self, task_id: str) -> bool:
         """Delete a task"""
@@ -112,50 +196,401 @@ class TaskRepository:
         return result.deleted_count > 0
     
     async def assign_to_agent(self, task_id: str, agent_id: str) -> Optional[Task]:
-        """Assign task to an agent"""
-        result = await self.collection.update_one(
-            {"_id": ObjectId(task_id)},
+        """Atomically flip a pending task to assigned, returns None if it was not pending"""
+        task_dict = await self.collection.find_one_and_update(
+            {"_id": ObjectId(task_id), "status": TaskStatus.PENDING.value},
             {
                 "$set": {
                     "agent_id": agent_id,
                     "status": TaskStatus.ASSIGNED.value,
                     "updated_at": datetime.utcnow()
                 }
-            }
+            },
+            return_document=ReturnDocument.AFTER
         )
-        
-        if result.modified_count > 0:
-            return await self.find_by_id(task_id)
+        if task_dict:
+            task_dict["id"] = str(task_dict.pop("_id"))
+            return Task.from_dict(unpack_task(task_dict))
         return None
     
-    async def add_recovered_hash(self, task_id: str, hash_value: str, plaintext: str) -> Optional[Task]:
-        """Add a recovered hash to the task"""
-        recovered_hash = {
-            "hash": hash_value,
-            "plaintext": plaintext,
-            "cracked_at": datetime.utcnow()
-        }
-        
-        result = await self.collection.update_one(
+    async def increment_recovered(self, task_id: str, count: int) -> Optional[Task]:
+        """Count newly recovered hashes on the task, returning it without its hash list"""
+        now = datetime.utcnow()
+        task_dict = await self.collection.find_one_and_update(
             {"_id": ObjectId(task_id)},
             {
-                "$push": {"recovered_hashes": recovered_hash},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
+                "$inc": {"recovered_count": count},
+                "$set": {"last_cracked_at": now, "updated_at": now}
+            },
+            projection=SUMMARY_PROJECTION,
+            return_document=ReturnDocument.AFTER
         )
         
-        if result.modified_count > 0:
-            return await self.find_by_id(task_id)
+        if task_dict:
+            task_dict["id"] = str(task_dict.pop("_id"))
+            return Task.from_dict(unpack_task(task_dict))
         return None
     
+    async def backfill_hash_counts(self) -> int:
+        """Store hash_count on old task documents so summaries can leave out the hash list"""
+        result = await self.collection.update_many(
+            {"hash_count": {"$exists": False}},
+            [{"$set": {"hash_count": {"$size": {"$ifNull": ["$hashes", []]}}}}]
+        )
+        return result.modified_count
+    
+    async def migrate_recovered_hashes(self) -> int:
+        """Replace recovered_hashes arrays left on old task documents with counters"""
+        result = await self.collection.update_many(
+            {"recovered_hashes": {"$exists": True}},
+            [
+                {"$set": {
+                    "recovered_count": {"$size": {"$ifNull": ["$recovered_hashes", []]}},
+                    "last_cracked_at": {"$max": "$recovered_hashes.cracked_at"}
+                }},
+                {"$unset": "recovered_hashes"}
+            ]
+        )
+        return result.modified_count
+    
     async def find_next_pending_task(self) -> Optional[Task]:
-        """Find the next pending task based on priority"""
-        task_dict = await self.collection.find_one(
-            {"status": TaskStatus.PENDING.value},
+        """Find the next task with keyspace left to dispatch, based on priority"""
+        tasks = await self.find_pending_tasks(limit=1)
+        return tasks[0] if tasks else None
+    
+    async def find_pending_tasks(self, limit: int = 100) -> List[Task]:
+        """Find tasks with keyspace left to dispatch, highest priority first"""
+        cursor = self.collection.find(
+            {
+                "status": {"$in": [
+                    TaskStatus.PENDING.value,
+                    TaskStatus.ASSIGNED.value,
+                    TaskStatus.RUNNING.value
+                ]},
+                "$or": [
+                    {"keyspace": None},
+                    {"$expr": {"$lt": ["$keyspace_offset", "$keyspace"]}}
+                ],
+                # Sharded parents are only containers, their shards get scheduled
+                "shard_count": {"$not": {"$gt": 0}}
+            },
             sort=[("priority", -1), ("created_at", 1)]
+        ).limit(limit)
+        tasks = []
+        async for task_dict in cursor:
+            task_dict["id"] = str(task_dict.pop("_id"))
+            tasks.append(Task.from_dict(unpack_task(task_dict)))
+        return tasks
+    
+    async def set_keyspace(self, task_id: str, keyspace: int) -> bool:
+        """Record the measured keyspace of a task, returns False if it was already set"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(task_id), "keyspace": None},
+            {"$set": {"keyspace": keyspace, "keyspace_offset": 0, "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+    
+    async def advance_keyspace_offset(self, task_id: str, size: int) -> Optional[int]:
+        """Atomically reserve the next `size` keyspace units, returning the previous offset"""
+        task_dict = await self.collection.find_one_and_update(
+            {
+                "_id": ObjectId(task_id),
+                "$expr": {"$lt": ["$keyspace_offset", "$keyspace"]}
+            },
+            {"$inc": {"keyspace_offset": size}, "$set": {"updated_at": datetime.utcnow()}},
+            projection={"keyspace_offset": 1},
+            return_document=ReturnDocument.BEFORE
         )
-        
         if task_dict:
-            task_dict["id"] = str(task_dict.pop("_id"))
-            return Task.from_dict(task_dict)
+            return task_dict.get("keyspace_offset", 0)
+        return None
+    
+    async def create_chunk(self, chunk: Chunk) -> Chunk:
+        """Create a new chunk"""
+        chunk_dict = chunk.to_dict()
+        # Remove id if None
+        if chunk_dict["id"] is None:
+            del chunk_dict["id"]
+        
+        result = await self.chunks.insert_one(chunk_dict)
+        chunk.id = str(result.inserted_id)
+        return chunk
+    
+    async def find_chunk_by_id(self, chunk_id: str) -> Optional[Chunk]:
+        """Find chunk by ID"""
+        chunk_dict = await self.chunks.find_one({"_id": ObjectId(chunk_id)})
+        if chunk_dict:
+            chunk_dict["id"] = str(chunk_dict.pop("_id"))
+            return Chunk.from_dict(chunk_dict)
+        return None
+    
+    async def find_held_chunk(self, agent_id: str) -> Optional[Chunk]:
+        """Find the chunk an agent holds, the one claimed last if there are several"""
+        chunk_dict = await self.chunks.find_one(
+            {"agent_id": agent_id, "status": {"$in": [ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]}},
+            sort=[("updated_at", -1)]
+        )
+        if chunk_dict:
+            chunk_dict["id"] = str(chunk_dict.pop("_id"))
+            return Chunk.from_dict(chunk_dict)
         return None
+    
+    async def find_chunks_by_task_id(self, task_id: str) -> List[Chunk]:
+        """Find all chunks of a task ordered by keyspace position"""
+        cursor = self.chunks.find({"task_id": task_id}).sort("skip", 1)
+        chunks = []
+        async for chunk_dict in cursor:
+            chunk_dict["id"] = str(chunk_dict.pop("_id"))
+            chunks.append(Chunk.from_dict(chunk_dict))
+        return chunks
+    
+    def _claimable_chunk_filter(self) -> Dict[str, Any]:
+        """Chunks that are pending, or whose agent let the lease expire"""
+        return {
+            "$or": [
+                {"status": ChunkStatus.PENDING.value},
+                {
+                    "status": {"$in": [ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]},
+                    "lease_expires_at": {"$lt": datetime.utcnow()}
+                }
+            ]
+        }
+    
+    async def find_pending_chunks(self, limit: int = 100) -> List[Chunk]:
+        """Find chunks waiting to be (re)assigned, oldest first"""
+        cursor = self.chunks.find(
+            self._claimable_chunk_filter(),
+            sort=[("created_at", 1)]
+        ).limit(limit)
+        chunks = []
+        async for chunk_dict in cursor:
+            chunk_dict["id"] = str(chunk_dict.pop("_id"))
+            chunks.append(Chunk.from_dict(chunk_dict))
+        return chunks
+    
+    async def claim_chunk(self, chunk_id: str, agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Atomically claim a chunk for an agent, returns None if someone else holds it"""
+        query = self._claimable_chunk_filter()
+        query["_id"] = ObjectId(chunk_id)
+        return await self._claim(query, agent_id, lease_seconds)
+    
+    async def claim_next_chunk(self, agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Atomically claim the oldest claimable chunk for an agent"""
+        return await self._claim(self._claimable_chunk_filter(), agent_id, lease_seconds)
+    
+    async def _claim(self, query: Dict[str, Any], agent_id: str, lease_seconds: int) -> Optional[Chunk]:
+        """Flip a claimable chunk to assigned with a fresh lease in a single round trip"""
+        now = datetime.utcnow()
+        chunk_dict = await self.chunks.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "agent_id": agent_id,
+                    "status": ChunkStatus.ASSIGNED.value,
+                    "progress": 0.0,
+                    "started_at": None,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now
+                }
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if chunk_dict:
+            chunk_dict["id"] = str(chunk_dict.pop("_id"))
+            return Chunk.from_dict(chunk_dict)
+        return None
+    
+    async def renew_chunk_lease(self, chunk_id: str, agent_id: str, lease_seconds: int) -> bool:
+        """Extend the lease of a chunk still held by the agent"""
+        result = await self.chunks.update_one(
+            {
+                "_id": ObjectId(chunk_id),
+                "agent_id": agent_id,
+                "status": {"$in": [ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]}
+            },
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+        )
+        return result.modified_count > 0
+    
+    async def bulk_update_chunk_progress(self, updates: Dict[str, Dict[str, Any]], lease_seconds: int) -> int:
+        """Write buffered progress of running chunks, chunk ID to agent_id/progress/speed/reported_at"""
+        operations = []
+        for chunk_id, update in updates.items():
+            update_data = {
+                "lease_expires_at": update["reported_at"] + timedelta(seconds=lease_seconds)
+            }
+            if update.get("progress") is not None or update.get("speed") is not None:
+                update_data["status"] = ChunkStatus.RUNNING.value
+                update_data["updated_at"] = update["reported_at"]
+            if update.get("progress") is not None:
+                update_data["progress"] = update["progress"]
+            if update.get("speed") is not None:
+                update_data["speed"] = update["speed"]
+            
+            # Only chunks the agent still holds, finished chunks are left alone
+            operations.append(UpdateOne(
+                {
+                    "_id": ObjectId(chunk_id),
+                    "agent_id": update["agent_id"],
+                    "status": {"$in": [ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]}
+                },
+                {"$set": update_data}
+            ))
+        
+        if not operations:
+            return 0
+        result = await self.chunks.bulk_write(operations, ordered=False)
+        return result.modified_count
+    
+    async def bulk_update_task_progress(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Write buffered progress of tasks run without chunks, task ID to progress/speed/reported_at"""
+        operations = []
+        for task_id, update in updates.items():
+            update_data = {
+                "status": TaskStatus.RUNNING.value,
+                "updated_at": update["reported_at"]
+            }
+            if update.get("progress") is not None:
+                update_data["progress"] = update["progress"]
+            if update.get("speed") is not None:
+                update_data["speed"] = update["speed"]
+            operations.append(UpdateOne(
+                {
+                    "_id": ObjectId(task_id),
+                    "status": {"$in": [TaskStatus.ASSIGNED.value, TaskStatus.RUNNING.value]}
+                },
+                {"$set": update_data}
+            ))
+        
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+    
+    async def update_chunk_status(self, chunk_id: str, status: ChunkStatus,
+                                progress: float = None, speed: float = None,
+                                error: str = None, agent_id: str = None,
+                                lease_seconds: int = None) -> Optional[Chunk]:
+        """Update chunk status, only for the holding agent when agent_id is given"""
+        update_data = {
+            "status": status.value,
+            "updated_at": datetime.utcnow()
+        }
+        
+        if lease_seconds is not None:
+            update_data["lease_expires_at"] = datetime.utcnow() + timedelta(seconds=lease_seconds)
+        
+        if progress is not None:
+            update_data["progress"] = progress
+        
+        if speed is not None:
+            update_data["speed"] = speed
+        
+        if error is not None:
+            update_data["error"] = error
+        
+        if status == ChunkStatus.RUNNING and progress == 0:
+            update_data["started_at"] = datetime.utcnow()
+        
+        if status in [ChunkStatus.COMPLETED, ChunkStatus.FAILED]:
+            update_data["completed_at"] = datetime.utcnow()
+        
+        # Finished and cancelled chunks stay that way so late reports cannot bring them back
+        query = {
+            "_id": ObjectId(chunk_id),
+            "status": {"$in": [ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]}
+        }
+        if agent_id is not None:
+            query["agent_id"] = agent_id
+        
+        chunk_dict = await self.chunks.find_one_and_update(
+            query,
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
+        if chunk_dict:
+            chunk_dict["id"] = str(chunk_dict.pop("_id"))
+            return Chunk.from_dict(chunk_dict)
+        return None
+    
+    async def requeue_chunk(self, chunk_id: str, agent_id: str) -> bool:
+        """Return an unfinished chunk to the pending queue, only while the agent still holds it"""
+        result = await self.chunks.update_one(
+            {
+                "_id": ObjectId(chunk_id),
+                "agent_id": agent_id,
+                "status": {"$in": [ChunkStatus.ASSIGNED.value, ChunkStatus.RUNNING.value]}
+            },
+            {
+                "$set": {
+                    "status": ChunkStatus.PENDING.value,
+                    "agent_id": None,
+                    "progress": 0.0,
+                    "started_at": None,
+                    "lease_expires_at": None,
+                    "updated_at": datetime.utcnow()
+                }
+            }
+        )
+        return result.modified_count > 0
+    
+    async def retry_chunk(self, chunk_id: str) -> bool:
+        """Return a failed chunk to the pending queue, counting the failure"""
+        result = await self.chunks.update_one(
+            {"_id": ObjectId(chunk_id), "status": ChunkStatus.FAILED.value},
+            {
+                "$set": {
+                    "status": ChunkStatus.PENDING.value,
+                    "agent_id": None,
+                    "progress": 0.0,
+                    "started_at": None,
+                    "completed_at": None,
+                    "lease_expires_at": None,
+                    "updated_at": datetime.utcnow()
+                },
+                "$inc": {"failures": 1}
+            }
+        )
+        return result.modified_count > 0
+    
+    async def cancel_chunks(self, task_id: str) -> int:
+        """Cancel all unfinished chunks of a task"""
+        result = await self.chunks.update_many(
+            {
+                "task_id": task_id,
+                "status": {"$in": [
+                    ChunkStatus.PENDING.value,
+                    ChunkStatus.ASSIGNED.value,
+                    ChunkStatus.RUNNING.value
+                ]}
+            },
+            {"$set": {"status": ChunkStatus.CANCELLED.value, "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count
+    
+    async def delete_chunks(self, task_id: str) -> int:
+        """Delete all chunks of a task"""
+        result = await self.chunks.delete_many({"task_id": task_id})
+        return result.deleted_count
+    
+    async def count_open_chunks(self, task_id: str) -> int:
+        """Count chunks of a task that are not finished yet"""
+        return await self.chunks.count_documents({
+            "task_id": task_id,
+            "status": {"$in": [
+                ChunkStatus.PENDING.value,
+                ChunkStatus.ASSIGNED.value,
+                ChunkStatus.RUNNING.value
+            ]}
+        })
+    
+    async def sum_completed_keyspace(self, task_id: str) -> int:
+        """Sum the keyspace covered by the completed chunks of a task"""
+        cursor = self.chunks.aggregate([
+            {"$match": {"task_id": task_id, "status": ChunkStatus.COMPLETED.value}},
+            {"$group": {"_id": None, "total": {"$sum": "$limit"}}}
+        ])
+        async for row in cursor:
+            return row["total"] or 0
+        return 0
@@ -0,0 +1,47 @@
+import pytest
+from entity.agent import Agent
+from usecase import api_key_cache
+from usecase.api_key_cache import ApiKeyCache
+
+
+def test_cache_get_and_put():
+    """Test caching an agent by API key"""
+    cache = ApiKeyCache(ttl=60, max_size=10)
+    agent = Agent(id="agent1", name="GPU 1", api_key="key1")
+    
+    assert cache.get("key1") is None
+    cache.put(agent)
+    
+    assert cache.get("key1") is agent
+    assert cache.get("key2") is None
+
+
+def test_cache_evicts_least_recently_used():
+    """Test that the cache stays within its size"""
+    cache = ApiKeyCache(ttl=60, max_size=2)
+    cache.put(Agent(id="agent1", api_key="key1"))
+    cache.put(Agent(id="agent2", api_key="key2"))
+    
+    # Touch key1 so key2 becomes the oldest entry
+    cache.get("key1")
+    cache.put(Agent(id="agent3", api_key="key3"))
+    
+    assert len(cache) == 2
+    assert cache.get("key1") is not None
+    assert cache.get("key2") is None
+    assert cache.get("key3") is not None
+
+
+def test_cache_expiry_and_invalidation(monkeypatch):
+    """Test that expired and invalidated entries are not served"""
+    now = 1000.0
+    monkeypatch.setattr(api_key_cache.time, "monotonic", lambda: now)
+    cache = ApiKeyCache(ttl=60, max_size=10)
+    cache.put(Agent(id="agent1", api_key="key1"))
+    
+    now += 61
+    assert cache.get("key1") is None
+    
+    cache.put(Agent(id="agent1", api_key="key1"))
+    cache.invalidate("agent1")
+    assert cache.get("key1") is None
@@ -0,0 +1,66 @@
+import pytest
+from datetime import datetime, timedelta
+from entity.chunk import Chunk, ChunkStatus
+from entity.task import Task
+
+
+def test_chunk_creation():
+    """Test chunk creation and properties"""
+    chunk = Chunk(
+        task_id="task123",
+        skip=1000,
+        limit=500
+    )
+    
+    assert chunk.task_id == "task123"
+    assert chunk.skip == 1000
+    assert chunk.limit == 500
+    assert chunk.status == ChunkStatus.PENDING
+    assert chunk.agent_id is None
+    assert chunk.progress == 0.0
+    assert isinstance(chunk.created_at, datetime)
+    assert chunk.is_open() is True
+
+
+def test_chunk_from_dict():
+    """Test creating chunk from dictionary"""
+    chunk_dict = Chunk(id="c1", task_id="task123", skip=0, limit=100).to_dict()
+    chunk_dict["status"] = "completed"
+    
+    chunk = Chunk.from_dict(chunk_dict)
+    
+    assert chunk.id == "c1"
+    assert chunk.status == ChunkStatus.COMPLETED
+    assert chunk.limit == 100
+    assert chunk.is_open() is False
+
+
+def test_chunk_keyspace_rate():
+    """Test keyspace throughput measured from a completed chunk"""
+    started = datetime.utcnow()
+    chunk = Chunk(
+        task_id="task123",
+        skip=0,
+        limit=1000,
+        status=ChunkStatus.COMPLETED,
+        started_at=started,
+        completed_at=started + timedelta(seconds=10)
+    )
+    assert chunk.keyspace_rate() == 100.0
+    
+    # Unfinished chunks have no measurement
+    chunk.status = ChunkStatus.RUNNING
+    assert chunk.keyspace_rate() is None
+
+
+def test_task_is_fully_dispatched():
+    """Test task keyspace dispatch tracking"""
+    task = Task(name="Test Task")
+    assert task.is_fully_dispatched() is False
+    
+    task.keyspace = 1000
+    task.keyspace_offset = 500
+    assert task.is_fully_dispatched() is False
+    
+    task.keyspace_offset = 1000
+    assert task.is_fully_dispatched() is True
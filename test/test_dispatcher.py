@@ -0,0 +1,57 @@
+import asyncio
+
+from usecase.dispatcher import AssignmentDispatcher
+
+
+def test_long_poll_woken_by_assignment():
+    """Test that a held request returns the assignment as soon as the agent is woken"""
+    dispatcher = AssignmentDispatcher(fallback_interval=30)
+    assignments = {}
+    checks = []
+    
+    async def check():
+        checks.append(assignments.get("agent1"))
+        return assignments.get("agent1")
+    
+    async def scenario():
+        waiting = asyncio.create_task(dispatcher.wait_for_assignment("agent1", 10, check))
+        await asyncio.sleep(0.01)
+        assignments["agent1"] = "chunk1"
+        dispatcher.wake_agent("agent1")
+        return await asyncio.wait_for(waiting, timeout=1)
+    
+    assert asyncio.run(scenario()) == "chunk1"
+    # One check on entry, one on the wakeup
+    assert checks == [None, "chunk1"]
+    assert dispatcher._waiters == {}
+
+
+def test_long_poll_finds_assignments_without_wakeup():
+    """Test that work assigned elsewhere, which never wakes this process, is found by rechecking"""
+    dispatcher = AssignmentDispatcher(fallback_interval=30, recheck_interval=0.05)
+    assignments = {}
+    
+    async def check():
+        return assignments.get("agent1")
+    
+    async def scenario():
+        waiting = asyncio.create_task(dispatcher.wait_for_assignment("agent1", 10, check))
+        await asyncio.sleep(0.01)
+        assignments["agent1"] = "chunk1"
+        return await asyncio.wait_for(waiting, timeout=1)
+    
+    assert asyncio.run(scenario()) == "chunk1"
+
+
+def test_long_poll_times_out():
+    """Test that a request without work returns None once the wait runs out, after a last check"""
+    dispatcher = AssignmentDispatcher(fallback_interval=30)
+    checks = []
+    
+    async def check():
+        checks.append(None)
+        return None
+    
+    assert asyncio.run(dispatcher.wait_for_assignment("agent1", 0.05, check)) is None
+    assert len(checks) == 2
+    assert dispatcher._wakeup.is_set()
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from usecase.file_cache import FileCache
+from usecase.file_catalog import FileCatalog, parse_range
+from usecase.file_store import FileStore
+from entity.task import Task
+
+
+async def stream(*chunks):
+    """Async iterable over byte chunks"""
+    for chunk in chunks:
+        yield chunk
+
+
+def entry_for(content):
+    """Catalog entry of some content"""
+    return {"name": "list.txt", "sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+
+
+def test_catalog_describes_task_files(tmp_path):
+    """Test that uploaded and configured files resolve to their digest and can be opened by it"""
+    extra_dir = tmp_path / "extra"
+    extra_dir.mkdir()
+    (extra_dir / "best64.rule").write_bytes(b":\n")
+    catalog = FileCatalog(FileStore(str(tmp_path / "uploads")), [str(extra_dir)])
+    
+    async def scenario():
+        await catalog.file_store.store("wordlists", "rockyou.txt", stream(b"123456\n"))
+        task = Task(name="Test", wordlist_path="/old/agent/path/rockyou.txt", rule_path="best64.rule")
+        return await catalog.describe_task(task)
+    
+    files = asyncio.run(scenario())
+    assert files["wordlist_path"] == {"name": "rockyou.txt", "sha256": hashlib.sha256(b"123456\n").hexdigest(),
+                                      "size": 7, "lines": 1}
+    assert files["rule_path"]["sha256"] == hashlib.sha256(b":\n").hexdigest()
+    assert catalog.open_path(files["rule_path"]["sha256"]) == extra_dir / "best64.rule"
+    assert catalog.open_path(files["wordlist_path"]["sha256"]).read_bytes() == b"123456\n"
+    
+    # Changed files are no longer served under their old digest
+    (extra_dir / "best64.rule").write_bytes(b"c\n")
+    assert catalog.open_path(files["rule_path"]["sha256"]) is None
+    # Only files below the catalog directories
+    assert catalog.locate("wordlists", str(tmp_path / "outside.txt")) is None
+
+
+def test_parse_range():
+    """Test single byte ranges, ignored ranges and unsatisfiable ones"""
+    assert parse_range(None, 10) is None
+    assert parse_range("bytes=4-", 10) == (4, 9)
+    assert parse_range("bytes=2-5", 10) == (2, 5)
+    assert parse_range("bytes=-3", 10) == (7, 9)
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    assert parse_range("bytes=a-b", 10) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=10-", 10)
+
+
+def test_cache_resumes_and_verifies_downloads(tmp_path):
+    """Test that an interrupted download resumes at its offset and a corrupt one is dropped"""
+    cache = FileCache(str(tmp_path))
+    content = b"password\n" * 10
+    entry = entry_for(content)
+    offsets = []
+    
+    async def interrupted(offset):
+        offsets.append(offset)
+        yield content[offset:40]
+        raise ConnectionError("connection reset")
+    
+    async def rest(offset):
+        offsets.append(offset)
+        yield content[offset:]
+    
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            await cache.ensure(entry, interrupted)
+        path = await cache.ensure(entry, rest)
+        # Cached files are not downloaded again
+        assert await cache.ensure(entry, interrupted) == path
+        
+        with pytest.raises(ValueError):
+            await cache.ensure(entry_for(b"other\n"), lambda offset: stream(b"wrong\n"))
+        return path
+    
+    path = asyncio.run(scenario())
+    assert offsets == [0, 40]
+    with open(path, "rb") as f:
+        assert f.read() == content
+    assert sorted(os.listdir(tmp_path)) == [entry["sha256"]]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test that eviction keeps the quota, removing the oldest unpinned files first"""
+    cache = FileCache(str(tmp_path), quota_bytes=25)
+    contents = [bytes([letter]) * 10 for letter in b"abc"]
+    entries = [entry_for(content) for content in contents]
+    
+    async def scenario():
+        for age, (entry, content) in enumerate(zip(entries, contents)):
+            if age == 2:
+                # The oldest file is in use
+                cache.pin([entries[0]["sha256"]])
+            path = await cache.ensure(entry, lambda offset, content=content: stream(content))
+            os.utime(path, (age, age))
+    
+    asyncio.run(scenario())
+    assert cache.get(entries[0]["sha256"])
+    assert cache.get(entries[1]["sha256"]) is None
+    assert cache.get(entries[2]["sha256"])
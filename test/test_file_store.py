@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from usecase.file_store import FileStore, UploadError
+
+
+async def stream(*chunks):
+    """Async iterable over byte chunks"""
+    for chunk in chunks:
+        yield chunk
+
+
+def test_store_deduplicates_by_digest(tmp_path):
+    """Test that identical uploads share one object and removing the last name drops it"""
+    store = FileStore(str(tmp_path), chunk_size=4)
+    
+    async def scenario():
+        first = await store.store("wordlists", "rockyou.txt", stream(b"pass\n", b"word\n"))
+        second = await store.store("wordlists", "copy.txt", stream(b"pass\nword\n"))
+        return first, second
+    
+    first, second = asyncio.run(scenario())
+    assert first["sha256"] == hashlib.sha256(b"pass\nword\n").hexdigest()
+    assert not first["deduplicated"]
+    assert second["deduplicated"]
+    assert os.path.samefile(first["path"], second["path"])
+    assert (tmp_path / "wordlists" / "copy.txt").read_bytes() == b"pass\nword\n"
+    assert list((tmp_path / "partial").iterdir()) == []
+    
+    assert store.remove(tmp_path / "wordlists" / "rockyou.txt")
+    assert store.has_object(first["sha256"])
+    assert store.remove(tmp_path / "wordlists" / "copy.txt")
+    assert not store.has_object(first["sha256"])
+    # Only named files in the upload directories
+    assert not store.remove(tmp_path / "objects")
+
+
+def test_resumable_session(tmp_path):
+    """Test that a session resumes at its offset, also after the server lost its running digest"""
+    store = FileStore(str(tmp_path))
+    content = b"0123456789"
+    
+    async def scenario():
+        session = await store.create_session("handshakes", "../capture.hccapx", len(content))
+        upload_id = session["upload_id"]
+        assert (await store.append(upload_id, 0, stream(content[:4])))["offset"] == 4
+        
+        with pytest.raises(UploadError) as error:
+            await store.append(upload_id, 0, stream(content))
+        assert error.value.status_code == 409
+        assert error.value.offset == 4
+        
+        # A restarted server hashes the received bytes again
+        store._digests.clear()
+        assert (await store.get_session(upload_id))["offset"] == 4
+        done = await store.append(upload_id, 4, stream(content[4:], b"extra"))
+        
+        # Known content completes without sending it again
+        linked = await store.create_session("handshakes", "again.hccapx", len(content), done["sha256"].upper())
+        return done, linked
+    
+    done, linked = asyncio.run(scenario())
+    assert done["complete"]
+    assert done["sha256"] == hashlib.sha256(content).hexdigest()
+    assert (tmp_path / "handshakes" / "capture.hccapx").read_bytes() == content
+    assert linked["complete"] and linked["deduplicated"]
+    assert (tmp_path / "handshakes" / "again.hccapx").read_bytes() == content
+
+
+def test_session_rejects_wrong_digest(tmp_path):
+    """Test that an upload not matching its announced SHA-256 is dropped"""
+    store = FileStore(str(tmp_path))
+    
+    async def scenario():
+        session = await store.create_session("wordlists", "list.txt", 3, "0" * 64)
+        with pytest.raises(UploadError) as error:
+            await store.append(session["upload_id"], 0, stream(b"abc"))
+        assert error.value.status_code == 422
+        with pytest.raises(UploadError):
+            await store.get_session(session["upload_id"])
+    
+    asyncio.run(scenario())
+    assert not (tmp_path / "wordlists" / "list.txt").exists()
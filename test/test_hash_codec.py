@@ -0,0 +1,63 @@
+import asyncio
+
+from config.hash_codec import pack_hash, unpack_hash, pack_hashes, unpack_hashes
+from config.memory_database import MemoryDatabase
+from config.sqlite_database import SQLiteDatabase
+from entity.task import Task
+from entity.result import Result
+from repository.memory_repository import MemoryTaskRepository, MemoryResultRepository
+from repository.sqlite_repository import SQLiteTaskRepository, SQLiteResultRepository
+
+MD5_HASHES = ["5f4dcc3b5aa765d61d8327deb882cf99", "e10adc3949ba59abbe56e057f20f883e"]
+
+
+def test_hex_digests_pack_losslessly():
+    """Test that lowercase hex digests pack to raw bytes and everything else stays text"""
+    assert pack_hash(MD5_HASHES[0]) == bytes.fromhex(MD5_HASHES[0])
+    assert unpack_hash(pack_hash(MD5_HASHES[0])) == MD5_HASHES[0]
+    # Uppercase hex, odd sizes and salted hashes would not come back the same
+    for hash_value in [MD5_HASHES[0].upper(), "abcd", f"{MD5_HASHES[0]}:salt"]:
+        assert pack_hash(hash_value) == hash_value
+    
+    packed = pack_hashes(MD5_HASHES)
+    assert len(packed) == 1 + 2 * 16
+    assert unpack_hashes(packed) == MD5_HASHES
+    assert pack_hashes(MD5_HASHES + ["hash"]) == MD5_HASHES + ["hash"]
+    assert unpack_hashes(["hash"]) == ["hash"]
+
+
+def test_memory_backend_round_trip():
+    """Test that the memory backend stores packed hashes and returns hex"""
+    database = MemoryDatabase()
+    task = asyncio.run(MemoryTaskRepository(database).create(Task(name="Test", hashes=MD5_HASHES)))
+    assert isinstance(database.tasks.documents[task.id]["hashes"], bytes)
+    assert asyncio.run(MemoryTaskRepository(database).find_by_id(task.id)).hashes == MD5_HASHES
+    
+    results = MemoryResultRepository(database)
+    asyncio.run(results.create(Result(task_id=task.id, hash_value=MD5_HASHES[0], plaintext="password")))
+    assert asyncio.run(results.find_existing_hashes(task.id, MD5_HASHES)) == {MD5_HASHES[0]}
+    assert asyncio.run(results.find_by_hash(MD5_HASHES[0])).hash_value == MD5_HASHES[0]
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    """Test that the sqlite backend stores packed hashes as BLOBs and returns hex"""
+    async def scenario(database):
+        task = await SQLiteTaskRepository(database).create(Task(name="Test", hashes=MD5_HASHES + ["hash"]))
+        assert (await SQLiteTaskRepository(database).find_by_id(task.id)).hashes == MD5_HASHES + ["hash"]
+        
+        results = SQLiteResultRepository(database)
+        await results.create(Result(task_id=task.id, hash_value=MD5_HASHES[0], plaintext="password"))
+        assert await results.find_existing_hashes(task.id, MD5_HASHES) == {MD5_HASHES[0]}
+        assert (await results.find_by_hash(MD5_HASHES[0])).hash_value == MD5_HASHES[0]
+        return await database.read(
+            lambda connection: connection.execute("SELECT typeof(hash_value) FROM results").fetchone()[0]
+        )
+    
+    async def run():
+        database = await SQLiteDatabase(str(tmp_path / "test.db")).connect()
+        try:
+            return await scenario(database)
+        finally:
+            await database.close()
+    
+    assert asyncio.run(run()) == "blob"
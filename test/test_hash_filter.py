@@ -0,0 +1,80 @@
+import asyncio
+
+from config.memory_database import MemoryDatabase
+from entity.result import Result
+from repository.memory_repository import MemoryResultRepository, MemoryPotfileRepository
+from usecase.hash_filter import BloomFilter, HashFilter
+from usecase.potfile_usecase import PotfileUseCase
+from usecase.result_usecase import ResultUseCase
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every added value is found and few others are"""
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    for index in range(1000):
+        bloom.add(f"hash{index}")
+    
+    assert all(f"hash{index}" in bloom for index in range(1000))
+    false_positives = sum(f"other{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+
+
+def test_image_round_trip(tmp_path):
+    """Test that a saved image maps back with the same contents and takes adds in memory only"""
+    path = str(tmp_path / "filter.bin")
+    bloom = BloomFilter.for_capacity(100, 0.01)
+    bloom.add("aa")
+    bloom.save(path)
+    
+    mapped = BloomFilter.load(path)
+    assert "aa" in mapped
+    assert mapped.item_count == 1
+    mapped.add("bb")
+    assert "bb" in mapped
+    assert "bb" not in BloomFilter.load(path)
+
+
+def test_save_uses_a_temp_file_per_process(tmp_path):
+    """Test that a save leaves the temp file of another process writing the same image alone"""
+    path = tmp_path / "filter.bin"
+    other_temp = tmp_path / "filter.bin.1.tmp"
+    other_temp.write_bytes(b"partial")
+    
+    bloom = BloomFilter.for_capacity(100, 0.01)
+    bloom.add("aa")
+    bloom.save(str(path))
+    
+    assert "aa" in BloomFilter.load(str(path))
+    assert other_temp.read_bytes() == b"partial"
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ["filter.bin", "filter.bin.1.tmp"]
+
+
+def test_rebuild_screens_lookups(tmp_path):
+    """Test that lookups of hashes outside the filter never reach the repositories"""
+    database = MemoryDatabase()
+    result_repo = MemoryResultRepository(database)
+    potfile_repo = MemoryPotfileRepository(database)
+    asyncio.run(result_repo.create(Result(task_id="task1", hash_value="AA", plaintext="1")))
+    
+    hash_filter = HashFilter(str(tmp_path / "filter.bin"), rebuild_interval=0)
+    assert hash_filter.might_contain("anything")
+    assert asyncio.run(hash_filter.rebuild(result_repo, potfile_repo)) == 1
+    assert hash_filter.might_contain("aa")
+    
+    # Hashes cracked after the rebuild are added as they come in
+    potfile = PotfileUseCase(potfile_repo, hash_filter)
+    asyncio.run(potfile.record(0, [{"hash": "bb", "plaintext": "2"}]))
+    assert hash_filter.screen(["BB", "aa"]) == ["BB", "aa"]
+    
+    async def fail(*args, **kwargs):
+        raise AssertionError("looked up a hash the filter ruled out")
+    
+    potfile_repo.find_plaintexts = fail
+    result_repo.find_by_hash = fail
+    assert asyncio.run(potfile.resolve(0, ["cc", "dd"])) == {}
+    assert asyncio.run(ResultUseCase(result_repo, hash_filter).get_result_by_hash("cc")) is None
+    
+    # A restarted server maps the image of the last rebuild
+    restarted = HashFilter(str(tmp_path / "filter.bin"))
+    assert restarted.load()
+    assert restarted.might_contain("AA")
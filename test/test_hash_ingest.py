@@ -0,0 +1,52 @@
+import io
+
+from usecase.hash_ingest import DigestSet, HashIngestor
+
+
+def test_hex_hashes_are_normalized_and_deduplicated():
+    """Test that hex digests are lowercased and deduplicated across case"""
+    lines = io.StringIO(
+        "5F4DCC3B5AA765D61D8327DEB882CF99\n"
+        "5f4dcc3b5aa765d61d8327deb882cf99\r\n"
+        "\n"
+        "e10adc3949ba59abbe56e057f20f883e\n"
+    )
+    ingestor = HashIngestor(0).feed(lines)
+    
+    assert ingestor.hashes == ["5f4dcc3b5aa765d61d8327deb882cf99", "e10adc3949ba59abbe56e057f20f883e"]
+    assert ingestor.duplicates == 1
+    assert ingestor.rejected == 0
+
+
+def test_invalid_lines_are_rejected_with_their_line_number():
+    """Test that lines of the wrong length or charset are reported and left out"""
+    ingestor = HashIngestor.for_hash_type("sha1", max_rejects=1).feed([
+        "5baa61e4c9b93f3f0682250b6cf8331b7ee68fd8",
+        "5baa61e4c9b93f3f0682250b6cf8331b7ee68fd",
+        "zbaa61e4c9b93f3f0682250b6cf8331b7ee68fd8",
+    ])
+    
+    assert ingestor.hashes == ["5baa61e4c9b93f3f0682250b6cf8331b7ee68fd8"]
+    report = ingestor.report()
+    assert report["rejected"] == 2
+    assert report["rejects"] == [{
+        "line": 2, "value": "5baa61e4c9b93f3f0682250b6cf8331b7ee68fd", "reason": "not a valid hash for mode 100"
+    }]
+
+
+def test_non_hex_hashes_keep_their_case():
+    """Test that bcrypt hashes are validated but not lowercased, and unknown modes accept any line"""
+    bcrypt = "$2a$05$LhayLxezLhK1LhWvKxCyLOj0j1u.Kj0jZ0pEmm134uzrQlFvQJLF6"
+    assert HashIngestor(3200).feed([bcrypt, bcrypt, bcrypt.lower()]).hashes == [bcrypt, bcrypt.lower()]
+    assert HashIngestor(22000).feed(["WPA*02*ABC", "WPA*02*ABC"]).hashes == ["WPA*02*ABC"]
+
+
+def test_digest_set_grows():
+    """Test that the digest set keeps every digest while it grows"""
+    digests = DigestSet(4, capacity=4)
+    for value in range(1000):
+        assert digests.add(value.to_bytes(4, "little"))
+    
+    assert len(digests) == 1000
+    assert not digests.add((999).to_bytes(4, "little"))
+    assert (1000).to_bytes(4, "little") not in digests
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from entity.task import Task, HashType
+from usecase import hashcat_usecase
+from usecase.hashcat_usecase import HashcatUseCase
+
+
+def test_read_new_results_from_offset(tmp_path):
+    """Test that only complete lines written after the offset are parsed"""
+    output_file = tmp_path / "output.txt"
+    output_file.write_bytes(b"hash1:pass1\nhash2:pa:ss2\nhash3:pa")
+    usecase = HashcatUseCase("hashcat")
+    
+    results, offset = asyncio.run(usecase.read_new_results(str(output_file)))
+    
+    assert results == [
+        {"hash": "hash1", "plaintext": "pass1"},
+        {"hash": "hash2", "plaintext": "pa:ss2"}
+    ]
+    assert offset == len(b"hash1:pass1\nhash2:pa:ss2\n")
+    
+    # The partial line is picked up once hashcat finishes writing it
+    with open(output_file, "ab") as f:
+        f.write(b"ss3\n")
+    results, offset = asyncio.run(usecase.read_new_results(str(output_file), offset))
+    
+    assert results == [{"hash": "hash3", "plaintext": "pass3"}]
+    assert offset == output_file.stat().st_size
+
+
+def test_read_new_results_final_and_missing(tmp_path):
+    """Test the final read of an unterminated line and a missing outfile"""
+    output_file = tmp_path / "output.txt"
+    usecase = HashcatUseCase("hashcat")
+    
+    assert asyncio.run(usecase.read_new_results(str(output_file), 7)) == ([], 7)
+    
+    output_file.write_bytes(b"hash1:pass1")
+    results, offset = asyncio.run(usecase.read_new_results(str(output_file), 0, final=True))
+    
+    assert results == [{"hash": "hash1", "plaintext": "pass1"}]
+    assert offset == 11
+    
+    # An outfile shorter than the offset is read from the start
+    results, offset = asyncio.run(usecase.read_new_results(str(output_file), 100, final=True))
+    assert len(results) == 1
+
+
+def test_read_new_results_line_longer_than_max_bytes(tmp_path):
+    """Test that a line longer than the read window is read to its end instead of stalling the offset"""
+    output_file = tmp_path / "output.txt"
+    long_line = b"hash1:" + b"p" * 100 + b"\n"
+    output_file.write_bytes(long_line + b"hash2:pass2\nhash3:pa")
+    usecase = HashcatUseCase("hashcat")
+    
+    results, offset = asyncio.run(usecase.read_new_results(str(output_file), max_bytes=16))
+    assert results == [{"hash": "hash1", "plaintext": "p" * 100}]
+    assert offset == len(long_line)
+    
+    results, offset = asyncio.run(usecase.read_new_results(str(output_file), offset, max_bytes=16))
+    assert results == [{"hash": "hash2", "plaintext": "pass2"}]
+    
+    # Without a newline left the window ends at the partial line, the final read takes everything
+    assert asyncio.run(usecase.read_new_results(str(output_file), offset, max_bytes=16)) == ([], offset)
+    results, offset = asyncio.run(usecase.read_new_results(str(output_file), offset, final=True, max_bytes=4))
+    assert results == [{"hash": "hash3", "plaintext": "pa"}]
+    assert offset == output_file.stat().st_size
+
+
+def test_prepare_task_command_passes_default_args_through(tmp_path, monkeypatch):
+    """Test that default args keep their values and only the status flags are not repeated"""
+    monkeypatch.setattr(hashcat_usecase, "DEFAULT_HASHCAT_ARGS", "--status -O -w 3 --status-json --status-timer=10")
+    task = Task(name="Mask", hash_type=HashType.MD5, hashes=["a" * 32], attack_mode=3, mask="?d?d?d")
+    usecase = HashcatUseCase("hashcat")
+    
+    command = asyncio.run(usecase.prepare_task_command(task, str(tmp_path / "out.txt"), str(tmp_path)))
+    
+    assert command.count("--status") == 1
+    assert command.count("--status-json") == 1
+    hash_file = usecase.get_hash_file_path(task.id, str(tmp_path))
+    assert command[command.index("-w"):command.index(hash_file)] == ["-w", "3", "--status-timer=10"]
+    assert command[command.index("-a") + 1] == "3"
+    assert command[command.index("-O") + 1] == "-w"
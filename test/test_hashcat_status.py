@@ -0,0 +1,77 @@
+import json
+import time
+import pytest
+from usecase.hashcat_status import HashcatStatusParser
+
+
+def test_parse_status_json():
+    """Test parsing a --status-json report"""
+    line = json.dumps({
+        "session": "hashcat",
+        "status": 3,
+        "progress": [250, 1000],
+        "recovered_hashes": [1, 4],
+        "rejected": 2,
+        "devices": [
+            {"device_id": 1, "speed": 1000},
+            {"device_id": 2, "speed": 500}
+        ],
+        "time_start": int(time.time()),
+        "estimated_stop": int(time.time()) + 60
+    })
+    
+    status = HashcatStatusParser().parse_line(line)
+    
+    assert status.status_name == "Running"
+    assert status.progress == 0.25
+    assert status.recovered == 1
+    assert status.recovered_total == 4
+    assert status.rejected == 2
+    assert status.device_speeds == {"1": 1000.0, "2": 500.0}
+    assert status.speed == 1500.0
+    assert 55 <= status.eta <= 60
+
+
+def test_parse_machine_readable():
+    """Test parsing a --machine-readable STATUS line"""
+    line = "\t".join([
+        "STATUS", "3",
+        "SPEED", "2000", "1000", "500", "500",
+        "EXEC_RUNTIME", "1.5", "1.2",
+        "CURKU", "10",
+        "PROGRESS", "100", "400",
+        "RECHASH", "0", "2",
+        "RECSALT", "0", "1",
+        "REJECTED", "5",
+        "UTIL", "99", "98"
+    ])
+    
+    status = HashcatStatusParser().parse_line(line)
+    
+    assert status.progress == 0.25
+    assert status.device_speeds == {"1": 2000.0, "2": 1000.0}
+    assert status.recovered_total == 2
+    assert status.rejected == 5
+    assert status.eta == 0.1
+
+
+def test_feed_reassembles_split_lines():
+    """Test that status lines split across reads are parsed once complete"""
+    parser = HashcatStatusParser()
+    line = json.dumps({"status": 3, "progress": [1, 2], "devices": []}).encode() + b"\n"
+    
+    assert parser.feed(b"Session..........: hashcat\n" + line[:10]) == []
+    statuses = parser.feed(line[10:] + line)
+    
+    assert len(statuses) == 2
+    assert statuses[0].progress == 0.5
+
+
+def test_feed_ignores_malformed_and_oversized_lines():
+    """Test that garbage output never produces a status"""
+    parser = HashcatStatusParser()
+    
+    assert parser.feed(b"{not json}\nSTATUS\tx\n") == []
+    assert parser.feed(b"x" * (HashcatStatusParser.MAX_LINE_LENGTH + 1)) == []
+    assert parser.feed(b"{\"progress\": [1, 2]}\n") == []
+    assert len(parser.feed(b"{\"progress\": [1, 2]}\n")) == 1
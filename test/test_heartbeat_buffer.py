@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from config.memory_database import MemoryDatabase
+from entity.agent import Agent, AgentStatus
+from entity.chunk import Chunk
+from entity.task import Task, TaskStatus, HashType
+from repository.memory_repository import MemoryAgentRepository, MemoryTaskRepository, MemoryResultRepository
+from usecase.agent_usecase import AgentUseCase
+from usecase.heartbeat_buffer import HeartbeatBuffer
+from usecase.task_usecase import TaskUseCase
+
+
+class RecordingRepository:
+    """Stands in for the repositories and records bulk writes"""
+    
+    def __init__(self):
+        self.writes = []
+    
+    async def bulk_update_heartbeats(self, heartbeats):
+        self.writes.append(("agents", heartbeats))
+        return len(heartbeats)
+    
+    async def bulk_update_chunk_progress(self, updates, lease_seconds):
+        self.writes.append(("chunks", updates))
+        return len(updates)
+    
+    async def bulk_update_task_progress(self, updates):
+        self.writes.append(("tasks", updates))
+        return len(updates)
+
+
+def test_heartbeats_coalesce_per_agent():
+    """Test that the latest heartbeat per agent is written in a single flush"""
+    repo = RecordingRepository()
+    buffer = HeartbeatBuffer(flush_interval=1000)
+    buffer.agent_repo = repo
+    buffer.task_repo = repo
+    
+    buffer.record_heartbeat("agent1", AgentStatus.ONLINE)
+    last_seen = buffer.record_heartbeat("agent1", AgentStatus.BUSY)
+    buffer.record_heartbeat("agent2", AgentStatus.ONLINE)
+    buffer.record_chunk_progress("chunk1", "agent1", progress=0.1, speed=100.0)
+    buffer.record_chunk_progress("chunk1", "agent1")
+    
+    assert buffer.last_seen("agent1") == last_seen
+    assert asyncio.run(buffer.flush()) == 3
+    
+    writes = dict(repo.writes)
+    assert writes["agents"]["agent1"]["status"] == AgentStatus.BUSY
+    assert len(writes["agents"]) == 2
+    # A heartbeat without progress keeps the last reported progress
+    assert writes["chunks"]["chunk1"]["progress"] == 0.1
+    assert "tasks" not in writes
+    
+    # Nothing is written twice, last_seen is still served from memory
+    repo.writes.clear()
+    assert asyncio.run(buffer.flush()) == 0
+    assert repo.writes == []
+    assert buffer.last_seen("agent1") == last_seen
+
+
+def test_discarded_entries_are_not_written():
+    """Test that discarded chunks and agents are dropped from the buffer"""
+    repo = RecordingRepository()
+    buffer = HeartbeatBuffer(flush_interval=1000)
+    buffer.agent_repo = repo
+    buffer.task_repo = repo
+    
+    buffer.record_heartbeat("agent1", AgentStatus.ONLINE)
+    buffer.record_chunk_progress("chunk1", "agent1", progress=0.5)
+    buffer.discard_chunk("chunk1")
+    buffer.discard_agent("agent1")
+    
+    assert asyncio.run(buffer.flush()) == 0
+    assert buffer.last_seen("agent1") is None
+
+
+def test_heartbeat_progress_for_held_chunks_only():
+    """Test that heartbeats buffer progress of a held chunk and stop naming a chunk that was cancelled"""
+    database = MemoryDatabase()
+    agents = MemoryAgentRepository(database)
+    chunks = MemoryTaskRepository(database)
+    buffer = HeartbeatBuffer(flush_interval=1000)
+    agent_usecase = AgentUseCase(agents, chunks, heartbeat_buffer=buffer)
+    
+    async def scenario():
+        agent = await agents.create(Agent(name="Agent", api_key="key", status=AgentStatus.ONLINE))
+        chunk = await chunks.create_chunk(Chunk(task_id="task1", skip=0, limit=100))
+        await chunks.claim_chunk(chunk.id, agent.id, lease_seconds=60)
+        agent = await agents.claim_task(agent.id, "task1", chunk.id)
+        
+        held = await agent_usecase.record_heartbeat(agent, AgentStatus.BUSY, "task1", 0.25, 100.0, chunk.id)
+        progress = dict(buffer._chunks)
+        await chunks.cancel_chunks("task1")
+        withdrawn = await agent_usecase.record_heartbeat(agent, AgentStatus.BUSY, "task1", 0.5, 100.0, chunk.id)
+        return chunk, held, progress, withdrawn
+    
+    chunk, held, progress, withdrawn = asyncio.run(scenario())
+    assert held.current_chunk_id == chunk.id
+    assert progress[chunk.id]["progress"] == 0.25
+    assert withdrawn.current_chunk_id is None
+    assert buffer._chunks[chunk.id]["progress"] == 0.25
+
+
+def test_final_chunk_status_discards_buffered_progress():
+    """Test that progress buffered for a chunk is dropped once its final status is written"""
+    database = MemoryDatabase()
+    agents = MemoryAgentRepository(database)
+    tasks = MemoryTaskRepository(database)
+    buffer = HeartbeatBuffer(flush_interval=1000)
+    task_usecase = TaskUseCase(tasks, agents, MemoryResultRepository(database), heartbeat_buffer=buffer)
+    
+    async def scenario():
+        agent = await agents.create(Agent(name="Agent", api_key="key", status=AgentStatus.ONLINE))
+        task = await tasks.create(Task(name="MD5", hash_type=HashType.MD5, hashes=["a" * 32], wordlist_path="list"))
+        chunk = await tasks.create_chunk(Chunk(task_id=task.id, skip=0, limit=100))
+        await task_usecase.auto_assign_tasks()
+        
+        buffer.record_chunk_progress(chunk.id, agent.id, progress=0.9)
+        await task_usecase.update_task_status(task.id, TaskStatus.COMPLETED, 1.0, chunk_id=chunk.id, agent_id=agent.id)
+        return chunk
+    
+    chunk = asyncio.run(scenario())
+    assert chunk.id not in buffer._chunks
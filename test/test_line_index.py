@@ -0,0 +1,88 @@
+import asyncio
+
+from config.memory_database import MemoryDatabase
+from entity.agent import Agent, AgentStatus
+from entity.task import Task, HashType
+from repository.memory_repository import MemoryTaskRepository, MemoryAgentRepository, MemoryResultRepository
+from usecase import line_index
+from usecase.file_catalog import FileCatalog
+from usecase.file_store import FileStore
+from usecase.line_index import LineIndex
+from usecase.task_usecase import TaskUseCase
+
+
+def test_line_offsets_match_a_full_scan(tmp_path, monkeypatch):
+    """Test that every line's offset is found from the sparse index, whatever the block boundaries"""
+    # Offsets and line breaks land on block and window boundaries
+    monkeypatch.setattr(line_index, "BLOCK_SIZE", 7)
+    monkeypatch.setattr(line_index, "WINDOW_SIZE", 3)
+    words = [b"password", b"", b"abc", b"letmein", b"x", b"123456", b"qwerty", b"zz", b"dragon", b"last"]
+    wordlist = tmp_path / "words.txt"
+    # The last word has no line break
+    wordlist.write_bytes(b"\n".join(words))
+    
+    LineIndex.build(str(wordlist), stride=3).save(str(tmp_path / "words.lines"))
+    index = LineIndex.load(str(tmp_path / "words.lines"), str(wordlist))
+    
+    assert index.lines == 10
+    assert len(index.offsets) == 4
+    starts = [sum(len(word) + 1 for word in words[:line]) for line in range(len(words))]
+    assert [index.line_offset(line) for line in range(len(words))] == starts
+    assert index.line_offset(10) == index.size
+    
+    offset, length = index.byte_range(2, 5)
+    assert wordlist.read_bytes()[offset:offset + length] == b"abc\nletmein\nx\n"
+    offset, length = index.byte_range(8, 12)
+    assert wordlist.read_bytes()[offset:offset + length] == b"dragon\nlast"
+    
+    # An index of another version of the wordlist is not used
+    wordlist.write_bytes(b"changed\n")
+    try:
+        LineIndex.load(str(tmp_path / "words.lines"), str(wordlist))
+        assert False, "Stale index was loaded"
+    except ValueError:
+        pass
+
+
+def test_chunks_come_with_the_byte_range_of_their_words(tmp_path):
+    """Test that an uploaded wordlist is indexed and sets the keyspace and each chunk's byte range"""
+    store = FileStore(str(tmp_path / "uploads"))
+    words = b"".join(b"word%d\n" % number for number in range(100))
+    
+    async def scenario():
+        stored = await store.store("wordlists", "list.txt", stream(words))
+        assert store.line_index_path(stored["sha256"]).exists()
+        
+        database = MemoryDatabase()
+        catalog = FileCatalog(store, [])
+        task_usecase = TaskUseCase(
+            MemoryTaskRepository(database), MemoryAgentRepository(database), MemoryResultRepository(database),
+            file_catalog=catalog
+        )
+        agents = MemoryAgentRepository(database)
+        agent = await agents.create(Agent(name="Agent", api_key="key", status=AgentStatus.ONLINE))
+        task = await task_usecase.create_task(Task(
+            name="MD5", hash_type=HashType.MD5, hashes=["a" * 32], wordlist_path="list.txt"
+        ))
+        # Hashcat is not asked for the keyspace of an indexed wordlist
+        task_usecase.hashcat_usecase.get_keyspace = None
+        await task_usecase.auto_assign_tasks()
+        chunk = await task_usecase.get_chunk((await agents.find_by_id(agent.id)).current_chunk_id)
+        chunk.skip, chunk.limit = 40, 25
+        return await task_usecase.get_task(task.id), await catalog.describe_task(task, chunk)
+    
+    task, files = asyncio.run(scenario())
+    assert task.keyspace == 100
+    wordlist = files["wordlist_path"]
+    assert wordlist["lines"] == 100
+    word_slice = wordlist["slice"]
+    assert (word_slice["skip"], word_slice["limit"]) == (40, 25)
+    assert words[word_slice["offset"]:word_slice["offset"] + word_slice["length"]].split(b"\n")[:-1] == [
+        b"word%d" % number for number in range(40, 65)
+    ]
+
+
+async def stream(*chunks):
+    """Async iterable over byte chunks"""
+    for chunk in chunks:
+        yield chunk
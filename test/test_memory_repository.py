@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+from config.memory_database import MemoryDatabase, MemoryCollection, DuplicateKeyError
+from entity.task import Task, TaskStatus
+from entity.chunk import Chunk, ChunkStatus
+from entity.agent import Agent, AgentStatus
+from entity.result import Result
+from repository.memory_repository import MemoryTaskRepository, MemoryAgentRepository, MemoryResultRepository
+
+
+def test_collection_indexes_follow_updates():
+    """Test that secondary and unique indexes track updates and deletes"""
+    collection = MemoryCollection(indexes=[("status",)], unique=[("api_key",)])
+    first = collection.insert({"status": "online", "api_key": "a"})
+    second = collection.insert({"status": "online", "api_key": "b"})
+    
+    assert collection.find_ids(("status",), "online") == [first, second]
+    assert collection.lookup(("api_key",), "b")["id"] == second
+    
+    collection.update(first, {"status": "busy"})
+    assert collection.find_ids(("status",), "online") == [second]
+    assert collection.find_ids(("status",), "busy") == [first]
+    
+    with pytest.raises(DuplicateKeyError):
+        collection.update(first, {"api_key": "b"})
+    with pytest.raises(DuplicateKeyError):
+        collection.insert({"status": "online", "api_key": "a"})
+    
+    assert collection.delete(second)
+    assert collection.lookup(("api_key",), "b") is None
+    assert collection.find(("status",), "online") == []
+
+
+def test_returned_documents_are_copies():
+    """Test that changing a returned entity does not change the stored document"""
+    repo = MemoryTaskRepository(MemoryDatabase())
+    task = asyncio.run(repo.create(Task(name="Test", hashes=["a", "b"])))
+    
+    found = asyncio.run(repo.find_by_id(task.id))
+    found.hashes.append("c")
+    
+    assert asyncio.run(repo.find_by_id(task.id)).hashes == ["a", "b"]
+    # List views leave out the hashes but keep their count
+    summary = asyncio.run(repo.find_all())[0]
+    assert summary.hashes == []
+    assert summary.hash_count == 2
+
+
+def test_chunk_claims_and_leases():
+    """Test that chunks are claimed once and again after their lease expired"""
+    repo = MemoryTaskRepository(MemoryDatabase())
+    task = asyncio.run(repo.create(Task(name="Test", hashes=["a"])))
+    chunk = asyncio.run(repo.create_chunk(Chunk(task_id=task.id, skip=0, limit=100)))
+    
+    claimed = asyncio.run(repo.claim_next_chunk("agent1", lease_seconds=60))
+    assert claimed.id == chunk.id
+    assert claimed.status == ChunkStatus.ASSIGNED
+    assert asyncio.run(repo.claim_next_chunk("agent2", lease_seconds=60)) is None
+    assert asyncio.run(repo.count_open_chunks(task.id)) == 1
+    
+    # Expire the lease
+    repo.chunks.update(chunk.id, {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    reclaimed = asyncio.run(repo.claim_chunk(chunk.id, "agent2", lease_seconds=60))
+    assert reclaimed.agent_id == "agent2"
+    assert asyncio.run(repo.find_held_chunk("agent2")).id == chunk.id
+    assert asyncio.run(repo.find_held_chunk("agent1")) is None
+    # The agent that let the lease expire cannot hand the chunk back any more
+    assert asyncio.run(repo.requeue_chunk(chunk.id, "agent1")) is False
+    
+    # Reports from the agent that lost the chunk are ignored
+    assert asyncio.run(repo.update_chunk_status(chunk.id, ChunkStatus.COMPLETED, agent_id="agent1")) is None
+    completed = asyncio.run(repo.update_chunk_status(chunk.id, ChunkStatus.COMPLETED, agent_id="agent2"))
+    assert completed.status == ChunkStatus.COMPLETED
+    # Nor can a late report bring a finished chunk back
+    assert asyncio.run(repo.update_chunk_status(chunk.id, ChunkStatus.RUNNING, agent_id="agent2")) is None
+    assert asyncio.run(repo.sum_completed_keyspace(task.id)) == 100
+
+
+def test_agent_status_and_claims():
+    """Test that a busy agent stays busy and can only be claimed when idle"""
+    repo = MemoryAgentRepository(MemoryDatabase())
+    agent = asyncio.run(repo.create(Agent(name="Agent", api_key="key", status=AgentStatus.ONLINE)))
+    
+    assert asyncio.run(repo.find_by_api_key("key")).id == agent.id
+    assert asyncio.run(repo.claim_task(agent.id, "task1")).status == AgentStatus.BUSY
+    assert asyncio.run(repo.claim_task(agent.id, "task2")) is None
+    assert asyncio.run(repo.update_status(agent.id, AgentStatus.ONLINE)).status == AgentStatus.BUSY
+    
+    assert asyncio.run(repo.clear_task_by_task_id("task1")) == 1
+    assert [a.id for a in asyncio.run(repo.find_available_agents())] == [agent.id]
+    assert asyncio.run(repo.update_heartbeat("missing", return_document=False)) is False
+    
+    # An agent is only released from the chunk it still holds
+    asyncio.run(repo.claim_task(agent.id, "task2", "chunk1"))
+    assert asyncio.run(repo.release_chunk(agent.id, "chunk2")) is False
+    assert asyncio.run(repo.release_chunk(agent.id, "chunk1")) is True
+    assert asyncio.run(repo.find_by_id(agent.id)).current_task_id is None
+
+
+def test_results_are_unique_per_task():
+    """Test that duplicate results are skipped and results page in insertion order"""
+    repo = MemoryResultRepository(MemoryDatabase())
+    created = asyncio.run(repo.create_many([
+        Result(task_id="task1", hash_value="a", plaintext="1"),
+        Result(task_id="task1", hash_value="a", plaintext="1"),
+        Result(task_id="task1", hash_value="b", plaintext="2"),
+        Result(task_id="task2", hash_value="a", plaintext="1"),
+    ]))
+    
+    assert len(created) == 3
+    assert asyncio.run(repo.find_existing_hashes("task1", ["a", "c"])) == {"a"}
+    assert [r.hash_value for r in asyncio.run(repo.find_by_task_id("task1", skip=1, limit=1))] == ["b"]
+    assert asyncio.run(repo.delete_by_task_id("task1")) == 2
+    assert asyncio.run(repo.find_by_hash("a")).task_id == "task2"
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Test that a snapshot restores documents and indexes"""
+    path = str(tmp_path / "memory.snapshot")
+    database = MemoryDatabase(path)
+    task = asyncio.run(MemoryTaskRepository(database).create(Task(name="Test", hashes=["a"])))
+    asyncio.run(MemoryAgentRepository(database).create(Agent(name="Agent", api_key="key")))
+    assert database.snapshot()
+    
+    restored = MemoryDatabase(path)
+    assert restored.load()
+    tasks = asyncio.run(MemoryTaskRepository(restored).find_by_status(TaskStatus.PENDING))
+    assert [t.id for t in tasks] == [task.id]
+    assert asyncio.run(MemoryAgentRepository(restored).find_by_api_key("key")) is not None
@@ -0,0 +1,82 @@
+import asyncio
+
+from config.memory_database import MemoryDatabase
+from config.sqlite_database import SQLiteDatabase
+from entity.task import Task, TaskStatus
+from repository.memory_repository import (
+    MemoryTaskRepository, MemoryAgentRepository, MemoryResultRepository, MemoryPotfileRepository
+)
+from repository.sqlite_repository import SQLitePotfileRepository
+from usecase.potfile_usecase import PotfileUseCase, normalize_hash
+from usecase.task_usecase import TaskUseCase
+
+
+def create_task_usecase(database):
+    """Task use case on the memory backend with the potfile enabled"""
+    return TaskUseCase(
+        MemoryTaskRepository(database),
+        MemoryAgentRepository(database),
+        MemoryResultRepository(database),
+        potfile_usecase=PotfileUseCase(MemoryPotfileRepository(database))
+    )
+
+
+def test_normalize_hash():
+    """Test that hex digests ignore case and other hashes are kept as they are"""
+    assert normalize_hash(" 5F4DCC3B5AA765D61D8327DEB882CF99\n") == "5f4dcc3b5aa765d61d8327deb882cf99"
+    assert normalize_hash("$2a$05$LhayLxezLhK1LhWvKxCyLO") == "$2a$05$LhayLxezLhK1LhWvKxCyLO"
+
+
+def test_resolve_by_hash_type():
+    """Test that known hashes resolve per hash type, whatever their case"""
+    potfile = PotfileUseCase(MemoryPotfileRepository(MemoryDatabase()))
+    assert asyncio.run(potfile.record(0, [{"hash": "AA", "plaintext": "1"}, {"hash": "aa", "plaintext": "1"}])) == 1
+    assert asyncio.run(potfile.record(0, [{"hash": "aa", "plaintext": "1"}])) == 0
+    
+    assert asyncio.run(potfile.resolve(0, ["aA", "bb"])) == {"aA": "1"}
+    assert asyncio.run(potfile.resolve(1000, ["aa"])) == {}
+
+
+def test_delta_since(tmp_path):
+    """Test that deltas return entries added at or after since, oldest first"""
+    async def scenario(database):
+        potfile = PotfileUseCase(SQLitePotfileRepository(database))
+        await potfile.record(0, [{"hash": "aa", "plaintext": "1"}])
+        await potfile.record(0, [{"hash": "bb", "plaintext": "2"}])
+        await potfile.record(100, [{"hash": "cc", "plaintext": "3"}])
+        
+        entries = await potfile.get_delta(0)
+        assert [entry.hash_value for entry in entries] == ["aa", "bb"]
+        assert await potfile.resolve(0, ["BB", "cc"]) == {"BB": "2"}
+        return [entry.hash_value for entry in await potfile.get_delta(0, entries[1].added_at)]
+    
+    async def run():
+        database = await SQLiteDatabase(str(tmp_path / "test.db")).connect()
+        try:
+            return await scenario(database)
+        finally:
+            await database.close()
+    
+    assert asyncio.run(run()) == ["bb"]
+
+
+def test_create_task_resolves_known_hashes():
+    """Test that known hashes become results at creation and are left out of the work"""
+    database = MemoryDatabase()
+    task_usecase = create_task_usecase(database)
+    first = asyncio.run(task_usecase.create_task(Task(name="First", hash_type_id=0, hashes=["aa", "bb"])))
+    asyncio.run(task_usecase.add_recovered_hashes(first.id, [{"hash": "aa", "plaintext": "1"}]))
+    
+    task = asyncio.run(task_usecase.create_task(Task(name="Second", hash_type_id=0, hashes=["AA", "cc"])))
+    assert task.hashes == ["cc"]
+    assert task.hash_count == 2
+    assert task.recovered_count == 1
+    assert task.status == TaskStatus.PENDING
+    results = asyncio.run(task_usecase.get_task_results(task.id))
+    assert [(result.hash_value, result.plaintext) for result in results] == [("AA", "1")]
+    
+    # Nothing is left to crack
+    done = asyncio.run(task_usecase.create_task(Task(name="Third", hash_type_id=0, hashes=["aa"])))
+    assert done.status == TaskStatus.COMPLETED
+    assert done.hashes == []
+    assert done.recovered_count == done.hash_count == 1
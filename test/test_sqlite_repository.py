@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from config.sqlite_database import SQLiteDatabase
+from entity.task import Task, TaskStatus
+from entity.chunk import Chunk, ChunkStatus
+from entity.agent import Agent, AgentStatus
+from entity.result import Result
+from repository.sqlite_repository import SQLiteTaskRepository, SQLiteAgentRepository, SQLiteResultRepository
+
+
+def run_with_database(path, scenario):
+    """Run an async scenario against a fresh SQLite database"""
+    async def run():
+        database = await SQLiteDatabase(str(path)).connect()
+        try:
+            return await scenario(database)
+        finally:
+            await database.close()
+    return asyncio.run(run())
+
+
+def test_task_round_trip(tmp_path):
+    """Test that tasks keep their fields and list views leave out the hashes"""
+    async def scenario(database):
+        repo = SQLiteTaskRepository(database)
+        task = await repo.create(Task(name="Test", hashes=["a", "b"], metadata={"source": "test"}))
+        
+        found = await repo.find_by_id(task.id)
+        assert found.hashes == ["a", "b"]
+        assert found.metadata == {"source": "test"}
+        assert found.status == TaskStatus.PENDING
+        assert found.created_at == task.created_at
+        
+        summary = (await repo.find_by_status(TaskStatus.PENDING))[0]
+        assert summary.hashes == []
+        assert summary.hash_count == 2
+        
+        assert (await repo.update_status(task.id, TaskStatus.RUNNING, progress=0.5)).progress == 0.5
+        # An update that changes nothing still finds the task
+        assert await repo.update_status(task.id, TaskStatus.RUNNING, progress=0.5, return_document=False)
+        assert await repo.update_status("missing", TaskStatus.RUNNING) is None
+        assert (await repo.increment_recovered(task.id, 2)).recovered_count == 2
+    
+    run_with_database(tmp_path / "test.db", scenario)
+
+
+def test_chunk_claims_and_keyspace(tmp_path):
+    """Test keyspace reservation, chunk claims and lease expiry"""
+    async def scenario(database):
+        repo = SQLiteTaskRepository(database)
+        task = await repo.create(Task(name="Test", hashes=["a"]))
+        assert await repo.set_keyspace(task.id, 150)
+        assert not await repo.set_keyspace(task.id, 200)
+        assert await repo.advance_keyspace_offset(task.id, 100) == 0
+        assert await repo.advance_keyspace_offset(task.id, 100) == 100
+        assert await repo.advance_keyspace_offset(task.id, 100) is None
+        assert await repo.find_pending_tasks() == []
+        
+        chunk = await repo.create_chunk(Chunk(task_id=task.id, skip=0, limit=100))
+        claimed = await repo.claim_next_chunk("agent1", lease_seconds=60)
+        assert claimed.id == chunk.id
+        assert await repo.claim_next_chunk("agent2", lease_seconds=60) is None
+        
+        # Expire the lease
+        await database.write(lambda connection: SQLiteDatabase.update(
+            connection, "task_chunks", {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)},
+            "id = ?", (chunk.id,)
+        ))
+        assert (await repo.claim_chunk(chunk.id, "agent2", lease_seconds=60)).agent_id == "agent2"
+        assert (await repo.find_held_chunk("agent2")).id == chunk.id
+        assert await repo.find_held_chunk("agent1") is None
+        # The agent that let the lease expire cannot hand the chunk back any more
+        assert await repo.requeue_chunk(chunk.id, "agent1") is False
+        assert await repo.update_chunk_status(chunk.id, ChunkStatus.COMPLETED, agent_id="agent1") is None
+        assert (await repo.update_chunk_status(chunk.id, ChunkStatus.COMPLETED, agent_id="agent2")).is_open() is False
+        assert await repo.update_chunk_status(chunk.id, ChunkStatus.RUNNING, agent_id="agent2") is None
+        assert await repo.count_open_chunks(task.id) == 0
+        assert await repo.sum_completed_keyspace(task.id) == 100
+        assert await repo.retry_chunk(chunk.id) is False
+        
+        # A failed chunk goes back to the queue, counting the failure
+        failed = await repo.create_chunk(Chunk(task_id=task.id, skip=100, limit=50))
+        await repo.claim_chunk(failed.id, "agent1", lease_seconds=60)
+        await repo.update_chunk_status(failed.id, ChunkStatus.FAILED, error="crash", agent_id="agent1")
+        assert await repo.retry_chunk(failed.id)
+        retried = await repo.find_chunk_by_id(failed.id)
+        assert (retried.status, retried.agent_id, retried.failures) == (ChunkStatus.PENDING, None, 1)
+        assert (await repo.claim_next_chunk("agent2", lease_seconds=60)).id == failed.id
+    
+    run_with_database(tmp_path / "test.db", scenario)
+
+
+def test_agents_and_results(tmp_path):
+    """Test agent claims and duplicate result handling"""
+    async def scenario(database):
+        agents = SQLiteAgentRepository(database)
+        agent = await agents.create(Agent(name="Agent", api_key="key", status=AgentStatus.ONLINE))
+        assert (await agents.find_by_api_key("key")).id == agent.id
+        assert (await agents.claim_task(agent.id, "task1")).status == AgentStatus.BUSY
+        assert await agents.claim_task(agent.id, "task2") is None
+        assert (await agents.update_status(agent.id, AgentStatus.ONLINE)).status == AgentStatus.BUSY
+        assert await agents.clear_task_by_task_id("task1") == 1
+        assert [a.id for a in await agents.find_available_agents()] == [agent.id]
+        
+        results = SQLiteResultRepository(database)
+        created = await results.create_many([
+            Result(task_id="task1", hash_value="a", plaintext="1"),
+            Result(task_id="task1", hash_value="a", plaintext="1"),
+            Result(task_id="task1", hash_value="b", plaintext="2"),
+        ])
+        assert len(created) == 2
+        assert await results.find_existing_hashes("task1", ["a", "c"]) == {"a"}
+        assert [r.hash_value for r in await results.find_by_task_id("task1", skip=1, limit=1)] == ["b"]
+    
+    run_with_database(tmp_path / "test.db", scenario)
+
+
+def test_data_survives_reopening(tmp_path):
+    """Test that data is read back after the database is closed and reopened"""
+    path = tmp_path / "test.db"
+    
+    async def create(database):
+        return (await SQLiteTaskRepository(database).create(Task(name="Test", hashes=["a"]))).id
+    
+    async def find(database):
+        return await SQLiteTaskRepository(database).find_by_id(task_id)
+    
+    task_id = run_with_database(path, create)
+    assert run_with_database(path, find).name == "Test"
@@ -85,3 +85,45 @@ def test_task_from_dict():
     assert task.hash_type_id == 0
     assert task.hashes == ["5f4dcc3b5aa765d61d8327deb882cf99"]
     assert task.status == TaskStatus.PENDING
+
+
+def test_task_create_shard():
+    """Test creating a hash shard from a parent task"""
+    parent = Task(
+        id="parent123",
+        name="NTLM Dump",
+        hash_type=HashType.NTLM,
+        hash_type_id=1000,
+        wordlist_path="/path/to/wordlist.txt",
+        priority=3,
+        hash_count=2500,
+        shard_count=3
+    )
+    
+    shard = parent.create_shard(1, ["hash1", "hash2"])
+    
+    assert parent.is_sharded() is True
+    assert shard.is_sharded() is False
+    assert shard.parent_id == "parent123"
+    assert shard.shard_index == 1
+    assert shard.name == "NTLM Dump [2/3]"
+    assert shard.hashes == ["hash1", "hash2"]
+    assert shard.hash_count == 2
+    assert shard.hash_type == HashType.NTLM
+    assert shard.wordlist_path == "/path/to/wordlist.txt"
+    assert shard.priority == 3
+    assert shard.status == TaskStatus.PENDING
+
+
+def test_task_from_legacy_dict():
+    """Test that recovered hashes stored on old task documents become a count"""
+    task = Task.from_dict({
+        "id": "123",
+        "name": "Old Task",
+        "hashes": ["hash1", "hash2"],
+        "recovered_hashes": [{"hash": "hash1", "plaintext": "password"}]
+    })
+    
+    assert task.recovered_count == 1
+    assert "recovered_hashes" not in task.to_dict()
+    assert task.to_dict()["recovered_count"] == 1
@@ -0,0 +1,154 @@
+import asyncio
+
+from config.memory_database import MemoryDatabase
+from entity.agent import Agent, AgentStatus
+from entity.chunk import ChunkStatus
+from entity.task import Task, TaskStatus, HashType
+from repository.memory_repository import MemoryTaskRepository, MemoryAgentRepository, MemoryResultRepository
+from usecase import task_usecase as task_usecase_module
+from usecase.task_usecase import TaskUseCase, NotAssignedError
+
+
+def create_task_usecase(database):
+    """Task use case on the memory backend"""
+    return TaskUseCase(
+        MemoryTaskRepository(database), MemoryAgentRepository(database), MemoryResultRepository(database)
+    )
+
+
+def test_cancel_keeps_finished_shards(monkeypatch):
+    """Test that a sharded task is split by TASK_CHUNK_SIZE and cancelling it leaves finished shards alone"""
+    monkeypatch.setattr(task_usecase_module, "TASK_CHUNK_SIZE", 2)
+    task_usecase = create_task_usecase(MemoryDatabase())
+    
+    async def scenario():
+        parent = await task_usecase.create_task(Task(
+            name="MD5", hash_type=HashType.MD5, hashes=["%032x" % number for number in range(5)], wordlist_path="list"
+        ))
+        shards = await task_usecase.task_repo.find_by_parent_id(parent.id, include_hashes=True)
+        await task_usecase.task_repo.update_status(shards[0].id, TaskStatus.COMPLETED, 1.0, return_document=False)
+        await task_usecase.task_repo.update_status(shards[1].id, TaskStatus.FAILED, return_document=False)
+        
+        cancelled = await task_usecase.cancel_task(parent.id)
+        statuses = [(await task_usecase.get_task(shard.id)).status for shard in shards]
+        return parent, shards, cancelled, statuses
+    
+    parent, shards, cancelled, statuses = asyncio.run(scenario())
+    assert parent.shard_count == 3
+    assert [len(shard.hashes) for shard in shards] == [2, 2, 1]
+    assert cancelled.status == TaskStatus.CANCELLED
+    assert statuses == [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]
+
+
+async def start_keyspace_task(task_usecase, keyspace, agent_count=1):
+    """Create a task with a known keyspace and the agents to work on it"""
+    async def get_keyspace(task):
+        return keyspace
+    
+    task_usecase.hashcat_usecase.get_keyspace = get_keyspace
+    task = await task_usecase.create_task(Task(
+        name="MD5", hash_type=HashType.MD5, hashes=["0" * 32], wordlist_path="list"
+    ))
+    agents = [
+        await task_usecase.agent_repo.create(Agent(name=f"agent-{number}", api_key=f"key-{number}", status=AgentStatus.ONLINE))
+        for number in range(agent_count)
+    ]
+    return task, agents
+
+
+def test_keyspace_is_cut_into_chunks_per_agent(monkeypatch):
+    """Test that each available agent gets its own --skip/--limit slice of the keyspace"""
+    monkeypatch.setattr(task_usecase_module, "TASK_DEFAULT_CHUNK_KEYSPACE", 400)
+    task_usecase = create_task_usecase(MemoryDatabase())
+    
+    async def scenario():
+        task, agents = await start_keyspace_task(task_usecase, 1000, agent_count=3)
+        assigned = await task_usecase.auto_assign_tasks()
+        chunks = await task_usecase.get_task_chunks(task.id)
+        return assigned, agents, chunks, await task_usecase.get_task(task.id)
+    
+    assigned, agents, chunks, task = asyncio.run(scenario())
+    assert assigned == 3
+    assert [(chunk.skip, chunk.limit) for chunk in chunks] == [(0, 400), (400, 400), (800, 200)]
+    assert sorted(chunk.agent_id for chunk in chunks) == sorted(agent.id for agent in agents)
+    assert all(chunk.status == ChunkStatus.ASSIGNED for chunk in chunks)
+    assert task.keyspace == 1000 and task.is_fully_dispatched()
+
+
+def test_expired_lease_is_reclaimed_by_another_agent(monkeypatch):
+    """Test that a chunk whose holder stopped renewing the lease goes to the next free agent"""
+    # Leases granted in these tests are already expired
+    monkeypatch.setattr(task_usecase_module, "TASK_LEASE_DURATION", -1)
+    task_usecase = create_task_usecase(MemoryDatabase())
+    
+    async def scenario():
+        task, (stalled,) = await start_keyspace_task(task_usecase, 100)
+        await task_usecase.auto_assign_tasks()
+        chunk = await task_usecase.get_held_chunk(stalled.id)
+        
+        other = await task_usecase.agent_repo.create(Agent(name="other", api_key="other-key", status=AgentStatus.ONLINE))
+        assert await task_usecase.auto_assign_tasks() == 1
+        reclaimed = await task_usecase.get_chunk(chunk.id)
+        released = await task_usecase.agent_repo.find_by_id(stalled.id)
+        
+        try:
+            await task_usecase.update_chunk_status(task.id, chunk.id, TaskStatus.COMPLETED, 1.0, agent_id=stalled.id)
+        except NotAssignedError:
+            refused = True
+        else:
+            refused = False
+        return other, reclaimed, released, refused
+    
+    other, reclaimed, released, refused = asyncio.run(scenario())
+    assert reclaimed.agent_id == other.id
+    assert reclaimed.status == ChunkStatus.ASSIGNED
+    assert released.current_chunk_id is None
+    assert refused
+
+
+def test_failed_chunk_is_requeued_until_max_attempts(monkeypatch):
+    """Test that a failing chunk is run again, and fails its task once TASK_CHUNK_MAX_ATTEMPTS runs failed"""
+    monkeypatch.setattr(task_usecase_module, "TASK_CHUNK_MAX_ATTEMPTS", 2)
+    task_usecase = create_task_usecase(MemoryDatabase())
+    
+    async def fail_held_chunk(task, agent):
+        await task_usecase.auto_assign_tasks()
+        chunk = await task_usecase.get_held_chunk(agent.id)
+        await task_usecase.update_chunk_status(
+            task.id, chunk.id, TaskStatus.FAILED, error="clGetDeviceInfo(): CL_DEVICE_NOT_AVAILABLE", agent_id=agent.id
+        )
+        return await task_usecase.get_chunk(chunk.id), await task_usecase.get_task(task.id)
+    
+    async def scenario():
+        task, (agent,) = await start_keyspace_task(task_usecase, 100)
+        first = await fail_held_chunk(task, agent)
+        freed = await task_usecase.agent_repo.find_by_id(agent.id)
+        second = await fail_held_chunk(task, agent)
+        return first, freed, second
+    
+    (requeued, running), freed, (failed, task) = asyncio.run(scenario())
+    assert requeued.status == ChunkStatus.PENDING
+    assert requeued.failures == 1 and requeued.agent_id is None
+    assert running.status == TaskStatus.RUNNING
+    assert freed.current_chunk_id is None
+    assert failed.id == requeued.id and failed.status == ChunkStatus.FAILED
+    assert task.status == TaskStatus.FAILED
+    assert task.error == "clGetDeviceInfo(): CL_DEVICE_NOT_AVAILABLE"
+
+
+def test_deterministic_failure_fails_task_at_once():
+    """Test that a hashcat error inherent to the task is not retried"""
+    task_usecase = create_task_usecase(MemoryDatabase())
+    
+    async def scenario():
+        task, (agent,) = await start_keyspace_task(task_usecase, 100)
+        await task_usecase.auto_assign_tasks()
+        chunk = await task_usecase.get_held_chunk(agent.id)
+        await task_usecase.update_chunk_status(
+            task.id, chunk.id, TaskStatus.FAILED, error="No hashes loaded.", agent_id=agent.id
+        )
+        return await task_usecase.get_chunk(chunk.id), await task_usecase.get_task(task.id)
+    
+    chunk, task = asyncio.run(scenario())
+    assert chunk.status == ChunkStatus.FAILED and chunk.failures == 0
+    assert task.status == TaskStatus.FAILED
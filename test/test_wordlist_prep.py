@@ -0,0 +1,110 @@
+import asyncio
+import gzip
+import json
+
+from config.memory_database import MemoryDatabase
+from entity.agent import Agent, AgentStatus
+from entity.task import Task, TaskStatus, HashType
+from repository.memory_repository import MemoryTaskRepository, MemoryAgentRepository, MemoryResultRepository
+from usecase import wordlist_prep
+from usecase.file_catalog import FileCatalog
+from usecase.file_store import FileStore
+from usecase.task_usecase import TaskUseCase
+from usecase.wordlist_prep import WordlistPreprocessor, index_path, line_range, load_index
+
+
+def test_prepare_sorts_deduplicates_and_buckets(tmp_path, monkeypatch):
+    """Test that many small runs merge into one sorted, deduplicated list indexed by length"""
+    # Several merge passes even for a small list
+    monkeypatch.setattr(wordlist_prep, "MERGE_FAN_IN", 2)
+    words = [b"password", b"abc", b"letmein", b"abc", b"12345678", b"", b"x" * 300, b"zz", b"password\r", b"qwerty"]
+    source = tmp_path / "words.txt.gz"
+    source.write_bytes(gzip.compress(b"\n".join(words * 3)))
+    destination = tmp_path / "words.prepared.txt"
+    
+    index = WordlistPreprocessor(chunk_size=16).prepare(str(source), str(destination))
+    
+    assert destination.read_bytes().split(b"\n")[:-1] == [
+        b"zz", b"abc", b"qwerty", b"letmein", b"12345678", b"password"
+    ]
+    assert index["lines"] == 6
+    assert index["source_lines"] == 30
+    assert index["rejected"] == 6
+    assert index["duplicates"] == 18
+    assert [(bucket["length"], bucket["first_line"], bucket["lines"]) for bucket in index["buckets"]] == [
+        (2, 0, 1), (3, 1, 1), (6, 2, 1), (7, 3, 1), (8, 4, 2)
+    ]
+    assert index["buckets"][-1]["offset"] == len(b"zz\nabc\nqwerty\nletmein\n")
+    assert json.loads((tmp_path / "words.prepared.txt.index.json").read_text())["sha256"] == index["sha256"]
+    
+    # WPA takes 8 to 63 characters
+    assert line_range(load_index(str(destination)), 8, 63) == (4, 2)
+    
+    # An index of another version of the list is not used
+    destination.write_bytes(b"changed\n")
+    assert load_index(str(destination)) is None
+
+
+def test_scheduler_uses_prepared_index(tmp_path):
+    """Test that chunks of a prepared wordlist cover only the words hashcat accepts for the mode"""
+    store = FileStore(str(tmp_path / "uploads"))
+    
+    async def scenario():
+        await store.store("wordlists", "list.txt", stream(b"a\nbb\n12345678\nabcdefgh\n123456789\n"))
+        prepared = await store.prepare_wordlist("list.txt")
+        assert prepared["path"].endswith("list.prepared.txt")
+        
+        database = MemoryDatabase()
+        task_usecase = TaskUseCase(
+            MemoryTaskRepository(database), MemoryAgentRepository(database), MemoryResultRepository(database),
+            file_catalog=FileCatalog(store, [])
+        )
+        agents = MemoryAgentRepository(database)
+        agent = await agents.create(Agent(name="Agent", api_key="key", status=AgentStatus.ONLINE))
+        task = await task_usecase.create_task(Task(
+            name="WPA", hash_type=HashType.WPA, hashes=["a" * 32], wordlist_path="list.prepared.txt"
+        ))
+        await task_usecase.auto_assign_tasks()
+        chunk = await task_usecase.get_chunk((await agents.find_by_id(agent.id)).current_chunk_id)
+        return chunk, await task_usecase.get_task(task.id)
+    
+    chunk, task = asyncio.run(scenario())
+    assert task.keyspace == 3
+    assert (chunk.skip, chunk.limit) == (2, 3)
+    
+    # Removing the wordlist removes its index too
+    assert store.remove(tmp_path / "uploads" / "wordlists" / "list.prepared.txt")
+    assert not (tmp_path / "uploads" / "wordlists" / index_path("list.prepared.txt")).exists()
+
+
+def test_task_without_usable_words_completes(tmp_path):
+    """Test that a prepared wordlist without words of usable length completes the task instead of running it"""
+    store = FileStore(str(tmp_path / "uploads"))
+    
+    async def scenario():
+        await store.store("wordlists", "short.txt", stream(b"a\nbb\nabcdefg\n"))
+        await store.prepare_wordlist("short.txt")
+        
+        database = MemoryDatabase()
+        task_usecase = TaskUseCase(
+            MemoryTaskRepository(database), MemoryAgentRepository(database), MemoryResultRepository(database),
+            file_catalog=FileCatalog(store, [])
+        )
+        await MemoryAgentRepository(database).create(Agent(name="Agent", api_key="key", status=AgentStatus.ONLINE))
+        task = await task_usecase.create_task(Task(
+            name="WPA", hash_type=HashType.WPA, hashes=["a" * 32], wordlist_path="short.prepared.txt"
+        ))
+        assigned = await task_usecase.auto_assign_tasks()
+        return assigned, await task_usecase.get_task(task.id), await task_usecase.get_task_chunks(task.id)
+    
+    assigned, task, chunks = asyncio.run(scenario())
+    assert assigned == 0
+    assert task.status == TaskStatus.COMPLETED
+    assert task.keyspace == 0
+    assert chunks == []
+
+
+async def stream(*chunks):
+    """Async iterable over byte chunks"""
+    for chunk in chunks:
+        yield chunk
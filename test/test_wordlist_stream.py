@@ -0,0 +1,66 @@
+import gzip
+import subprocess
+
+import pytest
+
+from usecase import wordlist_stream
+from usecase.wordlist_stream import WordlistFeeder, count_lines, detect_compression
+
+
+def feed_through_cat(feeder):
+    """Run a feeder into cat standing in for hashcat, returning what cat read"""
+    process = subprocess.Popen(["cat"], stdin=feeder.open_pipe(), stdout=subprocess.PIPE)
+    feeder.start()
+    output = process.communicate()[0]
+    feeder.join()
+    return output
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    """Decompress a few bytes at a time so words straddle blocks"""
+    monkeypatch.setattr(wordlist_stream, "BLOCK_SIZE", 7)
+
+
+def test_gzip_wordlist_chunk(tmp_path, small_blocks):
+    """Test that a chunk of a gzip wordlist is streamed word for word"""
+    words = [f"word{index}".encode() for index in range(20)]
+    path = tmp_path / "words.txt.gz"
+    # No line break after the last word
+    path.write_bytes(gzip.compress(b"\n".join(words)))
+    
+    assert detect_compression(str(path)) == "gzip"
+    assert count_lines(str(path)) == 20
+    
+    feeder = WordlistFeeder(str(path), skip=3, limit=5)
+    assert feed_through_cat(feeder) == b"".join(word + b"\n" for word in words[3:8])
+    assert feeder.lines_fed == 5
+    assert feeder.progress == 1.0
+    
+    feeder = WordlistFeeder(str(path), skip=17)
+    assert feed_through_cat(feeder) == b"word17\nword18\nword19\n"
+    assert feeder.error is None
+
+
+def test_zstd_wordlist(tmp_path):
+    """Test that zstd wordlists are decompressed"""
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "words.txt.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(b"a\nb\nc\n"))
+    
+    assert detect_compression(str(path)) == "zstd"
+    assert feed_through_cat(WordlistFeeder(str(path), skip=1)) == b"b\nc\n"
+
+
+def test_corrupt_wordlist_is_reported(tmp_path):
+    """Test that a broken stream is recorded rather than passed off as the end of the wordlist"""
+    path = tmp_path / "words.txt.gz"
+    path.write_bytes(gzip.compress(b"a\n" * 1000)[:30])
+    
+    feeder = WordlistFeeder(str(path))
+    feed_through_cat(feeder)
+    assert feeder.error is not None
+    
+    plain = tmp_path / "plain.txt"
+    plain.write_bytes(b"a\n")
+    assert detect_compression(str(plain)) is None
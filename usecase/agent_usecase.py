@@ -3,17 +3,25 @@ from datetime import datetime, timedelta
 import secrets
 import string
 
+from config.settings import TASK_LEASE_DURATION
 from entity.agent import Agent, AgentStatus
+from entity.chunk import ChunkStatus
 from repository.agent_repository import AgentRepository
 from repository.task_repository import TaskRepository
+from usecase.api_key_cache import ApiKeyCache
+from usecase.heartbeat_buffer import HeartbeatBuffer
 
 
 class AgentUseCase:
     """Use case for agent management"""
     
-    def __init__(self, agent_repo: AgentRepository, task_repo: TaskRepository):
+    def __init__(self, agent_repo: AgentRepository, task_repo: TaskRepository,
+                 api_key_cache: Optional[ApiKeyCache] = None,
+                 heartbeat_buffer: Optional[HeartbeatBuffer] = None):
         self.agent_repo = agent_repo
         self.task_repo = task_repo
+        self.api_key_cache = api_key_cache
+        self.heartbeat_buffer = heartbeat_buffer
     
     async def register_agent(self, agent: Agent) -> Agent:
         """Register a new agent"""
@@ -33,8 +41,16 @@ class AgentUseCase:
         return await self.agent_repo.find_by_id(agent_id)
     
     async def get_agent_by_api_key(self, api_key: str) -> Optional[Agent]:
-        """Get agent by API key"""
-        return await self.agent_repo.find_by_api_key(api_key)
+        """Get agent by API key; a cached agent's task assignment may be out of date"""
+        if self.api_key_cache:
+            agent = self.api_key_cache.get(api_key)
+            if agent:
+                return agent
+        
+        agent = await self.agent_repo.find_by_api_key(api_key)
+        if agent and self.api_key_cache:
+            self.api_key_cache.put(agent)
+        return agent
     
     async def get_all_agents(self, skip: int = 0, limit: int = 100) -> List[Agent]:
         """Get all agents with pagination"""
@@ -46,21 +62,23 @@ class AgentUseCase:
     
     async def update_agent(self, agent: Agent) -> Optional[Agent]:
         """Update an existing agent"""
-        return await self.agent_repo.update(agent)
+        updated_agent = await self.agent_repo.update(agent)
+        if self.api_key_cache:
+            self.api_key_cache.invalidate(agent.id)
+        return updated_agent
     
     async def delete_agent(self, agent_id: str) -> bool:
         """Delete an agent"""
         # Get agent to check if it has a task
         agent = await self.agent_repo.find_by_id(agent_id)
         if agent and agent.current_task_id:
-            # Reset task status to pending
-            from entity.task import TaskStatus
-            await self.task_repo.update_status(
-                agent.current_task_id, 
-                TaskStatus.PENDING
-            )
+            await self._release_work(agent)
         
         # Delete agent
+        if self.api_key_cache:
+            self.api_key_cache.invalidate(agent_id)
+        if self.heartbeat_buffer:
+            self.heartbeat_buffer.discard_agent(agent_id)
         return await self.agent_repo.delete(agent_id)
     
     async def update_agent_status(self, agent_id: str, status: AgentStatus) -> Optional[Agent]:
@@ -74,25 +92,85 @@ class AgentUseCase:
     async def process_heartbeat(self, agent_id: str, status: AgentStatus, 
                               current_task_id: Optional[str] = None,
                               task_progress: Optional[float] = None,
-                              task_speed: Optional[float] = None) -> Optional[Agent]:
+                              task_speed: Optional[float] = None,
+                              current_chunk_id: Optional[str] = None) -> Optional[Agent]:
         """Process agent heartbeat"""
         # Update agent status and heartbeat
         agent = await self.agent_repo.update_status(agent_id, status)
         if not agent:
             return None
+        if self.api_key_cache:
+            self.api_key_cache.refresh(agent)
         
-        # Update task progress if provided
-        if current_task_id and (task_progress is not None or task_speed is not None):
+        if current_chunk_id and (task_progress is not None or task_speed is not None):
+            # Progress is relative to the chunk, the task rolls up on chunk completion
+            await self.task_repo.update_chunk_status(
+                current_chunk_id,
+                ChunkStatus.RUNNING,
+                progress=task_progress,
+                speed=task_speed,
+                agent_id=agent_id,
+                lease_seconds=TASK_LEASE_DURATION
+            )
+        elif current_chunk_id:
+            await self.task_repo.renew_chunk_lease(current_chunk_id, agent_id, TASK_LEASE_DURATION)
+        elif current_task_id and (task_progress is not None or task_speed is not None):
+            # Update task progress if provided
             from entity.task import TaskStatus
             await self.task_repo.update_status(
                 current_task_id,
                 TaskStatus.RUNNING,
                 progress=task_progress,
-                speed=task_speed
+                speed=task_speed,
+                return_document=False
             )
         
         return agent
     
+    async def record_heartbeat(self, agent: Agent, status: AgentStatus,
+                               current_task_id: Optional[str] = None,
+                               task_progress: Optional[float] = None,
+                               task_speed: Optional[float] = None,
+                               current_chunk_id: Optional[str] = None) -> Agent:
+        """Buffer an agent heartbeat for the next bulk write and answer from the known agent"""
+        # Status changes are written straight away so the dispatcher sees them
+        if not self.heartbeat_buffer or status != agent.status:
+            return await self.process_heartbeat(
+                agent.id, status, current_task_id, task_progress, task_speed, current_chunk_id
+            )
+        
+        last_seen = self.heartbeat_buffer.record_heartbeat(agent.id, status)
+        updated_agent = Agent.from_dict(agent.to_dict())
+        if current_chunk_id:
+            # The cached agent may predate a withdrawal, the chunk tells whether the agent still holds it
+            chunk = await self.task_repo.find_chunk_by_id(current_chunk_id)
+            if chunk and chunk.agent_id == agent.id and chunk.status in [ChunkStatus.ASSIGNED, ChunkStatus.RUNNING]:
+                self.heartbeat_buffer.record_chunk_progress(current_chunk_id, agent.id, task_progress, task_speed)
+                updated_agent.current_task_id = chunk.task_id
+                updated_agent.current_chunk_id = chunk.id
+            else:
+                updated_agent.current_task_id = None
+                updated_agent.current_chunk_id = None
+        elif current_task_id and (task_progress is not None or task_speed is not None):
+            self.heartbeat_buffer.record_task_progress(current_task_id, task_progress, task_speed)
+        
+        updated_agent.status = status
+        if status == AgentStatus.ONLINE and agent.current_task_id:
+            updated_agent.status = AgentStatus.BUSY
+        updated_agent.last_seen = last_seen
+        if self.api_key_cache:
+            self.api_key_cache.refresh(updated_agent)
+        return updated_agent
+    
+    async def get_last_seen(self, agent_id: str) -> Optional[datetime]:
+        """Get when an agent was last heard from, from memory when possible"""
+        if self.heartbeat_buffer:
+            last_seen = self.heartbeat_buffer.last_seen(agent_id)
+            if last_seen:
+                return last_seen
+        agent = await self.agent_repo.find_by_id(agent_id)
+        return agent.last_seen if agent else None
+    
     async def get_available_agents(self) -> List[Agent]:
         """Get available agents for task assignment"""
         return await self.agent_repo.find_available_agents()
@@ -111,24 +189,40 @@ class AgentUseCase:
         # Check last seen timestamp
         offline_count = 0
         for agent in active_agents:
-            if agent.last_seen < cutoff_time:
+            # Heartbeats not written yet count too
+            last_seen = agent.last_seen
+            if self.heartbeat_buffer:
+                last_seen = max(last_seen, self.heartbeat_buffer.last_seen(agent.id) or last_seen)
+            if last_seen < cutoff_time:
                 # Mark agent as offline
-                await self.agent_repo.update_status(agent.id, AgentStatus.OFFLINE)
+                await self.agent_repo.update_status(agent.id, AgentStatus.OFFLINE, return_document=False)
+                if self.api_key_cache:
+                    self.api_key_cache.invalidate(agent.id)
                 
-                # If agent had a task, reset it to pending
+                # If agent had a task, hand its work back to the scheduler
                 if agent.current_task_id:
-                    from entity.task import TaskStatus
-                    await self.task_repo.update_status(
-                        agent.current_task_id,
-                        TaskStatus.PENDING
-                    )
+                    await self._release_work(agent)
                     # Clear task from agent
-                    await self.agent_repo.clear_task(agent.id)
+                    await self.agent_repo.clear_task(agent.id, return_document=False)
                 
                 offline_count += 1
         
         return offline_count
     
+    async def _release_work(self, agent: Agent) -> None:
+        """Return the agent's unfinished work to the pending queue"""
+        if agent.current_chunk_id:
+            # The lease may have expired and gone to another agent already, that holder keeps it
+            await self.task_repo.requeue_chunk(agent.current_chunk_id, agent.id)
+        else:
+            # Reset task status to pending
+            from entity.task import TaskStatus
+            await self.task_repo.update_status(
+                agent.current_task_id,
+                TaskStatus.PENDING,
+                return_document=False
+            )
+    
     def _generate_api_key(self, length: int = 32) -> str:
         """Generate a random API key"""
         alphabet = string.ascii_letters + string.digits
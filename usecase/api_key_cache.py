@@ -0,0 +1,54 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config.settings import AGENT_AUTH_CACHE_TTL, AGENT_AUTH_CACHE_SIZE
+from entity.agent import Agent
+
+
+class ApiKeyCache:
+    """Bounded LRU cache of API key to agent, with entries expiring after a TTL"""
+    
+    def __init__(self, ttl: int = None, max_size: int = None):
+        self.ttl = AGENT_AUTH_CACHE_TTL if ttl is None else ttl
+        self.max_size = AGENT_AUTH_CACHE_SIZE if max_size is None else max_size
+        self._entries: "OrderedDict[str, Tuple[float, Agent]]" = OrderedDict()
+    
+    def get(self, api_key: str) -> Optional[Agent]:
+        """Get the cached agent for an API key"""
+        entry = self._entries.get(api_key)
+        if not entry:
+            return None
+        expires_at, agent = entry
+        if expires_at < time.monotonic():
+            del self._entries[api_key]
+            return None
+        self._entries.move_to_end(api_key)
+        return agent
+    
+    def put(self, agent: Agent):
+        """Cache an agent under its API key, evicting the least recently used entry when full"""
+        if not agent.api_key or self.max_size <= 0 or self.ttl <= 0:
+            return
+        self._entries[agent.api_key] = (time.monotonic() + self.ttl, agent)
+        self._entries.move_to_end(agent.api_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def refresh(self, agent: Agent):
+        """Replace a cached agent with a newer copy without extending its TTL"""
+        entry = self._entries.get(agent.api_key)
+        if entry and entry[1].id == agent.id:
+            self._entries[agent.api_key] = (entry[0], agent)
+    
+    def invalidate(self, agent_id: str):
+        """Drop every entry of an agent"""
+        for api_key in [key for key, (_, agent) in self._entries.items() if agent.id == agent_id]:
+            del self._entries[api_key]
+    
+    def clear(self):
+        """Drop all entries"""
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from config.settings import DISPATCH_FALLBACK_INTERVAL
+from usecase.task_usecase import TaskUseCase
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AssignmentDispatcher:
+    """Runs task assignment passes as soon as work or agents become available"""
+    
+    def __init__(self, fallback_interval: int = None, recheck_interval: Optional[float] = None):
+        self.fallback_interval = fallback_interval or DISPATCH_FALLBACK_INTERVAL
+        # Seconds between checks of a held long-poll, for work assigned by other processes; None waits for a wakeup
+        self.recheck_interval = recheck_interval
+        self._wakeup = asyncio.Event()
+        self._waiters: Dict[str, asyncio.Event] = {}
+    
+    def notify(self, reason: Optional[str] = None):
+        """Request an assignment pass; notifications during a pass trigger one more pass"""
+        if reason:
+            logger.debug(f"Assignment pass requested: {reason}")
+        self._wakeup.set()
+    
+    def wake_agent(self, agent_id: str):
+        """Release a long-poll request held for an agent"""
+        waiter = self._waiters.get(agent_id)
+        if waiter:
+            waiter.set()
+    
+    async def wait_for_assignment(self, agent_id: str, timeout: float,
+                                  check: Callable[[], Awaitable[Optional[T]]]) -> Optional[T]:
+        """Hold until check finds work assigned to an agent, returning what it found or None on timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waiter = self._waiters.setdefault(agent_id, asyncio.Event())
+        notified = False
+        try:
+            while True:
+                # Checked after registering, so work assigned in between is found here or wakes the waiter
+                waiter.clear()
+                assignment = await check()
+                remaining = deadline - loop.time()
+                if assignment or remaining <= 0:
+                    return assignment
+                if not notified:
+                    self.notify(f"agent {agent_id} is waiting for work")
+                    notified = True
+                try:
+                    await asyncio.wait_for(waiter.wait(), timeout=min(remaining, self.recheck_interval or remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._waiters.get(agent_id) is waiter:
+                del self._waiters[agent_id]
+    
+    async def run(self, task_usecase: TaskUseCase):
+        """Run assignment passes on every notification"""
+        while True:
+            try:
+                # Passes also run on a slow timer to pick up changes made by other processes
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.fallback_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            
+            try:
+                assigned_count = await task_usecase.auto_assign_tasks(on_assign=self.wake_agent)
+                if assigned_count > 0:
+                    logger.info(f"Auto-assigned {assigned_count} tasks to agents")
+            except Exception as e:
+                logger.error(f"Error auto-assigning tasks: {e}")
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import Counter
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional
+
+import aiofiles
+
+from config.settings import AGENT_CACHE_QUOTA
+
+logger = logging.getLogger(__name__)
+
+# Fetches a catalog file from a byte offset on
+Fetch = Callable[[int], AsyncIterator[bytes]]
+
+
+class FileCache:
+    """Agent side copies of catalog files named by SHA-256, least recently used ones evicted over the quota"""
+    
+    def __init__(self, cache_dir: str, quota_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.quota_bytes = AGENT_CACHE_QUOTA * 1024 * 1024 if quota_bytes is None else quota_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Files hashcat is reading, never evicted
+        self._pinned: Counter = Counter()
+        # Downloads in flight, a prefetch and a task needing the same file share one
+        self._downloads: Dict[str, asyncio.Task] = {}
+    
+    def path(self, sha256: str) -> str:
+        """Path of a cached file"""
+        return os.path.join(self.cache_dir, sha256)
+    
+    def get(self, sha256: str) -> Optional[str]:
+        """Path of a cached file marked as just used, None if it is not cached"""
+        path = self.path(sha256)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+    
+    async def ensure(self, entry: Dict, fetch: Fetch) -> str:
+        """Path of a catalog entry's file, downloaded first unless it is cached"""
+        sha256 = entry["sha256"]
+        cached = self.get(sha256)
+        if cached:
+            return cached
+        
+        download = self._downloads.get(sha256)
+        if download is None:
+            download = asyncio.create_task(self._download(sha256, entry["size"], fetch))
+            self._downloads[sha256] = download
+            download.add_done_callback(lambda _: self._downloads.pop(sha256, None))
+        # One waiter giving up does not cancel the download for the others
+        return await asyncio.shield(download)
+    
+    def pin(self, digests: Iterable[str]) -> None:
+        """Keep files from being evicted while they are in use"""
+        self._pinned.update(digests)
+    
+    def unpin(self, digests: Iterable[str]) -> None:
+        """Release files pinned before"""
+        self._pinned.subtract(digests)
+        self._pinned += Counter()
+    
+    def evict(self, reserve: int = 0) -> int:
+        """Remove least recently used files until the cache and reserve bytes fit the quota"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            stats = os.stat(path)
+            total += stats.st_size
+            if not name.endswith(".part") and name not in self._pinned:
+                entries.append((stats.st_mtime, stats.st_size, path))
+        
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total + reserve <= self.quota_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted += 1
+            logger.info(f"Evicted {os.path.basename(path)} from the file cache")
+        return evicted
+    
+    async def _download(self, sha256: str, size: int, fetch: Fetch) -> str:
+        partial_path = f"{self.path(sha256)}.part"
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        if offset > size:
+            offset = 0
+        
+        # An interrupted download resumes, hashing the bytes it already has again
+        digest = hashlib.sha256()
+        async with aiofiles.open(partial_path, "r+b" if offset else "wb") as f:
+            remaining = offset
+            while remaining > 0:
+                chunk = await f.read(min(1024 * 1024, remaining))
+                digest.update(chunk)
+                remaining -= len(chunk)
+            await f.truncate(offset)
+        
+        self.evict(reserve=size - offset)
+        if offset < size:
+            logger.info(f"Downloading {sha256} from byte {offset} of {size}")
+            async with aiofiles.open(partial_path, "ab") as f:
+                async for chunk in fetch(offset):
+                    digest.update(chunk)
+                    await f.write(chunk)
+                    offset += len(chunk)
+        
+        if offset < size:
+            # The bytes received so far are kept for the next attempt
+            raise ConnectionError(f"Download of {sha256} stopped at byte {offset} of {size}")
+        if offset != size or digest.hexdigest() != sha256:
+            os.remove(partial_path)
+            raise ValueError(f"Downloaded file does not match {sha256}")
+        os.replace(partial_path, self.path(sha256))
+        return self.path(sha256)
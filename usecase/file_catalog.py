@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import logging
+import struct
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aiofiles
+
+from config.settings import FILE_CATALOG_DIRS, UPLOAD_CHUNK_SIZE
+from entity.chunk import Chunk
+from entity.task import Task
+from usecase.file_store import FileStore, is_listed
+from usecase.line_index import LineIndex
+from usecase.wordlist_prep import load_index, line_range
+
+logger = logging.getLogger(__name__)
+
+# Task fields naming catalog files, and the upload kind each one is looked up in
+TASK_FILE_FIELDS = {
+    "wordlist_path": "wordlists",
+    "rule_path": "rules",
+}
+
+
+class FileCatalog:
+    """Wordlists and rules the server hands out to agents, addressed by SHA-256"""
+    
+    def __init__(self, file_store: FileStore = None, search_dirs: List[str] = None):
+        self.file_store = file_store or FileStore()
+        self.search_dirs = [Path(d) for d in (FILE_CATALOG_DIRS if search_dirs is None else search_dirs)]
+        # Digests of files hashed in place, by device, inode, size and modification time
+        self._digests: Dict[Tuple[int, int, int, int], str] = {}
+        # Where a digest hashed in place is served from
+        self._paths: Dict[str, Path] = {}
+        # Files being hashed, so concurrent lookups wait for one pass
+        self._hashing: Dict[Tuple[int, int, int, int], asyncio.Future] = {}
+        # Line indexes of wordlists by digest, mapped once; None for compressed wordlists
+        self._line_indexes: Dict[str, Optional[LineIndex]] = {}
+        # Wordlists are indexed one at a time
+        self._indexing = asyncio.Lock()
+    
+    def locate(self, kind: str, reference: Optional[str]) -> Optional[Path]:
+        """Find the file a task field names: as given, or by name in the catalog directories"""
+        if not reference:
+            return None
+        roots = [self.file_store.kind_dir(kind)] + self.search_dirs
+        reference_path = Path(reference)
+        candidates = [reference_path]
+        if not reference_path.is_absolute():
+            candidates += [root / reference_path for root in roots]
+        candidates += [root / reference_path.name for root in roots]
+        for path in candidates:
+            if path.is_file() and self._is_served(path):
+                return path
+        return None
+    
+    async def describe(self, kind: str, reference: Optional[str]) -> Optional[Dict]:
+        """Name, digest and size of the file a task field names, None if it is not in the catalog"""
+        path = self.locate(kind, reference)
+        if path is None:
+            return None
+        entry = {"name": path.name, "sha256": await self.digest(path), "size": path.stat().st_size}
+        if kind == "wordlists":
+            index = await self.line_index(entry["sha256"])
+            if index is not None:
+                entry["lines"] = index.lines
+        return entry
+    
+    async def describe_task(self, task: Task, chunk: Optional[Chunk] = None) -> Dict[str, Dict]:
+        """Catalog entries of a task's wordlist and rules, by task field, with the byte range of a chunk's words"""
+        files = {}
+        for field, kind in TASK_FILE_FIELDS.items():
+            entry = await self.describe(kind, getattr(task, field))
+            if entry:
+                files[field] = entry
+        
+        wordlist = files.get("wordlist_path")
+        # Only a dictionary attack's --skip/--limit count lines of the wordlist
+        if wordlist and "lines" in wordlist and chunk and chunk.limit and task.attack_mode == 0:
+            index = await self.line_index(wordlist["sha256"])
+            offset, length = index.byte_range(chunk.skip, chunk.skip + chunk.limit)
+            wordlist["slice"] = {"skip": chunk.skip, "limit": chunk.limit, "offset": offset, "length": length}
+        return files
+    
+    async def list_files(self, kind: str) -> List[Dict]:
+        """Catalog entries of every file of a kind"""
+        paths = {}
+        for root in [self.file_store.kind_dir(kind)] + self.search_dirs:
+            if root.is_dir():
+                for path in sorted(root.iterdir()):
+                    if is_listed(path):
+                        paths.setdefault(path.name, path)
+        return [await self.describe(kind, str(path)) for path in paths.values()]
+    
+    async def warm(self) -> int:
+        """Hash every wordlist and rule file ahead of the first task that needs it"""
+        count = 0
+        for kind in TASK_FILE_FIELDS.values():
+            try:
+                count += len(await self.list_files(kind))
+            except Exception as e:
+                logger.error(f"Error hashing {kind} for the file catalog: {e}")
+        logger.info(f"File catalog holds {count} wordlists and rules")
+        return count
+    
+    async def digest(self, path: Path) -> str:
+        """SHA-256 of a file, hashed once per version of the file"""
+        key = self._stat_key(path)
+        if key in self._digests:
+            return self._digests[key]
+        if key in self._hashing:
+            return await asyncio.shield(self._hashing[key])
+        
+        future = asyncio.get_running_loop().create_future()
+        self._hashing[key] = future
+        try:
+            # Files uploaded through the store already carry their digest as the object name
+            sha256 = self.file_store.digest_of(path)
+            if sha256 is None:
+                sha256 = await asyncio.get_running_loop().run_in_executor(None, self._hash_file, path)
+                self._paths[sha256] = path
+            self._digests[key] = sha256
+            future.set_result(sha256)
+            return sha256
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._hashing[key]
+    
+    async def line_index(self, sha256: str) -> Optional[LineIndex]:
+        """Line index of a plain wordlist, built the first time it is needed; None for compressed ones"""
+        if sha256 in self._line_indexes:
+            return self._line_indexes[sha256]
+        path = self.open_path(sha256)
+        if path is None:
+            return None
+        
+        async with self._indexing:
+            if sha256 not in self._line_indexes:
+                index_file = self.file_store.line_index_path(sha256)
+                try:
+                    index = LineIndex.load(str(index_file), str(path))
+                except (OSError, ValueError, struct.error):
+                    # Wordlists from the catalog directories, or uploaded before indexing
+                    index = await asyncio.get_running_loop().run_in_executor(
+                        None, self.file_store.index_lines, sha256, path
+                    )
+                    if index is not None:
+                        index = LineIndex.load(str(index_file), str(path))
+                self._line_indexes[sha256] = index
+        return self._line_indexes[sha256]
+    
+    async def wordlist_range(self, task: Task, length_limits: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """First line and line count of a dictionary attack's words, None unless its wordlist is indexed"""
+        if task.attack_mode != 0:
+            return None
+        path = self.locate("wordlists", task.wordlist_path)
+        if path is None:
+            return None
+        index = load_index(str(path))
+        if index is None:
+            # Without length buckets the line index still gives the keyspace without counting
+            line_index = await self.line_index(await self.digest(path))
+            return (0, line_index.lines) if line_index is not None else None
+        # Rules change the length of the words, only without them can words of the wrong length be left out
+        if task.rule_path:
+            return 0, index["lines"]
+        return line_range(index, *length_limits)
+
+    def open_path(self, sha256: str) -> Optional[Path]:
+        """Path of the file with the given digest, None if it is unknown or changed since it was hashed"""
+        sha256 = sha256.lower()
+        if self.file_store.has_object(sha256):
+            return self.file_store.object_path(sha256)
+        path = self._paths.get(sha256)
+        if path is None or not path.is_file() or self._digests.get(self._stat_key(path)) != sha256:
+            return None
+        return path
+    
+    def _is_served(self, path: Path) -> bool:
+        resolved = path.resolve()
+        for root in [self.file_store.root] + self.search_dirs:
+            if resolved.is_relative_to(root.resolve()):
+                return True
+        return False
+    
+    @staticmethod
+    def _stat_key(path: Path) -> Tuple[int, int, int, int]:
+        stats = path.stat()
+        return stats.st_dev, stats.st_ino, stats.st_size, stats.st_mtime_ns
+    
+    @staticmethod
+    def _hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """First and last byte of a single "bytes=" range, None for the whole file; raises ValueError if unsatisfiable"""
+    if not range_header:
+        return None
+    unit, _, spec = range_header.strip().partition("=")
+    # Several ranges are answered with the whole file, which RFC 9110 allows
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        first = int(first) if first.strip() else None
+        last = int(last) if last.strip() else None
+    except ValueError:
+        # A malformed Range header is ignored
+        return None
+    if first is None:
+        # Suffix range, the last N bytes
+        if not last:
+            raise ValueError(f"Unsatisfiable range {range_header!r}")
+        return max(size - last, 0), size - 1
+    end = size - 1 if last is None else min(last, size - 1)
+    if first >= size or end < first:
+        raise ValueError(f"Unsatisfiable range {range_header!r}")
+    return first, end
+
+
+async def read_range(path: Path, start: int, end: int, chunk_size: int = None) -> AsyncIterator[bytes]:
+    """Read bytes start to end inclusive in chunks"""
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+    remaining = end - start + 1
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        while remaining > 0:
+            chunk = await f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
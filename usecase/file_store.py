@@ -0,0 +1,361 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterable, Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
+
+from config.settings import UPLOAD_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_SESSION_TTL
+from usecase.line_index import LineIndex
+from usecase.wordlist_prep import WordlistPreprocessor, INDEX_SUFFIX, index_path
+from usecase.wordlist_stream import detect_compression
+
+logger = logging.getLogger(__name__)
+
+# Upload kinds and the directory their named files are listed in
+FILE_KINDS = ("handshakes", "wordlists", "rules")
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class UploadError(Exception):
+    """An upload request that cannot be applied, status_code says why"""
+    
+    def __init__(self, message: str, status_code: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+class FileStore:
+    """Content addressed store of uploaded files, named files are hard links to one object per SHA-256"""
+    
+    def __init__(self, root: str = None, chunk_size: int = None, session_ttl: int = None):
+        self.root = Path(UPLOAD_DIR if root is None else root)
+        self.chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+        # Seconds an unfinished upload session is kept
+        self.session_ttl = UPLOAD_SESSION_TTL if session_ttl is None else session_ttl
+        self.objects_dir = self.root / "objects"
+        self.partial_dir = self.root / "partial"
+        self.lines_dir = self.root / "lines"
+        # Running digests of open sessions: upload id -> (offset, sha256)
+        self._digests: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+        # One request appends to a session at a time
+        self._locks: Dict[str, asyncio.Lock] = {}
+    
+    def kind_dir(self, kind: str) -> Path:
+        """Directory of the named files of an upload kind"""
+        if kind not in FILE_KINDS:
+            raise UploadError(f"Unknown upload kind {kind!r}, expected one of {list(FILE_KINDS)}", 404)
+        return self.root / kind
+    
+    def object_path(self, sha256: str) -> Path:
+        """Path of the object with the given digest, fanned out by its first two hex digits"""
+        return self.objects_dir / sha256[:2] / sha256
+    
+    def line_index_path(self, sha256: str) -> Path:
+        """Path of the line index of the wordlist with the given digest"""
+        return self.lines_dir / sha256[:2] / f"{sha256}.lines"
+    
+    def index_lines(self, sha256: str, path: Path) -> Optional[LineIndex]:
+        """Build and save the line index of a plain wordlist, None for compressed ones"""
+        if detect_compression(str(path)) is not None:
+            return None
+        index = LineIndex.build(str(path))
+        index_file = self.line_index_path(sha256)
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        index.save(str(index_file))
+        logger.info(f"Indexed {index.lines} lines of {path}")
+        return index
+    
+    def has_object(self, sha256: str) -> bool:
+        """Whether an object with the given digest is stored"""
+        sha256 = sha256.lower()
+        return bool(SHA256_PATTERN.fullmatch(sha256)) and self.object_path(sha256).is_file()
+    
+    def digest_of(self, path: Path) -> Optional[str]:
+        """SHA-256 of a named file, None if it is not linked to an object of the store"""
+        stats = Path(path).stat()
+        if stats.st_nlink < 2 or not self.objects_dir.exists():
+            return None
+        for object_path in self.objects_dir.glob("*/*"):
+            if os.path.samestat(object_path.stat(), stats):
+                return object_path.name
+        return None
+    
+    async def store(self, kind: str, filename: str, chunks: AsyncIterable[bytes]) -> Dict:
+        """Stream a whole file into the store and name it, the upload of the plain form"""
+        partial_path = self._new_partial_path()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(partial_path, "wb") as f:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    await f.write(chunk)
+                    size += len(chunk)
+            return await self._commit(kind, filename, partial_path, digest.hexdigest(), size)
+        finally:
+            if partial_path.exists():
+                partial_path.unlink()
+    
+    async def store_upload(self, kind: str, filename: str, file) -> Dict:
+        """Store a FastAPI UploadFile read chunk by chunk"""
+        async def chunks():
+            while True:
+                chunk = await file.read(self.chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        return await self.store(kind, filename, chunks())
+    
+    async def link(self, kind: str, filename: str, sha256: str) -> Optional[Dict]:
+        """Name an already stored object without sending its content, None if it is not stored"""
+        sha256 = sha256.lower()
+        if not self.has_object(sha256):
+            return None
+        object_path = self.object_path(sha256)
+        path = await self._link_name(kind, filename, object_path)
+        return {"complete": True, "sha256": sha256, "size": object_path.stat().st_size, "path": str(path),
+                "deduplicated": True}
+    
+    async def create_session(self, kind: str, filename: str, size: int, sha256: Optional[str] = None) -> Dict:
+        """Open a resumable upload, or finish it right away when the digest is already stored"""
+        self.kind_dir(kind)
+        if size < 0:
+            raise UploadError("Upload size must not be negative")
+        if sha256 and not SHA256_PATTERN.fullmatch(sha256.lower()):
+            raise UploadError(f"{sha256!r} is not a SHA-256 digest")
+        if sha256:
+            linked = await self.link(kind, filename, sha256)
+            if linked is not None:
+                return linked
+        
+        self.expire_sessions()
+        upload_id = uuid.uuid4().hex
+        state = {"kind": kind, "filename": self._clean_name(filename), "size": size,
+                 "sha256": sha256.lower() if sha256 else None, "created_at": time.time()}
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(self._state_path(upload_id), "w") as f:
+            await f.write(json.dumps(state))
+        async with aiofiles.open(self._data_path(upload_id), "wb"):
+            pass
+        self._digests[upload_id] = (0, hashlib.sha256())
+        
+        if size == 0:
+            return await self._finish(upload_id, state)
+        return {"complete": False, "upload_id": upload_id, "offset": 0, "size": size}
+    
+    async def get_session(self, upload_id: str) -> Dict:
+        """Offset an interrupted upload resumes from"""
+        state = await self._load_state(upload_id)
+        offset = (await aiofiles.os.stat(self._data_path(upload_id))).st_size
+        return {"complete": False, "upload_id": upload_id, "offset": offset, "size": state["size"]}
+    
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterable[bytes]) -> Dict:
+        """Append a byte range starting at offset, finishing the upload once all bytes arrived"""
+        state = await self._load_state(upload_id)
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        if lock.locked():
+            raise UploadError(f"Upload {upload_id} is already receiving data", 409)
+        async with lock:
+            data_path = self._data_path(upload_id)
+            current = (await aiofiles.os.stat(data_path)).st_size
+            if offset != current:
+                raise UploadError(f"Upload {upload_id} is at offset {current}, not {offset}", 409, current)
+            
+            digest = await self._session_digest(upload_id, current)
+            # Forget the digest while appending, a failed request leaves the file ahead of it
+            self._digests.pop(upload_id, None)
+            size = state["size"]
+            async with aiofiles.open(data_path, "ab") as f:
+                async for chunk in chunks:
+                    chunk = chunk[:size - current]
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    await f.write(chunk)
+                    current += len(chunk)
+            self._digests[upload_id] = (current, digest)
+            
+            if current < size:
+                return {"complete": False, "upload_id": upload_id, "offset": current, "size": size}
+            return await self._finish(upload_id, state)
+    
+    async def cancel_session(self, upload_id: str) -> bool:
+        """Drop an unfinished upload"""
+        self._digests.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+        found = False
+        for path in (self._data_path(upload_id), self._state_path(upload_id)):
+            if path.exists():
+                path.unlink()
+                found = True
+        return found
+    
+    def expire_sessions(self) -> int:
+        """Remove upload sessions untouched for longer than the session TTL"""
+        if self.session_ttl <= 0 or not self.partial_dir.exists():
+            return 0
+        expired = 0
+        cutoff = time.time() - self.session_ttl
+        for path in self.partial_dir.glob("*.json"):
+            upload_id = path.stem
+            data_path = self._data_path(upload_id)
+            touched = max(path.stat().st_mtime, data_path.stat().st_mtime if data_path.exists() else 0)
+            if touched < cutoff:
+                self._digests.pop(upload_id, None)
+                self._locks.pop(upload_id, None)
+                path.unlink()
+                if data_path.exists():
+                    data_path.unlink()
+                expired += 1
+        return expired
+    
+    async def prepare_wordlist(self, filename: str) -> Dict:
+        """Store a sorted, deduplicated copy of a wordlist with its length index as <name>.prepared.txt"""
+        source = self.kind_dir("wordlists") / self._clean_name(filename)
+        if not source.is_file():
+            raise UploadError(f"Wordlist {filename} not found", 404)
+        partial_path = self._new_partial_path()
+        try:
+            # Sorting takes minutes on large lists, off the event loop
+            index = await asyncio.get_running_loop().run_in_executor(
+                None, WordlistPreprocessor(temp_dir=str(self.partial_dir)).prepare, str(source), str(partial_path)
+            )
+            stored = await self._commit("wordlists", prepared_name(source.name), partial_path, index["sha256"],
+                                        index["size"])
+            os.replace(index_path(str(partial_path)), index_path(stored["path"]))
+            return dict(stored, index=index)
+        finally:
+            for path in (partial_path, Path(index_path(str(partial_path)))):
+                if path.exists():
+                    path.unlink()
+
+    def remove(self, path: Path) -> bool:
+        """Remove a named file, and its object once no other name links to it"""
+        path = Path(path)
+        if path.parent.resolve() not in [(self.root / kind).resolve() for kind in FILE_KINDS]:
+            return False
+        if not path.is_file():
+            return False
+        path.unlink()
+        sidecar = Path(index_path(str(path)))
+        if sidecar.exists():
+            sidecar.unlink()
+        self.collect_garbage()
+        return True
+    
+    def collect_garbage(self) -> int:
+        """Remove objects no named file links to any more"""
+        removed = 0
+        for object_path in self.objects_dir.glob("*/*"):
+            # The object itself is the only link left
+            if object_path.stat().st_nlink == 1:
+                object_path.unlink()
+                self.line_index_path(object_path.name).unlink(missing_ok=True)
+                removed += 1
+        return removed
+    
+    async def _finish(self, upload_id: str, state: Dict) -> Dict:
+        data_path = self._data_path(upload_id)
+        size = (await aiofiles.os.stat(data_path)).st_size
+        sha256 = (await self._session_digest(upload_id, size)).hexdigest()
+        self._digests.pop(upload_id, None)
+        try:
+            if state.get("sha256") and state["sha256"] != sha256:
+                raise UploadError(f"Upload {upload_id} has SHA-256 {sha256}, expected {state['sha256']}", 422)
+            return await self._commit(state["kind"], state["filename"], data_path, sha256, size)
+        finally:
+            await self.cancel_session(upload_id)
+    
+    async def _commit(self, kind: str, filename: str, data_path: Path, sha256: str, size: int) -> Dict:
+        object_path = self.object_path(sha256)
+        deduplicated = object_path.exists()
+        if not deduplicated:
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            # Same file system, so the finished upload becomes the object without a copy
+            await aiofiles.os.rename(data_path, object_path)
+            if kind == "wordlists":
+                # Indexed once on upload, chunks of the wordlist are then cut out by byte range
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self.index_lines, sha256, object_path)
+                except Exception as e:
+                    logger.error(f"Error indexing lines of {filename}: {e}")
+        path = await self._link_name(kind, filename, object_path)
+        logger.info(f"Stored {path} as {sha256}{' (deduplicated)' if deduplicated else ''}")
+        return {"complete": True, "sha256": sha256, "size": size, "path": str(path), "deduplicated": deduplicated}
+    
+    async def _link_name(self, kind: str, filename: str, object_path: Path) -> Path:
+        kind_dir = self.kind_dir(kind)
+        kind_dir.mkdir(parents=True, exist_ok=True)
+        path = kind_dir / self._clean_name(filename)
+        if path.exists() and os.path.samefile(path, object_path):
+            return path
+        # Link under a temporary name and swap it in, replacing an older file of the same name
+        temp_path = kind_dir / f".{path.name}.{uuid.uuid4().hex}"
+        await aiofiles.os.link(object_path, temp_path)
+        await aiofiles.os.replace(temp_path, path)
+        return path
+    
+    async def _session_digest(self, upload_id: str, offset: int) -> "hashlib._Hash":
+        cached = self._digests.get(upload_id)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        # The server restarted or a request failed midway, hash what was received so far again
+        digest = hashlib.sha256()
+        async with aiofiles.open(self._data_path(upload_id), "rb") as f:
+            remaining = offset
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        return digest
+    
+    async def _load_state(self, upload_id: str) -> Dict:
+        state_path = self._state_path(upload_id)
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id) or not state_path.exists():
+            raise UploadError(f"Upload {upload_id} not found", 404)
+        async with aiofiles.open(state_path) as f:
+            return json.loads(await f.read())
+    
+    def _new_partial_path(self) -> Path:
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        return self.partial_dir / f"{uuid.uuid4().hex}.stream"
+    
+    def _state_path(self, upload_id: str) -> Path:
+        return self.partial_dir / f"{upload_id}.json"
+    
+    def _data_path(self, upload_id: str) -> Path:
+        return self.partial_dir / f"{upload_id}.part"
+    
+    @staticmethod
+    def _clean_name(filename: str) -> str:
+        # Only the last path component, an upload never names a file outside its directory
+        name = Path((filename or "").replace("\\", "/")).name.lstrip(".")
+        if not name:
+            raise UploadError("Upload needs a file name")
+        return name
+
+
+def prepared_name(filename: str) -> str:
+    """Name of the prepared copy of a wordlist, rockyou.txt.gz becomes rockyou.prepared.txt"""
+    for suffix in (".gz", ".zst"):
+        if filename.endswith(suffix):
+            filename = filename[:-len(suffix)]
+    path = Path(filename)
+    return f"{path.stem}.prepared{path.suffix or '.txt'}"
+
+
+def is_listed(path: Path) -> bool:
+    """Whether a file in an upload directory is one of the named files rather than a link or index"""
+    return path.is_file() and not path.name.startswith(".") and not path.name.endswith(INDEX_SUFFIX)
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+from typing import Iterable, List, Optional, Union
+
+from config.settings import HASH_FILTER_PATH, HASH_FILTER_REBUILD_INTERVAL, HASH_FILTER_FALSE_POSITIVE_RATE
+from repository.result_repository import ResultRepository
+from repository.potfile_repository import PotfileRepository
+from usecase.potfile_usecase import normalize_hash
+
+logger = logging.getLogger(__name__)
+
+DIGEST = struct.Struct("<QQ")
+
+
+class BloomFilter:
+    """Fixed size Bloom filter over strings, its bits held in a bytearray or a memory map"""
+    
+    # Magic, bit count, hash count, item count; the bits follow
+    HEADER = struct.Struct("<8sQIQ")
+    MAGIC = b"HCBLOOM1"
+    
+    def __init__(self, bit_count: int, hash_count: int, bits: Union[bytearray, memoryview, None] = None,
+                 item_count: int = 0):
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray((bit_count + 7) // 8)
+        self.item_count = item_count
+    
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        """Size a filter to hold capacity items at the given false positive rate"""
+        capacity = max(capacity, 1)
+        bit_count = max(64, math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(bit_count / capacity * math.log(2)))
+        return cls(bit_count, hash_count)
+    
+    def _positions(self, value: str) -> List[int]:
+        # Double hashing, two 64 bit halves of one digest stand in for hash_count hash functions
+        first, second = DIGEST.unpack(hashlib.blake2b(value.encode(), digest_size=16).digest())
+        second |= 1
+        bit_count = self.bit_count
+        return [(first + index * second) % bit_count for index in range(self.hash_count)]
+    
+    def add(self, value: str) -> None:
+        """Add a value"""
+        bits = self.bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.item_count += 1
+    
+    def add_many(self, values: Iterable[str]) -> None:
+        """Add values"""
+        for value in values:
+            self.add(value)
+    
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        for position in self._positions(value):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+    
+    def save(self, path: str) -> None:
+        """Write the filter image, replacing the file atomically"""
+        # Each process writes its own temp file, concurrent saves never interleave in one
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.bit_count, self.hash_count, self.item_count))
+            f.write(self.bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        """Map a filter image into memory; adds stay private to this process"""
+        with open(path, "rb") as f:
+            image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, bit_count, hash_count, item_count = cls.HEADER.unpack_from(image)
+        if magic != cls.MAGIC or len(image) != cls.HEADER.size + (bit_count + 7) // 8:
+            image.close()
+            raise ValueError(f"{path} is not a hash filter image")
+        bits = memoryview(image)[cls.HEADER.size:]
+        return cls(bit_count, hash_count, bits, item_count)
+
+
+class HashFilter:
+    """Screens hash lookups against every cracked hash, only possible matches reach the database"""
+    
+    def __init__(self, path: str = None, rebuild_interval: int = None, false_positive_rate: float = None):
+        self.path = HASH_FILTER_PATH if path is None else path
+        # Seconds between rebuilds
+        self.rebuild_interval = HASH_FILTER_REBUILD_INTERVAL if rebuild_interval is None else rebuild_interval
+        self.false_positive_rate = false_positive_rate or HASH_FILTER_FALSE_POSITIVE_RATE
+        self.filter: Optional[BloomFilter] = None
+        # Hashes added while a rebuild scans the database, replayed into the new filter
+        self._added_during_rebuild: Optional[List[str]] = None
+    
+    def load(self) -> bool:
+        """Map the filter image written by the last rebuild, returns False if there is none"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            self.filter = BloomFilter.load(self.path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.error(f"Failed to load hash filter: {e}")
+            return False
+        logger.info(f"Loaded hash filter of {self.filter.item_count} hashes from {self.path}")
+        return True
+    
+    def save(self) -> bool:
+        """Write the current filter, including hashes added since the last rebuild"""
+        if not self.path or self.filter is None:
+            return False
+        self.filter.save(self.path)
+        return True
+    
+    def might_contain(self, hash_value: str) -> bool:
+        """Whether a hash may have been cracked; always True until the filter is built"""
+        if self.filter is None:
+            return True
+        return normalize_hash(hash_value) in self.filter
+    
+    def screen(self, hash_values: List[str]) -> List[str]:
+        """The hashes that may have been cracked, in their original order"""
+        if self.filter is None:
+            return list(hash_values)
+        return [hash_value for hash_value in hash_values if normalize_hash(hash_value) in self.filter]
+    
+    def add(self, hash_values: Iterable[str]) -> None:
+        """Add newly cracked hashes"""
+        keys = [normalize_hash(hash_value) for hash_value in hash_values]
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.extend(keys)
+        if self.filter is not None:
+            self.filter.add_many(keys)
+    
+    async def rebuild(self, result_repo: ResultRepository, potfile_repo: PotfileRepository) -> int:
+        """Build a new filter over all results and potfile entries and swap it in"""
+        self._added_during_rebuild = []
+        try:
+            # Room to grow until the next rebuild
+            capacity = 2 * (await result_repo.count() + await potfile_repo.count())
+            new_filter = BloomFilter.for_capacity(max(capacity, 100000), self.false_positive_rate)
+            loop = asyncio.get_running_loop()
+            for repo in (result_repo, potfile_repo):
+                async for hash_values in repo.iter_hash_values():
+                    # Hashing a batch takes a while, off the event loop requests keep being served
+                    keys = [normalize_hash(hash_value) for hash_value in hash_values]
+                    await loop.run_in_executor(None, new_filter.add_many, keys)
+            new_filter.add_many(self._added_during_rebuild)
+        finally:
+            self._added_during_rebuild = None
+        
+        self.filter = new_filter
+        if self.path:
+            new_filter.save(self.path)
+        logger.info(f"Rebuilt hash filter over {new_filter.item_count} hashes")
+        return new_filter.item_count
+    
+    async def run(self, result_repo: ResultRepository, potfile_repo: PotfileRepository):
+        """Rebuild the filter now and then every rebuild interval"""
+        while True:
+            try:
+                await self.rebuild(result_repo, potfile_repo)
+            except Exception as e:
+                logger.error(f"Error rebuilding hash filter: {e}")
+            if self.rebuild_interval <= 0:
+                return
+            await asyncio.sleep(self.rebuild_interval)
@@ -0,0 +1,142 @@
+import re
+from typing import Dict, Any, Iterable, List, Optional, Pattern, Set, Tuple
+
+from entity.task import HashType
+from usecase.hashcat_usecase import HASH_TYPE_IDS
+
+# Line format of the hash modes we validate: pattern, and digest size in bytes for plain hex digests
+HASH_FORMATS: Dict[int, Tuple[Pattern, int]] = {
+    0: (re.compile(r"[0-9a-fA-F]{32}"), 16),  # MD5
+    100: (re.compile(r"[0-9a-fA-F]{40}"), 20),  # SHA1
+    1000: (re.compile(r"[0-9a-fA-F]{32}"), 16),  # NTLM
+    1400: (re.compile(r"[0-9a-fA-F]{64}"), 32),  # SHA256
+    1700: (re.compile(r"[0-9a-fA-F]{128}"), 64),  # SHA512
+    3200: (re.compile(r"\$2[abxy]?\$[0-9]{2}\$[./A-Za-z0-9]{53}"), 0),  # bcrypt
+}
+
+# Hash lines are short, anything longer is not a hash of any mode
+MAX_LINE_LENGTH = 4096
+
+
+class DigestSet:
+    """Set of fixed size binary digests in one open addressing table"""
+    
+    def __init__(self, width: int, capacity: int = 1024):
+        self.width = width
+        self._slots = 1 << max(4, (2 * capacity - 1).bit_length())
+        self._table = bytearray(self._slots * width)
+        self._used = bytearray(self._slots)
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __contains__(self, digest: bytes) -> bool:
+        return self._find(digest)[1]
+    
+    def add(self, digest: bytes) -> bool:
+        """Add a digest, returns False if it was already in the set"""
+        slot, found = self._find(digest)
+        if found:
+            return False
+        self._store(slot, digest)
+        self._count += 1
+        # Linear probing stays short below half load
+        if 2 * self._count > self._slots:
+            self._grow()
+        return True
+    
+    def _find(self, digest: bytes) -> Tuple[int, bool]:
+        mask = self._slots - 1
+        width = self.width
+        slot = hash(digest) & mask
+        while self._used[slot]:
+            offset = slot * width
+            if self._table[offset:offset + width] == digest:
+                return slot, True
+            slot = (slot + 1) & mask
+        return slot, False
+    
+    def _store(self, slot: int, digest: bytes) -> None:
+        offset = slot * self.width
+        self._table[offset:offset + self.width] = digest
+        self._used[slot] = 1
+    
+    def _grow(self) -> None:
+        width = self.width
+        table, used = self._table, self._used
+        self._slots *= 2
+        self._table = bytearray(self._slots * width)
+        self._used = bytearray(self._slots)
+        for slot in range(len(used)):
+            if used[slot]:
+                digest = bytes(table[slot * width:(slot + 1) * width])
+                self._store(self._find(digest)[0], digest)
+
+
+class HashIngestor:
+    """Validates, normalizes and deduplicates a stream of hash lines for one hash mode"""
+    
+    def __init__(self, hash_type_id: int, max_rejects: int = 20):
+        self.hash_type_id = hash_type_id
+        self.pattern, digest_size = HASH_FORMATS.get(hash_type_id, (None, 0))
+        # Hex digests are deduplicated as packed bytes, other hashes as they are
+        self._digests = DigestSet(digest_size) if digest_size else None
+        self._seen: Set[str] = set()
+        self.max_rejects = max_rejects
+        self.hashes: List[str] = []
+        self.duplicates = 0
+        self.rejected = 0
+        self.rejects: List[Dict[str, Any]] = []
+    
+    @classmethod
+    def for_hash_type(cls, hash_type: HashType, hash_type_id: Optional[int] = None, **kwargs) -> "HashIngestor":
+        """Ingestor for a task's hash type, hash_type_id overrides the mode of the hash type"""
+        return cls(hash_type_id or HASH_TYPE_IDS.get(HashType(hash_type), 0), **kwargs)
+    
+    def feed(self, lines: Iterable[str], first_line: int = 1) -> "HashIngestor":
+        """Ingest lines, for example a file object read line by line"""
+        for line_number, line in enumerate(lines, first_line):
+            self.add(line, line_number)
+        return self
+    
+    def add(self, line: str, line_number: Optional[int] = None) -> Optional[str]:
+        """Ingest one line, returning the normalized hash if it was accepted"""
+        value = line.strip()
+        if not value:
+            return None
+        
+        if len(value) > MAX_LINE_LENGTH:
+            return self._reject(line_number, value, "line too long")
+        if self.pattern is not None and not self.pattern.fullmatch(value):
+            return self._reject(line_number, value, f"not a valid hash for mode {self.hash_type_id}")
+        if self.pattern is None and any(ord(char) < 32 for char in value):
+            return self._reject(line_number, value, "control characters")
+        
+        if self._digests is not None:
+            value = value.lower()
+            is_new = self._digests.add(bytes.fromhex(value))
+        else:
+            is_new = value not in self._seen
+            self._seen.add(value)
+        if not is_new:
+            self.duplicates += 1
+            return None
+        
+        self.hashes.append(value)
+        return value
+    
+    def report(self) -> Dict[str, Any]:
+        """Counts of accepted, duplicate and rejected lines with the first rejects"""
+        return {
+            "accepted": len(self.hashes),
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "rejects": self.rejects,
+        }
+    
+    def _reject(self, line_number: Optional[int], value: str, reason: str) -> None:
+        self.rejected += 1
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append({"line": line_number, "value": value[:200], "reason": reason})
+        return None
@@ -0,0 +1,188 @@
+import json
+import logging
+import time
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+# Hashcat status codes (status.c)
+HASHCAT_STATUS_NAMES = {
+    0: "Initializing",
+    1: "Autotuning",
+    2: "Selftest",
+    3: "Running",
+    4: "Paused",
+    5: "Exhausted",
+    6: "Cracked",
+    7: "Aborted",
+    8: "Quit",
+    9: "Bypass",
+    10: "Aborted (Checkpoint)",
+    11: "Aborted (Runtime)",
+    12: "Running (Checkpoint Quit requested)",
+    13: "Error",
+    14: "Aborted (Finish)",
+    15: "Autodetect",
+}
+
+# Hashcat exit codes that mean the whole keyspace was processed
+HASHCAT_EXIT_CRACKED = 0
+HASHCAT_EXIT_EXHAUSTED = 1
+
+
+class HashcatStatus:
+    """One status report printed by hashcat"""
+    
+    def __init__(
+        self,
+        status: int = 0,
+        progress_done: int = 0,
+        progress_total: int = 0,
+        recovered: int = 0,
+        recovered_total: int = 0,
+        rejected: int = 0,
+        device_speeds: Optional[Dict[str, float]] = None,  # H/s per device
+        eta: Optional[float] = None  # seconds
+    ):
+        self.status = status
+        self.progress_done = progress_done
+        self.progress_total = progress_total
+        self.recovered = recovered
+        self.recovered_total = recovered_total
+        self.rejected = rejected
+        self.device_speeds = device_speeds or {}
+        self.eta = eta
+    
+    @property
+    def progress(self) -> float:
+        """Fraction of the keyspace processed"""
+        if not self.progress_total:
+            return 0.0
+        return min(self.progress_done / self.progress_total, 1.0)
+    
+    @property
+    def speed(self) -> float:
+        """Combined speed of all devices in H/s"""
+        return sum(self.device_speeds.values())
+    
+    @property
+    def status_name(self) -> str:
+        return HASHCAT_STATUS_NAMES.get(self.status, f"Unknown ({self.status})")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert status to dictionary"""
+        return {
+            "status": self.status_name,
+            "progress": self.progress,
+            "progress_done": self.progress_done,
+            "progress_total": self.progress_total,
+            "recovered": self.recovered,
+            "recovered_total": self.recovered_total,
+            "rejected": self.rejected,
+            "speed": self.speed,
+            "device_speeds": self.device_speeds,
+            "eta": self.eta
+        }
+
+
+class HashcatStatusParser:
+    """Incremental parser for hashcat --status-json and --machine-readable status lines"""
+    
+    MAX_LINE_LENGTH = 65536
+    
+    def __init__(self):
+        self._buffer = b""
+        self._discarding = False
+    
+    def feed(self, data: bytes) -> List[HashcatStatus]:
+        """Add bytes read from hashcat and return the statuses of every completed line"""
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        
+        statuses = []
+        for line in lines:
+            if self._discarding:
+                # Tail of an oversized line
+                self._discarding = False
+                continue
+            status = self.parse_line(line.decode(errors="replace"))
+            if status:
+                statuses.append(status)
+        
+        # Never buffer more than one line's worth of output
+        if len(self._buffer) > self.MAX_LINE_LENGTH:
+            self._buffer = b""
+            self._discarding = True
+        
+        return statuses
+    
+    def parse_line(self, line: str) -> Optional[HashcatStatus]:
+        """Parse a single line, returning None for anything that is not a status report"""
+        line = line.strip()
+        try:
+            if line.startswith("{"):
+                return self._parse_json(json.loads(line))
+            if line.startswith("STATUS\t"):
+                return self._parse_machine_readable(line.split("\t"))
+        except (ValueError, TypeError, KeyError, IndexError) as e:
+            logger.debug(f"Ignoring malformed hashcat status line: {e}")
+        return None
+    
+    def _parse_json(self, data: Dict[str, Any]) -> Optional[HashcatStatus]:
+        """Parse a --status-json report"""
+        if "progress" not in data:
+            return None
+        
+        device_speeds = {
+            str(device.get("device_id", index + 1)): float(device.get("speed", 0))
+            for index, device in enumerate(data.get("devices", []))
+        }
+        
+        # estimated_stop is a unix timestamp
+        eta = None
+        if data.get("estimated_stop"):
+            eta = max(float(data["estimated_stop"]) - time.time(), 0.0)
+        
+        recovered = data.get("recovered_hashes", [0, 0])
+        return HashcatStatus(
+            status=int(data.get("status", 0)),
+            progress_done=int(data["progress"][0]),
+            progress_total=int(data["progress"][1]),
+            recovered=int(recovered[0]),
+            recovered_total=int(recovered[1]),
+            rejected=int(data.get("rejected", 0)),
+            device_speeds=device_speeds,
+            eta=eta
+        )
+    
+    def _parse_machine_readable(self, fields: List[str]) -> HashcatStatus:
+        """Parse a tab separated --machine-readable STATUS line"""
+        status = HashcatStatus(status=int(fields[1]))
+        
+        index = 2
+        while index < len(fields):
+            key = fields[index]
+            index += 1
+            if key == "SPEED":
+                # Pairs of hashes and the milliseconds they took, one pair per device
+                device = 1
+                while index + 1 < len(fields) and fields[index].isdigit():
+                    hashes, duration = float(fields[index]), float(fields[index + 1])
+                    status.device_speeds[str(device)] = hashes * 1000 / duration if duration else 0.0
+                    device += 1
+                    index += 2
+            elif key == "PROGRESS":
+                status.progress_done, status.progress_total = int(fields[index]), int(fields[index + 1])
+                index += 2
+            elif key == "RECHASH":
+                status.recovered, status.recovered_total = int(fields[index]), int(fields[index + 1])
+                index += 2
+            elif key == "REJECTED":
+                status.rejected = int(fields[index])
+                index += 1
+        
+        # Machine readable output has no ETA, derive it from the remaining keyspace
+        if status.speed and status.progress_total:
+            status.eta = (status.progress_total - status.progress_done) / status.speed
+        
+        return status
@@ -3,13 +3,48 @@ import logging
 import re
 import os
 import json
-from typing import List, Dict, Any, Optional, Tuple
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 
 from config.settings import HASHCAT_PATH, DEFAULT_HASHCAT_ARGS
 from entity.task import Task, HashType
+from usecase.hashcat_status import HashcatStatus, HashcatStatusParser
+from usecase.wordlist_stream import detect_compression, count_lines
 
 logger = logging.getLogger(__name__)
 
+# Hashcat hash modes of the hash types
+HASH_TYPE_IDS = {
+    HashType.MD5: 0,
+    HashType.SHA1: 100,
+    HashType.SHA256: 1400,
+    HashType.SHA512: 1700,
+    HashType.NTLM: 1000,
+    HashType.WPA: 2500,
+    HashType.BCRYPT: 3200,
+    HashType.CUSTOM: 0  # Default to MD5 for custom
+}
+
+# Flags the agent reads progress through, always passed whatever DEFAULT_HASHCAT_ARGS holds
+STATUS_FLAGS = ("--status", "--status-json")
+
+# Hashcat errors about the task itself, running the same chunk again would only repeat them
+DETERMINISTIC_ERRORS = (
+    "No hashes loaded",
+    "Token length exception",
+    "Separator unmatched",
+    "Line-length exception",
+    "Integer overflow detected in keyspace",
+    "Invalid argument",
+)
+
+# Candidate lengths in bytes hashcat accepts for a hash mode, other modes take 1 to 256
+PASSWORD_LENGTH_LIMITS = {
+    2500: (8, 63),  # WPA
+    22000: (8, 63),  # WPA-PBKDF2-PMKID+EAPOL
+    3200: (1, 72),  # bcrypt
+}
+
 
 class HashcatUseCase:
     """Use case for hashcat operations"""
@@ -70,10 +105,52 @@ class HashcatUseCase:
             logger.error(f"Error getting hashcat capabilities: {e}")
             return {"error": str(e)}
     
-    async def prepare_task_command(self, task: Task, output_file: str, temp_dir: str) -> List[str]:
-        """Prepare hashcat command for a task"""
+    async def get_keyspace(self, task: Task) -> Optional[int]:
+        """Get the keyspace of a task's attack using hashcat --keyspace"""
+        # Hashcat cannot read zstd wordlists, a dictionary attack's keyspace is its number of words
+        if task.attack_mode == 0 and task.wordlist_path and detect_compression(task.wordlist_path):
+            try:
+                return await asyncio.get_running_loop().run_in_executor(None, count_lines, task.wordlist_path)
+            except Exception as e:
+                logger.error(f"Error counting words of {task.wordlist_path}: {e}")
+                return None
+        
+        command = [
+            self.hashcat_path,
+            "--keyspace",
+            "-m", str(self.get_hash_type_id(task)),
+            "-a", str(task.attack_mode)
+        ]
+        command.extend(self._get_attack_args(task))
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+            
+            if process.returncode != 0:
+                logger.warning(f"Could not get keyspace for task {task.id}: {stderr.decode().strip()}")
+                return None
+            
+            # The keyspace is printed on the last non-empty line
+            for line in reversed(stdout.decode().splitlines()):
+                line = line.strip()
+                if line.isdigit():
+                    return int(line)
+            return None
+        except Exception as e:
+            logger.error(f"Error getting keyspace: {e}")
+            return None
+    
+    async def prepare_task_command(self, task: Task, output_file: str, temp_dir: str,
+                                   skip: Optional[int] = None, limit: Optional[int] = None,
+                                   potfile_path: Optional[str] = None, stdin_wordlist: bool = False) -> List[str]:
+        """Prepare hashcat command for a task, optionally restricted to a keyspace chunk"""
         # Create hash file
-        hash_file = os.path.join(temp_dir, f"task_{task.id}_hashes.txt")
+        hash_file = self.get_hash_file_path(task.id, temp_dir)
         with open(hash_file, "w") as f:
             for hash_value in task.hashes:
                 f.write(f"{hash_value}\n")
@@ -81,30 +158,32 @@ class HashcatUseCase:
         # Base command
         command = [
             self.hashcat_path,
-            "-m", str(task.hash_type_id or self._get_hash_type_id(task.hash_type)),
+            "-m", str(self.get_hash_type_id(task)),
             "-a", str(task.attack_mode),
             "-o", output_file,
             "--outfile-format=3",
-            "--status",
-            "--machine-readable"
+            *STATUS_FLAGS
         ]
         
-        # Add default args
+        # Add default args; the status flags above are needed for progress, configs may repeat them
         if DEFAULT_HASHCAT_ARGS:
-            command.extend(DEFAULT_HASHCAT_ARGS.split())
+            command.extend(arg for arg in DEFAULT_HASHCAT_ARGS.split() if arg not in STATUS_FLAGS)
+        
+        # Hashcat adds its cracks to the potfile and skips hashes already in it
+        if potfile_path:
+            command.extend(["--potfile-path", potfile_path])
         
         # Add hash file
         command.append(hash_file)
         
         # Add attack-specific options
-        if task.attack_mode == 0:  # Dictionary attack
-            if task.wordlist_path:
-                command.append(task.wordlist_path)
-            if task.rule_path:
-                command.extend(["-r", task.rule_path])
-        elif task.attack_mode == 3:  # Brute force with mask
-            if task.mask:
-                command.append(task.mask)
+        command.extend(self._get_attack_args(task, include_wordlist=not stdin_wordlist))
+        
+        # Restrict to the assigned keyspace chunk; words from stdin are cut to the chunk by the caller
+        if skip and not stdin_wordlist:
+            command.extend(["--skip", str(skip)])
+        if limit and not stdin_wordlist:
+            command.extend(["--limit", str(limit)])
         
         # Add additional args if provided
         if task.additional_args:
@@ -112,100 +191,127 @@ class HashcatUseCase:
         
         return command
     
-    async def run_hashcat(self, command: List[str]) -> asyncio.subprocess.Process:
-        """Run hashcat command"""
+    async def run_hashcat(self, command: List[str], stdin: Optional[int] = None) -> asyncio.subprocess.Process:
+        """Run hashcat command, optionally reading words from a pipe"""
         process = await asyncio.create_subprocess_exec(
             *command,
+            stdin=stdin,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE
         )
         return process
     
-    async def parse_hashcat_status(self, stdout: bytes, stderr: bytes) -> Dict[str, Any]:
-        """Parse hashcat status output"""
-        status = {
-            "progress": 0.0,
-            "speed": 0.0,
-            "recovered_hashes": [],
-            "status": "running",
-            "error": None
-        }
-        
-        try:
-            stdout_str = stdout.decode()
-            stderr_str = stderr.decode()
-            
-            # Check for errors
-            if "ERROR" in stderr_str:
-                error_match = re.search(r"ERROR: (.*)", stderr_str)
-                if error_match:
-                    status["error"] = error_match.group(1)
-                    status["status"] = "error"
-                    return status
-            
-            # Parse progress
-            progress_match = re.search(r"Progress\.+: (\d+)/(\d+) \((\d+\.\d+)%\)", stdout_str)
-            if progress_match:
-                current, total, percentage = progress_match.groups()
-                status["progress"] = float(percentage) / 100.0
-            
-            # Parse speed
-            speed_match = re.search(r"Speed\.+: (\d+(?:\.\d+)?)\s+([MKG]?H/s)", stdout_str)
-            if speed_match:
-                speed_value, speed_unit = speed_match.groups()
-                speed = float(speed_value)
-                if speed_unit == "KH/s":
-                    speed *= 1000
-                elif speed_unit == "MH/s":
-                    speed *= 1000000
-                elif speed_unit == "GH/s":
-                    speed *= 1000000000
-                status["speed"] = speed
-            
-            # Check if completed
-            if "Stopped" in stdout_str or "Exhausted" in stdout_str:
-                status["status"] = "completed"
-                status["progress"] = 1.0
-            
-            return status
-        except Exception as e:
-            logger.error(f"Error parsing hashcat status: {e}")
-            status["error"] = str(e)
-            status["status"] = "error"
-            return status
+    async def stream_status(self, stream: asyncio.StreamReader) -> AsyncIterator[HashcatStatus]:
+        """Yield hashcat status reports from its stdout as complete lines arrive"""
+        parser = HashcatStatusParser()
+        while True:
+            data = await stream.read(65536)
+            if not data:
+                break
+            for status in parser.feed(data):
+                yield status
+    
+    def is_deterministic_error(self, error: Optional[str]) -> bool:
+        """Check if a hashcat error comes from the task rather than the agent that ran it"""
+        return bool(error) and any(message in error for message in DETERMINISTIC_ERRORS)
+    
+    async def read_errors(self, stream: asyncio.StreamReader, max_lines: int = 20) -> List[str]:
+        """Collect the last lines hashcat writes to stderr"""
+        lines = deque(maxlen=max_lines)
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # Overlong line, asyncio has already dropped it
+                continue
+            if not line:
+                break
+            line = line.decode(errors="replace").strip()
+            if line:
+                lines.append(line)
+        return list(lines)
     
     async def parse_hashcat_results(self, output_file: str) -> List[Dict[str, str]]:
         """Parse hashcat results file"""
+        results, _ = await self.read_new_results(output_file, 0, final=True)
+        return results
+    
+    async def read_new_results(self, output_file: str, offset: int = 0, final: bool = False,
+                               max_bytes: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        """Parse results appended to a hashcat outfile since offset, returning them with the new offset"""
         results = []
         try:
-            if os.path.exists(output_file):
-                with open(output_file, "r") as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            parts = line.split(":")
-                            if len(parts) >= 2:
-                                hash_value = parts[0]
-                                plaintext = ":".join(parts[1:])
-                                results.append({
-                                    "hash": hash_value,
-                                    "plaintext": plaintext
-                                })
+            if not os.path.exists(output_file):
+                return results, offset
+            
+            with open(output_file, "rb") as f:
+                # A shorter file than the offset was rewritten, start over
+                if os.fstat(f.fileno()).st_size < offset:
+                    offset = 0
+                f.seek(offset)
+                if not max_bytes or final:
+                    data = f.read()
+                else:
+                    data = f.read(max_bytes)
+                    # A line longer than max_bytes is read to its end, or the offset could never move past it
+                    if b"\n" not in data:
+                        blocks = [data]
+                        while blocks[-1] and b"\n" not in blocks[-1]:
+                            blocks.append(f.read(max_bytes))
+                        data = b"".join(blocks)
+            
+            # Leave a line hashcat is still writing for the next read
+            if not final:
+                data = data[:data.rfind(b"\n") + 1]
+            
+            for line in data.decode(errors="replace").splitlines():
+                result = self._parse_result_line(line)
+                if result:
+                    results.append(result)
+            offset += len(data)
         except Exception as e:
             logger.error(f"Error parsing hashcat results: {e}")
         
-        return results
+        return results, offset
+    
+    def _parse_result_line(self, line: str) -> Optional[Dict[str, str]]:
+        """Parse a hash:plaintext outfile line"""
+        line = line.strip()
+        if not line:
+            return None
+        parts = line.split(":")
+        if len(parts) < 2:
+            return None
+        return {
+            "hash": parts[0],
+            "plaintext": ":".join(parts[1:])
+        }
+    
+    def get_hash_file_path(self, task_id: str, temp_dir: str) -> str:
+        """Path of the hash file written for a task's hashcat run"""
+        return os.path.join(temp_dir, f"task_{task_id}_hashes.txt")
+    
+    def _get_attack_args(self, task: Task, include_wordlist: bool = True) -> List[str]:
+        """Get attack-specific hashcat arguments for a task"""
+        args = []
+        if task.attack_mode == 0:  # Dictionary attack
+            if task.wordlist_path and include_wordlist:
+                args.append(task.wordlist_path)
+            if task.rule_path:
+                args.extend(["-r", task.rule_path])
+        elif task.attack_mode == 3:  # Brute force with mask
+            if task.mask:
+                args.append(task.mask)
+        return args
+    
+    def get_password_length_limits(self, task: Task) -> Tuple[int, int]:
+        """Shortest and longest candidate hashcat tries for a task's hash mode"""
+        return PASSWORD_LENGTH_LIMITS.get(self.get_hash_type_id(task), (1, 256))
+    
+    def get_hash_type_id(self, task: Task) -> int:
+        """Get the hashcat hash mode of a task"""
+        return task.hash_type_id or self._get_hash_type_id(task.hash_type)
     
     def _get_hash_type_id(self, hash_type: HashType) -> int:
         """Get hashcat hash type ID from enum"""
-        hash_type_map = {
-            HashType.MD5: 0,
-            HashType.SHA1: 100,
-            HashType.SHA256: 1400,
-            HashType.SHA512: 1700,
-            HashType.NTLM: 1000,
-            HashType.WPA: 2500,
-            HashType.BCRYPT: 3200,
-            HashType.CUSTOM: 0  # Default to MD5 for custom
-        }
-        return hash_type_map.get(hash_type, 0)
+        return HASH_TYPE_IDS.get(hash_type, 0)
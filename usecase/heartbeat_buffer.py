@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from config.settings import HEARTBEAT_FLUSH_INTERVAL, TASK_LEASE_DURATION
+from entity.agent import AgentStatus
+from repository.agent_repository import AgentRepository
+from repository.task_repository import TaskRepository
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatBuffer:
+    """Collects agent heartbeats and progress reports in memory and writes them in bulk"""
+    
+    def __init__(self, flush_interval: int = None):
+        # Milliseconds between flushes
+        self.flush_interval = flush_interval or HEARTBEAT_FLUSH_INTERVAL
+        self.agent_repo: Optional[AgentRepository] = None
+        self.task_repo: Optional[TaskRepository] = None
+        self._agents: Dict[str, Dict[str, Any]] = {}
+        self._chunks: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._last_seen: Dict[str, datetime] = {}
+    
+    def record_heartbeat(self, agent_id: str, status: AgentStatus) -> datetime:
+        """Buffer an agent heartbeat, the latest one per agent wins"""
+        now = datetime.utcnow()
+        self._agents[agent_id] = {"status": status, "last_seen": now}
+        self._last_seen[agent_id] = now
+        return now
+    
+    def record_chunk_progress(self, chunk_id: str, agent_id: str,
+                              progress: Optional[float] = None, speed: Optional[float] = None):
+        """Buffer progress of a running chunk; without progress only its lease is renewed"""
+        update = self._chunks.setdefault(chunk_id, {})
+        update["agent_id"] = agent_id
+        update["reported_at"] = datetime.utcnow()
+        if progress is not None:
+            update["progress"] = progress
+        if speed is not None:
+            update["speed"] = speed
+    
+    def record_task_progress(self, task_id: str, progress: Optional[float] = None, speed: Optional[float] = None):
+        """Buffer progress of a task run without chunks"""
+        update = self._tasks.setdefault(task_id, {})
+        update["reported_at"] = datetime.utcnow()
+        if progress is not None:
+            update["progress"] = progress
+        if speed is not None:
+            update["speed"] = speed
+    
+    def discard_chunk(self, chunk_id: str):
+        """Drop buffered progress of a chunk whose final status was written directly"""
+        self._chunks.pop(chunk_id, None)
+    
+    def discard_agent(self, agent_id: str):
+        """Forget a deleted agent"""
+        self._agents.pop(agent_id, None)
+        self._last_seen.pop(agent_id, None)
+    
+    def last_seen(self, agent_id: str) -> Optional[datetime]:
+        """Last heartbeat received by this process, including ones not written yet"""
+        return self._last_seen.get(agent_id)
+    
+    async def flush(self) -> int:
+        """Write everything buffered, one bulk write per collection"""
+        if not self.agent_repo or not self.task_repo:
+            return 0
+        
+        agents, self._agents = self._agents, {}
+        chunks, self._chunks = self._chunks, {}
+        tasks, self._tasks = self._tasks, {}
+        
+        written = 0
+        if agents:
+            written += await self.agent_repo.bulk_update_heartbeats(agents)
+        if chunks:
+            written += await self.task_repo.bulk_update_chunk_progress(chunks, TASK_LEASE_DURATION)
+        if tasks:
+            written += await self.task_repo.bulk_update_task_progress(tasks)
+        return written
+    
+    async def run(self, agent_repo: AgentRepository, task_repo: TaskRepository):
+        """Flush the buffer every flush interval"""
+        self.agent_repo = agent_repo
+        self.task_repo = task_repo
+        while True:
+            await asyncio.sleep(self.flush_interval / 1000)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing heartbeats: {e}")
@@ -0,0 +1,124 @@
+import mmap
+import os
+import struct
+from array import array
+from typing import Optional, Tuple
+
+from config.settings import WORDLIST_INDEX_STRIDE
+from usecase.wordlist_stream import BLOCK_SIZE
+
+# Bytes counted at a time while looking for one line break among many
+WINDOW_SIZE = 4096
+
+
+class LineIndex:
+    """Sparse line offsets of a plain wordlist, every stride-th line, to find any line's byte offset"""
+    
+    # Magic, stride, line count, wordlist size; the offsets follow as 64 bit integers
+    HEADER = struct.Struct("<8sQQQ")
+    MAGIC = b"HCLINES1"
+    
+    def __init__(self, stride: int, lines: int, size: int, offsets, wordlist: Optional[mmap.mmap] = None):
+        self.stride = stride
+        self.lines = lines
+        self.size = size
+        # offsets[k] is where line k * stride starts
+        self.offsets = offsets
+        self.wordlist = wordlist
+    
+    @classmethod
+    def build(cls, path: str, stride: int = None) -> "LineIndex":
+        """Index a wordlist in one pass over its memory map"""
+        stride = stride or WORDLIST_INDEX_STRIDE
+        offsets = array("Q", [0])
+        lines = 0
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return cls(stride, 0, 0, offsets)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image:
+                for start in range(0, size, BLOCK_SIZE):
+                    block = image[start:start + BLOCK_SIZE]
+                    count = block.count(b"\n")
+                    # Line n starts just past the n-th line break of the file
+                    next_line = len(offsets) * stride
+                    position = 0
+                    seen = lines
+                    while lines + count >= next_line:
+                        position = _skip_lines(block, position, next_line - seen)
+                        offsets.append(start + position)
+                        seen = next_line
+                        next_line += stride
+                    lines += count
+                last = image[size - 1:size]
+        # A last word without a line break
+        lines += last != b"\n"
+        # A break closing the file starts no line
+        if offsets[-1] >= size:
+            offsets.pop()
+        return cls(stride, lines, size, offsets)
+    
+    def save(self, path: str) -> None:
+        """Write the index, replacing the file atomically"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.stride, self.lines, self.size))
+            f.write(self.offsets.tobytes() if isinstance(self.offsets, array) else bytes(self.offsets))
+        os.replace(temp_path, path)
+    
+    @classmethod
+    def load(cls, path: str, wordlist_path: str) -> "LineIndex":
+        """Map an index and its wordlist into memory; raises ValueError if they do not belong together"""
+        with open(path, "rb") as f:
+            image = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, stride, lines, size = cls.HEADER.unpack_from(image)
+        if magic != cls.MAGIC or (len(image) - cls.HEADER.size) % 8:
+            image.close()
+            raise ValueError(f"{path} is not a line index")
+        if size != os.path.getsize(wordlist_path):
+            image.close()
+            raise ValueError(f"{path} indexes another version of {wordlist_path}")
+        
+        offsets = memoryview(image)[cls.HEADER.size:].cast("Q")
+        wordlist = None
+        if size:
+            with open(wordlist_path, "rb") as f:
+                wordlist = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(stride, lines, size, offsets, wordlist)
+    
+    def line_offset(self, line: int) -> int:
+        """Byte offset where a line starts, the wordlist size past the last line"""
+        if line >= self.lines:
+            return self.size
+        checkpoint, remaining = divmod(line, self.stride)
+        start = self.offsets[checkpoint]
+        if not remaining:
+            return start
+        # At most one stride of lines is scanned, whatever the size of the wordlist
+        end = self.offsets[checkpoint + 1] if checkpoint + 1 < len(self.offsets) else self.size
+        return start + _skip_lines(self.wordlist[start:end], 0, remaining)
+    
+    def byte_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Byte offset and length of the words of lines start to end, end excluded"""
+        if not 0 <= start <= end:
+            raise ValueError(f"Invalid line range {start}-{end}")
+        offset = self.line_offset(start)
+        return offset, self.line_offset(end) - offset
+
+
+def _skip_lines(data: bytes, position: int, lines: int) -> int:
+    """Offset just past the given number of line breaks from a position on"""
+    # Whole windows are counted in C, only the last one is searched break by break
+    while lines:
+        window_end = position + WINDOW_SIZE
+        count = data.count(b"\n", position, window_end)
+        if count < lines:
+            if window_end >= len(data):
+                return len(data)
+            lines -= count
+            position = window_end
+            continue
+        for _ in range(lines):
+            position = data.index(b"\n", position) + 1
+        return position
+    return position
@@ -30,7 +30,7 @@ class MockTaskUseCase:
     
     async def create_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         # Generate a unique ID for the new task
-        task_data["id"] = f"task{len(mock_db.tasks) + 1}"
+        task_data["id"] = f"task{len(mock_db.tasks_by_id) + 1}"
         
         # Add default fields if not present
         import datetime
@@ -44,9 +44,7 @@ class MockTaskUseCase:
             task_data["progress"] = 0.0
             
         # Add the task to the mock database
-        mock_db.tasks.append(task_data)
-        
-        return task_data
+        return mock_db.add_task(task_data)
     
     async def update_task(self, task_id: str, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         task = await self.get_task(task_id)
@@ -60,13 +58,7 @@ class MockTaskUseCase:
         return task
     
     async def delete_task(self, task_id: str) -> bool:
-        task = await self.get_task(task_id)
-        if not task:
-            return False
-        
-        # Remove task from mock database
-        mock_db.tasks = [t for t in mock_db.tasks if t["id"] != task_id]
-        return True
+        return mock_db.remove_task(task_id)
     
     async def cancel_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         task = await self.get_task(task_id)
@@ -99,12 +91,10 @@ class MockAgentUseCase:
     async def create_agent(self, agent_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new agent in the mock database"""
         # Generate a unique ID for the new agent
-        agent_data["id"] = f"agent{len(mock_db.agents) + 1}"
+        agent_data["id"] = f"agent{len(mock_db.agents_by_id) + 1}"
         
         # Add the agent to the mock database
-        mock_db.agents.append(agent_data)
-        
-        return agent_data
+        return mock_db.add_agent(agent_data)
 
 class MockResultUseCase:
     """Mock implementation of ResultUseCase"""
@@ -116,9 +106,9 @@ class MockResultUseCase:
         """Get all results with optional limit"""
         return await mock_db.get_results(0, limit)
     
-    async def get_results_by_task_id(self, task_id: str) -> List[Dict[str, Any]]:
+    async def get_results_by_task_id(self, task_id: str, skip: int = 0, limit: int = 1000) -> List[Dict[str, Any]]:
         """Get results for a specific task"""
-        return await mock_db.get_results(0, 1000, task_id)
+        return await mock_db.get_results(skip, limit or 1000, task_id)
     
     async def get_result_stats(self) -> Dict[str, int]:
         return await mock_db.get_result_stats()
@@ -0,0 +1,63 @@
+import re
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from config.settings import POTFILE_DELTA_LIMIT
+from entity.potfile import PotfileEntry
+from repository.potfile_repository import PotfileRepository
+
+HEX_HASH = re.compile(r"[0-9a-fA-F]+")
+
+
+def normalize_hash(hash_value: str) -> str:
+    """Canonical form of a hash for potfile lookups, plain hex digests are case-insensitive"""
+    hash_value = hash_value.strip()
+    if HEX_HASH.fullmatch(hash_value):
+        return hash_value.lower()
+    return hash_value
+
+
+class PotfileUseCase:
+    """Use case for the server-wide potfile of cracked hashes, keyed by hash type and hash"""
+    
+    def __init__(self, potfile_repo: PotfileRepository, hash_filter=None):
+        self.potfile_repo = potfile_repo
+        # HashFilter screening lookups, hashes it rules out are not looked up
+        self.hash_filter = hash_filter
+    
+    async def resolve(self, hash_type_id: int, hashes: List[str]) -> Dict[str, str]:
+        """Map the given hashes that were already cracked to their plaintext"""
+        normalized = {hash_value: normalize_hash(hash_value) for hash_value in hashes}
+        keys = list(set(normalized.values()))
+        if self.hash_filter:
+            keys = self.hash_filter.screen(keys)
+        if not keys:
+            return {}
+        plaintexts = await self.potfile_repo.find_plaintexts(hash_type_id, keys)
+        return {
+            hash_value: plaintexts[key]
+            for hash_value, key in normalized.items()
+            if key in plaintexts
+        }
+    
+    async def record(self, hash_type_id: int, recovered_hashes: List[Dict[str, str]],
+                     task_id: Optional[str] = None) -> int:
+        """Add recovered hashes to the potfile, returning how many were not known yet"""
+        entries = {}
+        for recovered in recovered_hashes:
+            key = normalize_hash(recovered["hash"])
+            entries.setdefault(key, PotfileEntry(
+                hash_type_id=hash_type_id,
+                hash_value=key,
+                plaintext=recovered["plaintext"],
+                task_id=task_id
+            ))
+        added = await self.potfile_repo.add_many(list(entries.values()))
+        if self.hash_filter:
+            self.hash_filter.add(entry.hash_value for entry in added)
+        return len(added)
+    
+    async def get_delta(self, hash_type_id: int, since: Optional[datetime] = None,
+                        limit: int = None) -> List[PotfileEntry]:
+        """Get entries of a hash type added at or after since, oldest first"""
+        return await self.potfile_repo.find_since(hash_type_id, since, limit or POTFILE_DELTA_LIMIT)
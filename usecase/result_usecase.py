@@ -7,12 +7,17 @@ from repository.result_repository import ResultRepository
 class ResultUseCase:
     """Use case for result management"""
     
-    def __init__(self, result_repo: ResultRepository):
+    def __init__(self, result_repo: ResultRepository, hash_filter=None):
         self.result_repo = result_repo
+        # HashFilter screening lookups by hash, hashes it rules out are not looked up
+        self.hash_filter = hash_filter
     
     async def create_result(self, result: Result) -> Result:
         """Create a new result"""
-        return await self.result_repo.create(result)
+        result = await self.result_repo.create(result)
+        if self.hash_filter:
+            self.hash_filter.add([result.hash_value])
+        return result
     
     async def get_result(self, result_id: str) -> Optional[Result]:
         """Get result by ID"""
@@ -22,12 +27,14 @@ class ResultUseCase:
         """Get all results with pagination"""
         return await self.result_repo.find_all(skip, limit)
     
-    async def get_results_by_task_id(self, task_id: str) -> List[Result]:
-        """Get results by task ID"""
-        return await self.result_repo.find_by_task_id(task_id)
+    async def get_results_by_task_id(self, task_id: str, skip: int = 0, limit: int = 0) -> List[Result]:
+        """Get results by task ID, a limit of 0 returns all"""
+        return await self.result_repo.find_by_task_id(task_id, skip, limit)
     
     async def get_result_by_hash(self, hash_value: str) -> Optional[Result]:
         """Get result by hash value"""
+        if self.hash_filter and not self.hash_filter.might_contain(hash_value):
+            return None
         return await self.result_repo.find_by_hash(hash_value)
     
     async def get_results_by_agent_id(self, agent_id: str) -> List[Result]:
@@ -44,8 +51,4 @@ class ResultUseCase:
     
     async def batch_create_results(self, results: List[Result]) -> List[Result]:
         """Create multiple results in batch"""
-        created_results = []
-        for result in results:
-            created_result = await self.result_repo.create(result)
-            created_results.append(created_result)
-        return created_results
+        return await self.result_repo.create_many(results)
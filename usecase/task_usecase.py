@@ -1,24 +1,75 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Callable, Tuple
 from datetime import datetime
 
+from config.settings import (
+    TASK_CHUNK_SIZE, TASK_CHUNK_DURATION, TASK_DEFAULT_CHUNK_KEYSPACE, TASK_LEASE_DURATION, TASK_CHUNK_MAX_ATTEMPTS
+)
 from entity.task import Task, TaskStatus
 from entity.agent import Agent
+from entity.chunk import Chunk, ChunkStatus
+from entity.result import Result
 from repository.task_repository import TaskRepository
 from repository.agent_repository import AgentRepository
 from repository.result_repository import ResultRepository
+from usecase.hashcat_usecase import HashcatUseCase
+from usecase.potfile_usecase import PotfileUseCase
+from usecase.file_catalog import FileCatalog
+from usecase.heartbeat_buffer import HeartbeatBuffer
+
+
+class NotAssignedError(Exception):
+    """An agent reporting on work it does not hold, or no longer holds"""
 
 
 class TaskUseCase:
     """Use case for task management"""
     
-    def __init__(self, task_repo: TaskRepository, agent_repo: AgentRepository, result_repo: ResultRepository):
+    def __init__(self, task_repo: TaskRepository, agent_repo: AgentRepository, result_repo: ResultRepository,
+                 hashcat_usecase: HashcatUseCase = None, potfile_usecase: PotfileUseCase = None,
+                 file_catalog: FileCatalog = None, heartbeat_buffer: HeartbeatBuffer = None):
         self.task_repo = task_repo
         self.agent_repo = agent_repo
         self.result_repo = result_repo
+        self.hashcat_usecase = hashcat_usecase or HashcatUseCase()
+        self.potfile_usecase = potfile_usecase
+        self.file_catalog = file_catalog
+        self.heartbeat_buffer = heartbeat_buffer
     
     async def create_task(self, task: Task) -> Task:
-        """Create a new task"""
-        return await self.task_repo.create(task)
+        """Create a new task, sharding its hashes when there are more than TASK_CHUNK_SIZE"""
+        # Hashes cracked before are resolved from the potfile and left out of the work
+        known = {}
+        if self.potfile_usecase and task.hashes:
+            known = await self.potfile_usecase.resolve(self.hashcat_usecase.get_hash_type_id(task), task.hashes)
+        if known:
+            task.hash_count = len(task.hashes)
+            task.hashes = [hash_value for hash_value in task.hashes if hash_value not in known]
+            task.recovered_count = task.hash_count - len(task.hashes)
+            task.last_cracked_at = datetime.utcnow()
+            if not task.hashes:
+                task.status = TaskStatus.COMPLETED
+                task.progress = 1.0
+                task.completed_at = task.last_cracked_at
+        
+        if len(task.hashes) <= TASK_CHUNK_SIZE:
+            created = await self.task_repo.create(task)
+            await self._add_known_results(created, known)
+            return created
+        
+        # The parent keeps the task definition, each shard carries a slice of the hashes
+        hashes = task.hashes
+        task.hashes = []
+        task.hash_count = task.recovered_count + len(hashes)
+        task.shard_count = (len(hashes) + TASK_CHUNK_SIZE - 1) // TASK_CHUNK_SIZE
+        parent = await self.task_repo.create(task)
+        
+        shards = [
+            parent.create_shard(index, hashes[index * TASK_CHUNK_SIZE:(index + 1) * TASK_CHUNK_SIZE])
+            for index in range(parent.shard_count)
+        ]
+        await self.task_repo.create_many(shards)
+        await self._add_known_results(parent, known)
+        return parent
     
     async def get_task(self, task_id: str) -> Optional[Task]:
         """Get task by ID"""
@@ -36,88 +87,210 @@ class TaskUseCase:
         """Update an existing task"""
         return await self.task_repo.update(task)
     
+    async def get_task_shards(self, task_id: str, skip: int = 0, limit: int = 100) -> List[Task]:
+        """Get the hash shards of a task"""
+        return await self.task_repo.find_by_parent_id(task_id, skip, limit)
+    
     async def delete_task(self, task_id: str) -> bool:
         """Delete a task"""
         # Delete associated results
         await self.result_repo.delete_by_task_id(task_id)
         
-        # Get task to check if assigned to an agent
-        task = await self.task_repo.find_by_id(task_id)
-        if task and task.agent_id:
-            # Clear task from agent
-            await self.agent_repo.clear_task(task.agent_id)
+        # Delete chunks and clear the task from every agent working on it
+        for work_id in [task_id] + await self.task_repo.find_shard_ids(task_id):
+            await self.task_repo.delete_chunks(work_id)
+            await self.agent_repo.clear_task_by_task_id(work_id)
+        await self.task_repo.delete_by_parent_id(task_id)
         
         # Delete task
         return await self.task_repo.delete(task_id)
     
-    async def assign_task_to_agent(self, task_id: str, agent_id: str) -> Optional[Task]:
-        """Assign task to an agent"""
-        # Check if task exists and is pending
-        task = await self.task_repo.find_by_id(task_id)
-        if not task or task.status != TaskStatus.PENDING:
-            return None
-        
-        # Check if agent exists and is available
-        agent = await self.agent_repo.find_by_id(agent_id)
-        if not agent or not agent.is_available():
-            return None
-        
-        # Assign task to agent
-        await self.agent_repo.assign_task(agent_id, task_id)
-        return await self.task_repo.assign_to_agent(task_id, agent_id)
+    async def get_task_chunks(self, task_id: str) -> List[Chunk]:
+        """Get the keyspace chunks of a task"""
+        return await self.task_repo.find_chunks_by_task_id(task_id)
+    
+    async def get_task_results(self, task_id: str, skip: int = 0, limit: int = 100) -> List[Result]:
+        """Get a page of the hashes recovered for a task"""
+        return await self.result_repo.find_by_task_id(task_id, skip, limit)
+    
+    async def get_chunk(self, chunk_id: str) -> Optional[Chunk]:
+        """Get chunk by ID"""
+        return await self.task_repo.find_chunk_by_id(chunk_id)
+    
+    async def get_held_chunk(self, agent_id: str) -> Optional[Chunk]:
+        """Get the chunk leased to an agent"""
+        return await self.task_repo.find_held_chunk(agent_id)
     
     async def update_task_status(self, task_id: str, status: TaskStatus, 
                                progress: float = None, speed: float = None,
-                               error: str = None) -> Optional[Task]:
-        """Update task status"""
+                               error: str = None, chunk_id: str = None,
+                               agent_id: str = None) -> Optional[Task]:
+        """Update task status, or the status of one of its chunks"""
+        if chunk_id:
+            return await self.update_chunk_status(task_id, chunk_id, status, progress, speed, error, agent_id)
+        
+        if agent_id:
+            task = await self.task_repo.find_by_id(task_id)
+            if not task:
+                return None
+            if task.agent_id != agent_id:
+                raise NotAssignedError(f"Agent {agent_id} is not assigned to task {task_id}")
+        
         task = await self.task_repo.update_status(task_id, status, progress, speed, error)
         
         # If task completed or failed, clear from agent
         if task and task.agent_id and status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
-            await self.agent_repo.clear_task(task.agent_id)
+            await self.agent_repo.clear_task(task.agent_id, return_document=False)
+        
+        if task and task.parent_id and status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+            await self._refresh_parent(task.parent_id)
         
         return task
     
+    async def update_chunk_status(self, task_id: str, chunk_id: str, status: TaskStatus,
+                                progress: float = None, speed: float = None,
+                                error: str = None, agent_id: str = None) -> Optional[Task]:
+        """Update a chunk reported by an agent and roll it up into its task"""
+        # Reports renew the lease; the chunk document itself says whether the agent still holds it
+        chunk = await self.task_repo.update_chunk_status(
+            chunk_id, ChunkStatus(status.value), progress, speed, error,
+            agent_id=agent_id, lease_seconds=TASK_LEASE_DURATION
+        )
+        if not chunk:
+            chunk = await self.task_repo.find_chunk_by_id(chunk_id)
+            if not chunk or chunk.task_id != task_id:
+                return None
+            if agent_id and chunk.agent_id != agent_id:
+                # The lease went to another agent, free this one for new work
+                await self.agent_repo.release_chunk(agent_id, chunk_id)
+            # Finished, cancelled or taken over, the agent has to drop it
+            raise NotAssignedError(f"Agent {agent_id} is not assigned to chunk {chunk_id}")
+        if chunk.task_id != task_id:
+            return None
+        
+        if not chunk.is_open() and self.heartbeat_buffer:
+            # Buffered progress flushed after the final status would only be refused
+            self.heartbeat_buffer.discard_chunk(chunk_id)
+        
+        if not chunk.is_open() and chunk.agent_id:
+            # Free the agent and remember how fast it got through the chunk
+            await self.agent_repo.clear_task(chunk.agent_id, return_document=False)
+            keyspace_speed = chunk.keyspace_rate()
+            if keyspace_speed:
+                await self.agent_repo.update_keyspace_speed(chunk.agent_id, keyspace_speed)
+        
+        if chunk.status == ChunkStatus.FAILED and self._should_retry(chunk):
+            # A crashed agent or a driver fault says nothing about the rest of the task, run the chunk again
+            if await self.task_repo.retry_chunk(chunk.id):
+                chunk.status = ChunkStatus.PENDING
+                chunk.progress = 0.0
+                chunk.failures += 1
+        
+        return await self._refresh_task_progress(task_id, chunk, speed, error)
+    
     async def add_recovered_hash(self, task_id: str, hash_value: str, plaintext: str, agent_id: str = None) -> Optional[Task]:
         """Add a recovered hash to the task"""
-        # Add to task's recovered hashes
-        task = await self.task_repo.add_recovered_hash(task_id, hash_value, plaintext)
-        
-        # Create result record
-        if task:
-            from entity.result import Result
-            result = Result(
-                task_id=task_id,
-                hash_value=hash_value,
-                plaintext=plaintext,
-                agent_id=agent_id or task.agent_id
+        return await self.add_recovered_hashes(task_id, [{"hash": hash_value, "plaintext": plaintext}], agent_id)
+    
+    async def add_recovered_hashes(self, task_id: str, recovered_hashes: List[Dict[str, str]], agent_id: str = None,
+                                   chunk_id: str = None) -> Optional[Task]:
+        """Add a batch of recovered hashes to the task, skipping hashes that are already recorded"""
+        if chunk_id:
+            chunk = await self.task_repo.find_chunk_by_id(chunk_id)
+            if not chunk or chunk.task_id != task_id:
+                return None
+            # Cracks its holder reports for a finished chunk still count
+            if chunk.agent_id != agent_id or chunk.status == ChunkStatus.CANCELLED:
+                raise NotAssignedError(f"Agent {agent_id} is not assigned to chunk {chunk_id}")
+        
+        task = await self.task_repo.find_by_id(task_id)
+        if not task:
+            return None
+        if agent_id and not chunk_id and task.agent_id != agent_id:
+            raise NotAssignedError(f"Agent {agent_id} is not assigned to task {task_id}")
+        
+        # Shards report their cracks under the parent task
+        result_task_id = task.parent_id or task_id
+        
+        # Deduplicate on hash value, within the batch and against stored results
+        batch = {}
+        for recovered in recovered_hashes:
+            batch.setdefault(recovered["hash"], recovered["plaintext"])
+        if not batch:
+            return task
+        existing = await self.result_repo.find_existing_hashes(result_task_id, list(batch))
+        new_hashes = [
+            {"hash": hash_value, "plaintext": plaintext}
+            for hash_value, plaintext in batch.items()
+            if hash_value not in existing
+        ]
+        if not new_hashes:
+            return task
+        
+        # Results are the record of cracked hashes, tasks only keep count
+        created = await self.result_repo.create_many([
+            Result(
+                task_id=result_task_id,
+                hash_value=recovered["hash"],
+                plaintext=recovered["plaintext"],
+                agent_id=agent_id or task.agent_id,
+                metadata={"shard_id": task_id} if task.parent_id else {}
             )
-            await self.result_repo.create(result)
+            for recovered in new_hashes
+        ])
+        
+        if not created:
+            return task
+        if self.potfile_usecase:
+            await self.potfile_usecase.record(
+                self.hashcat_usecase.get_hash_type_id(task),
+                [{"hash": result.hash_value, "plaintext": result.plaintext} for result in created],
+                result_task_id
+            )
+        task = await self.task_repo.increment_recovered(task_id, len(created))
+        if not task:
+            return None
+        if task.parent_id:
+            await self.task_repo.increment_recovered(task.parent_id, len(created))
+        
+        if task.hash_count and task.recovered_count >= task.hash_count:
+            task = await self._retire_task(task)
         
         return task
     
-    async def get_next_pending_task(self) -> Optional[Task]:
-        """Get the next pending task based on priority"""
-        return await self.task_repo.find_next_pending_task()
+    async def get_upcoming_tasks(self, limit: int) -> List[Task]:
+        """Get the tasks work is dispatched from next, highest priority first"""
+        return await self.task_repo.find_pending_tasks(limit)
     
-    async def auto_assign_tasks(self) -> int:
-        """Auto-assign pending tasks to available agents"""
+    async def auto_assign_tasks(self, on_assign: Optional[Callable[[str], None]] = None) -> int:
+        """Match all available agents to pending work in one batched pass"""
         # Get available agents
         agents = await self.agent_repo.find_available_agents()
         if not agents:
             return 0
         
-        # Assign tasks to agents
+        # Fetch candidate work for all agents at once
+        chunks = await self.task_repo.find_pending_chunks(limit=len(agents))
+        tasks = []
+        if len(chunks) < len(agents):
+            tasks = await self.task_repo.find_pending_tasks(limit=len(agents) - len(chunks))
+        
         assigned_count = 0
         for agent in agents:
-            # Get next pending task
-            task = await self.task_repo.find_next_pending_task()
-            if not task:
+            # Re-queued chunks go out before new keyspace is cut
+            chunk = chunks.pop(0) if chunks else None
+            while not chunk and tasks:
+                chunk = await self._cut_chunk(tasks[0], agent)
+                if not chunk or tasks[0].is_fully_dispatched():
+                    tasks.pop(0)
+            if not chunk:
                 break
             
-            # Assign task to agent
-            await self.assign_task_to_agent(task.id, agent.id)
-            assigned_count += 1
+            # Chunks lost to a concurrent assigner stay claimable for the next pass
+            if await self._lease_chunk(chunk, agent):
+                assigned_count += 1
+                if on_assign:
+                    on_assign(agent.id)
         
         return assigned_count
     
@@ -127,9 +300,160 @@ class TaskUseCase:
         if not task:
             return None
         
-        # If task is assigned to an agent, clear it
-        if task.agent_id and task.status in [TaskStatus.ASSIGNED, TaskStatus.RUNNING]:
-            await self.agent_repo.clear_task(task.agent_id)
+        # Cancel the unfinished shards of a sharded task, finished ones keep their outcome
+        for shard_id in await self.task_repo.cancel_shards(task_id):
+            await self._stop_work(shard_id)
+        
+        await self._stop_work(task_id)
         
         # Update task status to cancelled
         return await self.task_repo.update_status(task_id, TaskStatus.CANCELLED)
+    
+    async def _stop_work(self, task_id: str) -> None:
+        """Cancel outstanding chunks of a task and free the agents working on them"""
+        await self.task_repo.cancel_chunks(task_id)
+        await self.agent_repo.clear_task_by_task_id(task_id)
+    
+    async def _add_known_results(self, task: Task, known: Dict[str, str]) -> None:
+        """Record the hashes a task resolved from the potfile as its results"""
+        if not known:
+            return
+        await self.result_repo.create_many([
+            Result(task_id=task.id, hash_value=hash_value, plaintext=plaintext, metadata={"source": "potfile"})
+            for hash_value, plaintext in known.items()
+        ])
+    
+    async def _retire_task(self, task: Task) -> Optional[Task]:
+        """Complete a task early once every one of its hashes is cracked"""
+        if task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
+            return task
+        
+        await self._stop_work(task.id)
+        retired = await self.task_repo.update_status(task.id, TaskStatus.COMPLETED, 1.0)
+        if task.parent_id:
+            await self._refresh_parent(task.parent_id)
+        return retired
+    
+    async def _refresh_parent(self, parent_id: str) -> Optional[Task]:
+        """Derive a sharded task's status and progress from its shards"""
+        parent = await self.task_repo.find_by_id(parent_id)
+        if not parent or parent.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
+            return parent
+        
+        summary = await self.task_repo.summarize_shards(parent_id)
+        statuses = summary["statuses"]
+        finished = sum(statuses.get(status.value, 0) for status in
+                       [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED])
+        
+        if finished >= summary["total"]:
+            status = TaskStatus.FAILED if statuses.get(TaskStatus.FAILED.value) else TaskStatus.COMPLETED
+            return await self.task_repo.update_status(parent_id, status, summary["progress"])
+        
+        return await self.task_repo.update_status(parent_id, TaskStatus.RUNNING, summary["progress"])
+    
+    async def _cut_chunk(self, task: Task, agent: Agent) -> Optional[Chunk]:
+        """Cut the next chunk of a task's keyspace, sized for the agent"""
+        # Indexed wordlists give the keyspace, prepared ones also where the words of usable length start
+        wordlist_range = await self._get_wordlist_range(task)
+        first_line = wordlist_range[0] if wordlist_range else 0
+        
+        if task.keyspace is None:
+            if wordlist_range:
+                keyspace = wordlist_range[1]
+                if not keyspace:
+                    # No word of the wordlist fits the hash type, there is nothing to run
+                    task.keyspace = 0
+                    if await self.task_repo.set_keyspace(task.id, 0):
+                        await self.task_repo.update_status(task.id, TaskStatus.COMPLETED, 1.0, return_document=False)
+                        if task.parent_id:
+                            await self._refresh_parent(task.parent_id)
+                    return None
+            else:
+                keyspace = await self.hashcat_usecase.get_keyspace(task)
+            if not keyspace:
+                # Keyspace unknown, run the whole task as a single chunk
+                task.keyspace = 0
+                if not await self.task_repo.set_keyspace(task.id, 0):
+                    return None  # Another assigner already dispatched it
+                return await self.task_repo.create_chunk(Chunk(task_id=task.id))
+            
+            await self.task_repo.set_keyspace(task.id, keyspace)
+            task.keyspace = keyspace
+        
+        size = self._get_chunk_size(agent)
+        skip = await self.task_repo.advance_keyspace_offset(task.id, size)
+        if skip is None:
+            task.keyspace_offset = task.keyspace
+            return None
+        task.keyspace_offset = skip + size
+        
+        chunk = Chunk(task_id=task.id, skip=first_line + skip, limit=min(size, task.keyspace - skip))
+        return await self.task_repo.create_chunk(chunk)
+    
+    async def _get_wordlist_range(self, task: Task) -> Optional[Tuple[int, int]]:
+        """First line and line count of a task's words from its wordlist's index"""
+        if self.file_catalog is None:
+            return None
+        return await self.file_catalog.wordlist_range(task, self.hashcat_usecase.get_password_length_limits(task))
+    
+    async def _lease_chunk(self, chunk: Chunk, agent: Agent) -> Optional[Chunk]:
+        """Atomically claim a chunk and hand it to an agent"""
+        claimed = await self.task_repo.claim_chunk(chunk.id, agent.id, TASK_LEASE_DURATION)
+        if not claimed:
+            return None
+        # A chunk whose lease expired still names its previous holder, which must stop reporting on it
+        if chunk.agent_id and chunk.agent_id != agent.id:
+            await self.agent_repo.release_chunk(chunk.agent_id, chunk.id)
+        return await self._bind_agent(claimed, agent)
+    
+    async def _bind_agent(self, chunk: Chunk, agent: Agent) -> Optional[Chunk]:
+        """Atomically claim the agent for a chunk already claimed on its behalf"""
+        if not await self.agent_repo.claim_task(agent.id, chunk.task_id, chunk.id):
+            # Agent was taken by a concurrent assignment, put the chunk back
+            await self.task_repo.requeue_chunk(chunk.id, agent.id)
+            return None
+        
+        await self.task_repo.assign_to_agent(chunk.task_id, agent.id)
+        return chunk
+    
+    async def _refresh_task_progress(self, task_id: str, chunk: Chunk,
+                                     speed: float = None, error: str = None) -> Optional[Task]:
+        """Derive task status and progress from its chunks"""
+        task = await self.task_repo.find_by_id(task_id)
+        if not task or task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
+            return task
+        
+        if chunk.status == ChunkStatus.FAILED:
+            # Failing on every run, or in a way inherent to the task, it would fail all the other chunks too
+            await self.task_repo.cancel_chunks(task_id)
+            await self.agent_repo.clear_task_by_task_id(task_id)
+            task = await self.task_repo.update_status(task_id, TaskStatus.FAILED, error=error)
+            if task and task.parent_id:
+                await self._refresh_parent(task.parent_id)
+            return task
+        
+        if task.is_fully_dispatched() and await self.task_repo.count_open_chunks(task_id) == 0:
+            task = await self.task_repo.update_status(task_id, TaskStatus.COMPLETED, 1.0, speed)
+        else:
+            if task.keyspace:
+                progress = await self.task_repo.sum_completed_keyspace(task_id) / task.keyspace
+            else:
+                progress = chunk.progress
+            
+            task = await self.task_repo.update_status(task_id, TaskStatus.RUNNING, progress, speed)
+        
+        if task and task.parent_id and not chunk.is_open():
+            await self._refresh_parent(task.parent_id)
+        return task
+    
+    def _should_retry(self, chunk: Chunk) -> bool:
+        """Check if a failed chunk gets another run instead of failing its task"""
+        if self.hashcat_usecase.is_deterministic_error(chunk.error):
+            return False
+        return chunk.failures + 1 < TASK_CHUNK_MAX_ATTEMPTS
+    
+    def _get_chunk_size(self, agent: Agent) -> int:
+        """Keyspace units the agent can get through in TASK_CHUNK_DURATION"""
+        if agent.keyspace_speed:
+            return max(1, int(agent.keyspace_speed * TASK_CHUNK_DURATION))
+        return TASK_DEFAULT_CHUNK_KEYSPACE
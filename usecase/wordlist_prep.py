@@ -0,0 +1,200 @@
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from config.settings import WORDLIST_SORT_CHUNK_SIZE
+from usecase.wordlist_stream import detect_compression, open_wordlist
+
+logger = logging.getLogger(__name__)
+
+# Hashcat does not take longer candidates in any kernel
+MAX_WORD_LENGTH = 256
+
+# Runs merged at once, more are merged in several passes
+MERGE_FAN_IN = 64
+
+# Runs hold each word behind its length as three digits, so plain byte order puts shorter words first
+LENGTH_PREFIX = 3
+
+# Words written to the output at a time
+WRITE_BATCH = 65536
+
+INDEX_SUFFIX = ".index.json"
+
+
+def index_path(path: str) -> str:
+    """Path of a prepared wordlist's sidecar index"""
+    return f"{path}{INDEX_SUFFIX}"
+
+
+def load_index(path: str) -> Optional[Dict[str, Any]]:
+    """Sidecar index of a prepared wordlist, None if there is none or it belongs to another version"""
+    try:
+        with open(index_path(path), "r") as f:
+            index = json.load(f)
+        if index.get("size") != os.path.getsize(path):
+            return None
+        return index
+    except (OSError, ValueError):
+        return None
+
+
+def line_range(index: Dict[str, Any], min_length: int = 1, max_length: int = MAX_WORD_LENGTH) -> Tuple[int, int]:
+    """First line and number of lines of the words between two lengths, as --skip and keyspace"""
+    first_line = None
+    lines = 0
+    for bucket in index["buckets"]:
+        if min_length <= bucket["length"] <= max_length:
+            if first_line is None:
+                first_line = bucket["first_line"]
+            lines += bucket["lines"]
+    return first_line or 0, lines
+
+
+class WordlistPreprocessor:
+    """Sorts and deduplicates a wordlist with bounded memory, grouping its words by length"""
+    
+    def __init__(self, chunk_size: int = None, temp_dir: str = None):
+        # Bytes of the source sorted in memory at a time, memory use is about twenty times it
+        self.chunk_size = chunk_size or WORDLIST_SORT_CHUNK_SIZE
+        self.temp_dir = temp_dir
+    
+    def prepare(self, source: str, destination: str) -> Dict[str, Any]:
+        """Write the sorted, deduplicated words of source to destination with its sidecar index"""
+        stats = {"source_lines": 0, "rejected": 0}
+        with tempfile.TemporaryDirectory(dir=self.temp_dir or os.path.dirname(os.path.abspath(destination))) as work_dir:
+            runs = [self._write_run(chunk, work_dir, number, stats)
+                    for number, chunk in enumerate(self._read_chunks(source))]
+            runs = self._reduce_runs(runs, work_dir)
+            index = self._write_output(runs, destination)
+        
+        index.update({
+            "source": os.path.basename(source),
+            "source_lines": stats["source_lines"],
+            "rejected": stats["rejected"],
+            "duplicates": stats["source_lines"] - stats["rejected"] - index["lines"],
+            "created_at": datetime.utcnow().isoformat(),
+        })
+        temp_index = f"{index_path(destination)}.tmp"
+        with open(temp_index, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_index, index_path(destination))
+        logger.info(f"Prepared {destination}: {index['lines']} words of {stats['source_lines']} lines")
+        return index
+    
+    def _read_chunks(self, source: str) -> Iterator[bytes]:
+        """Pieces of the source of about chunk_size bytes, each ending at a line break"""
+        if detect_compression(source) is None:
+            if os.path.getsize(source) == 0:
+                return
+            with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as image:
+                start = 0
+                while start < len(image):
+                    end = image.find(b"\n", min(start + self.chunk_size, len(image)) - 1)
+                    end = len(image) if end < 0 else end + 1
+                    yield image[start:end]
+                    start = end
+            return
+        
+        with open_wordlist(source) as f:
+            pending = b""
+            while True:
+                block = f.read(self.chunk_size)
+                if not block:
+                    break
+                block = pending + block
+                cut = block.rfind(b"\n") + 1
+                if not cut:
+                    pending = block
+                    continue
+                pending = block[cut:]
+                yield block[:cut]
+            if pending:
+                yield pending
+    
+    def _write_run(self, chunk: bytes, work_dir: str, number: int, stats: Dict[str, int]) -> str:
+        """Sort and deduplicate one chunk into a run file"""
+        words = set()
+        lines = chunk.split(b"\n")
+        if lines and not lines[-1]:
+            lines.pop()
+        stats["source_lines"] += len(lines)
+        for line in lines:
+            word = line[:-1] if line.endswith(b"\r") else line
+            if not word or len(word) > MAX_WORD_LENGTH:
+                stats["rejected"] += 1
+                continue
+            words.add(b"%03d%s\n" % (len(word), word))
+        
+        path = os.path.join(work_dir, f"run_{number}")
+        with open(path, "wb") as f:
+            f.writelines(sorted(words))
+        return path
+    
+    def _reduce_runs(self, runs: List[str], work_dir: str) -> List[str]:
+        """Merge runs until few enough are left to be merged in one pass"""
+        generation = 0
+        while len(runs) > MERGE_FAN_IN:
+            merged = []
+            for start in range(0, len(runs), MERGE_FAN_IN):
+                path = os.path.join(work_dir, f"merge_{generation}_{start}")
+                with open(path, "wb") as f:
+                    f.writelines(self._merge(runs[start:start + MERGE_FAN_IN]))
+                merged.append(path)
+                for run in runs[start:start + MERGE_FAN_IN]:
+                    os.remove(run)
+            runs = merged
+            generation += 1
+        return runs
+    
+    def _merge(self, runs: List[str]) -> Iterator[bytes]:
+        """Lines of sorted runs in order, each line once"""
+        files: List[BinaryIO] = [open(run, "rb", buffering=1024 * 1024) for run in runs]
+        try:
+            previous = None
+            for line in heapq.merge(*files):
+                if line != previous:
+                    yield line
+                    previous = line
+        finally:
+            for f in files:
+                f.close()
+    
+    def _write_output(self, runs: List[str], destination: str) -> Dict[str, Any]:
+        """Write the merged words, recording where the words of each length start"""
+        buckets = []
+        digest = hashlib.sha256()
+        offset = 0
+        line_count = 0
+        prefix = None
+        batch = []
+        temp_destination = f"{destination}.tmp"
+        with open(temp_destination, "wb", buffering=1024 * 1024) as f:
+            for line in self._merge(runs):
+                if line[:LENGTH_PREFIX] != prefix:
+                    offset += self._flush(f, digest, batch)
+                    prefix = line[:LENGTH_PREFIX]
+                    buckets.append({"length": int(prefix), "first_line": line_count, "offset": offset, "lines": 0})
+                batch.append(line[LENGTH_PREFIX:])
+                buckets[-1]["lines"] += 1
+                line_count += 1
+                if len(batch) >= WRITE_BATCH:
+                    offset += self._flush(f, digest, batch)
+            offset += self._flush(f, digest, batch)
+        os.replace(temp_destination, destination)
+        return {"lines": line_count, "size": offset, "sha256": digest.hexdigest(), "buckets": buckets}
+    
+    @staticmethod
+    def _flush(f: BinaryIO, digest, batch: List[bytes]) -> int:
+        """Write a batch of words, returning the bytes written"""
+        data = b"".join(batch)
+        f.write(data)
+        digest.update(data)
+        batch.clear()
+        return len(data)
@@ -0,0 +1,166 @@
+import gzip
+import logging
+import os
+import threading
+from typing import BinaryIO, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of the compressed formats
+MAGIC_NUMBERS = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+# Bytes decompressed and written to the pipe at a time
+BLOCK_SIZE = 1024 * 1024
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Compression format of a file from its magic number, None for plain files"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4)
+    except OSError:
+        return None
+    for magic, compression in MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def open_wordlist(path: str) -> BinaryIO:
+    """Open a wordlist for reading, decompressing it on the fly"""
+    compression = detect_compression(path)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd compressed, install zstandard to read it")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def count_lines(path: str) -> int:
+    """Number of words in a wordlist, compressed or not"""
+    lines = 0
+    last = b"\n"
+    with open_wordlist(path) as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    # A last word without a line break
+    return lines + (last != b"\n")
+
+
+class WordlistFeeder:
+    """Streams a wordlist, decompressed in a background thread, into a pipe for hashcat's stdin"""
+    
+    def __init__(self, path: str, skip: int = 0, limit: Optional[int] = None):
+        self.path = path
+        # Hashcat takes no --skip/--limit on stdin, the chunk is cut out here by words
+        self.skip = skip or 0
+        self.limit = limit
+        self.lines_fed = 0
+        self.error: Optional[Exception] = None
+        self._read_fd: Optional[int] = None
+        self._write_fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def progress(self) -> float:
+        """Share of the chunk's words written to the pipe"""
+        if not self.limit:
+            return 0.0
+        return min(self.lines_fed / self.limit, 1.0)
+    
+    def open_pipe(self) -> int:
+        """Create the pipe, returning the end passed to hashcat as stdin"""
+        self._read_fd, self._write_fd = os.pipe()
+        return self._read_fd
+    
+    def start(self) -> None:
+        """Start feeding once hashcat holds the read end"""
+        # Hashcat has its own copy now, its exit must break the pipe
+        os.close(self._read_fd)
+        self._read_fd = None
+        self._thread = threading.Thread(target=self._feed, name=f"wordlist-feeder-{os.path.basename(self.path)}",
+                                        daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop feeding, hashcat sees the end of its input"""
+        self._stop.set()
+    
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Wait for the feeding thread, or close the pipe if feeding never started"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return
+        for fd in (self._read_fd, self._write_fd):
+            if fd is not None:
+                os.close(fd)
+        self._read_fd = self._write_fd = None
+    
+    def _feed(self) -> None:
+        try:
+            with os.fdopen(self._write_fd, "wb", buffering=BLOCK_SIZE) as pipe, open_wordlist(self.path) as wordlist:
+                self._copy(wordlist, pipe)
+        except BrokenPipeError:
+            # Hashcat exited first, cracked everything or was stopped
+            logger.debug(f"Hashcat closed its input while reading {self.path}")
+        except Exception as e:
+            logger.error(f"Error streaming wordlist {self.path}: {e}")
+            self.error = e
+        finally:
+            self._write_fd = None
+    
+    def _copy(self, wordlist: BinaryIO, pipe: BinaryIO) -> None:
+        to_skip = self.skip
+        remaining = self.limit
+        last = b"\n"
+        while not self._stop.is_set() and remaining != 0:
+            block = wordlist.read(BLOCK_SIZE)
+            if not block:
+                break
+            
+            if to_skip:
+                skipped = block.count(b"\n")
+                # The words after the last line break of a block belong to the next one
+                if skipped < to_skip:
+                    to_skip -= skipped
+                    continue
+                block = block[_nth_line_end(block, to_skip):]
+                to_skip = 0
+            
+            if remaining is not None:
+                lines = block.count(b"\n")
+                if lines >= remaining:
+                    block = block[:_nth_line_end(block, remaining)]
+                    lines = remaining
+                remaining -= lines
+            else:
+                lines = block.count(b"\n")
+            
+            pipe.write(block)
+            self.lines_fed += lines
+            last = block[-1:] or last
+        
+        # The last word of a file without a final line break
+        if last != b"\n" and not self._stop.is_set():
+            pipe.write(b"\n")
+            self.lines_fed += 1
+
+
+def _nth_line_end(block: bytes, n: int) -> int:
+    """Offset just past the n-th line break of a block"""
+    position = 0
+    for _ in range(n):
+        position = block.index(b"\n", position) + 1
+    return position